@@ -2,12 +2,10 @@ import os
 
 from core import logging
 from core.api.health import create_api as create_health_api
-from core.api.middleware.database_connection_middleware import DatabaseConnectionMiddleware
 from core.api.middleware.exception_handling_middleware import ExceptionHandlingMiddleware
 from core.api.middleware.logging_middleware import LoggingMiddleware
 from core.api.middleware.server_headers_middleware import ServerHeadersMiddleware
 from core.http.basic_authentication import BasicAuthentication
-from core.queues.sqs import SqsMessageQueue
 from core.requester import Requester
 from core.store.database import Database
 from core.util.value_holder import RequestIdHolder
@@ -18,6 +16,7 @@ from pablo import PabloClient
 
 from notd.activity_manager import ActivityManager
 from notd.api.api_v1 import create_api as create_v1_api
+from notd.api.database_connection_middleware import DatabaseConnectionMiddleware
 from notd.api.gallery_v1 import create_api as create_gallery_v1_api
 from notd.api.gm_v1 import create_api as create_gm_v1_api
 from notd.api.response_builder import ResponseBuilder
@@ -26,6 +25,8 @@ from notd.badge_manager import BadgeManager
 from notd.badge_processor import BadgeProcessor
 from notd.block_manager import BlockManager
 from notd.block_processor import BlockProcessor
+from notd.broadcast_hub import BroadcastHub
+from notd.broadcast_hub import PostgresBroadcastBackend
 from notd.collection_activity_processor import CollectionActivityProcessor
 from notd.collection_manager import CollectionManager
 from notd.collection_overlap_manager import CollectionOverlapManager
@@ -37,7 +38,9 @@ from notd.gm_manager import GmManager
 from notd.listing_manager import ListingManager
 from notd.lock_manager import LockManager
 from notd.manager import NotdManager
+from notd.message_queues import create_message_queue
 from notd.ownership_manager import OwnershipManager
+from notd.store.pooled_database import PooledDatabase
 from notd.store.retriever import Retriever
 from notd.store.saver import Saver
 from notd.sub_collection_manager import SubCollectionManager
@@ -73,13 +76,14 @@ twitterBearerToken = os.environ["TWITTER_BEARER_TOKEN"]
 ethNodeUsername = os.environ["ETH_NODE_USERNAME"]
 ethNodePassword = os.environ["ETH_NODE_PASSWORD"]
 ethNodeUrl = os.environ["ETH_NODE_URL"]
+queueBackend = os.environ.get('QUEUE_BACKEND', 'sqs')
 
 databaseConnectionString = Database.create_psql_connection_string(username=os.environ["DB_USERNAME"], password=os.environ["DB_PASSWORD"], host=os.environ["DB_HOST"], port=os.environ["DB_PORT"], name=os.environ["DB_NAME"])
-database = Database(connectionString=databaseConnectionString)
+database = PooledDatabase(connectionString=databaseConnectionString, poolSize=int(os.environ.get('DB_POOL_SIZE', 5)), maxOverflow=int(os.environ.get('DB_POOL_MAX_OVERFLOW', 10)))
 saver = Saver(database=database)
 retriever = Retriever(database=database)
-workQueue = SqsMessageQueue(region='eu-west-1', accessKeyId=accessKeyId, accessKeySecret=accessKeySecret, queueUrl='https://sqs.eu-west-1.amazonaws.com/097520841056/notd-work-queue')
-tokenQueue = SqsMessageQueue(region='eu-west-1', accessKeyId=accessKeyId, accessKeySecret=accessKeySecret, queueUrl='https://sqs.eu-west-1.amazonaws.com/097520841056/notd-token-queue')
+workQueue = create_message_queue(queueBackend=queueBackend, queueName='notd-work-queue', database=database, accessKeyId=accessKeyId, accessKeySecret=accessKeySecret)
+tokenQueue = create_message_queue(queueBackend=queueBackend, queueName='notd-token-queue', database=database, accessKeyId=accessKeyId, accessKeySecret=accessKeySecret)
 ethNodeAuth = BasicAuthentication(username=ethNodeUsername, password=ethNodePassword)
 ethNodeRequester = Requester(headers={'Authorization': f'Basic {ethNodeAuth.to_string()}'})
 ethClient = RestEthClient(url=ethNodeUrl, requester=ethNodeRequester)
@@ -110,13 +114,15 @@ tokenManager = TokenManager(saver=saver, retriever=retriever, tokenQueue=tokenQu
 twitterManager = TwitterManager(saver=saver, retriever=retriever, requester=requester, workQueue=workQueue, twitterBearerToken=twitterBearerToken)
 badgeProcessor = BadgeProcessor(retriever=retriever, saver=saver)
 badgeManager = BadgeManager(retriever=retriever, saver=saver, workQueue=workQueue, badgeProcessor=badgeProcessor)
-delegationManager = DelegationManager(ethClient=ethClient)
+delegationBroadcastHub = BroadcastHub(backend=PostgresBroadcastBackend(database=database, channel='notd_delegations'))
+delegationManager = DelegationManager(ethClient=ethClient, delegationBroadcastHub=delegationBroadcastHub)
 tokenStakingProcessor = TokenStakingProcessor(ethClient=ethClient, retriever=retriever)
 tokenStakingManager = TokenStakingManager(retriever=retriever, saver=saver, tokenQueue=tokenQueue, workQueue=workQueue, tokenStakingProcessor=tokenStakingProcessor)
-blockManager = BlockManager(saver=saver, retriever=retriever, workQueue=workQueue, blockProcessor=blockProcessor, tokenManager=tokenManager, collectionManager=collectionManager, ownershipManager=ownershipManager, tokenStakingManager=tokenStakingManager)
+blockManager = BlockManager(saver=saver, retriever=retriever, workQueue=workQueue, blockProcessor=blockProcessor, tokenManager=tokenManager, collectionManager=collectionManager, ownershipManager=ownershipManager, tokenStakingManager=tokenStakingManager, delegationManager=delegationManager)
 notdManager = NotdManager(saver=saver, retriever=retriever, workQueue=workQueue, blockManager=blockManager, tokenManager=tokenManager, activityManager=activityManager, attributeManager=attributeManager, collectionManager=collectionManager, ownershipManager=ownershipManager, listingManager=listingManager, twitterManager=twitterManager, collectionOverlapManager=collectionOverlapManager, badgeManager=badgeManager, delegationManager=delegationManager, tokenStakingManager=tokenStakingManager, subCollectionTokenManager=subCollectionTokenManager, subCollectionManager=subCollectionManager, requester=requester, revueApiKey=revueApiKey)
 galleryManager = GalleryManager(ethClient=ethClient, retriever=retriever, saver=saver, twitterManager=twitterManager, collectionManager=collectionManager, badgeManager=badgeManager)
-gmManager = GmManager(retriever=retriever, saver=saver, delegationManager=delegationManager)
+gmBroadcastHub = BroadcastHub(backend=PostgresBroadcastBackend(database=database, channel='notd_gms'), historySize=500, subscriberQueueSize=100)
+gmManager = GmManager(retriever=retriever, saver=saver, delegationManager=delegationManager, gmBroadcastHub=gmBroadcastHub, lockManager=lockManager)
 responseBuilder = ResponseBuilder(retriever=retriever)
 
 app = FastAPI()
@@ -127,7 +133,14 @@ app.include_router(prefix='/gm/v1', router=create_gm_v1_api(gmManager=gmManager,
 app.add_middleware(ExceptionHandlingMiddleware)
 app.add_middleware(ServerHeadersMiddleware, name=name, version=version, environment=environment)
 app.add_middleware(LoggingMiddleware, requestIdHolder=requestIdHolder)
-app.add_middleware(DatabaseConnectionMiddleware, database=database)
+# NOTE(krishan711): the gm stream stays open for as long as the client listens and these routes spend most of their time on eth calls so they shouldn't sit on a connection
+app.add_middleware(DatabaseConnectionMiddleware, database=database, lazyPathPatterns=[
+    '/gm/v1/generate-gms',
+    '/gm/v1/gm',
+    '/v1/accounts/[^/]+/delegated-tokens',
+    '/v1/accounts/[^/]+/refresh-token-ownerships',
+    '/gallery/v1/collections/[^/]+/tokens/[^/]+/airdrops',
+])
 app.add_middleware(CORSMiddleware, allow_credentials=True, allow_methods=['*'], allow_headers=['*'], expose_headers=['*'], allow_origins=[
     'http://localhost:3000',
     'http://localhost:3001',
@@ -149,9 +162,15 @@ async def startup():
     await database.connect()
     await workQueue.connect()
     await tokenQueue.connect()
+    await gmBroadcastHub.connect()
+    await delegationBroadcastHub.connect()
+    delegationManager.start_delegation_event_listener()
 
 @app.on_event('shutdown')
 async def shutdown():
+    await delegationManager.stop_delegation_event_listener()
+    await delegationBroadcastHub.disconnect()
+    await gmBroadcastHub.disconnect()
     await database.disconnect()
     await workQueue.disconnect()
     await tokenQueue.disconnect()
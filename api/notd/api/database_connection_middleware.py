@@ -0,0 +1,31 @@
+import re
+from typing import Optional
+from typing import Sequence
+
+from core.store.database import Database
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.middleware.base import RequestResponseEndpoint
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp
+
+
+class DatabaseConnectionMiddleware(BaseHTTPMiddleware):
+
+    def __init__(self, app: ASGIApp, database: Database, lazyPathPatterns: Optional[Sequence[str]] = None) -> None:
+        super().__init__(app=app)
+        self.database = database
+        self.lazyPathRegexes = [re.compile(lazyPathPattern) for lazyPathPattern in (lazyPathPatterns or [])]
+
+    def _is_lazy_request(self, request: Request) -> bool:
+        # NOTE(krishan711): lazy requests hold no connection, each query checks one out from the pool and returns it straight after.
+        # This means their queries don't share one view of the database so only routes that mostly wait on other services should be lazy.
+        return any(lazyPathRegex.fullmatch(request.url.path) for lazyPathRegex in self.lazyPathRegexes)
+
+    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
+        if self._is_lazy_request(request=request):
+            response = await call_next(request)
+        else:
+            async with self.database.create_context_connection():
+                response = await call_next(request)
+        return response
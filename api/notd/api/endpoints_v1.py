@@ -359,6 +359,12 @@ class GetLatestGmForAccountRequest(BaseModel):
 class GetLatestGmForAccountResponse(BaseModel):
     latestAccountGm: ApiLatestAccountGm
 
+class UpdateGmLeaderboardsRequest(BaseModel):
+    pass
+
+class UpdateGmLeaderboardsResponse(BaseModel):
+    pass
+
 class ListGalleryCollectionOverlapsRequest(BaseModel):
     pass
 
@@ -406,12 +412,6 @@ class CalculateCommonOwnersRequest(BaseModel):
 class CalculateCommonOwnersResponse(BaseModel):
     ownerAddresses: List[str]
 
-class UpdateStakingsForAllCollectionsDeferredRequest(BaseModel):
-    pass
-
-class UpdateStakingsForAllCollectionsDeferredResponse(BaseModel):
-    pass
-
 class ListEntriesInSuperCollectionRequest(BaseModel):
     pass
 
@@ -9,6 +9,7 @@ from notd.api.endpoints_v1 import GetLatestGmForAccountResponse
 from notd.api.endpoints_v1 import ListGmAccountRowsResponse
 from notd.api.endpoints_v1 import ListGmCollectionAccountRowsResponse
 from notd.api.endpoints_v1 import ListGmCollectionRowsResponse
+from notd.api.endpoints_v1 import UpdateGmLeaderboardsResponse
 from notd.api.response_builder import ResponseBuilder
 from notd.gm_manager import GmManager
 
@@ -26,6 +27,11 @@ def create_api(gmManager: GmManager, responseBuilder: ResponseBuilder) -> APIRou
         await gmManager.create_anonymous_gm()
         return CreateAnonymousGmResponse()
 
+    @router.post('/update-leaderboards', response_model=UpdateGmLeaderboardsResponse)
+    async def update_gm_leaderboards() -> UpdateGmLeaderboardsResponse:
+        await gmManager.update_gm_leaderboards()
+        return UpdateGmLeaderboardsResponse()
+
     @router.get('/account-rows', response_model=ListGmAccountRowsResponse)
     async def list_gm_account_rows() -> ListGmAccountRowsResponse:
         gmAccountRows = await gmManager.list_gm_account_rows()
@@ -42,14 +48,16 @@ def create_api(gmManager: GmManager, responseBuilder: ResponseBuilder) -> APIRou
         return ListGmCollectionRowsResponse(collectionRows=(await responseBuilder.gm_collection_rows_from_models(gmCollectionRows=gmCollectionRows)))
 
     @router.route('/generate-gms')
-    async def sse(rawRequest: Request) -> StreamingResponse:  # pylint: disable=unused-argument
+    async def sse(rawRequest: Request) -> StreamingResponse:
+        lastEventIdHeader = rawRequest.headers.get('last-event-id')
+        lastEventId = int(lastEventIdHeader) if lastEventIdHeader and lastEventIdHeader.isdigit() else None
         sseHeaders = {
             'Content-type': 'text/event-stream',
             'Cache-Control': 'no-cache',
             'Connection': 'keep-alive',
         }
         # TODO(krishan711): gmManager shouldn't be dealing with the structure of the response
-        return StreamingResponse(gmManager.generate_gms(), headers=sseHeaders)
+        return StreamingResponse(gmManager.generate_gms(lastEventId=lastEventId), headers=sseHeaders)
 
     @router.get('/accounts/{address}/latest-gm')
     async def get_latest_gm_for_account(address: str) -> GetLatestGmForAccountResponse:
@@ -1,3 +1,8 @@
+from collections import defaultdict
+from typing import Dict
+from typing import Set
+from typing import Tuple
+
 import sqlalchemy
 from core import logging
 from core.queues.message_queue import MessageQueue
@@ -5,14 +10,19 @@ from core.queues.model import Message
 from core.store.retriever import StringFieldFilter
 from core.util import date_util
 
+from notd.messages import UpdateCollectionAttributeBitmapsMessageContent
 from notd.messages import UpdateCollectionTokenAttributesMessageContent
 from notd.messages import UpdateTokenAttributesForAllCollectionsMessageContent
 from notd.model import GALLERY_COLLECTIONS
+from notd.model import RetrievedTokenAttributeBitmap
 from notd.store.retriever import Retriever
 from notd.store.saver import Saver
 from notd.store.schema import TokenAttributesTable
 from notd.store.schema import TokenMetadatasTable
 from notd.token_attributes_processor import TokenAttributeProcessor
+from notd.token_id_bitmap import create_bitmap
+from notd.token_id_bitmap import get_bitmap_token_id
+from notd.token_id_bitmap import serialize_bitmap
 
 
 class AttributeManager:
@@ -61,3 +71,35 @@ class AttributeManager:
             await self.saver.delete_token_attributes(tokenAttributeIds=currentTokenAttributeIds, connection=connection)
             logging.info(f'Saving {len(tokenAttributes)} attributes')
             await self.saver.create_token_attributes(retrievedTokenAttributes=tokenAttributes, connection=connection)
+        await self.update_collection_attribute_bitmaps_deferred(registryAddress=registryAddress)
+
+    async def update_collection_attribute_bitmaps_deferred(self, registryAddress: str) -> None:
+        await self.tokenQueue.send_message(message=UpdateCollectionAttributeBitmapsMessageContent(registryAddress=registryAddress).to_message())
+
+    async def update_collection_attribute_bitmaps(self, registryAddress: str) -> None:
+        tokenAttributesQuery = (
+            sqlalchemy.select(TokenAttributesTable.c.tokenId, TokenAttributesTable.c.name, TokenAttributesTable.c.value)
+            .where(TokenAttributesTable.c.registryAddress == registryAddress)
+            .where(TokenAttributesTable.c.value.is_not(None))
+        )
+        tokenAttributesResult = await self.retriever.database.execute(query=tokenAttributesQuery)
+        attributeTokenIdValuesMap: Dict[Tuple[str, str], Set[int]] = defaultdict(set)
+        for tokenId, name, value in tokenAttributesResult:
+            tokenIdValue = get_bitmap_token_id(tokenId=tokenId)
+            if tokenIdValue is None:
+                # NOTE(krishan711): collections without small numeric ids are left to the attribute joins in query_collection_tokens
+                logging.info(f'Not building attribute bitmaps for {registryAddress} as it has token id {tokenId}')
+                await self.saver.delete_token_attribute_bitmaps_for_collection(registryAddress=registryAddress)
+                return
+            attributeTokenIdValuesMap[(name, value)].add(tokenIdValue)
+        retrievedTokenAttributeBitmaps = [RetrievedTokenAttributeBitmap(
+            registryAddress=registryAddress,
+            name=name,
+            value=value,
+            tokenCount=len(tokenIdValues),
+            bitmap=serialize_bitmap(bitmap=create_bitmap(tokenIdValues=tokenIdValues)),
+        ) for (name, value), tokenIdValues in attributeTokenIdValuesMap.items()]
+        logging.info(f'Saving {len(retrievedTokenAttributeBitmaps)} attribute bitmaps for {registryAddress}')
+        async with self.saver.create_transaction() as connection:
+            await self.saver.delete_token_attribute_bitmaps_for_collection(registryAddress=registryAddress, connection=connection)
+            await self.saver.create_token_attribute_bitmaps(retrievedTokenAttributeBitmaps=retrievedTokenAttributeBitmaps, connection=connection)
@@ -0,0 +1,339 @@
+import abc
+import asyncio
+import dataclasses
+import datetime
+import os
+import socket
+import sys
+import time
+from abc import ABC
+from asyncio.subprocess import Process
+from typing import Generic
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Set
+from typing import Tuple
+from typing import TypeVar
+
+import sqlalchemy
+from core import logging
+from core.exceptions import KibaException
+from core.slack_client import SlackClient
+from core.store.database import Database
+from core.util import date_util
+from core.util import list_util
+from sqlalchemy.dialects import postgresql
+
+from notd.store.schema import BackfillCheckpointsTable
+
+BACKFILL_PROCESS_INDEX_KEY = 'BACKFILL_PROCESS_INDEX'
+
+BackfillItem = TypeVar('BackfillItem')
+
+
+class BackfillJob(ABC, Generic[BackfillItem]):
+
+    def __init__(self, name: str, startIndex: int, endIndex: int) -> None:
+        self.name = name
+        self.startIndex = startIndex
+        self.endIndex = endIndex
+
+    @abc.abstractmethod
+    async def list_items(self, startIndex: int, endIndex: int) -> Sequence[BackfillItem]:
+        pass
+
+    @abc.abstractmethod
+    async def process_item(self, item: BackfillItem) -> None:
+        pass
+
+
+@dataclasses.dataclass
+class BackfillPartition:
+    backfillCheckpointId: int
+    startIndex: int
+    endIndex: int
+    completedIndex: int
+
+
+class AdaptiveConcurrencyLimit:
+
+    def __init__(self, initialLimit: int, minLimit: int, maxLimit: int, latencyTolerance: float) -> None:
+        self.limit = initialLimit
+        self.minLimit = minLimit
+        self.maxLimit = maxLimit
+        self.latencyTolerance = latencyTolerance
+        self.baselineLatencySeconds: Optional[float] = None
+        self.sampleCount = 0
+        self.sampleFailureCount = 0
+        self.sampleLatencySeconds = 0.0
+
+    def record(self, latencySeconds: float, didSucceed: bool) -> None:
+        self.sampleCount += 1
+        self.sampleLatencySeconds += latencySeconds
+        if not didSucceed:
+            self.sampleFailureCount += 1
+        if self.sampleCount >= self.limit:
+            self._update_limit()
+
+    def _update_limit(self) -> None:
+        # NOTE(krishan711): the item latency covers the node and database calls it makes so it rising above the best seen means one of them is saturated.
+        # The baseline creeps up slowly so a permanently slower node doesn't pin the limit at the minimum.
+        averageLatencySeconds = self.sampleLatencySeconds / self.sampleCount
+        if self.baselineLatencySeconds is None:
+            self.baselineLatencySeconds = averageLatencySeconds
+        else:
+            self.baselineLatencySeconds = min(averageLatencySeconds, self.baselineLatencySeconds * 1.05)
+        if self.sampleFailureCount > 0 or averageLatencySeconds > self.baselineLatencySeconds * self.latencyTolerance:
+            self.limit = max(self.minLimit, self.limit // 2)
+        else:
+            self.limit = min(self.maxLimit, self.limit + 1)
+        self.sampleCount = 0
+        self.sampleFailureCount = 0
+        self.sampleLatencySeconds = 0.0
+
+
+class BackfillEngine(Generic[BackfillItem]):
+
+    def __init__(self, database: Database, job: BackfillJob[BackfillItem], partitionSize: int = 10000, stepSize: int = 1000, initialConcurrency: int = 10, minConcurrency: int = 1, maxConcurrency: int = 50, latencyTolerance: float = 2.0, maxFailureRatio: float = 0.1, leaseSeconds: int = 600, reportIntervalSeconds: int = 60, slackClient: Optional[SlackClient] = None) -> None:
+        self.database = database
+        self.job = job
+        self.partitionSize = partitionSize
+        self.stepSize = stepSize
+        self.maxFailureRatio = maxFailureRatio
+        self.leaseSeconds = leaseSeconds
+        self.reportIntervalSeconds = reportIntervalSeconds
+        self.slackClient = slackClient
+        self.concurrencyLimit = AdaptiveConcurrencyLimit(initialLimit=initialConcurrency, minLimit=minConcurrency, maxLimit=maxConcurrency, latencyTolerance=latencyTolerance)
+        # NOTE(krishan711): the partitioning is part of the checkpoint name so re-running with different sizes doesn't mix up progress
+        self.checkpointName = f'{job.name}:{job.startIndex}-{job.endIndex}:{partitionSize}'
+        self.leaseOwner = f'{socket.gethostname()}:{os.getpid()}'
+        self.isPrimaryProcess = os.environ.get(BACKFILL_PROCESS_INDEX_KEY, '0') == '0'
+        self.startTime = 0.0
+        self.startCompletedCount = 0
+        self.lastReportTime = 0.0
+
+    async def run(self) -> None:
+        await self._create_partitions()
+        self.startTime = time.monotonic()
+        self.lastReportTime = self.startTime
+        self.startCompletedCount, totalCount = await self._get_progress()
+        logging.info(f'{self.job.name}: starting with {self.startCompletedCount} / {totalCount} already completed')
+        if self.isPrimaryProcess:
+            await self._post_slack(text=f'{self.job.name} → 🚧 started: {self.job.startIndex}-{self.job.endIndex}')
+        try:
+            while True:
+                partition = await self._claim_partition()
+                if partition is None:
+                    break
+                await self._process_partition(partition=partition)
+        except Exception as exception:
+            await self._post_slack(text=f'{self.job.name} → ❌ error: {self.job.startIndex}-{self.job.endIndex}\n```{str(exception)}```')
+            raise exception
+        completedCount, totalCount = await self._report_progress()
+        if completedCount >= totalCount:
+            await self._post_slack(text=f'{self.job.name} → ✅ completed : {self.job.startIndex}-{self.job.endIndex}')
+
+    async def _post_slack(self, text: str) -> None:
+        if self.slackClient:
+            await self.slackClient.post(messageText=text)
+
+    async def _create_partitions(self) -> None:
+        createdDate = date_util.datetime_from_now()
+        values = []
+        for startIndex in range(self.job.startIndex, self.job.endIndex, self.partitionSize):
+            values.append({
+                BackfillCheckpointsTable.c.createdDate.key: createdDate,
+                BackfillCheckpointsTable.c.updatedDate.key: createdDate,
+                BackfillCheckpointsTable.c.jobName.key: self.checkpointName,
+                BackfillCheckpointsTable.c.startIndex.key: startIndex,
+                BackfillCheckpointsTable.c.endIndex.key: min(startIndex + self.partitionSize, self.job.endIndex),
+                BackfillCheckpointsTable.c.completedIndex.key: startIndex,
+                BackfillCheckpointsTable.c.leaseOwner.key: None,
+                BackfillCheckpointsTable.c.leaseDate.key: None,
+                BackfillCheckpointsTable.c.completedDate.key: None,
+            })
+        for valuesChunk in list_util.generate_chunks(lst=values, chunkSize=1000):
+            query = postgresql.insert(BackfillCheckpointsTable).values(valuesChunk).on_conflict_do_nothing(index_elements=[BackfillCheckpointsTable.c.jobName, BackfillCheckpointsTable.c.startIndex]).returning(BackfillCheckpointsTable.c.backfillCheckpointId)
+            async with self.database.create_transaction() as connection:
+                await self.database.execute(query=query, connection=connection)
+
+    async def _claim_partition(self) -> Optional[BackfillPartition]:
+        # NOTE(krishan711): partitions whose lease has run out belong to a worker that died so they are picked up again from their last checkpoint
+        currentDate = date_util.datetime_from_now()
+        claimablePartitionIdsQuery = (
+            sqlalchemy.select(BackfillCheckpointsTable.c.backfillCheckpointId)
+                .where(BackfillCheckpointsTable.c.jobName == self.checkpointName)
+                .where(BackfillCheckpointsTable.c.completedDate.is_(None))
+                .where(sqlalchemy.or_(BackfillCheckpointsTable.c.leaseDate.is_(None), BackfillCheckpointsTable.c.leaseDate < currentDate))
+                .order_by(BackfillCheckpointsTable.c.startIndex.asc())
+                .limit(1)
+                .with_for_update(skip_locked=True)
+        )
+        query = (
+            BackfillCheckpointsTable.update()
+                .where(BackfillCheckpointsTable.c.backfillCheckpointId.in_(claimablePartitionIdsQuery.scalar_subquery()))
+                .values({
+                    BackfillCheckpointsTable.c.updatedDate: currentDate,
+                    BackfillCheckpointsTable.c.leaseOwner: self.leaseOwner,
+                    BackfillCheckpointsTable.c.leaseDate: date_util.datetime_from_datetime(dt=currentDate, seconds=self.leaseSeconds),
+                })
+                .returning(BackfillCheckpointsTable.c.backfillCheckpointId, BackfillCheckpointsTable.c.startIndex, BackfillCheckpointsTable.c.endIndex, BackfillCheckpointsTable.c.completedIndex)
+        )
+        async with self.database.create_transaction() as connection:
+            result = await self.database.execute(query=query, connection=connection)
+        row = result.first()
+        if row is None:
+            return None
+        return BackfillPartition(backfillCheckpointId=row[0], startIndex=row[1], endIndex=row[2], completedIndex=row[3])
+
+    async def _update_checkpoint(self, partition: BackfillPartition, completedIndex: int) -> bool:
+        currentDate = date_util.datetime_from_now()
+        isCompleted = completedIndex >= partition.endIndex
+        query = (
+            BackfillCheckpointsTable.update()
+                .where(BackfillCheckpointsTable.c.backfillCheckpointId == partition.backfillCheckpointId)
+                .where(BackfillCheckpointsTable.c.leaseOwner == self.leaseOwner)
+                .values({
+                    BackfillCheckpointsTable.c.updatedDate: currentDate,
+                    BackfillCheckpointsTable.c.completedIndex: completedIndex,
+                    BackfillCheckpointsTable.c.leaseOwner: None if isCompleted else self.leaseOwner,
+                    BackfillCheckpointsTable.c.leaseDate: None if isCompleted else date_util.datetime_from_datetime(dt=currentDate, seconds=self.leaseSeconds),
+                    BackfillCheckpointsTable.c.completedDate: currentDate if isCompleted else None,
+                })
+                .returning(BackfillCheckpointsTable.c.backfillCheckpointId)
+        )
+        async with self.database.create_transaction() as connection:
+            result = await self.database.execute(query=query, connection=connection)
+            return len(result.all()) > 0
+
+    async def _renew_lease(self, partition: BackfillPartition) -> bool:
+        currentDate = date_util.datetime_from_now()
+        query = (
+            BackfillCheckpointsTable.update()
+                .where(BackfillCheckpointsTable.c.backfillCheckpointId == partition.backfillCheckpointId)
+                .where(BackfillCheckpointsTable.c.leaseOwner == self.leaseOwner)
+                .values({
+                    BackfillCheckpointsTable.c.updatedDate: currentDate,
+                    BackfillCheckpointsTable.c.leaseDate: date_util.datetime_from_datetime(dt=currentDate, seconds=self.leaseSeconds),
+                })
+                .returning(BackfillCheckpointsTable.c.backfillCheckpointId)
+        )
+        async with self.database.create_transaction() as connection:
+            result = await self.database.execute(query=query, connection=connection)
+            return len(result.all()) > 0
+
+    async def _keep_lease(self, partition: BackfillPartition) -> None:
+        # NOTE(krishan711): a single slow step can outlast the lease so it is renewed on a timer as well as at every checkpoint
+        while True:
+            await asyncio.sleep(self.leaseSeconds / 3)
+            if not await self._renew_lease(partition=partition):
+                logging.info(f'{self.job.name}: failed to renew the lease on partition {partition.startIndex}-{partition.endIndex}')
+                return
+
+    async def _release_partition(self, partition: BackfillPartition) -> None:
+        query = (
+            BackfillCheckpointsTable.update()
+                .where(BackfillCheckpointsTable.c.backfillCheckpointId == partition.backfillCheckpointId)
+                .where(BackfillCheckpointsTable.c.leaseOwner == self.leaseOwner)
+                .values({
+                    BackfillCheckpointsTable.c.updatedDate: date_util.datetime_from_now(),
+                    BackfillCheckpointsTable.c.leaseOwner: None,
+                    BackfillCheckpointsTable.c.leaseDate: None,
+                })
+                .returning(BackfillCheckpointsTable.c.backfillCheckpointId)
+        )
+        async with self.database.create_transaction() as connection:
+            await self.database.execute(query=query, connection=connection)
+
+    async def _process_partition(self, partition: BackfillPartition) -> None:
+        logging.info(f'{self.job.name}: working on partition {partition.startIndex}-{partition.endIndex} from {partition.completedIndex}')
+        currentIndex = partition.completedIndex
+        leaseTask = asyncio.create_task(self._keep_lease(partition=partition))
+        try:
+            while currentIndex < partition.endIndex:
+                endIndex = min(currentIndex + self.stepSize, partition.endIndex)
+                items = await self.job.list_items(startIndex=currentIndex, endIndex=endIndex)
+                failureCount = await self._process_items(items=items)
+                if failureCount > len(items) * self.maxFailureRatio:
+                    raise KibaException(message=f'{failureCount} / {len(items)} items failed in {currentIndex}-{endIndex}')
+                if not await self._update_checkpoint(partition=partition, completedIndex=endIndex):
+                    logging.info(f'{self.job.name}: lost the lease on partition {partition.startIndex}-{partition.endIndex}')
+                    return
+                currentIndex = endIndex
+                if time.monotonic() - self.lastReportTime >= self.reportIntervalSeconds:
+                    await self._report_progress()
+        except Exception:
+            await self._release_partition(partition=partition)
+            raise
+        finally:
+            leaseTask.cancel()
+
+    async def _process_items(self, items: Sequence[BackfillItem]) -> int:
+        failureCount = 0
+        itemIterator = iter(items)
+        pendingTasks: Set[asyncio.Task[bool]] = set()
+        hasMoreItems = True
+        while True:
+            while hasMoreItems and len(pendingTasks) < self.concurrencyLimit.limit:
+                try:
+                    item = next(itemIterator)
+                except StopIteration:
+                    hasMoreItems = False
+                    break
+                pendingTasks.add(asyncio.create_task(self._process_item(item=item)))
+            if len(pendingTasks) == 0:
+                break
+            doneTasks, pendingTasks = await asyncio.wait(pendingTasks, return_when=asyncio.FIRST_COMPLETED)
+            failureCount += sum(1 for task in doneTasks if not task.result())
+        return failureCount
+
+    async def _process_item(self, item: BackfillItem) -> bool:
+        startTime = time.monotonic()
+        didSucceed = True
+        try:
+            await self.job.process_item(item=item)
+        except Exception as exception:  # pylint: disable=broad-except
+            logging.error(f'{self.job.name}: failed to process {item}: {exception}')
+            didSucceed = False
+        self.concurrencyLimit.record(latencySeconds=time.monotonic() - startTime, didSucceed=didSucceed)
+        return didSucceed
+
+    async def _get_progress(self) -> Tuple[int, int]:
+        query = (
+            sqlalchemy.select(
+                sqlalchemy.func.coalesce(sqlalchemy.func.sum(BackfillCheckpointsTable.c.completedIndex - BackfillCheckpointsTable.c.startIndex), 0),
+                sqlalchemy.func.coalesce(sqlalchemy.func.sum(BackfillCheckpointsTable.c.endIndex - BackfillCheckpointsTable.c.startIndex), 0),
+            )
+                .where(BackfillCheckpointsTable.c.jobName == self.checkpointName)
+        )
+        result = await self.database.execute(query=query)
+        completedCount, totalCount = result.one()
+        return int(completedCount), int(totalCount)
+
+    async def _report_progress(self) -> Tuple[int, int]:
+        # NOTE(krishan711): progress is read back from the checkpoints so the rate and eta include every worker on this job
+        completedCount, totalCount = await self._get_progress()
+        self.lastReportTime = time.monotonic()
+        elapsedSeconds = max(self.lastReportTime - self.startTime, 1)
+        rate = (completedCount - self.startCompletedCount) / elapsedSeconds
+        percentage = (100 * completedCount / totalCount) if totalCount > 0 else 100
+        etaText = str(datetime.timedelta(seconds=round((totalCount - completedCount) / rate))) if rate > 0 else 'unknown'
+        logging.info(f'{self.job.name}: {completedCount} / {totalCount} ({percentage:.1f}%) at {rate:.1f}/s with concurrency {self.concurrencyLimit.limit}, eta {etaText}')
+        return completedCount, totalCount
+
+
+async def spawn_backfill_processes(processCount: int) -> bool:
+    # NOTE(krishan711): the workers re-run this same command and share the work through the checkpoint leases.
+    # Returns True in the parent once they have all finished and False in a worker, which should carry on as normal.
+    if processCount <= 1 or BACKFILL_PROCESS_INDEX_KEY in os.environ:
+        return False
+    processes: List[Process] = []
+    for processIndex in range(processCount):
+        environment = {**os.environ, BACKFILL_PROCESS_INDEX_KEY: str(processIndex)}
+        processes.append(await asyncio.create_subprocess_exec(sys.executable, *sys.argv, env=environment))
+    returnCodes = await asyncio.gather(*[process.wait() for process in processes])
+    failedProcessCount = sum(1 for returnCode in returnCodes if returnCode != 0)
+    if failedProcessCount > 0:
+        raise KibaException(message=f'{failedProcessCount} / {processCount} backfill processes failed')
+    return True
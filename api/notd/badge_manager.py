@@ -1,8 +1,12 @@
+import contextlib
 import datetime
 import json
 import logging
+from typing import List
+from typing import Optional
 
 from core.exceptions import BadRequestException
+from core.exceptions import NotFoundException
 from core.queues.message_queue import MessageQueue
 from core.queues.model import Message
 from core.store.retriever import StringFieldFilter
@@ -43,17 +47,48 @@ class BadgeManager:
 
     async def refresh_gallery_badge_holders_for_collection(self, registryAddress: str) -> None:
         registryAddress = chain_util.normalize_address(registryAddress)
-        retrievedGalleryBadgeHolders = await self.badgeProcessor.calculate_all_gallery_badge_holders(registryAddress=registryAddress)
+        startDate = date_util.datetime_from_now()
+        latestUpdate = None
+        with contextlib.suppress(NotFoundException):
+            latestUpdate = await self.retriever.get_latest_update_by_key_name(key='gallery_badge_holders', name=registryAddress)
+        # NOTE(krishan711): some rules read the ordered ownerships view so changes after its last refresh must be looked at again next time
+        processedDate = startDate
+        with contextlib.suppress(NotFoundException):
+            viewsLatestUpdate = await self.retriever.get_latest_update_by_key_name(key='materialized_views')
+            processedDate = min(startDate, viewsLatestUpdate.date)
+        ownerAddresses: Optional[List[str]] = None
+        if latestUpdate:
+            ownerAddresses = list(await self.badgeProcessor.get_changed_owner_addresses(registryAddress=registryAddress, sinceDate=latestUpdate.date))
+            logging.info(f'Recalculating gallery badges for {len(ownerAddresses)} changed owners since {latestUpdate.date}')
+            if len(ownerAddresses) == 0:
+                await self.saver.update_latest_update(latestUpdateId=latestUpdate.latestUpdateId, date=processedDate)
+                return
+        retrievedGalleryBadgeHolders = await self.badgeProcessor.calculate_all_gallery_badge_holders(registryAddress=registryAddress, ownerAddresses=ownerAddresses)
         async with self.saver.create_transaction() as connection:
-            currentGalleryBadgeHolders = await self.retriever.list_gallery_badge_holders(fieldFilters=[
-                StringFieldFilter(fieldName=GalleryBadgeHoldersTable.c.registryAddress.key, eq=registryAddress),
-            ], connection=connection)
-            galleryBadgeHoldersToDelete = {galleryBadgeHolders.galleryBadgeHolderId for galleryBadgeHolders in currentGalleryBadgeHolders}
-            logging.info(f'Deleting {len(galleryBadgeHoldersToDelete)} existing gallery badges')
-            for chunkedIds in list_util.generate_chunks(lst=list(galleryBadgeHoldersToDelete), chunkSize=100):
+            fieldFilters = [StringFieldFilter(fieldName=GalleryBadgeHoldersTable.c.registryAddress.key, eq=registryAddress)]
+            if ownerAddresses is not None:
+                fieldFilters.append(StringFieldFilter(fieldName=GalleryBadgeHoldersTable.c.ownerAddress.key, containedIn=ownerAddresses))
+            currentGalleryBadgeHolders = await self.retriever.list_gallery_badge_holders(fieldFilters=fieldFilters, connection=connection)
+            existingGalleryBadgeHolderMap = {(galleryBadgeHolder.ownerAddress, galleryBadgeHolder.badgeKey): galleryBadgeHolder for galleryBadgeHolder in currentGalleryBadgeHolders}
+            retrievedGalleryBadgeHolderMap = {(retrievedGalleryBadgeHolder.ownerAddress, retrievedGalleryBadgeHolder.badgeKey): retrievedGalleryBadgeHolder for retrievedGalleryBadgeHolder in retrievedGalleryBadgeHolders}
+            galleryBadgeHolderIdsToDelete = []
+            galleryBadgeHoldersToCreate = []
+            for key, existingGalleryBadgeHolder in existingGalleryBadgeHolderMap.items():
+                matchingRetrievedGalleryBadgeHolder = retrievedGalleryBadgeHolderMap.get(key)
+                if not matchingRetrievedGalleryBadgeHolder or matchingRetrievedGalleryBadgeHolder.achievedDate != existingGalleryBadgeHolder.achievedDate:
+                    galleryBadgeHolderIdsToDelete.append(existingGalleryBadgeHolder.galleryBadgeHolderId)
+            for key, retrievedGalleryBadgeHolder in retrievedGalleryBadgeHolderMap.items():
+                matchingExistingGalleryBadgeHolder = existingGalleryBadgeHolderMap.get(key)
+                if not matchingExistingGalleryBadgeHolder or retrievedGalleryBadgeHolder.achievedDate != matchingExistingGalleryBadgeHolder.achievedDate:
+                    galleryBadgeHoldersToCreate.append(retrievedGalleryBadgeHolder)
+            logging.info(f'Deleting {len(galleryBadgeHolderIdsToDelete)} and saving {len(galleryBadgeHoldersToCreate)} gallery badges ({len(retrievedGalleryBadgeHolderMap) - len(galleryBadgeHoldersToCreate)} unchanged)')
+            for chunkedIds in list_util.generate_chunks(lst=galleryBadgeHolderIdsToDelete, chunkSize=1000):
                 await self.saver.delete_gallery_badge_holders(galleryBadgeHolderIds=chunkedIds, connection=connection)
-            logging.info(f'Saving {len(retrievedGalleryBadgeHolders)} gallery badges')
-            await self.saver.create_gallery_badge_holders(retrievedGalleryBadgeHolders=retrievedGalleryBadgeHolders, connection=connection)
+            await self.saver.create_gallery_badge_holders(retrievedGalleryBadgeHolders=galleryBadgeHoldersToCreate, connection=connection)
+            if latestUpdate:
+                await self.saver.update_latest_update(latestUpdateId=latestUpdate.latestUpdateId, date=processedDate, connection=connection)
+            else:
+                await self.saver.create_latest_update(key='gallery_badge_holders', name=registryAddress, date=processedDate, connection=connection)
 
     async def assign_badge(self, registryAddress: str, ownerAddress: str, badgeKey: str, assignerAddress: str, achievedDate: datetime.datetime, signature: str) -> None:
         registryAddress = chain_util.normalize_address(value=registryAddress)
@@ -1,5 +1,11 @@
+import datetime
+from typing import Dict
 from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Set
 
+from notd.collection_badge_processor import CollectionBadgeProcessor
 from notd.model import COLLECTION_RUDEBOYS_ADDRESS
 from notd.model import RetrievedGalleryBadgeHolder
 from notd.rudeboy_badge_processor import RudeboysBadgeProcessor
@@ -12,10 +18,19 @@ class BadgeProcessor:
     def __init__(self, retriever: Retriever, saver: Saver) -> None:
         self.retriever = retriever
         self.saver = saver
+        self.collectionBadgeProcessors: Dict[str, CollectionBadgeProcessor] = {
+            COLLECTION_RUDEBOYS_ADDRESS: RudeboysBadgeProcessor(retriever=self.retriever, saver=self.saver),
+        }
 
-    async def calculate_all_gallery_badge_holders(self, registryAddress: str) -> List[RetrievedGalleryBadgeHolder]:
-        if registryAddress == COLLECTION_RUDEBOYS_ADDRESS:
-            processor = RudeboysBadgeProcessor(retriever=self.retriever, saver=self.saver)
-            retrievedBadges = await processor.calculate_all_gallery_badge_holders()
-            return retrievedBadges
-        return []
+    async def get_changed_owner_addresses(self, registryAddress: str, sinceDate: datetime.datetime) -> Set[str]:
+        processor = self.collectionBadgeProcessors.get(registryAddress)
+        if not processor:
+            return set()
+        return await processor.get_changed_owner_addresses(sinceDate=sinceDate)
+
+    async def calculate_all_gallery_badge_holders(self, registryAddress: str, ownerAddresses: Optional[Sequence[str]] = None) -> List[RetrievedGalleryBadgeHolder]:
+        processor = self.collectionBadgeProcessors.get(registryAddress)
+        if not processor:
+            return []
+        retrievedBadges = await processor.calculate_all_gallery_badge_holders(ownerAddresses=ownerAddresses)
+        return retrievedBadges
@@ -17,13 +17,14 @@ from core.util import date_util
 
 from notd.block_processor import BlockProcessor
 from notd.collection_manager import CollectionManager
+from notd.delegation_manager import DelegationManager
 from notd.messages import ProcessBlockMessageContent
 from notd.messages import ReceiveNewBlocksMessageContent
 from notd.messages import ReprocessBlocksMessageContent
-from notd.model import STAKING_ADDRESSES
 from notd.model import ProcessedBlock
 from notd.model import RetrievedTokenTransfer
 from notd.ownership_manager import OwnershipManager
+from notd.store.query_counting_database import count_queries
 from notd.store.retriever import Retriever
 from notd.store.saver import Saver
 from notd.store.schema import BlocksTable
@@ -34,7 +35,7 @@ from notd.token_staking_manager import TokenStakingManager
 
 class BlockManager:
 
-    def __init__(self, saver: Saver, retriever: Retriever, workQueue: MessageQueue[Message], blockProcessor: BlockProcessor, ownershipManager: OwnershipManager, collectionManager: CollectionManager, tokenStakingManager: TokenStakingManager, tokenManager: TokenManager) -> None:
+    def __init__(self, saver: Saver, retriever: Retriever, workQueue: MessageQueue[Message], blockProcessor: BlockProcessor, ownershipManager: OwnershipManager, collectionManager: CollectionManager, tokenStakingManager: TokenStakingManager, tokenManager: TokenManager, delegationManager: DelegationManager) -> None:
         self.saver = saver
         self.retriever = retriever
         self.workQueue = workQueue
@@ -43,6 +44,7 @@ class BlockManager:
         self.collectionManager = collectionManager
         self.tokenStakingManager = tokenStakingManager
         self.tokenManager = tokenManager
+        self.delegationManager = delegationManager
 
     async def receive_new_blocks_deferred(self) -> None:
         await self.workQueue.send_message(message=ReceiveNewBlocksMessageContent().to_message())
@@ -78,19 +80,23 @@ class BlockManager:
         await self.workQueue.send_message(message=ProcessBlockMessageContent(blockNumber=blockNumber, shouldSkipProcessingTokens=shouldSkipProcessingTokens).to_message(), delaySeconds=delaySeconds)
 
     async def process_block(self, blockNumber: int, shouldSkipProcessingTokens: Optional[bool] = None, shouldSkipUpdatingOwnerships: Optional[bool] = None, shouldSkipUpdatingStakings: Optional[bool] = None) -> None:
-        processedBlock = await self.blockProcessor.process_block(blockNumber=blockNumber)
-        logging.info(f'Found {len(processedBlock.retrievedTokenTransfers)} token transfers in block #{blockNumber}')
-        collectionTokenIds = await self._save_processed_block(processedBlock=processedBlock)
-        collectionAddresses = list({registryAddress for registryAddress, _ in collectionTokenIds})
-        logging.info(f'Found {len(collectionTokenIds)} changed tokens and {len(collectionAddresses)} changed collections in block #{blockNumber}')
-        stakingCollectionTokenIds = {(transfer.registryAddress, transfer.tokenId) for transfer in processedBlock.retrievedTokenTransfers if (transfer.fromAddress in STAKING_ADDRESSES) or (transfer.toAddress in STAKING_ADDRESSES)}
-        if not shouldSkipUpdatingStakings:
-            await self.tokenStakingManager.update_token_stakings_deferred(collectionTokenIds=stakingCollectionTokenIds)
-        if not shouldSkipUpdatingOwnerships:
-            await self.ownershipManager.update_token_ownerships_deferred(collectionTokenIds=collectionTokenIds)
-        if not shouldSkipProcessingTokens:
-            await self.collectionManager.update_collections_deferred(addresses=collectionAddresses)
-            await self.tokenManager.update_token_metadatas_deferred(collectionTokenIds=collectionTokenIds)
+        with count_queries() as queryCounter:
+            processedBlock = await self.blockProcessor.process_block(blockNumber=blockNumber)
+            logging.info(f'Found {len(processedBlock.retrievedTokenTransfers)} token transfers in block #{blockNumber}')
+            collectionTokenIds = await self._save_processed_block(processedBlock=processedBlock)
+            collectionAddresses = list({registryAddress for registryAddress, _ in collectionTokenIds})
+            logging.info(f'Found {len(collectionTokenIds)} changed tokens and {len(collectionAddresses)} changed collections in block #{blockNumber}')
+            if not shouldSkipUpdatingStakings:
+                await self.tokenStakingManager.update_token_stakings_for_block(processedBlock=processedBlock)
+            if not shouldSkipUpdatingOwnerships:
+                await self.ownershipManager.update_token_ownerships_deferred(collectionTokenIds=collectionTokenIds)
+            if not shouldSkipProcessingTokens:
+                await self.collectionManager.update_collections_deferred(addresses=collectionAddresses)
+                await self.tokenManager.update_token_metadatas_deferred(collectionTokenIds=collectionTokenIds)
+                # NOTE(krishan711): only live blocks change delegations the api may have cached, reprocessed blocks are long covered by the cache ttl
+                delegationEvents = await self.blockProcessor.get_delegation_events(startBlockNumber=blockNumber, endBlockNumber=blockNumber)
+                await self.delegationManager.publish_delegation_events(delegationEvents=delegationEvents)
+        logging.stat('PROCESS_BLOCK_QUERY_COUNT', str(blockNumber), queryCounter.queryCount)
 
     @staticmethod
     def _uniqueness_tuple_from_token_transfer(tokenTransfer: RetrievedTokenTransfer) -> Tuple[str, str, str, str, str, int, int, int, str, bool, bool, bool, bool, bool, str]:
@@ -1,7 +1,9 @@
+import contextvars
 import dataclasses
 import datetime
-import json
+import functools
 import typing
+from collections import Counter
 from collections import defaultdict
 from typing import Dict
 from typing import List
@@ -14,18 +16,38 @@ from core.exceptions import InternalServerErrorException
 from core.util import chain_util
 from core.web3.eth_client import EthClientInterface
 from web3 import Web3
+from web3.contract import Contract
+from web3.contract.base_contract import BaseContractEvent
 from web3.types import HexBytes
 from web3.types import LogReceipt
 from web3.types import TxData
 from web3.types import TxReceipt
 
+from notd.contract_store import get_contract
+from notd.model import DELEGATION_REGISTRY_ADDRESS
 from notd.model import MARKETPLACE_ADDRESSES
 from notd.model import WRAPPED_ETHER_ADDRESS
 from notd.model import ProcessedBlock
+from notd.model import RetrievedDelegationEvent
 from notd.model import RetrievedTokenTransfer
 
 
-@dataclasses.dataclass
+_normalizedAddressesContext = contextvars.ContextVar[Optional[Dict[str, str]]]('_normalizedAddressesContext', default=None)
+
+
+def _normalize_address(value: str) -> str:
+    # NOTE(krishan711): checksumming is slow (keccak) and the same addresses are seen repeatedly within a block so process_block memoizes them while it runs
+    normalizedAddresses = _normalizedAddressesContext.get()
+    if normalizedAddresses is None:
+        return chain_util.normalize_address(value=value)
+    normalizedAddress = normalizedAddresses.get(value)
+    if normalizedAddress is None:
+        normalizedAddress = chain_util.normalize_address(value=value)
+        normalizedAddresses[value] = normalizedAddress
+    return normalizedAddress
+
+
+@dataclasses.dataclass(slots=True)
 class RetrievedEvent:
     transactionHash: str
     registryAddress: str
@@ -40,44 +62,63 @@ class RetrievedEvent:
 class BlockProcessor:
 
     def __init__(self, ethClient: EthClientInterface) -> None:
-        self.w3 = Web3()
         self.ethClient = ethClient
+        # TODO(krishan711): use the contracts to get the signature hashes instead of doing manually
+        self.erc721TransferEventSignatureHash = Web3.keccak(text='Transfer(address,address,uint256)').hex()
+        self.erc20TransferEventSignatureHash = Web3.keccak(text='Transfer(address,address,uint256)').hex()
+        self.erc1155TransferEventSignatureHash = Web3.keccak(text='TransferSingle(address,address,address,uint256,uint256)').hex()
+        self.erc1155TransferBatchEventSignatureHash = Web3.keccak(text='TransferBatch(address,address,address,uint256[],uint256[])').hex()
+        self.delegationEventSignatureHashDataTypes = {
+            Web3.keccak(text='DelegateForAll(address,address,bool)').hex(): ['address', 'address', 'bool'],
+            Web3.keccak(text='DelegateForContract(address,address,address,bool)').hex(): ['address', 'address', 'address', 'bool'],
+            Web3.keccak(text='DelegateForToken(address,address,address,uint256,bool)').hex(): ['address', 'address', 'address', 'uint256', 'bool'],
+            Web3.keccak(text='RevokeAllDelegates(address)').hex(): ['address'],
+            Web3.keccak(text='RevokeDelegate(address,address)').hex(): ['address', 'address'],
+        }
 
-        with open('./contracts/CryptoKitties.json') as contractJsonFile:
-            contractJson = json.load(contractJsonFile)
-        self.cryptoKittiesContract = self.w3.eth.contract(address='0x06012c8cf97BEaD5deAe237070F9587f8E7A266d', abi=contractJson['abi'])  # type: ignore[call-overload]
-        self.cryptoKittiesTransferEvent = self.cryptoKittiesContract.events.Transfer()
+    @functools.cached_property
+    def cryptoKittiesContract(self) -> Contract:  # pylint: disable=invalid-name
+        return get_contract(name='CryptoKitties', address='0x06012c8cf97BEaD5deAe237070F9587f8E7A266d')
 
-        with open('./contracts/CryptoPunksMarket.json') as contractJsonFile:
-            contractJson = json.load(contractJsonFile)
-        self.cryptoPunksContract = self.w3.eth.contract(address='0xb47e3cd837dDF8e4c57F05d70Ab865de6e193BBB', abi=contractJson['abi'])  # type: ignore[call-overload]
-        self.cryptoPunksTransferEvent = self.cryptoPunksContract.events.PunkTransfer()
-        self.cryptoPunksBoughtEvent = self.cryptoPunksContract.events.PunkBought()
+    @functools.cached_property
+    def cryptoKittiesTransferEvent(self) -> BaseContractEvent:  # pylint: disable=invalid-name
+        return self.cryptoKittiesContract.events.Transfer()
 
-        with open('./contracts/IERC721.json') as contractJsonFile:
-            contractJson = json.load(contractJsonFile)
-        self.ierc721Contract = self.w3.eth.contract(abi=contractJson['abi'])
-        self.ierc721TransferEvent = self.ierc721Contract.events.Transfer()
-        # TODO(krishan711): use the contract to get the signature hash instead of doing manually
-        # self.contractFilter = self.ierc721Contract.events.Transfer.create_filter(fromBlock=6517190, toBlock=6517190, topics=[None, None, None, None])
-        self.erc721TransferEventSignatureHash = Web3.keccak(text='Transfer(address,address,uint256)').hex()
-        self.erc20TransferEventSignatureHash = Web3.keccak(text='Transfer(address,address,uint256)').hex()
+    @functools.cached_property
+    def cryptoPunksContract(self) -> Contract:  # pylint: disable=invalid-name
+        return get_contract(name='CryptoPunksMarket', address='0xb47e3cd837dDF8e4c57F05d70Ab865de6e193BBB')
 
-        with open('./contracts/IERC1155.json') as contractJsonFile:
-            contractJson = json.load(contractJsonFile)
-        self.ierc1155Contract = self.w3.eth.contract(abi=contractJson['abi'])
-        self.ierc1155TransferEvent = self.ierc1155Contract.events.TransferSingle()
-        # TODO(krishan711): use the contract to get the signature hash instead of doing manually
-        # self.contractFilter = self.ierc1155Contract.events.Transfer.create_filter(fromBlock=6517190, toBlock=6517190, topics=[None, None, None, None])
-        self.erc1155TransferEventSignatureHash = Web3.keccak(text='TransferSingle(address,address,address,uint256,uint256)').hex()
+    @functools.cached_property
+    def cryptoPunksTransferEvent(self) -> BaseContractEvent:  # pylint: disable=invalid-name
+        return self.cryptoPunksContract.events.PunkTransfer()
 
-        with open('./contracts/IERC1155.json') as contractJsonFile:
-            contractJson = json.load(contractJsonFile)
-        self.ierc1155Contract = self.w3.eth.contract(abi=contractJson['abi'])
-        self.ierc1155TransferEvent = self.ierc1155Contract.events.TransferBatch()
-        # TODO(krishan711): use the contract to get the signature hash instead of doing manually
-        # self.contractFilter = self.ierc1155Contract.events.Transfer.create_filter(fromBlock=6517190, toBlock=6517190, topics=[None, None, None, None])
-        self.erc1155TransferBatchEventSignatureHash = Web3.keccak(text='TransferBatch(address,address,address,uint256[],uint256[])').hex()
+    @functools.cached_property
+    def cryptoPunksBoughtEvent(self) -> BaseContractEvent:  # pylint: disable=invalid-name
+        return self.cryptoPunksContract.events.PunkBought()
+
+    @functools.cached_property
+    def ierc721Contract(self) -> Contract:  # pylint: disable=invalid-name
+        return get_contract(name='IERC721')
+
+    @functools.cached_property
+    def ierc1155Contract(self) -> Contract:  # pylint: disable=invalid-name
+        return get_contract(name='IERC1155')
+
+    async def get_delegation_events(self, startBlockNumber: int, endBlockNumber: int) -> List[RetrievedDelegationEvent]:
+        # NOTE(krishan711): none of the delegation registry event fields are indexed so everything is decoded from the data
+        delegationEvents: List[RetrievedDelegationEvent] = []
+        events = await self.ethClient.get_log_entries(startBlockNumber=startBlockNumber, endBlockNumber=endBlockNumber, address=DELEGATION_REGISTRY_ADDRESS)
+        for event in events:
+            eventDataTypes = self.delegationEventSignatureHashDataTypes.get(event['topics'][0].hex())
+            if eventDataTypes is None:
+                continue
+            (vaultAddress, *otherEventData) = eth_abi.decode(eventDataTypes, typing.cast(HexBytes, event['data']))
+            delegationEvents.append(RetrievedDelegationEvent(
+                blockNumber=event['blockNumber'],
+                vaultAddress=chain_util.normalize_address(value=vaultAddress),
+                delegateAddress=chain_util.normalize_address(value=otherEventData[0]) if len(otherEventData) > 0 else None,
+            ))
+        return delegationEvents
 
     async def get_transaction_receipt(self, transactionHash: str) -> TxReceipt:
         return await self.ethClient.get_transaction_receipt(transactionHash=transactionHash)
@@ -111,34 +152,44 @@ class BlockProcessor:
         for event in erc20events:
             if len(event['topics']) == 3 and event['address'] == WRAPPED_ETHER_ADDRESS:
                 transactionHash = event['transactionHash'].hex()
-                fromAddress = chain_util.normalize_address(event['topics'][1].hex())
+                fromAddress = _normalize_address(event['topics'][1].hex())
                 (wethValue, ) = eth_abi.decode(["uint256"], typing.cast(HexBytes, event['data']))
                 transactionHashWethValuesMap[transactionHash].append((fromAddress, wethValue))
         return transactionHashWethValuesMap
 
     async def process_block(self, blockNumber: int) -> ProcessedBlock:
+        token = _normalizedAddressesContext.set({})
+        try:
+            return await self._process_block(blockNumber=blockNumber)
+        finally:
+            _normalizedAddressesContext.reset(token)
+
+    async def _process_block(self, blockNumber: int) -> ProcessedBlock:
         blockData = await self.ethClient.get_block(blockNumber=blockNumber, shouldHydrateTransactions=True)
         retrievedTokenTransfers: List[RetrievedTokenTransfer] = []
         transactionHashEventMap = await self._get_retrieved_events(blockNumber=blockNumber)
+        transactionHashWethValuesMap: Optional[Dict[str, List[Tuple[str, int]]]] = None
         for transaction in blockData['transactions']:
             transactionData = typing.cast(TxData, transaction)
-            retrievedEvents = transactionHashEventMap[transactionData['hash'].hex()]
-            if len(retrievedEvents) > 0:
-                transactionHashWethValuesMap = await self._get_transaction_weth_values(blockNumber=blockNumber)
-                retrievedTokenTransfers += await self.process_transaction(transaction=transactionData, retrievedEvents=retrievedEvents, transactionWethValues=transactionHashWethValuesMap[transactionData['hash'].hex()])
+            transactionHash = transactionData['hash'].hex()
+            retrievedEvents = transactionHashEventMap.get(transactionHash)
+            if retrievedEvents:
+                if transactionHashWethValuesMap is None:
+                    transactionHashWethValuesMap = await self._get_transaction_weth_values(blockNumber=blockNumber)
+                retrievedTokenTransfers += await self.process_transaction(transaction=transactionData, retrievedEvents=retrievedEvents, transactionWethValues=transactionHashWethValuesMap.get(transactionHash, []))
         blockHash = blockData['hash'].hex()
         blockDate = datetime.datetime.utcfromtimestamp(blockData['timestamp'])
         return ProcessedBlock(blockNumber=blockNumber, blockHash=blockHash, blockDate=blockDate, retrievedTokenTransfers=retrievedTokenTransfers)
 
     async def _process_erc1155_single_event(self, event: LogReceipt) -> List[RetrievedEvent]:
         transactionHash = event['transactionHash'].hex()
-        registryAddress = chain_util.normalize_address(event['address'])
+        registryAddress = _normalize_address(event['address'])
         if len(event['topics']) < 4:
             logging.debug('Ignoring event with less than 4 topics')
             return []
-        operatorAddress = chain_util.normalize_address(event['topics'][1].hex())
-        fromAddress = chain_util.normalize_address(event['topics'][2].hex())
-        toAddress = chain_util.normalize_address(event['topics'][3].hex())
+        operatorAddress = _normalize_address(event['topics'][1].hex())
+        fromAddress = _normalize_address(event['topics'][2].hex())
+        toAddress = _normalize_address(event['topics'][3].hex())
         (tokenId, amount, ) = eth_abi.decode(["uint256", "uint256"], typing.cast(HexBytes, event['data']))
         retrievedEvents = [RetrievedEvent(
             transactionHash=transactionHash,
@@ -165,22 +216,23 @@ class BlockProcessor:
 
     async def _process_erc1155_batch_event(self, event: LogReceipt,) -> List[RetrievedEvent]:
         transactionHash = event['transactionHash'].hex()
-        registryAddress = chain_util.normalize_address(event['address'])
+        registryAddress = _normalize_address(event['address'])
         if len(event['topics']) < 4:
             logging.debug('Ignoring event with less than 4 topics')
             return []
-        operatorAddress = chain_util.normalize_address(event['topics'][1].hex())
-        fromAddress = chain_util.normalize_address(event['topics'][2].hex())
-        toAddress = chain_util.normalize_address(event['topics'][3].hex())
+        operatorAddress = _normalize_address(event['topics'][1].hex())
+        fromAddress = _normalize_address(event['topics'][2].hex())
+        toAddress = _normalize_address(event['topics'][3].hex())
         # The data structure seems to be:
         # [<something>, <something>, tokenIdListSize, tokenId0, tokenId1..., tokenCountListSize, tokenCount0, tokenCount1, ...]
-        data = typing.cast(HexBytes, event['data'])
+        data = bytes(typing.cast(HexBytes, event['data']))
         dataLength = int(len(data) / 32)
-        dataParams = typing.cast(Tuple[int], eth_abi.decode(["uint256"] * dataLength, typing.cast(HexBytes, event['data'])))
+        # NOTE(krishan711): every param is a uint256 so reading the words directly is much faster than eth_abi.decode for big batches
+        dataParams = [int.from_bytes(data[index * 32: (index + 1) * 32], 'big') for index in range(dataLength)]
         tokenCount = int((dataLength - 4) / 2)
-        tokenIds = dataParams[3: 3 + tokenCount]  # pylint: disable=unsubscriptable-object
-        amounts = dataParams[3 + tokenCount + 1:]  # pylint: disable=unsubscriptable-object
-        dataDict = {str(int(tokenIds[i])): int(amounts[i]) for i in range(len(tokenIds))}
+        tokenIds = dataParams[3: 3 + tokenCount]
+        amounts = dataParams[3 + tokenCount + 1:]
+        dataDict = {str(tokenId): amount for tokenId, amount in zip(tokenIds, amounts)}
         retrievedEvents = [RetrievedEvent(
             transactionHash=transactionHash,
             registryAddress=registryAddress,
@@ -195,7 +247,7 @@ class BlockProcessor:
 
     async def _process_erc721_single_event(self, event: LogReceipt) -> List[RetrievedEvent]:
         transactionHash = event['transactionHash'].hex()
-        registryAddress = chain_util.normalize_address(event['address'])
+        registryAddress = _normalize_address(event['address'])
         if registryAddress == self.cryptoKittiesContract.address:
             # NOTE(krishan711): for CryptoKitties the tokenId isn't indexed in the Transfer event
             decodedEventData = self.cryptoKittiesTransferEvent.process_log(event)
@@ -213,8 +265,8 @@ class BlockProcessor:
         if len(event['topics']) < 4:
             logging.debug('Ignoring event with less than 4 topics')
             return []
-        fromAddress = chain_util.normalize_address(event['topics'][1].hex())
-        toAddress = chain_util.normalize_address(event['topics'][2].hex())
+        fromAddress = _normalize_address(event['topics'][1].hex())
+        toAddress = _normalize_address(event['topics'][2].hex())
         tokenId = str(int.from_bytes(bytes(event['topics'][3]), 'big'))
         retrievedEvents = [RetrievedEvent(
             transactionHash=transactionHash,
@@ -236,15 +288,17 @@ class BlockProcessor:
             contractAddress = str(ethTransactionReceipt['contractAddress']) if ethTransactionReceipt['contractAddress'] else None
         if not contractAddress:
             raise InternalServerErrorException(f'Failed to identify contractAddress')
-        contractAddress = chain_util.normalize_address(value=contractAddress)
-        transactionFromAddress = chain_util.normalize_address(value=str(transaction['from']))
-        tokenKeys = [(retrievedEvent.registryAddress, retrievedEvent.tokenId, retrievedEvent.tokenType) for retrievedEvent in retrievedEvents]
-        tokenKeyCounts = {tokenKey: tokenKeys.count(tokenKey) for tokenKey in tokenKeys}
+        contractAddress = _normalize_address(value=contractAddress)
+        transactionFromAddress = _normalize_address(value=str(transaction['from']))
+        tokenKeyCounts = Counter((retrievedEvent.registryAddress, retrievedEvent.tokenId, retrievedEvent.tokenType) for retrievedEvent in retrievedEvents)
         registryAddresses = {retrievedEvent.registryAddress for retrievedEvent in retrievedEvents}
         retrievedTokenTransfers: list[RetrievedTokenTransfer] = []
         # NOTE(krishan711) Set interstitial and multi first, they are independent of other info
         isMultiAddress = len(registryAddresses) > 1
         tokenKeySeenCounts: Dict[Tuple[str, str, str], int] = defaultdict(int)
+        gasLimit = transaction['gas']
+        gasPrice = transaction['gasPrice']
+        blockNumber = transaction['blockNumber']
         for retrievedEvent in retrievedEvents:
             tokenKey = (retrievedEvent.registryAddress, retrievedEvent.tokenId, retrievedEvent.tokenType)
             tokenKeyCount = tokenKeyCounts[tokenKey]
@@ -252,7 +306,7 @@ class BlockProcessor:
             isInterstitial = tokenKeySeenCounts[tokenKey] < tokenKeyCount
             isOutbound = retrievedEvent.fromAddress == transactionFromAddress
             operatorAddress = retrievedEvent.operatorAddress if retrievedEvent.operatorAddress else transactionFromAddress
-            retrievedTokenTransfers += [
+            retrievedTokenTransfers.append(
                 RetrievedTokenTransfer(
                     transactionHash=retrievedEvent.transactionHash,
                     registryAddress=retrievedEvent.registryAddress,
@@ -263,9 +317,9 @@ class BlockProcessor:
                     contractAddress=contractAddress,
                     amount=retrievedEvent.amount,
                     value=0,
-                    gasLimit=transaction['gas'],
-                    gasPrice=transaction['gasPrice'],
-                    blockNumber=transaction['blockNumber'],
+                    gasLimit=gasLimit,
+                    gasPrice=gasPrice,
+                    blockNumber=blockNumber,
                     tokenType=retrievedEvent.tokenType,
                     isMultiAddress=isMultiAddress,
                     isInterstitial=isInterstitial,
@@ -273,10 +327,11 @@ class BlockProcessor:
                     isSwap=False,
                     isBatch=False,
                 )
-            ]
+            )
         # Calculate isBatch only if this is not a multi address
         if not isMultiAddress:
-            isBatch = len({retrievedTokenTransfer for retrievedTokenTransfer in retrievedTokenTransfers if not retrievedTokenTransfer.isInterstitial}) > 1
+            # NOTE(krishan711): non-interstitial transfers all have different token keys so counting them is the same as counting unique ones
+            isBatch = sum(1 for retrievedTokenTransfer in retrievedTokenTransfers if not retrievedTokenTransfer.isInterstitial) > 1
             for retrievedTokenTransfer in retrievedTokenTransfers:
                 retrievedTokenTransfer.isBatch = isBatch and not retrievedTokenTransfer.isInterstitial
         # Calculate swaps as anywhere the transaction creator receives a token
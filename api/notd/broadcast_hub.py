@@ -0,0 +1,186 @@
+import abc
+import asyncio
+import bisect
+import collections
+from abc import ABC
+from typing import AsyncGenerator
+from typing import Callable
+from typing import Deque
+from typing import Optional
+from typing import Set
+from typing import Tuple
+
+import asyncpg  # type: ignore[import]
+import sqlalchemy
+from core import logging
+from core.store.database import Database
+
+from notd.store.schema import BroadcastEventIdsSequence
+
+BroadcastEvent = Tuple[int, str]
+BroadcastMessageCallback = Callable[[int, str], None]
+
+
+class BroadcastBackend(ABC):
+
+    @abc.abstractmethod
+    async def connect(self, onMessage: BroadcastMessageCallback) -> None:
+        pass
+
+    @abc.abstractmethod
+    async def disconnect(self) -> None:
+        pass
+
+    @abc.abstractmethod
+    async def publish(self, payload: str) -> None:
+        pass
+
+
+class LocalBroadcastBackend(BroadcastBackend):
+
+    def __init__(self) -> None:
+        self.onMessage: Optional[BroadcastMessageCallback] = None
+        self.nextEventId = 0
+
+    async def connect(self, onMessage: BroadcastMessageCallback) -> None:
+        self.onMessage = onMessage
+
+    async def disconnect(self) -> None:
+        self.onMessage = None
+
+    async def publish(self, payload: str) -> None:
+        eventId = self.nextEventId
+        self.nextEventId += 1
+        if self.onMessage:
+            self.onMessage(eventId, payload)
+
+
+class PostgresBroadcastBackend(BroadcastBackend):
+
+    def __init__(self, database: Database, channel: str, reconnectDelaySeconds: float = 5) -> None:
+        self.database = database
+        self.channel = channel
+        self.reconnectDelaySeconds = reconnectDelaySeconds
+        self.onMessage: Optional[BroadcastMessageCallback] = None
+        self.connection: Optional[asyncpg.Connection] = None
+        self.reconnectTask: Optional[asyncio.Task[None]] = None
+        self.isConnected = False
+
+    async def connect(self, onMessage: BroadcastMessageCallback) -> None:
+        self.onMessage = onMessage
+        self.isConnected = True
+        await self._listen()
+
+    async def disconnect(self) -> None:
+        self.isConnected = False
+        if self.reconnectTask:
+            self.reconnectTask.cancel()
+            self.reconnectTask = None
+        if self.connection:
+            connection = self.connection
+            self.connection = None
+            await connection.close()
+
+    async def publish(self, payload: str) -> None:
+        # NOTE(krishan711): postgres only delivers a notification once its transaction commits so it gets its own.
+        # Publishers don't coordinate so ids from the shared sequence can arrive slightly out of order, the hub keeps its history sorted by id.
+        async with self.database.create_transaction() as connection:
+            notifyPayload = sqlalchemy.cast(BroadcastEventIdsSequence.next_value(), sqlalchemy.Text).concat(f':{payload}')
+            await self.database.execute(query=sqlalchemy.select(sqlalchemy.func.pg_notify(self.channel, notifyPayload)), connection=connection)
+
+    async def _listen(self) -> None:
+        # NOTE(krishan711): LISTEN needs a dedicated connection that lives outside the pool
+        dsn = self.database.connectionString.replace('+asyncpg', '', 1)
+        connection = await asyncpg.connect(dsn=dsn)
+        connection.add_termination_listener(self._on_connection_terminated)
+        await connection.add_listener(self.channel, self._on_notification)
+        self.connection = connection
+
+    def _on_notification(self, connection: asyncpg.Connection, pid: int, channel: str, payload: str) -> None:  # pylint: disable=unused-argument
+        eventIdString, payload = payload.split(':', 1)
+        if self.onMessage:
+            self.onMessage(int(eventIdString), payload)
+
+    def _on_connection_terminated(self, connection: asyncpg.Connection) -> None:
+        if self.isConnected and connection is self.connection:
+            logging.info(f'Broadcast listener connection for {self.channel} was terminated, reconnecting')
+            self.connection = None
+            self.reconnectTask = asyncio.create_task(self._reconnect())
+
+    async def _reconnect(self) -> None:
+        while self.isConnected:
+            try:
+                await self._listen()
+                return
+            except Exception as exception:  # pylint: disable=broad-except
+                logging.info(f'Failed to reconnect broadcast listener for {self.channel}: {exception}')
+                await asyncio.sleep(self.reconnectDelaySeconds)
+
+
+class BroadcastSubscription:
+
+    def __init__(self, maxQueueSize: int) -> None:
+        self.queue: asyncio.Queue[Optional[BroadcastEvent]] = asyncio.Queue(maxsize=maxQueueSize)
+        self.isDropped = False
+
+
+class BroadcastHub:
+
+    def __init__(self, backend: BroadcastBackend, historySize: int = 100, subscriberQueueSize: int = 100) -> None:
+        self.backend = backend
+        self.historySize = historySize
+        self.subscriberQueueSize = subscriberQueueSize
+        self.history: Deque[BroadcastEvent] = collections.deque(maxlen=historySize)
+        self.subscriptions: Set[BroadcastSubscription] = set()
+
+    async def connect(self) -> None:
+        await self.backend.connect(onMessage=self._on_message)
+
+    async def disconnect(self) -> None:
+        await self.backend.disconnect()
+        for subscription in list(self.subscriptions):
+            self._drop_subscription(subscription=subscription)
+
+    async def publish(self, payload: str) -> None:
+        await self.backend.publish(payload=payload)
+
+    async def subscribe(self, lastEventId: Optional[int] = None) -> AsyncGenerator[BroadcastEvent, None]:
+        # NOTE(krishan711): the replay is captured and the subscription registered without awaiting so no event can be missed in between
+        replayEvents = [event for event in self.history if event[0] > lastEventId] if lastEventId is not None else []
+        subscription = BroadcastSubscription(maxQueueSize=self.subscriberQueueSize)
+        self.subscriptions.add(subscription)
+        try:
+            for event in replayEvents:
+                yield event
+            while not subscription.isDropped:
+                queuedEvent = await subscription.queue.get()
+                if queuedEvent is None or subscription.isDropped:
+                    break
+                yield queuedEvent
+        finally:
+            self.subscriptions.discard(subscription)
+
+    def _on_message(self, eventId: int, payload: str) -> None:
+        event = (eventId, payload)
+        self._add_to_history(event=event)
+        for subscription in list(self.subscriptions):
+            try:
+                subscription.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                logging.info(f'Dropping slow broadcast subscriber with {subscription.queue.qsize()} pending events')
+                self._drop_subscription(subscription=subscription)
+
+    def _add_to_history(self, event: BroadcastEvent) -> None:
+        # NOTE(krishan711): events can arrive out of id order so the history is kept sorted for replays from a lastEventId
+        if len(self.history) == self.historySize:
+            if event < self.history[0]:
+                return
+            self.history.popleft()
+        bisect.insort(self.history, event)
+
+    def _drop_subscription(self, subscription: BroadcastSubscription) -> None:
+        # NOTE(krishan711): a full queue means the consumer isn't waiting so the flag is enough, otherwise wake it up to finish
+        subscription.isDropped = True
+        self.subscriptions.discard(subscription)
+        if not subscription.queue.full():
+            subscription.queue.put_nowait(None)
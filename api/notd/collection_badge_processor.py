@@ -1,6 +1,10 @@
 import abc
+import datetime
 from abc import ABC
 from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Set
 
 from notd.model import RetrievedGalleryBadgeHolder
 
@@ -8,5 +12,9 @@ from notd.model import RetrievedGalleryBadgeHolder
 class CollectionBadgeProcessor(ABC):
 
     @abc.abstractmethod
-    async def calculate_all_gallery_badge_holders(self) -> List[RetrievedGalleryBadgeHolder]:
+    async def get_changed_owner_addresses(self, sinceDate: datetime.datetime) -> Set[str]:
+        pass
+
+    @abc.abstractmethod
+    async def calculate_all_gallery_badge_holders(self, ownerAddresses: Optional[Sequence[str]] = None) -> List[RetrievedGalleryBadgeHolder]:
         pass
@@ -1,8 +1,12 @@
 import asyncio
+import datetime
 import random
+from typing import Dict
 from typing import Optional
 from typing import Sequence
+from typing import Set
 
+import sqlalchemy
 from core import logging
 from core.exceptions import NotFoundException
 from core.queues.message_queue import MessageQueue
@@ -31,6 +35,8 @@ class CollectionManager:
         self.retriever = retriever
         self.tokenQueue = tokenQueue
         self.collectionProcessor = collectionProcessor
+        self.collectionUpdatedDateMap: Optional[Dict[str, datetime.datetime]] = None
+        self.collectionUpdatedDateMapLock = asyncio.Lock()
 
     async def get_collection_by_address(self, address: str) -> Collection:
         address = chain_util.normalize_address(value=address)
@@ -50,17 +56,40 @@ class CollectionManager:
             collection = await self.retriever.get_collection_by_address(address=address)
         return collection
 
+    async def _get_collection_updated_date_map(self) -> Dict[str, datetime.datetime]:
+        # NOTE(krishan711): loaded once and kept up to date by update_collection so enqueueing doesn't need a query per address
+        if self.collectionUpdatedDateMap is None:
+            async with self.collectionUpdatedDateMapLock:
+                if self.collectionUpdatedDateMap is None:
+                    query = sqlalchemy.select(TokenCollectionsTable.c.address, TokenCollectionsTable.c.updatedDate)
+                    result = await self.retriever.database.execute(query=query)
+                    self.collectionUpdatedDateMap = dict(result.tuples())
+                    logging.info(f'Loaded updated dates for {len(self.collectionUpdatedDateMap)} collections')
+        return self.collectionUpdatedDateMap
+
+    def _set_collection_updated_date(self, address: str, updatedDate: datetime.datetime) -> None:
+        if self.collectionUpdatedDateMap is None:
+            return
+        currentUpdatedDate = self.collectionUpdatedDateMap.get(address)
+        if currentUpdatedDate is None or currentUpdatedDate < updatedDate:
+            self.collectionUpdatedDateMap[address] = updatedDate
+
+    async def _get_recently_updated_addresses(self, addresses: Sequence[str]) -> Set[str]:
+        collectionUpdatedDateMap = await self._get_collection_updated_date_map()
+        minimumUpdatedDate = date_util.datetime_from_now(days=-_COLLECTION_UPDATE_MIN_DAYS)
+        recentlyUpdatedAddresses = set()
+        for address in addresses:
+            updatedDate = collectionUpdatedDateMap.get(address)
+            if updatedDate is not None and updatedDate > minimumUpdatedDate:
+                recentlyUpdatedAddresses.add(address)
+        return recentlyUpdatedAddresses
+
     async def update_collections_deferred(self, addresses: Sequence[str], shouldForce: Optional[bool] = False) -> None:
         if len(addresses) == 0:
             return
+        addresses = list({chain_util.normalize_address(value=address) for address in addresses})
         if not shouldForce:
-            recentlyUpdatedCollections = await self.retriever.list_collections(
-                fieldFilters=[
-                    StringFieldFilter(fieldName=TokenCollectionsTable.c.address.key, containedIn=addresses),
-                    DateFieldFilter(fieldName=TokenCollectionsTable.c.updatedDate.key, gt=date_util.datetime_from_now(days=-_COLLECTION_UPDATE_MIN_DAYS))
-                ],
-            )
-            recentlyUpdatedAddresses = {collection.address for collection in recentlyUpdatedCollections}
+            recentlyUpdatedAddresses = await self._get_recently_updated_addresses(addresses=addresses)
             logging.info(f'Skipping {len(recentlyUpdatedAddresses)} collections because they have been updated recently.')
             addresses = list(set(addresses) - recentlyUpdatedAddresses)
         messages = [UpdateCollectionMessageContent(address=address).to_message() for address in addresses]
@@ -69,13 +98,8 @@ class CollectionManager:
     async def update_collection_deferred(self, address: str, shouldForce: Optional[bool] = False) -> None:
         address = chain_util.normalize_address(value=address)
         if not shouldForce:
-            recentlyUpdatedCollections = await self.retriever.list_collections(
-                fieldFilters=[
-                    StringFieldFilter(fieldName=TokenCollectionsTable.c.address.key, eq=address),
-                    DateFieldFilter(fieldName=TokenCollectionsTable.c.updatedDate.key, gt=date_util.datetime_from_now(days=-_COLLECTION_UPDATE_MIN_DAYS))
-                ],
-            )
-            if len(recentlyUpdatedCollections) > 0:
+            recentlyUpdatedAddresses = await self._get_recently_updated_addresses(addresses=[address])
+            if len(recentlyUpdatedAddresses) > 0:
                 logging.info('Skipping collection because it has been updated recently.')
                 return
         await self.tokenQueue.send_message(message=UpdateCollectionMessageContent(address=address).to_message())
@@ -83,6 +107,11 @@ class CollectionManager:
     async def update_collection(self, address: str, shouldForce: Optional[bool] = False) -> None:
         address = chain_util.normalize_address(value=address)
         if not shouldForce:
+            recentlyUpdatedAddresses = await self._get_recently_updated_addresses(addresses=[address])
+            if len(recentlyUpdatedAddresses) > 0:
+                logging.info('Skipping collection because it has been updated recently.')
+                return
+            # NOTE(krishan711): another process may have updated it since the map was loaded so check before doing the expensive part
             recentlyUpdatedCollections = await self.retriever.list_collections(
                 fieldFilters=[
                     StringFieldFilter(fieldName=TokenCollectionsTable.c.address.key, eq=address),
@@ -90,6 +119,7 @@ class CollectionManager:
                 ],
             )
             if len(recentlyUpdatedCollections) > 0:
+                self._set_collection_updated_date(address=address, updatedDate=recentlyUpdatedCollections[0].updatedDate)
                 logging.info('Skipping collection because it has been updated recently.')
                 return
         try:
@@ -106,3 +136,4 @@ class CollectionManager:
                 await self.saver.update_collection(connection=connection, collectionId=collection.collectionId, name=retrievedCollection.name, symbol=retrievedCollection.symbol, description=retrievedCollection.description, imageUrl=retrievedCollection.imageUrl, twitterUsername=retrievedCollection.twitterUsername, instagramUsername=retrievedCollection.instagramUsername, wikiUrl=retrievedCollection.wikiUrl, openseaSlug=retrievedCollection.openseaSlug, url=retrievedCollection.url, discordUrl=retrievedCollection.discordUrl, bannerImageUrl=retrievedCollection.bannerImageUrl, doesSupportErc721=retrievedCollection.doesSupportErc721, doesSupportErc1155=retrievedCollection.doesSupportErc1155)
             else:
                 await self.saver.create_collection(connection=connection, address=address, name=retrievedCollection.name, symbol=retrievedCollection.symbol, description=retrievedCollection.description, imageUrl=retrievedCollection.imageUrl, twitterUsername=retrievedCollection.twitterUsername, instagramUsername=retrievedCollection.instagramUsername, wikiUrl=retrievedCollection.wikiUrl, openseaSlug=retrievedCollection.openseaSlug, url=retrievedCollection.url, discordUrl=retrievedCollection.discordUrl, bannerImageUrl=retrievedCollection.bannerImageUrl, doesSupportErc721=retrievedCollection.doesSupportErc721, doesSupportErc1155=retrievedCollection.doesSupportErc1155)
+        self._set_collection_updated_date(address=address, updatedDate=date_util.datetime_from_now())
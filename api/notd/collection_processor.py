@@ -12,6 +12,8 @@ from core.web3.eth_client import EthClientInterface
 from eth_abi.exceptions import InsufficientDataBytes
 from httpx import ReadTimeout
 
+from notd.contract_store import get_contract_abi
+from notd.contract_store import get_function_abi
 from notd.model import RetrievedCollection
 
 _INTERFACE_ID_ERC721 = '0x5b5e139f'
@@ -26,23 +28,6 @@ class CollectionProcessor:
         self.requester = requester
         self.ethClient = ethClient
         self.openseaApiKey = openseaApiKey
-        with open('./contracts/IERC721Metadata.json') as contractJsonFile:
-            erc721MetdataContractJson = json.load(contractJsonFile)
-        self.erc721MetdataContractAbi = erc721MetdataContractJson['abi']
-        self.erc721MetadataNameFunctionAbi = [internalAbi for internalAbi in self.erc721MetdataContractAbi if internalAbi['name'] == 'name'][0]
-        self.erc721MetadataSymbolFunctionAbi = [internalAbi for internalAbi in self.erc721MetdataContractAbi if internalAbi['name'] == 'symbol'][0]
-        with open('./contracts/IERC1155MetadataURI.json') as contractJsonFile:
-            erc1155MetadataContractJson = json.load(contractJsonFile)
-        self.erc1155MetadataContractAbi = erc1155MetadataContractJson['abi']
-        self.erc1155MetadataUriFunctionAbi = [internalAbi for internalAbi in self.erc1155MetadataContractAbi if internalAbi.get('name') == 'uri'][0]
-        with open('./contracts/IERC165.json') as contractJsonFile:
-            erc165MetadataContractJson = json.load(contractJsonFile)
-        self.erc165MetadataContractAbi = erc165MetadataContractJson['abi']
-        self.erc165SupportInterfaceUriFunctionAbi = [internalAbi for internalAbi in self.erc165MetadataContractAbi if internalAbi.get('name') == 'supportsInterface'][0]
-        with open('./contracts/ContractMetadata.json') as contractJsonFile:
-            contractMetadataJson = json.load(contractJsonFile)
-        self.contractAbi = contractMetadataJson['abi']
-        self.contractUriFunctionAbi = [internalAbi for internalAbi in self.contractAbi if internalAbi['name'] == 'contractURI'][0]
 
     @staticmethod
     def _clean_potential_ipfs_url(ipfsUrl: Optional[str]) -> Optional[str]:
@@ -50,27 +35,27 @@ class CollectionProcessor:
 
     async def retrieve_collection(self, address: str) -> RetrievedCollection:  # pylint: disable=too-many-statements
         try:
-            doesSupportErc721Response = await self.ethClient.call_function(toAddress=address, contractAbi=self.erc165MetadataContractAbi, functionAbi=self.erc165SupportInterfaceUriFunctionAbi, arguments={'interfaceId': _INTERFACE_ID_ERC721})
+            doesSupportErc721Response = await self.ethClient.call_function(toAddress=address, contractAbi=get_contract_abi(name='IERC165'), functionAbi=get_function_abi(contractName='IERC165', functionName='supportsInterface'), arguments={'interfaceId': _INTERFACE_ID_ERC721})
             doesSupportErc721 = doesSupportErc721Response[0]
         except BadRequestException:
             doesSupportErc721 = False
         try:
-            doesSupportErc1155Response = await self.ethClient.call_function(toAddress=address, contractAbi=self.erc165MetadataContractAbi, functionAbi=self.erc165SupportInterfaceUriFunctionAbi, arguments={'interfaceId': _INTERFACE_ID_ERC1155})
+            doesSupportErc1155Response = await self.ethClient.call_function(toAddress=address, contractAbi=get_contract_abi(name='IERC165'), functionAbi=get_function_abi(contractName='IERC165', functionName='supportsInterface'), arguments={'interfaceId': _INTERFACE_ID_ERC1155})
             doesSupportErc1155 = doesSupportErc1155Response[0]
         except BadRequestException:
             doesSupportErc1155 = False
         try:
-            tokenMetadataNameResponse = await self.ethClient.call_function(toAddress=address, contractAbi=self.erc721MetdataContractAbi, functionAbi=self.erc721MetadataNameFunctionAbi)
+            tokenMetadataNameResponse = await self.ethClient.call_function(toAddress=address, contractAbi=get_contract_abi(name='IERC721Metadata'), functionAbi=get_function_abi(contractName='IERC721Metadata', functionName='name'))
             collectionName = tokenMetadataNameResponse[0]
         except BadRequestException:
             collectionName = None
         try:
-            tokenMetadataSymbolResponse = await self.ethClient.call_function(toAddress=address, contractAbi=self.erc721MetdataContractAbi, functionAbi=self.erc721MetadataSymbolFunctionAbi)
+            tokenMetadataSymbolResponse = await self.ethClient.call_function(toAddress=address, contractAbi=get_contract_abi(name='IERC721Metadata'), functionAbi=get_function_abi(contractName='IERC721Metadata', functionName='symbol'))
             collectionSymbol = tokenMetadataSymbolResponse[0]
         except BadRequestException:
             collectionSymbol = None
         try:
-            contractUriResponse = await self.ethClient.call_function(toAddress=address, contractAbi=self.contractAbi, functionAbi=self.contractUriFunctionAbi)
+            contractUriResponse = await self.ethClient.call_function(toAddress=address, contractAbi=get_contract_abi(name='ContractMetadata'), functionAbi=get_function_abi(contractName='ContractMetadata', functionName='contractURI'))
             contractMetadataUri = contractUriResponse[0]
         except (BadRequestException, InsufficientDataBytes):
             contractMetadataUri = None
@@ -0,0 +1,50 @@
+import functools
+import json
+import typing
+from typing import Dict
+from typing import Optional
+from typing import Tuple
+
+from core.util.typing_util import JSON
+from web3 import Web3
+from web3.contract import Contract
+from web3.types import ABI
+from web3.types import ABIFunction
+
+# NOTE(krishan711): everything here is cached for the life of the process and shared between all processors so callers must never modify what they get back
+
+_CONTRACTS_DIRECTORY = './contracts'
+
+# NOTE(krishan711): the abi types contain Any so these are cached by hand, mypy rejects them behind a caching decorator
+_FUNCTION_ABIS: Dict[Tuple[str, str], ABIFunction] = {}
+
+
+@functools.lru_cache(maxsize=None)
+def get_contract_json(name: str) -> Dict[str, JSON]:
+    with open(f'{_CONTRACTS_DIRECTORY}/{name}.json') as contractJsonFile:
+        contractJson: Dict[str, JSON] = json.load(contractJsonFile)
+    return contractJson
+
+
+def get_contract_abi(name: str) -> ABI:
+    return typing.cast(ABI, get_contract_json(name=name)['abi'])
+
+
+def get_function_abi(contractName: str, functionName: str) -> ABIFunction:
+    functionAbi = _FUNCTION_ABIS.get((contractName, functionName))
+    if functionAbi is None:
+        functionAbi = typing.cast(ABIFunction, [internalAbi for internalAbi in get_contract_abi(name=contractName) if internalAbi.get('name') == functionName][0])
+        _FUNCTION_ABIS[(contractName, functionName)] = functionAbi
+    return functionAbi
+
+
+@functools.lru_cache(maxsize=None)
+def _get_web3() -> Web3:
+    return Web3()
+
+
+@functools.lru_cache(maxsize=None)
+def get_contract(name: str, address: Optional[str] = None) -> Contract:
+    if address is None:
+        return _get_web3().eth.contract(abi=get_contract_abi(name=name))  # type: ignore[return-value]
+    return _get_web3().eth.contract(address=address, abi=get_contract_abi(name=name))  # type: ignore[call-overload, no-any-return]
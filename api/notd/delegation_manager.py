@@ -1,15 +1,33 @@
 from __future__ import annotations
 
+import asyncio
+import contextlib
 import dataclasses
+import functools
 import json
+import time
 import typing
+from typing import Dict
 from typing import List
 from typing import Optional
+from typing import Sequence
+from typing import Set
+from typing import Tuple
 
+from core import logging
 from core.exceptions import BadRequestException
 from core.util import chain_util
 from core.web3.eth_client import EthClientInterface
+from web3._utils.abi import get_abi_output_types
 from web3.auto import w3
+from web3.contract import Contract
+
+from notd.broadcast_hub import BroadcastHub
+from notd.contract_store import get_contract
+from notd.contract_store import get_function_abi
+from notd.model import DELEGATION_REGISTRY_ADDRESS
+from notd.model import MULTICALL3_ADDRESS
+from notd.model import RetrievedDelegationEvent
 
 
 class DelegationType:
@@ -39,23 +57,106 @@ class Delegation:
     tokenId: Optional[str]
 
 
-DEPOSIT_CASH_ADDRESS = '0x00000000000076A84feF008CDAbe6409d2FE638B'
-
-
 class DelegationManager:
 
-    def __init__(self, ethClient: EthClientInterface) -> None:
+    def __init__(self, ethClient: EthClientInterface, delegationBroadcastHub: BroadcastHub, cacheSeconds: float = 30, batchDelaySeconds: float = 0.01, maxBatchSize: int = 50, maxCacheSize: int = 10000) -> None:
         self.ethClient = ethClient
-        with open('./contracts/DelegationRegistry.json') as contractJsonFile:
-            contractJson = json.load(contractJsonFile)
-        self.depositCashContract = w3.eth.contract(address=DEPOSIT_CASH_ADDRESS, abi=contractJson['abi'])  # type: ignore[call-overload]
+        self.delegationBroadcastHub = delegationBroadcastHub
+        self.cacheSeconds = cacheSeconds
+        self.batchDelaySeconds = batchDelaySeconds
+        self.maxBatchSize = maxBatchSize
+        self.maxCacheSize = maxCacheSize
+        self.delegateDelegationsCache: Dict[str, Tuple[float, List[Delegation]]] = {}
+        self.lookupFutures: Dict[str, asyncio.Future[List[Delegation]]] = {}
+        self.queuedLookups: List[Tuple[str, asyncio.Future[List[Delegation]]]] = []
+        self.batchTask: Optional[asyncio.Task[None]] = None
+        self.eventListenerTask: Optional[asyncio.Task[None]] = None
+
+    @functools.cached_property
+    def delegationRegistryContract(self) -> Contract:  # pylint: disable=invalid-name
+        return get_contract(name='DelegationRegistry', address=DELEGATION_REGISTRY_ADDRESS)
+
+    @functools.cached_property
+    def getDelegationsByDelegateOutputTypes(self) -> List[str]:  # pylint: disable=invalid-name
+        return get_abi_output_types(abi=get_function_abi(contractName='DelegationRegistry', functionName='getDelegationsByDelegate'))
+
+    @functools.cached_property
+    def multicallContract(self) -> Contract:  # pylint: disable=invalid-name
+        return get_contract(name='Multicall3', address=MULTICALL3_ADDRESS)
 
     async def get_delegations(self, delegateAddress: str) -> List[Delegation]:
-        response = await self.ethClient.call_contract_function(contract=self.depositCashContract, functionName='getDelegationsByDelegate', arguments={'delegate': delegateAddress})
+        # NOTE(krishan711): lookups made close together (e.g. during a gm burst) share one request and repeat lookups are served from the cache
+        delegateAddress = chain_util.normalize_address(value=delegateAddress)
+        cachedEntry = self.delegateDelegationsCache.get(delegateAddress)
+        if cachedEntry is not None and cachedEntry[0] > time.monotonic():
+            return list(cachedEntry[1])
+        lookupFuture = self.lookupFutures.get(delegateAddress)
+        if lookupFuture is None:
+            lookupFuture = self._queue_lookup(delegateAddress=delegateAddress)
+        return list(await asyncio.shield(lookupFuture))
+
+    def _queue_lookup(self, delegateAddress: str) -> asyncio.Future[List[Delegation]]:
+        lookupFuture: asyncio.Future[List[Delegation]] = asyncio.get_running_loop().create_future()
+        self.lookupFutures[delegateAddress] = lookupFuture
+        self.queuedLookups.append((delegateAddress, lookupFuture))
+        if self.batchTask is None:
+            self.batchTask = asyncio.create_task(self._run_batches())
+        return lookupFuture
+
+    async def _run_batches(self) -> None:
+        try:
+            await asyncio.sleep(self.batchDelaySeconds)
+            while len(self.queuedLookups) > 0:
+                lookups = self.queuedLookups[:self.maxBatchSize]
+                self.queuedLookups = self.queuedLookups[self.maxBatchSize:]
+                await self._lookup_batch(lookups=lookups)
+        finally:
+            self.batchTask = None
+
+    async def _lookup_batch(self, lookups: Sequence[Tuple[str, asyncio.Future[List[Delegation]]]]) -> None:
+        delegateAddresses = [delegateAddress for delegateAddress, _ in lookups]
+        try:
+            delegateDelegationsMap = await self._retrieve_delegations(delegateAddresses=delegateAddresses)
+        except Exception as exception:  # pylint: disable=broad-except
+            delegateDelegationsMap = {delegateAddress: exception for delegateAddress in delegateAddresses}
+        currentTime = time.monotonic()
+        if len(self.delegateDelegationsCache) > self.maxCacheSize:
+            self.delegateDelegationsCache = {delegateAddress: cachedEntry for delegateAddress, cachedEntry in self.delegateDelegationsCache.items() if cachedEntry[0] > currentTime}
+        expiryTime = currentTime + self.cacheSeconds
+        for delegateAddress, lookupFuture in lookups:
+            # NOTE(krishan711): a lookup that was invalidated while in flight may have read the old state so it only answers its own waiters and never fills the cache
+            isCurrentLookup = self.lookupFutures.get(delegateAddress) is lookupFuture
+            if isCurrentLookup:
+                del self.lookupFutures[delegateAddress]
+            delegations = delegateDelegationsMap[delegateAddress]
+            if isinstance(delegations, Exception):
+                lookupFuture.set_exception(delegations)
+                # NOTE(krishan711): mark the exception as retrieved so it isn't logged if every waiter has gone away
+                lookupFuture.exception()
+                continue
+            if isCurrentLookup:
+                self.delegateDelegationsCache[delegateAddress] = (expiryTime, delegations)
+            lookupFuture.set_result(delegations)
+
+    async def _retrieve_delegations(self, delegateAddresses: Sequence[str]) -> Dict[str, typing.Union[List[Delegation], Exception]]:
+        if len(delegateAddresses) == 1:
+            response = await self.ethClient.call_contract_function(contract=self.delegationRegistryContract, functionName='getDelegationsByDelegate', arguments={'delegate': delegateAddresses[0]})
+            return {delegateAddresses[0]: self._parse_delegations(delegationInfos=response[0])}
+        calls = [(DELEGATION_REGISTRY_ADDRESS, True, bytes.fromhex(self.delegationRegistryContract.encodeABI(fn_name='getDelegationsByDelegate', args=[delegateAddress])[2:])) for delegateAddress in delegateAddresses]
+        response = await self.ethClient.call_contract_function(contract=self.multicallContract, functionName='aggregate3', arguments={'calls': calls})
+        delegateDelegationsMap: Dict[str, typing.Union[List[Delegation], Exception]] = {}
+        for delegateAddress, (isSuccess, returnData) in zip(delegateAddresses, response[0]):
+            if not isSuccess:
+                delegateDelegationsMap[delegateAddress] = BadRequestException(message=f'Failed to get delegations for {delegateAddress}')
+                continue
+            (delegationInfos, ) = w3.codec.decode(types=self.getDelegationsByDelegateOutputTypes, data=returnData)
+            delegateDelegationsMap[delegateAddress] = self._parse_delegations(delegationInfos=delegationInfos)
+        return delegateDelegationsMap
+
+    @staticmethod
+    def _parse_delegations(delegationInfos: Sequence[Tuple[int, str, str, str, int]]) -> List[Delegation]:
         delegations: List[Delegation] = []
-        if response == [()]:
-            return delegations
-        for ((delegationTypeValue, vaultAddressRaw, delegateAddressRaw, contractAddressRaw, tokenIdRaw), ) in response:
+        for (delegationTypeValue, vaultAddressRaw, delegateAddressRaw, contractAddressRaw, tokenIdRaw) in delegationInfos:
             delegation = Delegation(
                 delegationType=DelegationType.from_raw(value=delegationTypeValue),
                 vaultAddress=chain_util.normalize_address(vaultAddressRaw),
@@ -66,3 +167,49 @@ class DelegationManager:
             if delegation.delegationType != DelegationType.NONE:
                 delegations.append(delegation)
         return delegations
+
+    async def warm_from_delegation_events(self, delegationEvents: Sequence[RetrievedDelegationEvent]) -> None:
+        # NOTE(krishan711): revoking all delegates only names the vault so any cached delegate with a delegation from it is affected too
+        changedDelegateAddresses: Set[str] = {delegationEvent.delegateAddress for delegationEvent in delegationEvents if delegationEvent.delegateAddress is not None}
+        revokedVaultAddresses = {delegationEvent.vaultAddress for delegationEvent in delegationEvents if delegationEvent.delegateAddress is None}
+        if len(revokedVaultAddresses) > 0:
+            for delegateAddress, (_, delegations) in self.delegateDelegationsCache.items():
+                if any(delegation.vaultAddress in revokedVaultAddresses for delegation in delegations):
+                    changedDelegateAddresses.add(delegateAddress)
+        cachedDelegateAddresses: List[str] = []
+        for delegateAddress in changedDelegateAddresses:
+            cachedEntry = self.delegateDelegationsCache.pop(delegateAddress, None)
+            # NOTE(krishan711): in-flight lookups are detached too so the refresh below starts a new one instead of joining a stale one
+            lookupFuture = self.lookupFutures.pop(delegateAddress, None)
+            if cachedEntry is not None or lookupFuture is not None:
+                cachedDelegateAddresses.append(delegateAddress)
+        if len(cachedDelegateAddresses) == 0:
+            return
+        logging.info(f'Refreshing delegations for {len(cachedDelegateAddresses)} cached delegates')
+        await asyncio.gather(*[self.get_delegations(delegateAddress=delegateAddress) for delegateAddress in cachedDelegateAddresses], return_exceptions=True)
+
+    async def publish_delegation_events(self, delegationEvents: Sequence[RetrievedDelegationEvent]) -> None:
+        if len(delegationEvents) == 0:
+            return
+        await self.delegationBroadcastHub.publish(payload=json.dumps([dataclasses.asdict(delegationEvent) for delegationEvent in delegationEvents]))
+
+    def start_delegation_event_listener(self) -> None:
+        if self.eventListenerTask is None:
+            self.eventListenerTask = asyncio.create_task(self._listen_for_delegation_events())
+
+    async def stop_delegation_event_listener(self) -> None:
+        if self.eventListenerTask is not None:
+            self.eventListenerTask.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self.eventListenerTask
+            self.eventListenerTask = None
+
+    async def _listen_for_delegation_events(self) -> None:
+        # NOTE(krishan711): the events are published by the worker as it processes blocks, a slow listener is dropped by the hub so it subscribes again and the cache ttl covers anything missed
+        while True:
+            async for _, payload in self.delegationBroadcastHub.subscribe():
+                delegationEvents = [RetrievedDelegationEvent(**delegationEventDict) for delegationEventDict in json.loads(payload)]
+                try:
+                    await self.warm_from_delegation_events(delegationEvents=delegationEvents)
+                except Exception as exception:  # pylint: disable=broad-except
+                    logging.info(f'Failed to warm delegations from events: {exception}')
@@ -1,5 +1,6 @@
 import contextlib
 import datetime
+import functools
 import json
 import urllib.parse as urlparse
 from collections import defaultdict
@@ -16,14 +17,19 @@ from core.store.retriever import StringFieldFilter
 from core.util import chain_util
 from core.util import date_util
 from core.util import list_util
+from core.util.typing_util import JSON
 from core.web3.eth_client import EthClientInterface
 from eth_account.messages import defunct_hash_message
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.sql import functions as sqlalchemyfunc
 from web3 import Web3
 
 from notd.api.endpoints_v1 import InQueryParam
 from notd.badge_manager import BadgeManager
 from notd.collection_manager import CollectionManager
+from notd.contract_store import get_contract_abi
+from notd.contract_store import get_contract_json
+from notd.contract_store import get_function_abi
 from notd.model import COLLECTION_SPRITE_CLUB_ADDRESS
 from notd.model import STAKING_ADDRESSES
 from notd.model import SUPER_COLLECTIONS
@@ -47,9 +53,10 @@ from notd.model import TokenCustomization
 from notd.model import TokenMetadata
 from notd.store.retriever import Retriever
 from notd.store.saver import Saver
+from notd.store.schema import BestTokenListingsTable
 from notd.store.schema import CollectionTotalActivitiesTable
 from notd.store.schema import GalleryBadgeHoldersView
-from notd.store.schema import OrderedTokenListingsView
+from notd.store.schema import TokenAttributeBitmapsTable
 from notd.store.schema import TokenAttributesTable
 from notd.store.schema import TokenCollectionOverlapsTable
 from notd.store.schema import TokenCollectionsTable
@@ -69,6 +76,8 @@ from notd.store.schema_conversions import token_metadata_from_row
 from notd.store.schema_conversions import token_staking_from_row
 from notd.store.schema_conversions import twitter_profile_from_row
 from notd.store.schema_conversions import user_profile_from_row
+from notd.token_id_bitmap import deserialize_bitmap
+from notd.token_id_bitmap import get_bitmap_token_ids
 from notd.twitter_manager import TwitterManager
 
 SPRITE_CLUB_STORMDROP_REGISTRY_ADDRESS = '0x27C86e1c64622643049d3D7966580Cb832dCd1EF'
@@ -83,15 +92,12 @@ class GalleryManager:
         self.twitterManager = twitterManager
         self.collectionManager = collectionManager
         self.badgeManager = badgeManager
-        with open('./contracts/SpriteClub.json', 'r') as contractJsonFile:
-            self.spriteClubContract = json.load(contractJsonFile)
-        with open('./contracts/SpriteClubStormdrop.json', 'r') as contractJsonFile:
-            self.spriteClubStormdropContract = json.load(contractJsonFile)
-        self.spriteClubStormdropClaimedFunctionAbi = [internalAbi for internalAbi in self.spriteClubStormdropContract['abi'] if internalAbi.get('name') == 'claimedSpriteItemIdMap'][0]
-        with open('./contracts/SpriteClubStormdropIdMap.json', 'r') as contractJsonFile:
-            self.spriteClubStormdropIdMap = json.load(contractJsonFile)
         self.web3 = Web3()
 
+    @functools.cached_property
+    def spriteClubStormdropIdMap(self) -> Dict[str, JSON]:  # pylint: disable=invalid-name
+        return get_contract_json(name='SpriteClubStormdropIdMap')
+
     async def twitter_login(self, account: str, signatureJson: str, initialUrl: str) -> None:
         # TODO(krishan711): validate the signatureJson
         signature = Signature.from_dict(signatureDict=json.loads(urlparse.unquote(signatureJson)))
@@ -102,13 +108,13 @@ class GalleryManager:
 
     async def get_gallery_token(self, registryAddress: str, tokenId: str) -> GalleryToken:
         query = (
-            sqlalchemy.select(TokenMetadatasTable, TokenCustomizationsTable, OrderedTokenListingsView, sqlalchemyfunc.sum(TokenOwnershipsView.c.quantity).label('quantity'))
+            sqlalchemy.select(TokenMetadatasTable, TokenCustomizationsTable, BestTokenListingsTable, sqlalchemyfunc.sum(TokenOwnershipsView.c.quantity).label('quantity'))
                 .join(TokenCustomizationsTable, sqlalchemy.and_(TokenMetadatasTable.c.registryAddress == TokenCustomizationsTable.c.registryAddress, TokenMetadatasTable.c.tokenId == TokenCustomizationsTable.c.tokenId), isouter=True)
                 .join(TokenOwnershipsView, sqlalchemy.and_(TokenMetadatasTable.c.registryAddress == TokenOwnershipsView.c.registryAddress, TokenMetadatasTable.c.tokenId == TokenOwnershipsView.c.tokenId))
-                .join(OrderedTokenListingsView, sqlalchemy.and_(TokenMetadatasTable.c.registryAddress == OrderedTokenListingsView.c.registryAddress, TokenMetadatasTable.c.tokenId == OrderedTokenListingsView.c.tokenId, OrderedTokenListingsView.c.tokenListingIndex == 1), isouter=True)
+                .join(BestTokenListingsTable, sqlalchemy.and_(TokenMetadatasTable.c.registryAddress == BestTokenListingsTable.c.registryAddress, TokenMetadatasTable.c.tokenId == BestTokenListingsTable.c.tokenId, BestTokenListingsTable.c.endDate > date_util.datetime_from_now()), isouter=True)
                 .where(TokenMetadatasTable.c.registryAddress == registryAddress)
                 .where(TokenMetadatasTable.c.tokenId == tokenId)
-                .group_by(TokenMetadatasTable.c.tokenMetadataId, TokenCustomizationsTable.c.tokenCustomizationId, OrderedTokenListingsView.c, TokenMetadatasTable.c.registryAddress, TokenMetadatasTable.c.tokenId)  # type: ignore[arg-type]
+                .group_by(TokenMetadatasTable.c.tokenMetadataId, TokenCustomizationsTable.c.tokenCustomizationId, BestTokenListingsTable.c, TokenMetadatasTable.c.registryAddress, TokenMetadatasTable.c.tokenId)  # type: ignore[arg-type]
         )
         result = await self.retriever.database.execute(query=query)
         row = result.mappings().first()
@@ -117,7 +123,7 @@ class GalleryManager:
         galleryToken = GalleryToken(
             tokenMetadata=token_metadata_from_row(row),
             tokenCustomization=token_customization_from_row(row) if row[TokenCustomizationsTable.c.tokenCustomizationId] else None,
-            tokenListing=token_listing_from_row(row, OrderedTokenListingsView) if row[OrderedTokenListingsView.c.latestTokenListingId] else None,
+            tokenListing=token_listing_from_row(row, BestTokenListingsTable) if row[BestTokenListingsTable.c.latestTokenListingId] else None,
             tokenStaking=None,
             quantity=row['quantity'],
         )
@@ -127,9 +133,9 @@ class GalleryManager:
         registryAddress = chain_util.normalize_address(registryAddress)
         tokenKey = Token(registryAddress=registryAddress, tokenId=tokenId)
         if registryAddress == COLLECTION_SPRITE_CLUB_ADDRESS:
-            claimedTokenId = (await self.ethClient.call_function(toAddress=SPRITE_CLUB_STORMDROP_REGISTRY_ADDRESS, contractAbi=self.spriteClubStormdropContract['abi'], functionAbi=self.spriteClubStormdropClaimedFunctionAbi, arguments={'': int(tokenId)}))[0]
+            claimedTokenId = (await self.ethClient.call_function(toAddress=SPRITE_CLUB_STORMDROP_REGISTRY_ADDRESS, contractAbi=get_contract_abi(name='SpriteClubStormdrop'), functionAbi=get_function_abi(contractName='SpriteClubStormdrop', functionName='claimedSpriteItemIdMap'), arguments={'': int(tokenId)}))[0]
             isClaimed = claimedTokenId > 0
-            claimTokenId = claimedTokenId or self.spriteClubStormdropIdMap[tokenId]
+            claimTokenId = str(claimedTokenId or self.spriteClubStormdropIdMap[tokenId])
             claimTokenKey = Token(registryAddress=SPRITE_CLUB_STORMDROP_REGISTRY_ADDRESS, tokenId=claimTokenId)
             return [Airdrop(name='Stormdrop ⚡️⚡️', tokenKey=tokenKey, isClaimed=isClaimed, claimTokenKey=claimTokenKey, claimUrl='https://stormdrop.spriteclubnft.com')]
         return []
@@ -154,48 +160,82 @@ class GalleryManager:
             collectionAttribute.values.append(value)
         return list(collectionAttributeNameMap.values())
 
+    async def _get_attribute_filter_token_ids(self, registryAddress: str, attributeFilters: List[InQueryParam]) -> Optional[List[str]]:
+        # NOTE(krishan711): returns None when the collection has no bitmaps so the caller can fall back to joining attributes
+        tokenAttributeBitmaps = await self.retriever.list_token_attribute_bitmaps(fieldFilters=[
+            StringFieldFilter(fieldName=TokenAttributeBitmapsTable.c.registryAddress.key, eq=registryAddress),
+            StringFieldFilter(fieldName=TokenAttributeBitmapsTable.c.name.key, containedIn=list({attributeFilter.fieldName for attributeFilter in attributeFilters})),
+            StringFieldFilter(fieldName=TokenAttributeBitmapsTable.c.value.key, containedIn=list({value for attributeFilter in attributeFilters for value in attributeFilter.values})),
+        ])
+        if len(tokenAttributeBitmaps) == 0:
+            # NOTE(krishan711): no bitmap matching the filter only means nothing matches if the collection has bitmaps at all
+            hasBitmapsQuery = (
+                sqlalchemy.select(TokenAttributeBitmapsTable.c.tokenAttributeBitmapId)
+                .where(TokenAttributeBitmapsTable.c.registryAddress == registryAddress)
+                .limit(1)
+            )
+            hasBitmapsResult = await self.retriever.database.execute(query=hasBitmapsQuery)
+            return [] if hasBitmapsResult.first() else None
+        bitmapMap = {(tokenAttributeBitmap.name, tokenAttributeBitmap.value): tokenAttributeBitmap.bitmap for tokenAttributeBitmap in tokenAttributeBitmaps}
+        matchingBitmap: Optional[int] = None
+        for attributeFilter in attributeFilters:
+            filterBitmap = 0
+            for value in attributeFilter.values:
+                bitmap = bitmapMap.get((attributeFilter.fieldName, value))
+                if bitmap:
+                    filterBitmap |= deserialize_bitmap(value=bitmap)
+            matchingBitmap = filterBitmap if matchingBitmap is None else matchingBitmap & filterBitmap
+            if matchingBitmap == 0:
+                return []
+        return get_bitmap_token_ids(bitmap=matchingBitmap or 0)
+
     async def query_collection_tokens(self, registryAddress: str, limit: int, offset: int, ownerAddress: Optional[str] = None, minPrice: Optional[int] = None, maxPrice: Optional[int] = None, isListed: Optional[bool] = None, tokenIdIn: Optional[List[str]] = None, attributeFilters: Optional[List[InQueryParam]] = None, order: Optional[str] = None) -> List[GalleryToken]:
         registryAddress = chain_util.normalize_address(value=registryAddress)
         await self.collectionManager.get_collection_by_address(address=registryAddress)
         usesListings = isListed or minPrice or maxPrice
         query = (
-            sqlalchemy.select(TokenMetadatasTable, TokenCustomizationsTable, OrderedTokenListingsView, TokenStakingsTable, sqlalchemyfunc.sum(TokenOwnershipsView.c.quantity).label('quantity'))
+            sqlalchemy.select(TokenMetadatasTable, TokenCustomizationsTable, BestTokenListingsTable, TokenStakingsTable, sqlalchemyfunc.sum(TokenOwnershipsView.c.quantity).label('quantity'))
                 .join(TokenOwnershipsView, sqlalchemy.and_(TokenMetadatasTable.c.registryAddress == TokenOwnershipsView.c.registryAddress, TokenMetadatasTable.c.tokenId == TokenOwnershipsView.c.tokenId))
                 .join(TokenCustomizationsTable, sqlalchemy.and_(TokenMetadatasTable.c.registryAddress == TokenCustomizationsTable.c.registryAddress, TokenMetadatasTable.c.tokenId == TokenCustomizationsTable.c.tokenId), isouter=True)
-                .join(OrderedTokenListingsView, sqlalchemy.and_(TokenMetadatasTable.c.registryAddress == OrderedTokenListingsView.c.registryAddress, TokenMetadatasTable.c.tokenId == OrderedTokenListingsView.c.tokenId, OrderedTokenListingsView.c.tokenListingIndex == 1), isouter=True)
+                .join(BestTokenListingsTable, sqlalchemy.and_(TokenMetadatasTable.c.registryAddress == BestTokenListingsTable.c.registryAddress, TokenMetadatasTable.c.tokenId == BestTokenListingsTable.c.tokenId, BestTokenListingsTable.c.endDate > date_util.datetime_from_now()), isouter=True)
                 .join(TokenStakingsTable, sqlalchemy.and_(TokenOwnershipsView.c.registryAddress == TokenStakingsTable.c.registryAddress, TokenOwnershipsView.c.ownerAddress == TokenStakingsTable.c.stakingAddress, TokenOwnershipsView.c.tokenId == TokenStakingsTable.c.tokenId), isouter=True)
                 .where(TokenMetadatasTable.c.registryAddress == registryAddress)
                 .where(TokenOwnershipsView.c.quantity > 0)
-                .group_by(TokenMetadatasTable.c.tokenMetadataId, TokenCustomizationsTable.c.tokenCustomizationId, OrderedTokenListingsView.c, TokenStakingsTable.c, TokenMetadatasTable.c.registryAddress, TokenMetadatasTable.c.tokenId)  # type: ignore[arg-type]
+                .group_by(TokenMetadatasTable.c.tokenMetadataId, TokenCustomizationsTable.c.tokenCustomizationId, BestTokenListingsTable.c, TokenStakingsTable.c, TokenMetadatasTable.c.registryAddress, TokenMetadatasTable.c.tokenId)  # type: ignore[arg-type]
                 .limit(limit)
                 .offset(offset)
         )
         order = order or 'TOKENID_ASC'
         if  order == "TOKENID_ASC":
-            query = query.order_by(sqlalchemy.cast(TokenMetadatasTable.c.tokenId, sqlalchemy.Integer).asc())
+            query = query.order_by(TokenMetadatasTable.c.tokenIdSortKey.asc())
         elif order == "TOKENID_DESC":
-            query = query.order_by(sqlalchemy.cast(TokenMetadatasTable.c.tokenId, sqlalchemy.Integer).desc())
+            query = query.order_by(sqlalchemy.nulls_last(TokenMetadatasTable.c.tokenIdSortKey.desc()))
         elif order == "QUANTITY_ASC":
-            query = query.order_by(sqlalchemyfunc.sum(TokenOwnershipsView.c.quantity).asc(), sqlalchemy.cast(TokenMetadatasTable.c.tokenId, sqlalchemy.Integer).asc())
+            query = query.order_by(sqlalchemyfunc.sum(TokenOwnershipsView.c.quantity).asc(), TokenMetadatasTable.c.tokenIdSortKey.asc())
         elif order == "QUANTITY_DESC":
-            query = query.order_by(sqlalchemyfunc.sum(TokenOwnershipsView.c.quantity).desc(), sqlalchemy.cast(TokenMetadatasTable.c.tokenId, sqlalchemy.Integer).asc())
+            query = query.order_by(sqlalchemyfunc.sum(TokenOwnershipsView.c.quantity).desc(), TokenMetadatasTable.c.tokenIdSortKey.asc())
         elif order == "PRICE_ASC":
-            query = query.order_by(sqlalchemy.nulls_last(sqlalchemy.cast(OrderedTokenListingsView.c.value, sqlalchemy.NUMERIC).asc()), sqlalchemy.cast(TokenMetadatasTable.c.tokenId, sqlalchemy.Integer).asc())
+            query = query.order_by(sqlalchemy.nulls_last(BestTokenListingsTable.c.value.asc()), TokenMetadatasTable.c.tokenIdSortKey.asc())
         elif order == "PRICE_DESC":
-            query = query.order_by(sqlalchemy.nulls_last(sqlalchemy.cast(OrderedTokenListingsView.c.value, sqlalchemy.NUMERIC).desc()), sqlalchemy.cast(TokenMetadatasTable.c.tokenId, sqlalchemy.Integer).asc())
+            query = query.order_by(sqlalchemy.nulls_last(BestTokenListingsTable.c.value.desc()), TokenMetadatasTable.c.tokenIdSortKey.asc())
         else:
             raise BadRequestException('Unknown order')
         if usesListings:
-            query = query.where(OrderedTokenListingsView.c.latestTokenListingId.is_not(None))
+            query = query.where(BestTokenListingsTable.c.latestTokenListingId.is_not(None))
         if minPrice:
-            query = query.where(OrderedTokenListingsView.c.value >= sqlalchemy.sql.expression.cast(minPrice, sqlalchemy.Numeric(precision=256, scale=0)))
+            query = query.where(BestTokenListingsTable.c.value >= sqlalchemy.sql.expression.cast(minPrice, sqlalchemy.Numeric(precision=256, scale=0)))
         if maxPrice:
-            query = query.where(OrderedTokenListingsView.c.value <= sqlalchemy.sql.expression.cast(maxPrice, sqlalchemy.Numeric(precision=256, scale=0)))
+            query = query.where(BestTokenListingsTable.c.value <= sqlalchemy.sql.expression.cast(maxPrice, sqlalchemy.Numeric(precision=256, scale=0)))
         if ownerAddress:
             query = query.where(sqlalchemy.or_(TokenOwnershipsView.c.ownerAddress == ownerAddress, TokenStakingsTable.c.ownerAddress == ownerAddress))
         if tokenIdIn:
             query = query.where(TokenMetadatasTable.c.tokenId.in_(tokenIdIn))
-        if attributeFilters:
+        attributeTokenIds = await self._get_attribute_filter_token_ids(registryAddress=registryAddress, attributeFilters=attributeFilters) if attributeFilters else None
+        if attributeTokenIds is not None:
+            if len(attributeTokenIds) == 0:
+                return []
+            query = query.where(TokenMetadatasTable.c.tokenId == sqlalchemy.any_(sqlalchemy.literal(attributeTokenIds, type_=postgresql.ARRAY(sqlalchemy.Text))))
+        elif attributeFilters:
             for index, attributeFilter in enumerate(attributeFilters):
                 query = query.join(TokenAttributesTable.alias(f'attributes-{index}'), sqlalchemy.and_(
                     TokenMetadatasTable.c.registryAddress == TokenAttributesTable.alias(f'attributes-{index}').c.registryAddress,
@@ -209,7 +249,7 @@ class GalleryManager:
             galleryTokens.append(GalleryToken(
                 tokenMetadata=token_metadata_from_row(row),
                 tokenCustomization=token_customization_from_row(row) if row[TokenCustomizationsTable.c.tokenCustomizationId] else None,
-                tokenListing=token_listing_from_row(row, OrderedTokenListingsView) if row[OrderedTokenListingsView.c.latestTokenListingId] else None,
+                tokenListing=token_listing_from_row(row, BestTokenListingsTable) if row[BestTokenListingsTable.c.latestTokenListingId] else None,
                 tokenStaking=token_staking_from_row(row) if row[TokenStakingsTable.c.tokenStakingId] else None,
                 quantity=row['quantity'],
             ))
@@ -1,19 +1,28 @@
 import asyncio
+import datetime
+import functools
 import json
-from typing import Any
 from typing import AsyncGenerator
+from typing import Awaitable
+from typing import Callable
+from typing import Dict
 from typing import List
 from typing import Optional
+from typing import Tuple
+from typing import TypeVar
 
 import sqlalchemy
+from core import logging
 from core.exceptions import NotFoundException
+from core.store.database import DatabaseConnection
 from core.util import chain_util
 from core.util import date_util
 from pydantic import BaseModel
-from sqlalchemy import Select
-from sqlalchemy.sql import functions as sqlalchemyfunc
 
+from notd.broadcast_hub import BroadcastHub
 from notd.delegation_manager import DelegationManager
+from notd.lock_manager import LockManager
+from notd.lock_manager import LockTimeoutException
 from notd.model import AccountGm
 from notd.model import GmAccountRow
 from notd.model import GmCollectionRow
@@ -23,12 +32,16 @@ from notd.store.saver import Saver
 from notd.store.schema import AccountCollectionGmsTable
 from notd.store.schema import AccountGmsTable
 from notd.store.schema import CollectionTotalActivitiesTable
+from notd.store.schema import GmAccountCollectionCountsTable
+from notd.store.schema import GmAccountCountsTable
+from notd.store.schema import GmCollectionCountsTable
 from notd.store.schema import TokenCollectionsTable
-from notd.store.schema import TokenOwnershipsView
 from notd.store.schema_conversions import account_collection_gm_from_row
 from notd.store.schema_conversions import account_gm_from_row
 from notd.store.schema_conversions import collection_from_row
 
+LeaderboardRow = TypeVar('LeaderboardRow')
+
 
 class GmNotification(BaseModel):
     address: Optional[str]
@@ -36,38 +49,45 @@ class GmNotification(BaseModel):
 
 class GmManager:
 
-    def __init__(self, retriever: Retriever, saver: Saver, delegationManager: DelegationManager) -> None:
+    def __init__(self, retriever: Retriever, saver: Saver, delegationManager: DelegationManager, gmBroadcastHub: BroadcastHub, lockManager: LockManager, leaderboardCacheSeconds: int = 10) -> None:
         self.retriever = retriever
         self.saver = saver
         self.delegationManager = delegationManager
-        self.notifications: List[GmNotification] = []
+        self.lockManager = lockManager
+        self.gmBroadcastHub = gmBroadcastHub
+        self.leaderboardCacheSeconds = leaderboardCacheSeconds
+        self.accountRowsCache: Dict[str, Tuple[datetime.datetime, List[GmAccountRow]]] = {}
+        self.collectionRowsCache: Dict[str, Tuple[datetime.datetime, List[GmCollectionRow]]] = {}
+        self.countsUpdateLock = asyncio.Lock()
+        self.countsUpdatedDate: Optional[datetime.datetime] = None
 
     # TODO(krishan711): The structure of the response should be handled in api layer
-    async def generate_gms(self) -> AsyncGenerator[bytes, None]:
-        nextIndex = len(self.notifications)
-        while True:
-            notificationCount = len(self.notifications)
-            if notificationCount > nextIndex:
-                for index, item in enumerate(self.notifications[nextIndex: notificationCount]):
-                    outputString = f"id: {nextIndex + index}\ndata: {json.dumps(item.dict())}\n\n"
-                    yield outputString.encode()
-                nextIndex = notificationCount
-            await asyncio.sleep(1)
+    async def generate_gms(self, lastEventId: Optional[int] = None) -> AsyncGenerator[bytes, None]:
+        async for eventId, payload in self.gmBroadcastHub.subscribe(lastEventId=lastEventId):
+            outputString = f"id: {eventId}\ndata: {payload}\n\n"
+            yield outputString.encode()
+
+    async def _publish_gm_notification(self, notification: GmNotification) -> None:
+        await self.gmBroadcastHub.publish(payload=json.dumps(notification.dict()))
 
     async def create_anonymous_gm(self) -> None:
-        self.notifications.append(GmNotification(address=None))
+        await self._publish_gm_notification(notification=GmNotification(address=None))
 
     async def create_gm(self, account: str, signatureMessage: str, signature: str) -> AccountGm:
         delegations = await self.delegationManager.get_delegations(delegateAddress=account)
-        for delegation in delegations:
-            await self._create_gm(account=delegation.vaultAddress, delegateAddress=delegation.delegateAddress, signatureMessage=signatureMessage, signature=signature)
-        return await self._create_gm(account=account, delegateAddress=None, signatureMessage=signatureMessage, signature=signature)
+        async with self.saver.create_transaction() as connection:
+            vaultAccountGms = [await self._create_gm(account=delegation.vaultAddress, delegateAddress=delegation.delegateAddress, signatureMessage=signatureMessage, signature=signature, connection=connection) for delegation in delegations]
+            accountGm = await self._create_gm(account=account, delegateAddress=None, signatureMessage=signatureMessage, signature=signature, connection=connection)
+        self._clear_leaderboards()
+        # NOTE(krishan711): notifications are only sent once the gms have committed so subscribers never hear about one that was rolled back
+        for createdAccountGm in [*vaultAccountGms, accountGm]:
+            await self._publish_gm_notification(notification=GmNotification(address=createdAccountGm.address))
+        return accountGm
 
-    async def _create_gm(self, account: str, delegateAddress: Optional[str], signatureMessage: str, signature: str) -> AccountGm:
+    async def _create_gm(self, account: str, delegateAddress: Optional[str], signatureMessage: str, signature: str, connection: DatabaseConnection) -> AccountGm:
         account = chain_util.normalize_address(value=account)
         delegateAddress = chain_util.normalize_address(value=delegateAddress) if delegateAddress else None
         # TODO(krishan711): validate signature
-        self.notifications.append(GmNotification(address=account))
         todayDate = date_util.start_of_day()
         latestAccountGmQuery = (
             AccountGmsTable.select()
@@ -75,141 +95,121 @@ class GmManager:
             .order_by(AccountGmsTable.c.date.desc())
             .limit(1)
         )
-        latestAccountGmResult = await self.retriever.database.execute(query=latestAccountGmQuery)
+        latestAccountGmResult = await self.retriever.database.execute(query=latestAccountGmQuery, connection=connection)
         latestAccountGmRow = latestAccountGmResult.mappings().first()
         latestAccountGm = account_gm_from_row(latestAccountGmRow) if latestAccountGmRow else None
         if latestAccountGm and latestAccountGm.date >= todayDate:
             # NOTE(krishan711): could check here that this date has all the current collections
             return latestAccountGm
         streakLength = latestAccountGm.streakLength + 1 if latestAccountGm and latestAccountGm.date == date_util.datetime_from_datetime(dt=todayDate, days=-1) else 1
-        ownedCollectionsQuery = (
-            sqlalchemy.select(TokenOwnershipsView.c.registryAddress.distinct())
-            .where(TokenOwnershipsView.c.ownerAddress == account)
-            .where(TokenOwnershipsView.c.quantity > 0)
-        )
-        ownedCollectionsResult = await self.retriever.database.execute(query=ownedCollectionsQuery)
-        ownedCollectionAddresses = {registryAddress for (registryAddress, ) in ownedCollectionsResult}
-        async with self.saver.create_transaction() as connection:
-            accountGm = await self.saver.create_account_gm(address=account, delegateAddress=delegateAddress, date=todayDate, streakLength=streakLength, collectionCount=len(ownedCollectionAddresses), signatureMessage=signatureMessage, signature=signature, connection=connection)
-            for registryAddress in ownedCollectionAddresses:
-                await self.saver.create_account_collection_gm(accountAddress=account, accountDelegateAddress=delegateAddress, registryAddress=registryAddress, date=todayDate, signatureMessage=signatureMessage, signature=signature, connection=connection)
+        ownedCollectionAddresses = await self.saver.create_account_collection_gms_for_owned_collections(accountAddress=account, accountDelegateAddress=delegateAddress, date=todayDate, signatureMessage=signatureMessage, signature=signature, connection=connection)
+        accountGm = await self.saver.create_account_gm(address=account, delegateAddress=delegateAddress, date=todayDate, streakLength=streakLength, collectionCount=len(ownedCollectionAddresses), signatureMessage=signatureMessage, signature=signature, connection=connection)
+        await self.saver.increment_gm_counts(address=account, registryAddresses=ownedCollectionAddresses, date=todayDate, streakLength=streakLength, connection=connection)
         return accountGm
 
+    async def _get_leaderboard(self, cache: Dict[str, Tuple[datetime.datetime, List[LeaderboardRow]]], key: str, loader: Callable[[], Awaitable[List[LeaderboardRow]]]) -> List[LeaderboardRow]:
+        await self._update_gm_counts_if_stale()
+        cachedLeaderboard = cache.get(key)
+        if cachedLeaderboard and cachedLeaderboard[0] > date_util.datetime_from_now(seconds=-self.leaderboardCacheSeconds):
+            return cachedLeaderboard[1]
+        leaderboard = await loader()
+        cache[key] = (date_util.datetime_from_now(), leaderboard)
+        return leaderboard
+
+    def _clear_leaderboards(self) -> None:
+        self.accountRowsCache.clear()
+        self.collectionRowsCache.clear()
+
+    async def _update_gm_counts_if_stale(self) -> None:
+        # NOTE(krishan711): the counts only grow as gms come in so the first leaderboard load each day moves the week and month windows forward
+        todayDate = date_util.start_of_day()
+        if self.countsUpdatedDate is not None and self.countsUpdatedDate >= todayDate:
+            return
+        async with self.countsUpdateLock:
+            if self.countsUpdatedDate is not None and self.countsUpdatedDate >= todayDate:
+                return
+            try:
+                await self._recalculate_gm_counts(timeoutSeconds=1)
+            except LockTimeoutException:
+                logging.info('Skipped updating gm counts because another process is updating them')
+                self.countsUpdatedDate = todayDate
+
+    async def _recalculate_gm_counts(self, timeoutSeconds: int) -> None:
+        todayDate = date_util.start_of_day()
+        async with self.lockManager.with_lock(name='gm-counts', timeoutSeconds=timeoutSeconds, expirySeconds=300):
+            await self.saver.recalculate_gm_counts()
+        self.countsUpdatedDate = todayDate
+        self._clear_leaderboards()
+
+    async def update_gm_leaderboards(self) -> None:
+        await self._recalculate_gm_counts(timeoutSeconds=30)
+
     async def list_gm_account_rows(self) -> List[GmAccountRow]:
-        latestRowQuery: Select[Any] = (  # type: ignore[misc]
-            sqlalchemy.select(AccountGmsTable.c.address, sqlalchemyfunc.max(AccountGmsTable.c.date).label('date'))
-            .where(AccountGmsTable.c.date >= date_util.start_of_day(dt=date_util.datetime_from_now(days=-7)))
-            .group_by(AccountGmsTable.c.address)
-        )
-        weekCountQuery = (
-            sqlalchemy.select(AccountGmsTable.c.address, sqlalchemyfunc.count(AccountGmsTable.c.accountGmId).label('weekCount'))
-            .where(AccountGmsTable.c.date > date_util.datetime_from_now(days=-7))
-            .group_by(AccountGmsTable.c.address)
-        ).subquery()
-        monthCountQuery = (
-            sqlalchemy.select(AccountGmsTable.c.address, sqlalchemyfunc.count(AccountGmsTable.c.accountGmId).label('monthCount'))
-            .where(AccountGmsTable.c.date > date_util.datetime_from_now(days=-30))
-            .group_by(AccountGmsTable.c.address)
-        ).subquery()
+        return await self._get_leaderboard(cache=self.accountRowsCache, key='account-rows', loader=self._list_gm_account_rows)
+
+    async def _list_gm_account_rows(self) -> List[GmAccountRow]:
         accountRowsQuery = (
-            sqlalchemy.select(AccountGmsTable, weekCountQuery, monthCountQuery)
-            .join(weekCountQuery, weekCountQuery.c.address == AccountGmsTable.c.address)
-            .join(monthCountQuery, monthCountQuery.c.address == AccountGmsTable.c.address)
-            .where(sqlalchemy.tuple_(AccountGmsTable.c.address, AccountGmsTable.c.date).in_(latestRowQuery))
-            .order_by(AccountGmsTable.c.streakLength.desc(), AccountGmsTable.c.date.desc())
+            GmAccountCountsTable.select()
+            .where(GmAccountCountsTable.c.latestDate >= date_util.start_of_day(dt=date_util.datetime_from_now(days=-7)))
+            .order_by(GmAccountCountsTable.c.streakLength.desc(), GmAccountCountsTable.c.latestDate.desc())
             .limit(500)
         )
         accountRowsResult = await self.retriever.database.execute(query=accountRowsQuery)
         accountRows = [
             GmAccountRow(
-                address=row[AccountGmsTable.c.address],
-                streakLength=row[AccountGmsTable.c.streakLength],
-                lastDate=row[AccountGmsTable.c.date],
-                weekCount=int(row['weekCount']),
-                monthCount=int(row['monthCount']),
+                address=row[GmAccountCountsTable.c.address],
+                streakLength=row[GmAccountCountsTable.c.streakLength],
+                lastDate=row[GmAccountCountsTable.c.latestDate],
+                weekCount=row[GmAccountCountsTable.c.weekCount],
+                monthCount=row[GmAccountCountsTable.c.monthCount],
             ) for row in accountRowsResult.mappings()
         ]
         return accountRows
 
     async def list_gm_collection_account_rows(self, registryAddress: str) -> List[GmAccountRow]:
-        latestRowQuery: Select[Any] = (  # type: ignore[misc]
-            sqlalchemy.select(AccountCollectionGmsTable.c.accountAddress, sqlalchemyfunc.max(AccountCollectionGmsTable.c.date).label('date'))
-            .where(AccountCollectionGmsTable.c.date >= date_util.start_of_day(dt=date_util.datetime_from_now(days=-7)))
-            .where(AccountCollectionGmsTable.c.registryAddress == registryAddress)
-            .group_by(AccountCollectionGmsTable.c.accountAddress)
-        )
-        latestAccountRowQuery = (
-            sqlalchemy.select(AccountGmsTable.c.address, sqlalchemyfunc.max(AccountGmsTable.c.date).label('date'))
-            .where(AccountGmsTable.c.date >= date_util.start_of_day(dt=date_util.datetime_from_now(days=-7)))
-            .group_by(AccountGmsTable.c.address)
-        ).subquery()
-        weekCountQuery = (
-            sqlalchemy.select(AccountCollectionGmsTable.c.accountAddress, sqlalchemyfunc.count(AccountCollectionGmsTable.c.accountCollectionGmId).label('weekCount'))
-            .where(AccountCollectionGmsTable.c.date > date_util.datetime_from_now(days=-7))
-            .where(AccountCollectionGmsTable.c.registryAddress == registryAddress)
-            .group_by(AccountCollectionGmsTable.c.accountAddress)
-        ).subquery()
-        monthCountQuery = (
-            sqlalchemy.select(AccountCollectionGmsTable.c.accountAddress, sqlalchemyfunc.count(AccountCollectionGmsTable.c.accountCollectionGmId).label('monthCount'))
-            .where(AccountCollectionGmsTable.c.date > date_util.datetime_from_now(days=-30))
-            .where(AccountCollectionGmsTable.c.registryAddress == registryAddress)
-            .group_by(AccountCollectionGmsTable.c.accountAddress)
-        ).subquery()
+        return await self._get_leaderboard(cache=self.accountRowsCache, key=f'collection-account-rows-{registryAddress}', loader=functools.partial(self._list_gm_collection_account_rows, registryAddress=registryAddress))
+
+    async def _list_gm_collection_account_rows(self, registryAddress: str) -> List[GmAccountRow]:
         accountRowsQuery = (
-            sqlalchemy.select(AccountCollectionGmsTable, AccountGmsTable, latestAccountRowQuery, weekCountQuery, monthCountQuery)
-            .join(latestAccountRowQuery, latestAccountRowQuery.c.address == AccountCollectionGmsTable.c.accountAddress)
-            .join(AccountGmsTable, sqlalchemy.and_(latestAccountRowQuery.c.address == AccountGmsTable.c.address, latestAccountRowQuery.c.date == AccountGmsTable.c.date))
-            .join(weekCountQuery, weekCountQuery.c.accountAddress == AccountCollectionGmsTable.c.accountAddress)
-            .join(monthCountQuery, monthCountQuery.c.accountAddress == AccountCollectionGmsTable.c.accountAddress)
-            .where(sqlalchemy.tuple_(AccountCollectionGmsTable.c.accountAddress, AccountCollectionGmsTable.c.date).in_(latestRowQuery))
-            .where(AccountCollectionGmsTable.c.registryAddress == registryAddress)
-            .order_by(AccountGmsTable.c.streakLength.desc(), AccountCollectionGmsTable.c.date.desc())
+            sqlalchemy.select(GmAccountCollectionCountsTable, GmAccountCountsTable.c.streakLength)
+            .join(GmAccountCountsTable, GmAccountCountsTable.c.address == GmAccountCollectionCountsTable.c.accountAddress)
+            .where(GmAccountCollectionCountsTable.c.registryAddress == registryAddress)
+            .where(GmAccountCollectionCountsTable.c.latestDate >= date_util.start_of_day(dt=date_util.datetime_from_now(days=-7)))
+            .order_by(GmAccountCountsTable.c.streakLength.desc(), GmAccountCollectionCountsTable.c.latestDate.desc())
             .limit(500)
         )
         accountRowsResult = await self.retriever.database.execute(query=accountRowsQuery)
         accountRows = [
             GmAccountRow(
-                address=row[AccountCollectionGmsTable.c.accountAddress],
-                streakLength=row[AccountGmsTable.c.streakLength],
-                lastDate=row[AccountCollectionGmsTable.c.date],
-                weekCount=int(row['weekCount']),
-                monthCount=int(row['monthCount']),
+                address=row[GmAccountCollectionCountsTable.c.accountAddress],
+                streakLength=row[GmAccountCountsTable.c.streakLength],
+                lastDate=row[GmAccountCollectionCountsTable.c.latestDate],
+                weekCount=row[GmAccountCollectionCountsTable.c.weekCount],
+                monthCount=row[GmAccountCollectionCountsTable.c.monthCount],
             ) for row in accountRowsResult.mappings()
         ]
         return accountRows
 
     async def list_gm_collection_rows(self) -> List[GmCollectionRow]:
-        todayCountQuery = (
-            sqlalchemy.select(AccountCollectionGmsTable.c.registryAddress, sqlalchemyfunc.count(AccountCollectionGmsTable.c.accountCollectionGmId).label('todayCount'))
-            .where(AccountCollectionGmsTable.c.date > date_util.datetime_from_now(days=-1))
-            .group_by(AccountCollectionGmsTable.c.registryAddress)
-        ).subquery()
-        weekCountQuery = (
-            sqlalchemy.select(AccountCollectionGmsTable.c.registryAddress, sqlalchemyfunc.count(AccountCollectionGmsTable.c.accountCollectionGmId).label('weekCount'))
-            .where(AccountCollectionGmsTable.c.date > date_util.datetime_from_now(days=-7))
-            .group_by(AccountCollectionGmsTable.c.registryAddress)
-        ).subquery()
-        monthCountQuery = (
-            sqlalchemy.select(AccountCollectionGmsTable.c.registryAddress, sqlalchemyfunc.count(AccountCollectionGmsTable.c.accountCollectionGmId).label('monthCount'))
-            .where(AccountCollectionGmsTable.c.date > date_util.datetime_from_now(days=-30))
-            .group_by(AccountCollectionGmsTable.c.registryAddress)
-        ).subquery()
+        return await self._get_leaderboard(cache=self.collectionRowsCache, key='collection-rows', loader=self._list_gm_collection_rows)
+
+    async def _list_gm_collection_rows(self) -> List[GmCollectionRow]:
+        todayCountColumn = sqlalchemy.case((GmCollectionCountsTable.c.todayDate == date_util.start_of_day(), GmCollectionCountsTable.c.todayCount), else_=0).label('todayCount')
         collectionRowsQuery = (
-            sqlalchemy.select(TokenCollectionsTable, monthCountQuery, weekCountQuery, todayCountQuery)
+            sqlalchemy.select(TokenCollectionsTable, GmCollectionCountsTable.c.weekCount, GmCollectionCountsTable.c.monthCount, todayCountColumn)
             .join(CollectionTotalActivitiesTable, CollectionTotalActivitiesTable.c.address == TokenCollectionsTable.c.address)
-            .join(monthCountQuery, monthCountQuery.c.registryAddress == TokenCollectionsTable.c.address)
-            .join(weekCountQuery, weekCountQuery.c.registryAddress == TokenCollectionsTable.c.address, isouter=True)
-            .join(todayCountQuery, todayCountQuery.c.registryAddress == TokenCollectionsTable.c.address, isouter=True)
-            .order_by(sqlalchemyfunc.coalesce(todayCountQuery.c.todayCount, 0).desc(), sqlalchemyfunc.coalesce(weekCountQuery.c.weekCount, 0).desc(), sqlalchemyfunc.coalesce(monthCountQuery.c.monthCount, 0).desc(), CollectionTotalActivitiesTable.c.totalValue.desc())
+            .join(GmCollectionCountsTable, GmCollectionCountsTable.c.registryAddress == TokenCollectionsTable.c.address)
+            .where(GmCollectionCountsTable.c.monthCount > 0)
+            .order_by(todayCountColumn.desc(), GmCollectionCountsTable.c.weekCount.desc(), GmCollectionCountsTable.c.monthCount.desc(), CollectionTotalActivitiesTable.c.totalValue.desc())
             .limit(500)
         )
         collectionRowsResult = await self.retriever.database.execute(query=collectionRowsQuery)
         collectionRows = [
             GmCollectionRow(
                 collection=collection_from_row(row),
-                todayCount=int(row['todayCount']) if row['todayCount'] else 0,
-                weekCount=int(row['weekCount']) if row['weekCount'] else 0,
-                monthCount=int(row['monthCount']) if row['monthCount'] else 0,
+                todayCount=row['todayCount'],
+                weekCount=row[GmCollectionCountsTable.c.weekCount],
+                monthCount=row[GmCollectionCountsTable.c.monthCount],
             ) for row in collectionRowsResult.mappings()
         ]
         return collectionRows
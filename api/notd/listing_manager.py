@@ -1,11 +1,13 @@
+import contextlib
 import datetime
 from typing import List
+from typing import Optional
 
 from core import logging
+from core.exceptions import NotFoundException
 from core.queues.message_queue import MessageQueue
 from core.queues.message_queue_processor import MessageNeedsReprocessingException
 from core.queues.model import Message
-from core.store.retriever import StringFieldFilter
 from core.util import date_util
 
 from notd.lock_manager import LockTimeoutException
@@ -17,6 +19,7 @@ from notd.model import GALLERY_COLLECTIONS
 from notd.model import TokenListing
 from notd.store.retriever import Retriever
 from notd.store.saver import Saver
+from notd.store.schema import BestTokenListingsTable
 from notd.store.schema import LatestTokenListingsTable
 from notd.store.schema import OrderedTokenListingsView
 from notd.store.schema_conversions import token_listing_from_row
@@ -62,23 +65,44 @@ class ListingManager:
         # )
         # tokenIdsQueryResult = await self.retriever.database.execute(query=tokenIdsQuery)
         # tokenIds = [tokenId for (tokenId, ) in tokenIdsQueryResult]
-        openseaListings = await self.tokenListingProcessor.get_opensea_listings_for_collection(registryAddress=address)
-        logging.info(f'Retrieved {len(openseaListings)} openseaListings')
         # looksrareListings = await self.tokenListingProcessor.get_looksrare_listings_for_collection(registryAddress=address)
         # logging.info(f'Retrieved {len(looksrareListings)} looksrareListings')
         # raribleListings = await self.tokenListingProcessor.get_rarible_listings_for_tokens(registryAddress=address, tokenIds=tokenIds)
         # logging.info(f'Retrieved {len(raribleListings)} raribleListings')
-        allListings = openseaListings # + looksrareListings + raribleListings
-        # TODO(krishan711): change this to not delete existing. should add / remove / update changed only
+        try:
+            progress = await self.retriever.get_latest_update_by_key_name(key='refresh_latest_token_listings_progress', name=address)
+        except NotFoundException:
+            progress = await self.saver.create_latest_update(key='refresh_latest_token_listings_progress', name=address, date=date_util.datetime_from_now())
+        # NOTE(krishan711): opensea cursors don't live forever so a refresh that stopped part way is only resumed from its cursor within a day of starting.
+        # After that it starts again from the first page with a new sync date, the stale cursor is discarded.
+        if progress.cursor and progress.date > date_util.datetime_from_now(days=-1):
+            syncDate = progress.date
+            startCursor: Optional[str] = progress.cursor
+            logging.info(f'Resuming listings refresh started at {syncDate}')
+        else:
+            syncDate = date_util.datetime_from_now()
+            startCursor = None
+            await self.saver.update_latest_update(latestUpdateId=progress.latestUpdateId, date=syncDate, cursor=None)
+        addedCount = 0
+        updatedCount = 0
+        keptCount = 0
+        # NOTE(krishan711): the pages hold the opensea lock so the generator is closed straight away if saving a page fails
+        async with contextlib.aclosing(self.tokenListingProcessor.generate_opensea_listing_pages_for_collection(registryAddress=address, startCursor=startCursor)) as openseaListingPages:
+            async for openseaListings, nextCursor in openseaListingPages:
+                async with self.saver.create_transaction() as connection:
+                    pageSyncResult = await self.saver.merge_latest_token_listings(registryAddress=address, retrievedTokenListings=openseaListings, syncDate=syncDate, connection=connection)
+                    await self.saver.update_best_token_listings(registryAddress=address, tokenIds=list({listing.tokenId for listing in openseaListings}), connection=connection)
+                    await self.saver.update_latest_update(latestUpdateId=progress.latestUpdateId, cursor=nextCursor, connection=connection)
+                addedCount += pageSyncResult.addedCount
+                updatedCount += pageSyncResult.updatedCount
+                keptCount += pageSyncResult.keptCount
         async with self.saver.create_transaction() as connection:
-            currentLatestTokenListings = await self.retriever.list_latest_token_listings(fieldFilters=[
-                StringFieldFilter(fieldName=LatestTokenListingsTable.c.registryAddress.key, eq=address)
-            ], connection=connection)
-            currentLatestTokenListingIds = [latestTokenListing.tokenListingId for latestTokenListing in currentLatestTokenListings]
-            logging.info(f'Deleting {len(currentLatestTokenListingIds)} existing listings')
-            await self.saver.delete_latest_token_listings(latestTokenListingIds=currentLatestTokenListingIds, connection=connection)
-            logging.info(f'Saving {len(allListings)} listings')
-            await self.saver.create_latest_token_listings(retrievedTokenListings=allListings, connection=connection)
+            removedCount = await self.saver.delete_stale_latest_token_listings(registryAddress=address, syncDate=syncDate, connection=connection)
+            await self.saver.update_best_token_listings(registryAddress=address, connection=connection)
+        logging.info(f'Synced listings: {addedCount} added, {removedCount} removed, {updatedCount} updated, {keptCount} kept')
+        logging.stat(name='LISTINGS_SYNC_ADDED', key=address, value=addedCount)
+        logging.stat(name='LISTINGS_SYNC_REMOVED', key=address, value=removedCount)
+        logging.stat(name='LISTINGS_SYNC_UPDATED', key=address, value=updatedCount)
 
     async def _update_partial_latest_listings_for_collection(self, address: str, startDate: datetime.datetime) -> None:
         openseaTokenIdsToReprocess = await self.tokenListingProcessor.get_changed_opensea_token_listings_for_collection(address=address, startDate=startDate)
@@ -125,6 +149,15 @@ class ListingManager:
             allListings = openseaListings # + looksrareListings + raribleListings
             await self.saver.delete_latest_token_listings(latestTokenListingIds=allListingIdsToDelete, connection=connection)
             await self.saver.create_latest_token_listings(retrievedTokenListings=allListings, connection=connection)
+            expiredBestListingsQuery = (
+                BestTokenListingsTable.select()
+                    .with_only_columns(BestTokenListingsTable.c.tokenId)
+                    .where(BestTokenListingsTable.c.registryAddress == address)
+                    .where(BestTokenListingsTable.c.endDate <= date_util.datetime_from_now())
+            )
+            expiredBestListingsResult = await self.retriever.database.execute(query=expiredBestListingsQuery, connection=connection)
+            expiredTokenIds = {tokenId for (tokenId, ) in expiredBestListingsResult}
+            await self.saver.update_best_token_listings(registryAddress=address, tokenIds=list(set(openseaTokenIdsToReprocess) | expiredTokenIds), connection=connection)
 
     async def update_latest_listings_for_collection(self, address: str) -> None:
         currentDate = date_util.datetime_from_now()
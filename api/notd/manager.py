@@ -6,6 +6,7 @@ from typing import Dict
 from typing import List
 from typing import Optional
 from typing import Sequence
+from typing import Tuple
 from typing import Union
 
 import sqlalchemy
@@ -673,12 +674,23 @@ class NotdManager:
         await self.tokenManager.update_token_metadata(registryAddress=registryAddress, tokenId=tokenId, shouldForce=shouldForce)
         await self.subCollectionTokenManager.update_sub_collection_token(registryAddress=registryAddress, tokenId=tokenId)
 
+    async def update_token_metadatas(self, collectionTokenIds: Sequence[Tuple[str, str]], shouldForce: Optional[bool] = False) -> None:
+        await self.tokenManager.update_token_metadatas(collectionTokenIds=collectionTokenIds, shouldForce=shouldForce)
+        registryAddressTokenIdsMap: Dict[str, List[str]] = defaultdict(list)
+        for (registryAddress, tokenId) in collectionTokenIds:
+            registryAddressTokenIdsMap[registryAddress].append(tokenId)
+        for registryAddress, tokenIds in registryAddressTokenIdsMap.items():
+            await self.subCollectionTokenManager.update_sub_collection_tokens(registryAddress=registryAddress, tokenIds=tokenIds)
+
     async def update_token_ownership_deferred(self, registryAddress: str, tokenId: str) -> None:
         await self.ownershipManager.update_token_ownership_deferred(registryAddress=registryAddress, tokenId=tokenId)
 
     async def update_token_ownership(self, registryAddress: str, tokenId: str) -> None:
         await self.ownershipManager.update_token_ownership(registryAddress=registryAddress, tokenId=tokenId)
 
+    async def update_token_ownerships(self, collectionTokenIds: Sequence[Tuple[str, str]]) -> None:
+        await self.ownershipManager.update_token_ownerships(collectionTokenIds=collectionTokenIds)
+
     async def update_token_deferred(self, registryAddress: str, tokenId: str, shouldForce: Optional[bool] = False) -> None:
         await self.tokenManager.update_token_metadata_deferred(registryAddress=registryAddress, tokenId=tokenId, shouldForce=shouldForce)
         await self.ownershipManager.update_token_ownership_deferred(registryAddress=registryAddress, tokenId=tokenId)
@@ -732,6 +744,12 @@ class NotdManager:
     async def update_collection_token_attributes(self, registryAddress: str, tokenId: str) -> None:
         await self.attributeManager.update_collection_token_attributes(registryAddress=registryAddress, tokenId=tokenId)
 
+    async def update_collection_attribute_bitmaps_deferred(self, registryAddress: str) -> None:
+        await self.attributeManager.update_collection_attribute_bitmaps_deferred(registryAddress=registryAddress)
+
+    async def update_collection_attribute_bitmaps(self, registryAddress: str) -> None:
+        await self.attributeManager.update_collection_attribute_bitmaps(registryAddress=registryAddress)
+
     async def update_latest_listings_for_all_collections_deferred(self, delaySeconds: int = 0) -> None:
         await self.listingManager.update_latest_listings_for_all_collections_deferred(delaySeconds=delaySeconds)
 
@@ -778,10 +796,16 @@ class NotdManager:
         await self.workQueue.send_message(message=RefreshViewsMessageContent().to_message())
 
     async def refresh_views(self) -> None:
+        startDate = date_util.datetime_from_now()
         async with self.saver.create_transaction() as connection:
             await connection.execute(sqlalchemy.text('REFRESH MATERIALIZED VIEW CONCURRENTLY mvw_user_registry_first_ownerships;'))
         async with self.saver.create_transaction() as connection:
             await connection.execute(sqlalchemy.text('REFRESH MATERIALIZED VIEW CONCURRENTLY mvw_user_registry_ordered_ownerships;'))
+        try:
+            latestUpdate = await self.retriever.get_latest_update_by_key_name(key='materialized_views')
+            await self.saver.update_latest_update(latestUpdateId=latestUpdate.latestUpdateId, date=startDate)
+        except NotFoundException:
+            await self.saver.create_latest_update(key='materialized_views', name=None, date=startDate)
 
     async def receive_new_blocks_deferred(self) -> None:
         await self.blockManager.receive_new_blocks_deferred()
@@ -836,12 +860,6 @@ class NotdManager:
     async def refresh_gallery_badge_holders_for_all_collections(self) -> None:
         await self.badgeManager.refresh_gallery_badge_holders_for_all_collections()
 
-    async def update_token_stakings_for_all_collections_deferred(self) -> None:
-        await self.tokenStakingManager.update_token_stakings_for_all_collections_deferred()
-
-    async def update_token_stakings_for_collection(self, registryAddress: str) -> None:
-        await self.tokenStakingManager.update_token_stakings_for_collection(address=registryAddress)
-
     async def update_token_staking_deferred(self, registryAddress: str, tokenId: str) -> None:
         await self.tokenStakingManager.update_token_staking_deferred(registryAddress=registryAddress, tokenId=tokenId)
 
@@ -0,0 +1,176 @@
+import datetime
+import math
+from collections import Counter
+from collections import defaultdict
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Set
+from typing import Tuple
+
+from core import logging
+from core.queues.message_queue import MessageQueue
+from core.queues.message_queue_processor import MessageProcessor
+from core.queues.model import Message
+from core.util import date_util
+
+from notd.message_queue_consumer import BatchMessageProcessor
+from notd.message_queue_consumer import BatchProcessingException
+from notd.message_queue_consumer import get_batch_commands
+from notd.message_queue_consumer import process_messages
+from notd.messages import UpdateCollectionAttributeBitmapsMessageContent
+from notd.messages import UpdateCollectionMessageContent
+from notd.messages import UpdateTokenMetadataMessageContent
+from notd.messages import UpdateTokenOwnershipMessageContent
+from notd.messages import UpdateTokenStakingMessageContent
+
+CoalescingKey = Tuple[str, Optional[str], Optional[str]]
+
+COALESCED_COMMANDS = {
+    UpdateTokenOwnershipMessageContent.get_command(),
+    UpdateTokenMetadataMessageContent.get_command(),
+    UpdateTokenStakingMessageContent.get_command(),
+    UpdateCollectionMessageContent.get_command(),
+    UpdateCollectionAttributeBitmapsMessageContent.get_command(),
+}
+
+
+def get_coalescing_key(message: Message, coalescedCommands: Set[str]) -> Optional[CoalescingKey]:
+    # NOTE(krishan711): forced updates are never merged into an unforced one
+    if message.command not in coalescedCommands or message.content.get('shouldForce'):
+        return None
+    registryAddress = message.content.get('registryAddress', message.content.get('address'))
+    return (message.command, registryAddress, message.content.get('tokenId'))
+
+
+class ExpiringKeySet:
+
+    def __init__(self) -> None:
+        # NOTE(krishan711): keys are re-inserted on every set so the dict stays (close to) ordered by date and expired keys can be removed from the front
+        self.keyDates: Dict[CoalescingKey, datetime.datetime] = {}
+
+    def get(self, key: CoalescingKey) -> Optional[datetime.datetime]:
+        return self.keyDates.get(key)
+
+    def set(self, key: CoalescingKey, date: datetime.datetime) -> None:
+        self.keyDates.pop(key, None)
+        self.keyDates[key] = date
+
+    def remove_before(self, date: datetime.datetime) -> None:
+        while len(self.keyDates) > 0:
+            key, keyDate = next(iter(self.keyDates.items()))
+            if keyDate >= date:
+                break
+            del self.keyDates[key]
+
+
+class CoalescingMessageQueue(MessageQueue[Message]):
+
+    def __init__(self, messageQueue: MessageQueue[Message], windowSeconds: int, coalescedCommands: Optional[Set[str]] = None) -> None:
+        self.messageQueue = messageQueue
+        self.windowSeconds = windowSeconds
+        self.coalescedCommands = coalescedCommands if coalescedCommands is not None else COALESCED_COMMANDS
+        # NOTE(krishan711): this only knows what this process sent, repeats from other processes are caught by the DeduplicatingMessageProcessor on the worker
+        self.pendingKeys = ExpiringKeySet()
+
+    async def connect(self) -> None:
+        await self.messageQueue.connect()
+
+    async def disconnect(self) -> None:
+        await self.messageQueue.disconnect()
+
+    async def send_message(self, message: Message, delaySeconds: int = 0) -> None:
+        await self.send_messages(messages=[message], delaySeconds=delaySeconds)
+
+    async def send_messages(self, messages: Sequence[Message], delaySeconds: int = 0) -> None:
+        # NOTE(krishan711): the first message for a key goes out straight away, a repeat within the window is held until the window ends and any more repeats before then are covered by it
+        if self.windowSeconds <= 0:
+            await self.messageQueue.send_messages(messages=messages, delaySeconds=delaySeconds)
+            return
+        currentDate = date_util.datetime_from_now()
+        self.pendingKeys.remove_before(date=date_util.datetime_from_datetime(dt=currentDate, seconds=-self.windowSeconds))
+        messagesToSend: List[Message] = []
+        delayedMessagesToSend: Dict[int, List[Message]] = defaultdict(list)
+        droppedCommandCounter: Counter[str] = Counter()
+        for message in messages:
+            key = get_coalescing_key(message=message, coalescedCommands=self.coalescedCommands)
+            if key is None:
+                messagesToSend.append(message)
+                continue
+            deliveryDate = self.pendingKeys.get(key=key)
+            if deliveryDate is None:
+                self.pendingKeys.set(key=key, date=date_util.datetime_from_datetime(dt=currentDate, seconds=delaySeconds))
+                messagesToSend.append(message)
+                continue
+            if deliveryDate > currentDate:
+                droppedCommandCounter[message.command] += 1
+                continue
+            keyedDelaySeconds = max(delaySeconds, math.ceil((deliveryDate - currentDate).total_seconds()) + self.windowSeconds)
+            self.pendingKeys.set(key=key, date=date_util.datetime_from_datetime(dt=currentDate, seconds=keyedDelaySeconds))
+            delayedMessagesToSend[keyedDelaySeconds].append(message)
+        for command, droppedCount in droppedCommandCounter.items():
+            logging.stat('COALESCED_QUEUE_MESSAGES', command, droppedCount)
+        if len(messagesToSend) > 0:
+            await self.messageQueue.send_messages(messages=messagesToSend, delaySeconds=delaySeconds)
+        for keyedDelaySeconds, keyedMessagesToSend in delayedMessagesToSend.items():
+            await self.messageQueue.send_messages(messages=keyedMessagesToSend, delaySeconds=keyedDelaySeconds)
+
+    async def get_message(self, expectedProcessingSeconds: int = 300, longPollSeconds: int = 0) -> Optional[Message]:
+        return await self.messageQueue.get_message(expectedProcessingSeconds=expectedProcessingSeconds, longPollSeconds=longPollSeconds)
+
+    async def get_messages(self, limit: int = 1, expectedProcessingSeconds: int = 300, longPollSeconds: int = 0) -> List[Message]:
+        return await self.messageQueue.get_messages(limit=limit, expectedProcessingSeconds=expectedProcessingSeconds, longPollSeconds=longPollSeconds)
+
+    async def delete_message(self, message: Message) -> None:
+        await self.messageQueue.delete_message(message=message)
+
+
+class DeduplicatingMessageProcessor(BatchMessageProcessor):
+
+    def __init__(self, messageProcessor: MessageProcessor, windowSeconds: int, coalescedCommands: Optional[Set[str]] = None) -> None:
+        self.messageProcessor = messageProcessor
+        self.windowSeconds = windowSeconds
+        self.coalescedCommands = coalescedCommands if coalescedCommands is not None else COALESCED_COMMANDS
+        self.startedKeys = ExpiringKeySet()
+
+    def get_batch_commands(self) -> Set[str]:
+        return get_batch_commands(messageProcessor=self.messageProcessor)
+
+    def _is_message_covered(self, message: Message) -> bool:
+        # NOTE(krishan711): a message posted before the last successful run of the same work started is already covered by it
+        key = get_coalescing_key(message=message, coalescedCommands=self.coalescedCommands)
+        if key is None or self.windowSeconds <= 0:
+            return False
+        startedDate = self.startedKeys.get(key=key)
+        if startedDate is not None and message.postDate is not None and message.postDate < startedDate:
+            logging.stat('DEDUPLICATED_QUEUE_MESSAGES', message.command, 1)
+            return True
+        return False
+
+    def _record_processed_messages(self, messages: Sequence[Message], startDate: datetime.datetime) -> None:
+        # NOTE(krishan711): only called once processing succeeded so a failed message is never skipped when it is retried
+        for message in messages:
+            key = get_coalescing_key(message=message, coalescedCommands=self.coalescedCommands)
+            if key is not None:
+                self.startedKeys.set(key=key, date=startDate)
+
+    async def process_message(self, message: Message) -> None:
+        await self.process_messages(messages=[message])
+
+    async def process_messages(self, messages: Sequence[Message]) -> None:
+        startDate = date_util.datetime_from_now()
+        self.startedKeys.remove_before(date=date_util.datetime_from_datetime(dt=startDate, seconds=-self.windowSeconds))
+        messagesToProcess = [message for message in messages if not self._is_message_covered(message=message)]
+        if len(messagesToProcess) == 0:
+            return
+        try:
+            if len(messagesToProcess) == 1:
+                await self.messageProcessor.process_message(message=messagesToProcess[0])
+            else:
+                await process_messages(messageProcessor=self.messageProcessor, messages=messagesToProcess)
+        except BatchProcessingException as exception:
+            failedMessageIds = {id(message) for message in exception.failedMessages}
+            self._record_processed_messages(messages=[message for message in messagesToProcess if id(message) not in failedMessageIds], startDate=startDate)
+            raise
+        self._record_processed_messages(messages=messagesToProcess, startDate=startDate)
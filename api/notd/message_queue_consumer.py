@@ -0,0 +1,273 @@
+import asyncio
+import dataclasses
+import heapq
+import itertools
+from collections import defaultdict
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Set
+from typing import Tuple
+
+from core import logging
+from core.exceptions import KibaException
+from core.notification_client import NotificationClient
+from core.queues.message_queue import MessageQueue
+from core.queues.message_queue_processor import MessageProcessor
+from core.queues.message_queue_processor import MessageQueueProcessor
+from core.queues.model import Message
+from core.util.value_holder import RequestIdHolder
+
+
+class InFlightLimiter:
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self.inFlightCount = 0
+        self.waiters: List[Tuple[int, int, asyncio.Future[None]]] = []
+        self.waiterCounter = itertools.count()
+
+    def has_capacity(self) -> bool:
+        return self.inFlightCount < self.limit and len(self.waiters) == 0
+
+    def try_acquire(self) -> bool:
+        if self.inFlightCount >= self.limit or len(self.waiters) > 0:
+            return False
+        self.inFlightCount += 1
+        return True
+
+    async def acquire(self, priority: int = 0) -> None:
+        # NOTE(krishan711): when the limit is reached the waiter with the highest priority gets the next free slot
+        if self.try_acquire():
+            return
+        future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.waiters, (-priority, next(self.waiterCounter), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self) -> None:
+        self.inFlightCount -= 1
+        self._wake_waiters()
+
+    def _wake_waiters(self) -> None:
+        while len(self.waiters) > 0 and self.inFlightCount < self.limit:
+            _, _, future = heapq.heappop(self.waiters)
+            if future.done():
+                continue
+            self.inFlightCount += 1
+            future.set_result(None)
+
+
+class BatchProcessingException(KibaException):
+
+    def __init__(self, failedMessages: Sequence[Message], originalException: Optional[Exception] = None) -> None:
+        super().__init__(message=f'Failed to process {len(failedMessages)} messages: {originalException}')
+        self.failedMessages = failedMessages
+        self.originalException = originalException
+
+
+async def _process_messages_individually(messageProcessor: MessageProcessor, messages: Sequence[Message]) -> None:
+    failedMessages = []
+    for message in messages:
+        try:
+            await messageProcessor.process_message(message=message)
+        except Exception:  # pylint: disable=broad-except
+            failedMessages.append(message)
+    if len(failedMessages) > 0:
+        raise BatchProcessingException(failedMessages=failedMessages)
+
+
+class BatchMessageProcessor(MessageProcessor):
+
+    def get_batch_commands(self) -> Set[str]:
+        return set()
+
+    async def process_messages(self, messages: Sequence[Message]) -> None:
+        # NOTE(krishan711): implementations raise BatchProcessingException with the messages that failed so the others aren't processed again
+        await _process_messages_individually(messageProcessor=self, messages=messages)
+
+
+def get_batch_commands(messageProcessor: MessageProcessor) -> Set[str]:
+    if isinstance(messageProcessor, BatchMessageProcessor):
+        return messageProcessor.get_batch_commands()
+    return set()
+
+
+async def process_messages(messageProcessor: MessageProcessor, messages: Sequence[Message]) -> None:
+    if isinstance(messageProcessor, BatchMessageProcessor):
+        await messageProcessor.process_messages(messages=messages)
+        return
+    await _process_messages_individually(messageProcessor=messageProcessor, messages=messages)
+
+
+class ConsumerMessageQueueProcessor(MessageQueueProcessor[Message]):
+
+    async def process_message(self, message: Message) -> None:
+        # NOTE(krishan711): core only runs single messages from its own polling loops so this is the one place the consumer hooks into its processing
+        await self._process_message(message=message)
+
+    async def process_messages(self, messages: Sequence[Message]) -> None:
+        try:
+            await process_messages(messageProcessor=self.messageProcessor, messages=messages)
+            failedMessages: Sequence[Message] = []
+        except BatchProcessingException as exception:
+            failedMessages = exception.failedMessages
+            logging.info(f'Failed to process {len(failedMessages)} of {len(messages)} {messages[0].command} messages in a batch, processing them individually: {exception.originalException}')
+        except Exception as exception:  # pylint: disable=broad-except
+            failedMessages = messages
+            logging.info(f'Failed to process batch of {len(messages)} {messages[0].command} messages, processing them individually: {exception}')
+        failedMessageIds = {id(message) for message in failedMessages}
+        for message in messages:
+            if id(message) in failedMessageIds:
+                continue
+            try:
+                await self.queue.delete_message(message=message)
+            except Exception as exception:  # pylint: disable=broad-except
+                logging.exception(exception)
+        logging.stat('PROCESSED_BATCH_MESSAGES', messages[0].command, len(messages) - len(failedMessages))
+        # NOTE(krishan711): only the failed messages are retried, on their own, so a bad message can't hold back the rest of its batch
+        await asyncio.gather(*[self.process_message(message=message) for message in failedMessages])
+
+
+@dataclasses.dataclass
+class ConsumedQueue:
+    name: str
+    queue: MessageQueue[Message]
+    priority: int
+    pollerCount: int
+    batchSize: int
+    maxInFlight: int
+
+
+class MessageQueueConsumer:
+
+    def __init__(self, messageProcessor: MessageProcessor, consumedQueues: Sequence[ConsumedQueue], maxInFlight: int, notificationClients: List[NotificationClient], requestIdHolder: Optional[RequestIdHolder] = None, commandConcurrencyLimits: Optional[Dict[str, int]] = None, expectedProcessingSeconds: int = 300, longPollSeconds: int = 20, idleSleepSeconds: float = 1) -> None:
+        self.messageProcessor = messageProcessor
+        self.consumedQueues = consumedQueues
+        self.expectedProcessingSeconds = expectedProcessingSeconds
+        # NOTE(krishan711): received messages are already invisible so waiting for a command slot must leave time to process them
+        self.maxCommandWaitSeconds = expectedProcessingSeconds / 2
+        self.longPollSeconds = longPollSeconds
+        self.idleSleepSeconds = idleSleepSeconds
+        self.inFlightLimiter = InFlightLimiter(limit=maxInFlight)
+        self.queueInFlightLimiters = {consumedQueue.name: InFlightLimiter(limit=consumedQueue.maxInFlight) for consumedQueue in consumedQueues}
+        self.commandLimiters = {command: InFlightLimiter(limit=limit) for command, limit in (commandConcurrencyLimits or {}).items()}
+        self.queueProcessors = {consumedQueue.name: ConsumerMessageQueueProcessor(queue=consumedQueue.queue, messageProcessor=messageProcessor, notificationClients=notificationClients, requestIdHolder=requestIdHolder) for consumedQueue in consumedQueues}
+        self.processingTasks: Set[asyncio.Task[None]] = set()
+
+    async def run(self) -> None:
+        pollerTasks = [asyncio.create_task(self._run_poller(consumedQueue=consumedQueue)) for consumedQueue in self.consumedQueues for _ in range(consumedQueue.pollerCount)]
+        try:
+            await asyncio.gather(*pollerTasks)
+        finally:
+            for pollerTask in pollerTasks:
+                pollerTask.cancel()
+            if len(self.processingTasks) > 0:
+                logging.info(f'Waiting for {len(self.processingTasks)} in-flight messages to finish')
+                await asyncio.gather(*self.processingTasks, return_exceptions=True)
+
+    async def _acquire_slots(self, consumedQueue: ConsumedQueue) -> int:
+        # NOTE(krishan711): slots are reserved before receiving so messages are never left invisible on the queue while waiting for capacity
+        queueInFlightLimiter = self.queueInFlightLimiters[consumedQueue.name]
+        await queueInFlightLimiter.acquire()
+        try:
+            await self.inFlightLimiter.acquire(priority=consumedQueue.priority)
+        except asyncio.CancelledError:
+            queueInFlightLimiter.release()
+            raise
+        slotCount = 1
+        while slotCount < consumedQueue.batchSize and queueInFlightLimiter.try_acquire():
+            if not self.inFlightLimiter.try_acquire():
+                queueInFlightLimiter.release()
+                break
+            slotCount += 1
+        return slotCount
+
+    def _release_slot(self, consumedQueue: ConsumedQueue) -> None:
+        self.inFlightLimiter.release()
+        self.queueInFlightLimiters[consumedQueue.name].release()
+
+    async def _acquire_command_slot(self, command: str, messageCount: int) -> bool:
+        commandLimiter = self.commandLimiters.get(command)
+        if not commandLimiter:
+            return True
+        try:
+            await asyncio.wait_for(commandLimiter.acquire(), timeout=self.maxCommandWaitSeconds)
+        except asyncio.TimeoutError:
+            # NOTE(krishan711): the messages aren't deleted so they are received again once their visibility timeout ends
+            logging.info(f'Timed out waiting for a {command} slot, leaving {messageCount} messages to be received again')
+            return False
+        return True
+
+    def _release_command_slot(self, command: str) -> None:
+        commandLimiter = self.commandLimiters.get(command)
+        if commandLimiter:
+            commandLimiter.release()
+
+    async def _process_message(self, consumedQueue: ConsumedQueue, message: Message) -> None:
+        try:
+            if not await self._acquire_command_slot(command=message.command, messageCount=1):
+                return
+            try:
+                await self.queueProcessors[consumedQueue.name].process_message(message=message)
+            finally:
+                self._release_command_slot(command=message.command)
+        finally:
+            self._release_slot(consumedQueue=consumedQueue)
+
+    async def _process_message_batch(self, consumedQueue: ConsumedQueue, messages: Sequence[Message]) -> None:
+        # NOTE(krishan711): batches only ever contain a single command and take one slot of its limit
+        try:
+            if not await self._acquire_command_slot(command=messages[0].command, messageCount=len(messages)):
+                return
+            try:
+                await self.queueProcessors[consumedQueue.name].process_messages(messages=messages)
+            finally:
+                self._release_command_slot(command=messages[0].command)
+        finally:
+            for _ in messages:
+                self._release_slot(consumedQueue=consumedQueue)
+
+    def _start_processing(self, consumedQueue: ConsumedQueue, messages: Sequence[Message]) -> None:
+        batchCommands = get_batch_commands(messageProcessor=self.messageProcessor)
+        commandMessagesMap: Dict[str, List[Message]] = defaultdict(list)
+        processingCoroutines = []
+        for message in messages:
+            if message.command in batchCommands:
+                commandMessagesMap[message.command].append(message)
+            else:
+                processingCoroutines.append(self._process_message(consumedQueue=consumedQueue, message=message))
+        for commandMessages in commandMessagesMap.values():
+            if len(commandMessages) == 1:
+                processingCoroutines.append(self._process_message(consumedQueue=consumedQueue, message=commandMessages[0]))
+            else:
+                processingCoroutines.append(self._process_message_batch(consumedQueue=consumedQueue, messages=commandMessages))
+        for processingCoroutine in processingCoroutines:
+            processingTask = asyncio.create_task(processingCoroutine)
+            self.processingTasks.add(processingTask)
+            processingTask.add_done_callback(self.processingTasks.discard)
+
+    async def _run_poller(self, consumedQueue: ConsumedQueue) -> None:
+        while True:
+            slotCount = await self._acquire_slots(consumedQueue=consumedQueue)
+            # NOTE(krishan711): the slots are held while polling so only long poll if other pollers can still get one
+            longPollSeconds = self.longPollSeconds if self.inFlightLimiter.has_capacity() else 0
+            try:
+                messages = await consumedQueue.queue.get_messages(limit=slotCount, expectedProcessingSeconds=self.expectedProcessingSeconds, longPollSeconds=longPollSeconds)
+            except asyncio.CancelledError:
+                for _ in range(slotCount):
+                    self._release_slot(consumedQueue=consumedQueue)
+                raise
+            except Exception as exception:  # pylint: disable=broad-except
+                logging.exception(exception)
+                messages = []
+            for _ in range(slotCount - len(messages)):
+                self._release_slot(consumedQueue=consumedQueue)
+            self._start_processing(consumedQueue=consumedQueue, messages=messages)
+            if len(messages) == 0:
+                await asyncio.sleep(self.idleSleepSeconds)
@@ -0,0 +1,251 @@
+import asyncio
+import dataclasses
+import datetime
+import heapq
+import itertools
+import uuid
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+from typing import Union
+
+import sqlalchemy
+from core import logging
+from core.exceptions import InternalServerErrorException
+from core.queues.message_queue import MessageQueue
+from core.queues.model import Message
+from core.queues.sqs import SqsMessageQueue
+from core.store.database import Database
+from core.store.database import DatabaseConnection
+from core.util import date_util
+from core.util import list_util
+
+from notd.store.schema import QueueMessagesTable
+
+_SQS_QUEUE_URL_PREFIX = 'https://sqs.eu-west-1.amazonaws.com/097520841056/'
+_POSTGRES_MAX_RECEIVE_COUNT = 5
+
+
+class QueuedMessage(Message):
+    receiptHandle: str
+
+    @classmethod
+    def from_body(cls, body: str, receiptHandle: str) -> 'QueuedMessage':
+        message = Message.parse_raw(body)
+        return cls(
+            command=message.command,
+            content=message.content,
+            requestId=message.requestId,
+            postCount=message.postCount,
+            postDate=message.postDate,
+            receiptHandle=receiptHandle,
+        )
+
+
+@dataclasses.dataclass
+class LocalQueueEntry:
+    messageId: int
+    body: str
+    visibleDate: datetime.datetime
+    receiptHandle: Optional[str]
+
+
+class LocalMessageQueue(MessageQueue[QueuedMessage]):
+
+    def __init__(self, name: str, pollIntervalSeconds: float = 1) -> None:
+        self.name = name
+        self.pollIntervalSeconds = pollIntervalSeconds
+        self.entries: Dict[int, LocalQueueEntry] = {}
+        self.visibleHeap: List[Tuple[datetime.datetime, int]] = []
+        self.receiptHandleMessageIds: Dict[str, int] = {}
+        self.messageIdCounter = itertools.count()
+        self.messageEvent = asyncio.Event()
+
+    async def connect(self) -> None:
+        pass
+
+    async def disconnect(self) -> None:
+        pass
+
+    async def send_message(self, message: Message, delaySeconds: int = 0) -> None:
+        await self.send_messages(messages=[message], delaySeconds=delaySeconds)
+
+    async def send_messages(self, messages: Sequence[Message], delaySeconds: int = 0) -> None:
+        visibleDate = date_util.datetime_from_now(seconds=delaySeconds)
+        for message in messages:
+            message.prepare_for_send()
+            entry = LocalQueueEntry(messageId=next(self.messageIdCounter), body=message.json(), visibleDate=visibleDate, receiptHandle=None)
+            self.entries[entry.messageId] = entry
+            heapq.heappush(self.visibleHeap, (entry.visibleDate, entry.messageId))
+        self.messageEvent.set()
+
+    async def get_message(self, expectedProcessingSeconds: int = 300, longPollSeconds: int = 0) -> Optional[QueuedMessage]:
+        messages = await self.get_messages(limit=1, expectedProcessingSeconds=expectedProcessingSeconds, longPollSeconds=longPollSeconds)
+        return messages[0] if len(messages) > 0 else None
+
+    async def get_messages(self, limit: int = 1, expectedProcessingSeconds: int = 300, longPollSeconds: int = 0) -> List[QueuedMessage]:
+        endDate = date_util.datetime_from_now(seconds=longPollSeconds)
+        while True:
+            self.messageEvent.clear()
+            messages = self._receive_messages(limit=limit, expectedProcessingSeconds=expectedProcessingSeconds)
+            remainingSeconds = (endDate - date_util.datetime_from_now()).total_seconds()
+            if len(messages) > 0 or remainingSeconds <= 0:
+                return messages
+            try:
+                await asyncio.wait_for(self.messageEvent.wait(), timeout=min(remainingSeconds, self.pollIntervalSeconds))
+            except asyncio.TimeoutError:
+                pass
+
+    def _receive_messages(self, limit: int, expectedProcessingSeconds: int) -> List[QueuedMessage]:
+        # NOTE(krishan711): received messages are pushed back with their new visible date so they re-appear if they are not deleted in time
+        currentDate = date_util.datetime_from_now()
+        invisibleDate = date_util.datetime_from_datetime(dt=currentDate, seconds=expectedProcessingSeconds)
+        messages: List[QueuedMessage] = []
+        while len(messages) < limit and len(self.visibleHeap) > 0 and self.visibleHeap[0][0] <= currentDate:
+            visibleDate, messageId = heapq.heappop(self.visibleHeap)
+            entry = self.entries.get(messageId)
+            if entry is None or entry.visibleDate != visibleDate:
+                continue
+            if entry.receiptHandle:
+                self.receiptHandleMessageIds.pop(entry.receiptHandle, None)
+            entry.receiptHandle = str(uuid.uuid4())
+            entry.visibleDate = invisibleDate
+            self.receiptHandleMessageIds[entry.receiptHandle] = messageId
+            heapq.heappush(self.visibleHeap, (entry.visibleDate, entry.messageId))
+            messages.append(QueuedMessage.from_body(body=entry.body, receiptHandle=entry.receiptHandle))
+        return messages
+
+    async def delete_message(self, message: QueuedMessage) -> None:
+        messageId = self.receiptHandleMessageIds.pop(message.receiptHandle, None)
+        if messageId is not None:
+            self.entries.pop(messageId, None)
+
+
+class PostgresMessageQueue(MessageQueue[QueuedMessage]):
+
+    def __init__(self, database: Database, queueName: str, pollIntervalSeconds: float = 1, deadLetterQueueName: Optional[str] = None, maxReceiveCount: Optional[int] = None) -> None:
+        self.database = database
+        self.queueName = queueName
+        self.pollIntervalSeconds = pollIntervalSeconds
+        self.deadLetterQueueName = deadLetterQueueName
+        self.maxReceiveCount = maxReceiveCount
+
+    async def connect(self) -> None:
+        pass
+
+    async def disconnect(self) -> None:
+        pass
+
+    async def send_message(self, message: Message, delaySeconds: int = 0) -> None:
+        await self.send_messages(messages=[message], delaySeconds=delaySeconds)
+
+    async def send_messages(self, messages: Sequence[Message], delaySeconds: int = 0) -> None:
+        # NOTE(krishan711): each chunk commits in its own transaction so it is visible to consumers straight away, even if the caller's transaction later rolls back
+        if len(messages) == 0:
+            return
+        createdDate = date_util.datetime_from_now()
+        visibleDate = date_util.datetime_from_datetime(dt=createdDate, seconds=delaySeconds)
+        for chunk in list_util.generate_chunks(lst=list(messages), chunkSize=100):
+            values = []
+            for message in chunk:
+                message.prepare_for_send()
+                values.append({
+                    QueueMessagesTable.c.createdDate.key: createdDate,
+                    QueueMessagesTable.c.updatedDate.key: createdDate,
+                    QueueMessagesTable.c.queueName.key: self.queueName,
+                    QueueMessagesTable.c.visibleDate.key: visibleDate,
+                    QueueMessagesTable.c.receiveCount.key: 0,
+                    QueueMessagesTable.c.receiptHandle.key: None,
+                    QueueMessagesTable.c.body.key: message.json(),
+                })
+            async with self.database.create_transaction() as connection:
+                await self.database.execute(query=QueueMessagesTable.insert().values(values).returning(QueueMessagesTable.c.queueMessageId), connection=connection)
+
+    async def get_message(self, expectedProcessingSeconds: int = 300, longPollSeconds: int = 0) -> Optional[QueuedMessage]:
+        messages = await self.get_messages(limit=1, expectedProcessingSeconds=expectedProcessingSeconds, longPollSeconds=longPollSeconds)
+        return messages[0] if len(messages) > 0 else None
+
+    async def get_messages(self, limit: int = 1, expectedProcessingSeconds: int = 300, longPollSeconds: int = 0) -> List[QueuedMessage]:
+        endDate = date_util.datetime_from_now(seconds=longPollSeconds)
+        while True:
+            messages = await self._receive_messages(limit=limit, expectedProcessingSeconds=expectedProcessingSeconds)
+            remainingSeconds = (endDate - date_util.datetime_from_now()).total_seconds()
+            if len(messages) > 0 or remainingSeconds <= 0:
+                return messages
+            await asyncio.sleep(min(remainingSeconds, self.pollIntervalSeconds))
+
+    async def _receive_messages(self, limit: int, expectedProcessingSeconds: int) -> List[QueuedMessage]:
+        # NOTE(krishan711): SKIP LOCKED lets many consumers claim different rows at once and the receipt handle changes on every receive so a late delete can't remove a redelivered message
+        currentDate = date_util.datetime_from_now()
+        visibleMessageIdsQuery = (
+            sqlalchemy.select(QueueMessagesTable.c.queueMessageId)
+                .where(QueueMessagesTable.c.queueName == self.queueName)
+                .where(QueueMessagesTable.c.visibleDate <= currentDate)
+                .order_by(QueueMessagesTable.c.visibleDate.asc(), QueueMessagesTable.c.queueMessageId.asc())
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+        )
+        query = (
+            QueueMessagesTable.update()
+                .where(QueueMessagesTable.c.queueMessageId.in_(visibleMessageIdsQuery.scalar_subquery()))
+                .values({
+                    QueueMessagesTable.c.updatedDate: currentDate,
+                    QueueMessagesTable.c.visibleDate: date_util.datetime_from_datetime(dt=currentDate, seconds=expectedProcessingSeconds),
+                    QueueMessagesTable.c.receiveCount: QueueMessagesTable.c.receiveCount + 1,
+                    QueueMessagesTable.c.receiptHandle: sqlalchemy.cast(QueueMessagesTable.c.queueMessageId, sqlalchemy.Text).concat(':').concat(sqlalchemy.cast(QueueMessagesTable.c.receiveCount + 1, sqlalchemy.Text)),
+                })
+                .returning(QueueMessagesTable.c.body, QueueMessagesTable.c.receiptHandle)
+        )
+        async with self.database.create_transaction() as connection:
+            await self._dead_letter_messages(currentDate=currentDate, connection=connection)
+            result = await self.database.execute(query=query, connection=connection)
+        return [QueuedMessage.from_body(body=body, receiptHandle=receiptHandle) for (body, receiptHandle) in result]
+
+    async def _dead_letter_messages(self, currentDate: datetime.datetime, connection: DatabaseConnection) -> None:
+        # NOTE(krishan711): like an sqs redrive policy, messages that became visible again too many times move to the dead letter queue instead of being received
+        if not self.deadLetterQueueName or not self.maxReceiveCount:
+            return
+        query = (
+            QueueMessagesTable.update()
+                .where(QueueMessagesTable.c.queueName == self.queueName)
+                .where(QueueMessagesTable.c.visibleDate <= currentDate)
+                .where(QueueMessagesTable.c.receiveCount >= self.maxReceiveCount)
+                .values({
+                    QueueMessagesTable.c.updatedDate: currentDate,
+                    QueueMessagesTable.c.queueName: self.deadLetterQueueName,
+                    QueueMessagesTable.c.receiveCount: 0,
+                    QueueMessagesTable.c.receiptHandle: None,
+                })
+                .returning(QueueMessagesTable.c.queueMessageId)
+        )
+        result = await self.database.execute(query=query, connection=connection)
+        deadLetteredCount = len(result.all())
+        if deadLetteredCount > 0:
+            logging.info(f'Moved {deadLetteredCount} messages from {self.queueName} to {self.deadLetterQueueName} after {self.maxReceiveCount} receives')
+
+    async def delete_message(self, message: QueuedMessage) -> None:
+        query = QueueMessagesTable.delete().where(QueueMessagesTable.c.receiptHandle == message.receiptHandle).returning(QueueMessagesTable.c.queueMessageId)
+        async with self.database.create_transaction() as connection:
+            await self.database.execute(query=query, connection=connection)
+
+
+_LOCAL_MESSAGE_QUEUES: Dict[str, LocalMessageQueue] = {}
+
+
+def create_message_queue(queueBackend: str, queueName: str, database: Optional[Database] = None, accessKeyId: Optional[str] = None, accessKeySecret: Optional[str] = None) -> Union[SqsMessageQueue, PostgresMessageQueue, LocalMessageQueue]:
+    # NOTE(krishan711): local queues only live in this process so every caller asking for the same name shares one
+    if queueBackend == 'sqs':
+        if not accessKeyId or not accessKeySecret:
+            raise InternalServerErrorException(message='The sqs queue backend needs aws credentials')
+        return SqsMessageQueue(region='eu-west-1', accessKeyId=accessKeyId, accessKeySecret=accessKeySecret, queueUrl=f'{_SQS_QUEUE_URL_PREFIX}{queueName}')
+    if queueBackend == 'postgres':
+        if not database:
+            raise InternalServerErrorException(message='The postgres queue backend needs a database')
+        return PostgresMessageQueue(database=database, queueName=queueName, deadLetterQueueName=f'{queueName}-dl', maxReceiveCount=_POSTGRES_MAX_RECEIVE_COUNT)
+    if queueBackend == 'local':
+        if queueName not in _LOCAL_MESSAGE_QUEUES:
+            _LOCAL_MESSAGE_QUEUES[queueName] = LocalMessageQueue(name=queueName)
+        return _LOCAL_MESSAGE_QUEUES[queueName]
+    raise InternalServerErrorException(message=f'Unknown queue backend: {queueBackend}')
@@ -76,6 +76,11 @@ class UpdateCollectionTokenAttributesMessageContent(MessageContent):
     tokenId: str
 
 
+class UpdateCollectionAttributeBitmapsMessageContent(MessageContent):
+    _COMMAND = 'UPDATE_COLLECTION_ATTRIBUTE_BITMAPS'
+    registryAddress: str
+
+
 class UpdateListingsForAllCollections(MessageContent):
     _COMMAND = 'UPDATE_LISTINGS_FOR_ALL_COLLECTIONS'
 
@@ -98,10 +103,6 @@ class RefreshListingsForCollectionMessageContent(MessageContent):
     address: str
 
 
-class UpdateTokenStakingsForCollectionMessageContent(MessageContent):
-    _COMMAND = 'UPDATE_TOKEN_STAKINGS_FOR_COLLECTION'
-    address: str
-
 class UpdateTokenStakingMessageContent(MessageContent):
     _COMMAND = 'UPDATE_TOKEN_STAKING'
     registryAddress: str
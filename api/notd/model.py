@@ -11,6 +11,8 @@ from typing import TypeVar
 from core.util.typing_util import JSON
 
 WRAPPED_ETHER_ADDRESS = '0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2'
+DELEGATION_REGISTRY_ADDRESS = '0x00000000000076A84feF008CDAbe6409d2FE638B'
+MULTICALL3_ADDRESS = '0xcA11bde05977b3631167028862bE2a173976CA11'
 
 COLLECTION_SPRITE_CLUB_ADDRESS = '0x2744fE5e7776BCA0AF1CDEAF3bA3d1F5cae515d3'
 COLLECTION_GOBLINTOWN_ADDRESS = '0xbCe3781ae7Ca1a5e050Bd9C4c77369867eBc307e'
@@ -249,6 +251,13 @@ class Block:
     blockDate: datetime.datetime
 
 
+@dataclasses.dataclass
+class RetrievedDelegationEvent:
+    blockNumber: int
+    vaultAddress: str
+    delegateAddress: Optional[str]
+
+
 @dataclasses.dataclass
 class ProcessedBlock:
     blockNumber: int
@@ -374,6 +383,7 @@ class LatestUpdate:
     key: str
     name: Optional[str]
     date: datetime.datetime
+    cursor: Optional[str]
 
 
 @dataclasses.dataclass
@@ -405,6 +415,13 @@ class TokenListing(RetrievedTokenListing):
     updatedDate: datetime.datetime
 
 
+@dataclasses.dataclass
+class TokenListingsSyncResult:
+    addedCount: int
+    updatedCount: int
+    keptCount: int
+
+
 @dataclasses.dataclass
 class RetrievedTokenAttribute:
     registryAddress: str
@@ -420,6 +437,22 @@ class TokenAttribute(RetrievedTokenAttribute):
     updatedDate: datetime.datetime
 
 
+@dataclasses.dataclass
+class RetrievedTokenAttributeBitmap:
+    registryAddress: str
+    name: str
+    value: str
+    tokenCount: int
+    bitmap: bytes
+
+
+@dataclasses.dataclass
+class TokenAttributeBitmap(RetrievedTokenAttributeBitmap):
+    tokenAttributeBitmapId: int
+    createdDate: datetime.datetime
+    updatedDate: datetime.datetime
+
+
 @dataclasses.dataclass
 class CollectionAttribute:
     name: str
@@ -757,6 +790,13 @@ class SubCollectionKey:
     externalId: str
 
 
+@dataclasses.dataclass
+class RetrievedSubCollectionToken:
+    registryAddress: str
+    tokenId: str
+    subCollectionId: int
+
+
 @dataclasses.dataclass
 class SubCollectionToken:
     subCollectionTokenId: int
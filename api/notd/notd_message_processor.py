@@ -1,10 +1,21 @@
+import dataclasses
+from collections import defaultdict
+from typing import Awaitable
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Set
+
 from core import logging
 from core.exceptions import KibaException
-from core.queues.message_queue_processor import MessageProcessor
 from core.queues.model import Message
 from core.util import date_util
 
 from notd.manager import NotdManager
+from notd.message_queue_consumer import BatchMessageProcessor
+from notd.message_queue_consumer import BatchProcessingException
 from notd.messages import ProcessBlockMessageContent
 from notd.messages import ReceiveNewBlocksMessageContent
 from notd.messages import RefreshAllCollectionOverlapsMessageContent
@@ -18,6 +29,7 @@ from notd.messages import ReprocessBlocksMessageContent
 from notd.messages import UpdateActivityForAllCollectionsMessageContent
 from notd.messages import UpdateActivityForCollectionMessageContent
 from notd.messages import UpdateAllTwitterUsersMessageContent
+from notd.messages import UpdateCollectionAttributeBitmapsMessageContent
 from notd.messages import UpdateCollectionMessageContent
 from notd.messages import UpdateCollectionTokenAttributesMessageContent
 from notd.messages import UpdateCollectionTokensMessageContent
@@ -28,153 +40,219 @@ from notd.messages import UpdateTokenAttributesForAllCollectionsMessageContent
 from notd.messages import UpdateTokenMetadataMessageContent
 from notd.messages import UpdateTokenOwnershipMessageContent
 from notd.messages import UpdateTokenStakingMessageContent
-from notd.messages import UpdateTokenStakingsForCollectionMessageContent
 from notd.messages import UpdateTotalActivityForAllCollectionsMessageContent
 from notd.messages import UpdateTotalActivityForCollectionMessageContent
 
+MessageHandler = Callable[[Message], Awaitable[None]]
+BatchMessageHandler = Callable[[Sequence[Message]], Awaitable[None]]
+
+
+@dataclasses.dataclass
+class CommandHandler:
+    handler: MessageHandler
+    batchHandler: Optional[BatchMessageHandler] = None
+    maxAgeSeconds: Optional[int] = None
+
 
-class NotdMessageProcessor(MessageProcessor):
+class NotdMessageProcessor(BatchMessageProcessor):
 
     def __init__(self, notdManager: NotdManager):
         self.notdManager = notdManager
+        self.commandHandlers: Dict[str, CommandHandler] = {
+            ProcessBlockMessageContent.get_command(): CommandHandler(handler=self._process_block),
+            ReceiveNewBlocksMessageContent.get_command(): CommandHandler(handler=self._receive_new_blocks, maxAgeSeconds=60 * 5),
+            RefreshViewsMessageContent.get_command(): CommandHandler(handler=self._refresh_views, maxAgeSeconds=60 * 5),
+            ReprocessBlocksMessageContent.get_command(): CommandHandler(handler=self._reprocess_blocks, maxAgeSeconds=60 * 5),
+            UpdateTokenMetadataMessageContent.get_command(): CommandHandler(handler=self._update_token_metadata, batchHandler=self._update_token_metadatas),
+            UpdateTokenOwnershipMessageContent.get_command(): CommandHandler(handler=self._update_token_ownership, batchHandler=self._update_token_ownerships),
+            UpdateCollectionMessageContent.get_command(): CommandHandler(handler=self._update_collection),
+            UpdateCollectionTokensMessageContent.get_command(): CommandHandler(handler=self._update_collection_tokens),
+            UpdateActivityForAllCollectionsMessageContent.get_command(): CommandHandler(handler=self._update_activity_for_all_collections, maxAgeSeconds=60 * 10),
+            UpdateActivityForCollectionMessageContent.get_command(): CommandHandler(handler=self._update_activity_for_collection),
+            UpdateTotalActivityForAllCollectionsMessageContent.get_command(): CommandHandler(handler=self._update_total_activity_for_all_collections, maxAgeSeconds=60 * 10),
+            UpdateTotalActivityForCollectionMessageContent.get_command(): CommandHandler(handler=self._update_total_activity_for_collection),
+            UpdateTokenAttributesForAllCollectionsMessageContent.get_command(): CommandHandler(handler=self._update_token_attributes_for_all_collections, maxAgeSeconds=60 * 60),
+            UpdateCollectionTokenAttributesMessageContent.get_command(): CommandHandler(handler=self._update_collection_token_attributes),
+            UpdateCollectionAttributeBitmapsMessageContent.get_command(): CommandHandler(handler=self._update_collection_attribute_bitmaps),
+            UpdateListingsForAllCollections.get_command(): CommandHandler(handler=self._update_listings_for_all_collections, maxAgeSeconds=60 * 5),
+            UpdateListingsForCollection.get_command(): CommandHandler(handler=self._update_listings_for_collection, maxAgeSeconds=60 * 5),
+            RefreshListingsForAllCollections.get_command(): CommandHandler(handler=self._refresh_listings_for_all_collections, maxAgeSeconds=60 * 60),
+            RefreshListingsForCollectionMessageContent.get_command(): CommandHandler(handler=self._refresh_listings_for_collection, maxAgeSeconds=60 * 60),
+            UpdateAllTwitterUsersMessageContent.get_command(): CommandHandler(handler=self._update_all_twitter_users),
+            RefreshAllCollectionOverlapsMessageContent.get_command(): CommandHandler(handler=self._refresh_all_collection_overlaps),
+            RefreshCollectionOverlapMessageContent.get_command(): CommandHandler(handler=self._refresh_collection_overlap),
+            RefreshGalleryBadgeHoldersForAllCollectionsMessageContent.get_command(): CommandHandler(handler=self._refresh_gallery_badge_holders_for_all_collections),
+            RefreshGalleryBadgeHoldersForCollectionMessageContent.get_command(): CommandHandler(handler=self._refresh_gallery_badge_holders_for_collection),
+            UpdateTokenStakingMessageContent.get_command(): CommandHandler(handler=self._update_token_staking),
+            UpdateSubCollectionMessageContent.get_command(): CommandHandler(handler=self._update_sub_collection, maxAgeSeconds=60 * 5),
+        }
+
+    def get_batch_commands(self) -> Set[str]:
+        return {command for command, commandHandler in self.commandHandlers.items() if commandHandler.batchHandler is not None}
+
+    def _get_command_handler(self, command: str) -> CommandHandler:
+        commandHandler = self.commandHandlers.get(command)
+        if not commandHandler:
+            raise KibaException(message='Message was unhandled')
+        return commandHandler
+
+    @staticmethod
+    def _is_message_expired(message: Message, commandHandler: CommandHandler) -> bool:
+        if commandHandler.maxAgeSeconds is None:
+            return False
+        if message.postDate is None or message.postDate < date_util.datetime_from_now(seconds=-commandHandler.maxAgeSeconds):
+            logging.info(f'Skipping {message.command} from more than {int(commandHandler.maxAgeSeconds / 60)} minutes ago')
+            return True
+        return False
 
-    # pylint: disable=too-many-statements
     async def process_message(self, message: Message) -> None:
-        if message.command == ProcessBlockMessageContent.get_command():
-            processBlockMessageContent = ProcessBlockMessageContent.parse_obj(message.content)
-            await self.notdManager.process_block(blockNumber=processBlockMessageContent.blockNumber, shouldSkipProcessingTokens=processBlockMessageContent.shouldSkipProcessingTokens)
-            return
-        if message.command == ReceiveNewBlocksMessageContent.get_command():
-            if message.postDate is None or message.postDate < date_util.datetime_from_now(seconds=-(60 * 5)):
-                logging.info(f'Skipping {message.command} from more than 5 minutes ago')
-                return
-            receiveNewBlocksMessageContent = ReceiveNewBlocksMessageContent.parse_obj(message.content)  # pylint: disable=unused-variable
-            await self.notdManager.receive_new_blocks()
-            return
-        if message.command == RefreshViewsMessageContent.get_command():
-            if message.postDate is None or message.postDate < date_util.datetime_from_now(seconds=-(60 * 5)):
-                logging.info(f'Skipping {message.command} from more than 5 minutes ago')
-                return
-            refreshViewsMessageContent = RefreshViewsMessageContent.parse_obj(message.content)  # pylint: disable=unused-variable
-            await self.notdManager.refresh_views()
-            return
-        if message.command == ReprocessBlocksMessageContent.get_command():
-            if message.postDate is None or message.postDate < date_util.datetime_from_now(seconds=-(60 * 5)):
-                logging.info(f'Skipping {message.command} from more than 5 minutes ago')
-                return
-            reprocessBlocksMessageContent = ReprocessBlocksMessageContent.parse_obj(message.content)  # pylint: disable=unused-variable
-            await self.notdManager.reprocess_old_blocks()
-            return
-        if message.command == UpdateTokenMetadataMessageContent.get_command():
-            updateTokenMetadataMessageContent = UpdateTokenMetadataMessageContent.parse_obj(message.content)
-            await self.notdManager.update_token_metadata(registryAddress=updateTokenMetadataMessageContent.registryAddress, tokenId=updateTokenMetadataMessageContent.tokenId, shouldForce=updateTokenMetadataMessageContent.shouldForce)
-            return
-        if message.command == UpdateTokenOwnershipMessageContent.get_command():
-            updateTokenOwnershipMessageContent = UpdateTokenOwnershipMessageContent.parse_obj(message.content)
-            await self.notdManager.update_token_ownership(registryAddress=updateTokenOwnershipMessageContent.registryAddress, tokenId=updateTokenOwnershipMessageContent.tokenId)
-            return
-        if message.command == UpdateCollectionMessageContent.get_command():
-            updateCollectionMessageContent = UpdateCollectionMessageContent.parse_obj(message.content)
-            await self.notdManager.update_collection(address=updateCollectionMessageContent.address, shouldForce=updateCollectionMessageContent.shouldForce)
-            return
-        if message.command == UpdateCollectionTokensMessageContent.get_command():
-            updateCollectionTokensMessageContent = UpdateCollectionTokensMessageContent.parse_obj(message.content)
-            await self.notdManager.update_collection_tokens(address=updateCollectionTokensMessageContent.address, shouldForce=updateCollectionTokensMessageContent.shouldForce)
-            return
-        if message.command == UpdateActivityForAllCollectionsMessageContent.get_command():
-            if message.postDate is None or message.postDate < date_util.datetime_from_now(seconds=-(60 * 10)):
-                logging.info(f'Skipping {message.command} from more than 10 minutes ago')
-                return
-            updateActivityForAllCollectionsMessageContent = UpdateActivityForAllCollectionsMessageContent.parse_obj(message.content)  # pylint: disable=unused-variable
-            await self.notdManager.update_activity_for_all_collections()
-            return
-        if message.command == UpdateActivityForCollectionMessageContent.get_command():
-            updateActivityForCollectionMessageContent = UpdateActivityForCollectionMessageContent.parse_obj(message.content)
-            await self.notdManager.update_activity_for_collection(address=updateActivityForCollectionMessageContent.address, startDate=updateActivityForCollectionMessageContent.startDate)
-            return
-        if message.command == UpdateTotalActivityForAllCollectionsMessageContent.get_command():
-            if message.postDate is None or message.postDate < date_util.datetime_from_now(seconds=-(60 * 10)):
-                logging.info(f'Skipping {message.command} from more than 10 minutes ago')
-                return
-            updateTotalActivityForAllCollectionsMessageContent = UpdateTotalActivityForAllCollectionsMessageContent.parse_obj(message.content)  # pylint: disable=unused-variable
-            await self.notdManager.update_total_activity_for_all_collections()
-            return
-        if message.command == UpdateTotalActivityForCollectionMessageContent.get_command():
-            updateTotalActivityForCollectionMessageContent = UpdateTotalActivityForCollectionMessageContent.parse_obj(message.content)
-            await self.notdManager.update_total_activity_for_collection(address=updateTotalActivityForCollectionMessageContent.address)
-            return
-        if message.command == UpdateTokenAttributesForAllCollectionsMessageContent.get_command():
-            if message.postDate is None or message.postDate < date_util.datetime_from_now(seconds=-(60 * 60)):
-                logging.info(f'Skipping {message.command} from more than 60 minutes ago')
-                return
-            updateTokenAttributesForAllCollectionsMessageContent = UpdateTokenAttributesForAllCollectionsMessageContent.parse_obj(message.content)  # pylint: disable=unused-variable, invalid-name
-            await self.notdManager.update_token_attributes_for_all_collections()
-            return
-        if message.command == UpdateCollectionTokenAttributesMessageContent.get_command():
-            updateCollectionTokenAttributesMessageContent = UpdateCollectionTokenAttributesMessageContent.parse_obj(message.content)
-            await self.notdManager.update_collection_token_attributes(registryAddress=updateCollectionTokenAttributesMessageContent.registryAddress, tokenId=updateCollectionTokenAttributesMessageContent.tokenId)
-            return
-        if message.command == UpdateListingsForAllCollections.get_command():
-            if message.postDate is None or message.postDate < date_util.datetime_from_now(seconds=-(60 * 5)):
-                logging.info(f'Skipping {message.command} from more than 5 minutes ago')
-                return
-            updateListingsForAllCollections = UpdateListingsForAllCollections.parse_obj(message.content)  # pylint: disable=unused-variable
-            await self.notdManager.update_latest_listings_for_all_collections()
-            return
-        if message.command == UpdateListingsForCollection.get_command():
-            if message.postDate is None or message.postDate < date_util.datetime_from_now(seconds=-(60 * 5)):
-                logging.info(f'Skipping {message.command} from more than 5 minutes ago')
-                return
-            updateListingsForCollection = UpdateListingsForCollection.parse_obj(message.content)
-            await self.notdManager.update_latest_listings_for_collection(address=updateListingsForCollection.address)
-            return
-        if message.command == RefreshListingsForAllCollections.get_command():
-            if message.postDate is None or message.postDate < date_util.datetime_from_now(seconds=-(60 * 60)):
-                logging.info(f'Skipping {message.command} from more than 60 minutes ago')
-                return
-            refreshListingsForAllCollections = RefreshListingsForAllCollections.parse_obj(message.content)  # pylint: disable=unused-variable
-            await self.notdManager.refresh_latest_listings_for_all_collections()
-            return
-        if message.command == RefreshListingsForCollectionMessageContent.get_command():
-            if message.postDate is None or message.postDate < date_util.datetime_from_now(seconds=-(60 * 60)):
-                logging.info(f'Skipping {message.command} from more than 60 minutes ago')
-                return
-            refreshListingsForCollection = RefreshListingsForCollectionMessageContent.parse_obj(message.content)
-            await self.notdManager.refresh_latest_listings_for_collection(address=refreshListingsForCollection.address)
-            return
-        if message.command == UpdateAllTwitterUsersMessageContent.get_command():
-            updateAllTwitterUsersMessageContent = UpdateAllTwitterUsersMessageContent.parse_obj(message.content)  # pylint: disable=unused-variable
-            await self.notdManager.update_all_twitter_users()
-            return
-        if message.command == RefreshAllCollectionOverlapsMessageContent.get_command():
-            refreshAllCollectionOverlapsMessageContent = RefreshAllCollectionOverlapsMessageContent.parse_obj(message.content)  # pylint: disable=unused-variable
-            await self.notdManager.refresh_overlaps_for_all_collections()
-            return
-        if message.command == RefreshCollectionOverlapMessageContent.get_command():
-            refreshCollectionOverlapMessageContent = RefreshCollectionOverlapMessageContent.parse_obj(message.content)
-            await self.notdManager.refresh_overlap_for_collection(registryAddress=refreshCollectionOverlapMessageContent.registryAddress)
-            return
-        if message.command == RefreshGalleryBadgeHoldersForAllCollectionsMessageContent.get_command():
-            refreshGalleryBadgeHoldersForAllCollectionsMessageContent = RefreshGalleryBadgeHoldersForAllCollectionsMessageContent.parse_obj(message.content)  # pylint: disable=unused-variable, invalid-name
-            await self.notdManager.refresh_gallery_badge_holders_for_all_collections()
-            return
-        if message.command == RefreshGalleryBadgeHoldersForCollectionMessageContent.get_command():
-            refreshGalleryBadgeHoldersForCollectionMessageContent = RefreshGalleryBadgeHoldersForCollectionMessageContent.parse_obj(message.content)  # pylint: disable=invalid-name
-            await self.notdManager.refresh_gallery_badge_holders_for_collection(registryAddress=refreshGalleryBadgeHoldersForCollectionMessageContent.registryAddress)
-            return
-        if message.command == UpdateTokenStakingsForCollectionMessageContent.get_command():
-            updateTokenStakingsForCollectionMessageContent = UpdateTokenStakingsForCollectionMessageContent.parse_obj(message.content)
-            await self.notdManager.update_token_stakings_for_collection(registryAddress=updateTokenStakingsForCollectionMessageContent.address)
-            return
-        if message.command == UpdateTokenStakingMessageContent.get_command():
-            updateTokenStakingMessageContent = UpdateTokenStakingMessageContent.parse_obj(message.content)
-            await self.notdManager.update_token_staking(registryAddress=updateTokenStakingMessageContent.registryAddress, tokenId=updateTokenStakingMessageContent.tokenId)
+        commandHandler = self._get_command_handler(command=message.command)
+        if self._is_message_expired(message=message, commandHandler=commandHandler):
             return
-        if message.command == UpdateSubCollectionMessageContent.get_command():
-            if message.postDate is None or message.postDate < date_util.datetime_from_now(seconds=-(60 * 5)):
-                logging.info(f'Skipping {message.command} from more than 5 minutes ago')
-                return
-            updateSubCollectionMessageContent = UpdateSubCollectionMessageContent.parse_obj(message.content)
-            await self.notdManager.update_sub_collection(registryAddress=updateSubCollectionMessageContent.registryAddress, externalId=updateSubCollectionMessageContent.externalId)
-            return
-        raise KibaException(message='Message was unhandled')
+        await commandHandler.handler(message)
+
+    async def process_messages(self, messages: Sequence[Message]) -> None:
+        commandMessagesMap: Dict[str, List[Message]] = defaultdict(list)
+        for message in messages:
+            commandMessagesMap[message.command].append(message)
+        failedMessages: List[Message] = []
+        lastException: Optional[Exception] = None
+        for command, commandMessages in commandMessagesMap.items():
+            try:
+                commandHandler = self._get_command_handler(command=command)
+            except KibaException as exception:
+                failedMessages += commandMessages
+                lastException = exception
+                continue
+            unexpiredMessages = [message for message in commandMessages if not self._is_message_expired(message=message, commandHandler=commandHandler)]
+            if len(unexpiredMessages) == 0:
+                continue
+            if commandHandler.batchHandler is None:
+                for message in unexpiredMessages:
+                    try:
+                        await commandHandler.handler(message)
+                    except Exception as exception:  # pylint: disable=broad-except
+                        failedMessages.append(message)
+                        lastException = exception
+            else:
+                try:
+                    await commandHandler.batchHandler(unexpiredMessages)
+                except Exception as exception:  # pylint: disable=broad-except
+                    failedMessages += unexpiredMessages
+                    lastException = exception
+        if len(failedMessages) > 0:
+            raise BatchProcessingException(failedMessages=failedMessages, originalException=lastException)
+
+    async def _process_block(self, message: Message) -> None:
+        processBlockMessageContent = ProcessBlockMessageContent.parse_obj(message.content)
+        await self.notdManager.process_block(blockNumber=processBlockMessageContent.blockNumber, shouldSkipProcessingTokens=processBlockMessageContent.shouldSkipProcessingTokens)
+
+    async def _receive_new_blocks(self, message: Message) -> None:
+        receiveNewBlocksMessageContent = ReceiveNewBlocksMessageContent.parse_obj(message.content)  # pylint: disable=unused-variable
+        await self.notdManager.receive_new_blocks()
+
+    async def _refresh_views(self, message: Message) -> None:
+        refreshViewsMessageContent = RefreshViewsMessageContent.parse_obj(message.content)  # pylint: disable=unused-variable
+        await self.notdManager.refresh_views()
+
+    async def _reprocess_blocks(self, message: Message) -> None:
+        reprocessBlocksMessageContent = ReprocessBlocksMessageContent.parse_obj(message.content)  # pylint: disable=unused-variable
+        await self.notdManager.reprocess_old_blocks()
+
+    async def _update_token_metadata(self, message: Message) -> None:
+        updateTokenMetadataMessageContent = UpdateTokenMetadataMessageContent.parse_obj(message.content)
+        await self.notdManager.update_token_metadata(registryAddress=updateTokenMetadataMessageContent.registryAddress, tokenId=updateTokenMetadataMessageContent.tokenId, shouldForce=updateTokenMetadataMessageContent.shouldForce)
+
+    async def _update_token_metadatas(self, messages: Sequence[Message]) -> None:
+        updateTokenMetadataMessageContents = [UpdateTokenMetadataMessageContent.parse_obj(message.content) for message in messages]
+        for shouldForce in {bool(updateTokenMetadataMessageContent.shouldForce) for updateTokenMetadataMessageContent in updateTokenMetadataMessageContents}:
+            collectionTokenIds = [(content.registryAddress, content.tokenId) for content in updateTokenMetadataMessageContents if bool(content.shouldForce) == shouldForce]
+            await self.notdManager.update_token_metadatas(collectionTokenIds=collectionTokenIds, shouldForce=shouldForce)
+
+    async def _update_token_ownership(self, message: Message) -> None:
+        updateTokenOwnershipMessageContent = UpdateTokenOwnershipMessageContent.parse_obj(message.content)
+        await self.notdManager.update_token_ownership(registryAddress=updateTokenOwnershipMessageContent.registryAddress, tokenId=updateTokenOwnershipMessageContent.tokenId)
+
+    async def _update_token_ownerships(self, messages: Sequence[Message]) -> None:
+        updateTokenOwnershipMessageContents = [UpdateTokenOwnershipMessageContent.parse_obj(message.content) for message in messages]
+        await self.notdManager.update_token_ownerships(collectionTokenIds=[(content.registryAddress, content.tokenId) for content in updateTokenOwnershipMessageContents])
+
+    async def _update_collection(self, message: Message) -> None:
+        updateCollectionMessageContent = UpdateCollectionMessageContent.parse_obj(message.content)
+        await self.notdManager.update_collection(address=updateCollectionMessageContent.address, shouldForce=updateCollectionMessageContent.shouldForce)
+
+    async def _update_collection_tokens(self, message: Message) -> None:
+        updateCollectionTokensMessageContent = UpdateCollectionTokensMessageContent.parse_obj(message.content)
+        await self.notdManager.update_collection_tokens(address=updateCollectionTokensMessageContent.address, shouldForce=updateCollectionTokensMessageContent.shouldForce)
+
+    async def _update_activity_for_all_collections(self, message: Message) -> None:
+        updateActivityForAllCollectionsMessageContent = UpdateActivityForAllCollectionsMessageContent.parse_obj(message.content)  # pylint: disable=unused-variable
+        await self.notdManager.update_activity_for_all_collections()
+
+    async def _update_activity_for_collection(self, message: Message) -> None:
+        updateActivityForCollectionMessageContent = UpdateActivityForCollectionMessageContent.parse_obj(message.content)
+        await self.notdManager.update_activity_for_collection(address=updateActivityForCollectionMessageContent.address, startDate=updateActivityForCollectionMessageContent.startDate)
+
+    async def _update_total_activity_for_all_collections(self, message: Message) -> None:
+        updateTotalActivityForAllCollectionsMessageContent = UpdateTotalActivityForAllCollectionsMessageContent.parse_obj(message.content)  # pylint: disable=unused-variable
+        await self.notdManager.update_total_activity_for_all_collections()
+
+    async def _update_total_activity_for_collection(self, message: Message) -> None:
+        updateTotalActivityForCollectionMessageContent = UpdateTotalActivityForCollectionMessageContent.parse_obj(message.content)
+        await self.notdManager.update_total_activity_for_collection(address=updateTotalActivityForCollectionMessageContent.address)
+
+    async def _update_token_attributes_for_all_collections(self, message: Message) -> None:
+        updateTokenAttributesForAllCollectionsMessageContent = UpdateTokenAttributesForAllCollectionsMessageContent.parse_obj(message.content)  # pylint: disable=unused-variable, invalid-name
+        await self.notdManager.update_token_attributes_for_all_collections()
+
+    async def _update_collection_token_attributes(self, message: Message) -> None:
+        updateCollectionTokenAttributesMessageContent = UpdateCollectionTokenAttributesMessageContent.parse_obj(message.content)
+        await self.notdManager.update_collection_token_attributes(registryAddress=updateCollectionTokenAttributesMessageContent.registryAddress, tokenId=updateCollectionTokenAttributesMessageContent.tokenId)
+
+    async def _update_collection_attribute_bitmaps(self, message: Message) -> None:
+        updateCollectionAttributeBitmapsMessageContent = UpdateCollectionAttributeBitmapsMessageContent.parse_obj(message.content)
+        await self.notdManager.update_collection_attribute_bitmaps(registryAddress=updateCollectionAttributeBitmapsMessageContent.registryAddress)
+
+    async def _update_listings_for_all_collections(self, message: Message) -> None:
+        updateListingsForAllCollections = UpdateListingsForAllCollections.parse_obj(message.content)  # pylint: disable=unused-variable
+        await self.notdManager.update_latest_listings_for_all_collections()
+
+    async def _update_listings_for_collection(self, message: Message) -> None:
+        updateListingsForCollection = UpdateListingsForCollection.parse_obj(message.content)
+        await self.notdManager.update_latest_listings_for_collection(address=updateListingsForCollection.address)
+
+    async def _refresh_listings_for_all_collections(self, message: Message) -> None:
+        refreshListingsForAllCollections = RefreshListingsForAllCollections.parse_obj(message.content)  # pylint: disable=unused-variable
+        await self.notdManager.refresh_latest_listings_for_all_collections()
+
+    async def _refresh_listings_for_collection(self, message: Message) -> None:
+        refreshListingsForCollection = RefreshListingsForCollectionMessageContent.parse_obj(message.content)
+        await self.notdManager.refresh_latest_listings_for_collection(address=refreshListingsForCollection.address)
+
+    async def _update_all_twitter_users(self, message: Message) -> None:
+        updateAllTwitterUsersMessageContent = UpdateAllTwitterUsersMessageContent.parse_obj(message.content)  # pylint: disable=unused-variable
+        await self.notdManager.update_all_twitter_users()
+
+    async def _refresh_all_collection_overlaps(self, message: Message) -> None:
+        refreshAllCollectionOverlapsMessageContent = RefreshAllCollectionOverlapsMessageContent.parse_obj(message.content)  # pylint: disable=unused-variable
+        await self.notdManager.refresh_overlaps_for_all_collections()
+
+    async def _refresh_collection_overlap(self, message: Message) -> None:
+        refreshCollectionOverlapMessageContent = RefreshCollectionOverlapMessageContent.parse_obj(message.content)
+        await self.notdManager.refresh_overlap_for_collection(registryAddress=refreshCollectionOverlapMessageContent.registryAddress)
+
+    async def _refresh_gallery_badge_holders_for_all_collections(self, message: Message) -> None:
+        refreshGalleryBadgeHoldersForAllCollectionsMessageContent = RefreshGalleryBadgeHoldersForAllCollectionsMessageContent.parse_obj(message.content)  # pylint: disable=unused-variable, invalid-name
+        await self.notdManager.refresh_gallery_badge_holders_for_all_collections()
+
+    async def _refresh_gallery_badge_holders_for_collection(self, message: Message) -> None:
+        refreshGalleryBadgeHoldersForCollectionMessageContent = RefreshGalleryBadgeHoldersForCollectionMessageContent.parse_obj(message.content)  # pylint: disable=invalid-name
+        await self.notdManager.refresh_gallery_badge_holders_for_collection(registryAddress=refreshGalleryBadgeHoldersForCollectionMessageContent.registryAddress)
+
+    async def _update_token_staking(self, message: Message) -> None:
+        updateTokenStakingMessageContent = UpdateTokenStakingMessageContent.parse_obj(message.content)
+        await self.notdManager.update_token_staking(registryAddress=updateTokenStakingMessageContent.registryAddress, tokenId=updateTokenStakingMessageContent.tokenId)
+
+    async def _update_sub_collection(self, message: Message) -> None:
+        updateSubCollectionMessageContent = UpdateSubCollectionMessageContent.parse_obj(message.content)
+        await self.notdManager.update_sub_collection(registryAddress=updateSubCollectionMessageContent.registryAddress, externalId=updateSubCollectionMessageContent.externalId)
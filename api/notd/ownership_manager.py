@@ -1,9 +1,13 @@
 import asyncio
 import datetime
+from collections import defaultdict
+from typing import Dict
 from typing import List
 from typing import Sequence
+from typing import Set
 from typing import Tuple
 
+import sqlalchemy
 from core import logging
 from core.exceptions import NotFoundException
 from core.queues.message_queue import MessageQueue
@@ -60,6 +64,42 @@ class OwnershipManager:
         elif collection.doesSupportErc1155:
             await self._update_token_multi_ownership(registryAddress=registryAddress, tokenId=tokenId)
 
+    async def update_token_ownerships(self, collectionTokenIds: Sequence[Tuple[str, str]]) -> None:
+        collectionTokenIds = list({(chain_util.normalize_address(value=registryAddress), tokenId) for (registryAddress, tokenId) in collectionTokenIds})
+        registryAddresses = list({registryAddress for (registryAddress, _) in collectionTokenIds})
+        collections = await asyncio.gather(*[self.collectionManager.get_collection_by_address(address=registryAddress) for registryAddress in registryAddresses])
+        collectionMap = dict(zip(registryAddresses, collections))
+        singleCollectionTokenIds = [(registryAddress, tokenId) for (registryAddress, tokenId) in collectionTokenIds if collectionMap[registryAddress].doesSupportErc721]
+        multiCollectionTokenIds = [(registryAddress, tokenId) for (registryAddress, tokenId) in collectionTokenIds if not collectionMap[registryAddress].doesSupportErc721 and collectionMap[registryAddress].doesSupportErc1155]
+        await self._update_token_single_ownerships(collectionTokenIds=singleCollectionTokenIds)
+        for (registryAddress, tokenId) in multiCollectionTokenIds:
+            await self._update_token_multi_ownership(registryAddress=registryAddress, tokenId=tokenId)
+
+    async def _update_token_single_ownerships(self, collectionTokenIds: Sequence[Tuple[str, str]]) -> None:
+        # NOTE(krishan711): the upsert makes the per-token locks unnecessary as concurrent writers can no longer conflict on create
+        if len(collectionTokenIds) == 0:
+            return
+        retrievedTokenOwnershipMap = await self.tokenOwnershipProcessor.calculate_token_single_ownerships(collectionTokenIds=collectionTokenIds)
+        for (registryAddress, tokenId) in collectionTokenIds:
+            if (registryAddress, tokenId) not in retrievedTokenOwnershipMap:
+                logging.error(f'No ownership found for {registryAddress}:{tokenId}')
+        if len(retrievedTokenOwnershipMap) == 0:
+            return
+        async with self.saver.create_transaction() as connection:
+            query = (
+                TokenOwnershipsTable.select()
+                    .where(sqlalchemy.tuple_(TokenOwnershipsTable.c.registryAddress, TokenOwnershipsTable.c.tokenId).in_(list(retrievedTokenOwnershipMap.keys())))
+            )
+            tokenOwnerships = await self.retriever.query_token_ownerships(query=query, connection=connection)
+            currentOwnerAddressMap = {(tokenOwnership.registryAddress, tokenOwnership.tokenId): tokenOwnership.ownerAddress for tokenOwnership in tokenOwnerships}
+            await self.saver.upsert_token_ownerships(connection=connection, retrievedTokenOwnerships=list(retrievedTokenOwnershipMap.values()))
+            changedTokenIdsMap: Dict[str, List[str]] = defaultdict(list)
+            for (registryAddress, tokenId), retrievedTokenOwnership in retrievedTokenOwnershipMap.items():
+                if currentOwnerAddressMap.get((registryAddress, tokenId)) != retrievedTokenOwnership.ownerAddress:
+                    changedTokenIdsMap[registryAddress].append(tokenId)
+            for registryAddress, tokenIds in changedTokenIdsMap.items():
+                await self.saver.update_best_token_listings(connection=connection, registryAddress=registryAddress, tokenIds=tokenIds)
+
     async def _update_token_single_ownership(self, registryAddress: str, tokenId: str) -> None:
         registryAddress = chain_util.normalize_address(value=registryAddress)
         async with self.lockManager.with_lock(name=f"update-single-ownership-{registryAddress}-{tokenId}", timeoutSeconds=5, expirySeconds=300):
@@ -77,6 +117,8 @@ class OwnershipManager:
                     await self.saver.update_token_ownership(connection=connection, tokenOwnershipId=tokenOwnership.tokenOwnershipId, ownerAddress=retrievedTokenOwnership.ownerAddress, transferDate=retrievedTokenOwnership.transferDate, transferValue=retrievedTokenOwnership.transferValue, transferTransactionHash=retrievedTokenOwnership.transferTransactionHash)
                 else:
                     await self.saver.create_token_ownership(connection=connection, registryAddress=retrievedTokenOwnership.registryAddress, tokenId=retrievedTokenOwnership.tokenId, ownerAddress=retrievedTokenOwnership.ownerAddress, transferDate=retrievedTokenOwnership.transferDate, transferValue=retrievedTokenOwnership.transferValue, transferTransactionHash=retrievedTokenOwnership.transferTransactionHash)
+                if not tokenOwnership or tokenOwnership.ownerAddress != retrievedTokenOwnership.ownerAddress:
+                    await self.saver.update_best_token_listings(connection=connection, registryAddress=registryAddress, tokenIds=[tokenId])
 
     @staticmethod
     def _uniqueness_tuple_from_token_multi_ownership(retrievedTokenMultiOwnership: RetrievedTokenMultiOwnership) -> Tuple[str, str, str, int, int, datetime.datetime, str]:
@@ -122,6 +164,8 @@ class OwnershipManager:
                         continue
                     retrievedTokenMultiOwnershipsToSave.append(retrievedTokenMultiOwnership)
                 await self.saver.create_token_multi_ownerships(connection=connection, retrievedTokenMultiOwnerships=retrievedTokenMultiOwnershipsToSave)
+                if len(retrievedTokenMultiOwnershipsToSave) > 0 or len(tokenMultiOwnershipIdsToDelete) > 0:
+                    await self.saver.update_best_token_listings(connection=connection, registryAddress=registryAddress, tokenIds=[tokenId])
                 logging.info(f'Saving multi ownerships: saved {len(retrievedTokenMultiOwnershipsToSave)}, deleted {len(tokenMultiOwnershipIdsToDelete)}, kept {len(existingOwnershipTuples - retrievedOwnershipTuples) - len(tokenMultiOwnershipIdsToDelete)}')
                 # NOTE(krishan711): if nothing changed, force update one so that it doesn't update again
                 if len(existingOwnershipTuplesMap) > 0 and len(retrievedTokenMultiOwnershipsToSave) == 0 and len(tokenMultiOwnershipIdsToDelete) == 0:
@@ -147,8 +191,10 @@ class OwnershipManager:
         return tokens
 
     async def reprocess_owner_token_ownerships(self, ownerAddress: str) -> List[Tuple[str, str]]:
-        tokenTransfers = await self.retriever.list_token_transfers(fieldFilters=[StringFieldFilter(fieldName=TokenTransfersTable.c.toAddress.key, eq=ownerAddress)])
-        collectionTokenIds = list({(transfer.registryAddress, transfer.tokenId) for transfer in tokenTransfers})
+        collectionTokenIdSet: Set[Tuple[str, str]] = set()
+        async for tokenTransfers in self.retriever.stream_token_transfers(fieldFilters=[StringFieldFilter(fieldName=TokenTransfersTable.c.toAddress.key, eq=ownerAddress)]):
+            collectionTokenIdSet.update((transfer.registryAddress, transfer.tokenId) for transfer in tokenTransfers)
+        collectionTokenIds = list(collectionTokenIdSet)
         logging.info(f'Refreshing {len(collectionTokenIds)} ownerships')
         for collectionTokenIdChunk in list_util.generate_chunks(lst=collectionTokenIds, chunkSize=10):
             await asyncio.gather(*[self.update_token_ownership(registryAddress=registryAddress, tokenId=tokenId) for (registryAddress, tokenId) in collectionTokenIdChunk])
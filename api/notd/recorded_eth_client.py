@@ -0,0 +1,81 @@
+import gzip
+import json
+import os
+import typing
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+
+from core.exceptions import NotFoundException
+from core.requester import Requester
+from core.util.typing_util import JSON
+from core.web3.eth_client import ListAny
+from core.web3.eth_client import RestEthClient
+
+
+class EthClientFixture:
+
+    def __init__(self, responses: Optional[Dict[str, JSON]] = None, blockNumbers: Optional[List[int]] = None) -> None:
+        self.responses: Dict[str, JSON] = responses or {}
+        self.blockNumbers: List[int] = blockNumbers or []
+
+    @staticmethod
+    def _get_key(method: str, params: Optional[ListAny]) -> str:
+        return json.dumps({'method': method, 'params': params or []}, sort_keys=True)
+
+    def get_response(self, method: str, params: Optional[ListAny]) -> JSON:
+        key = self._get_key(method=method, params=params)
+        if key not in self.responses:
+            raise NotFoundException(message=f'No recorded response for {key}')
+        return self.responses[key]
+
+    def add_response(self, method: str, params: Optional[ListAny], response: JSON) -> None:
+        self.responses[self._get_key(method=method, params=params)] = response
+
+    @classmethod
+    def load(cls, filePath: str) -> 'EthClientFixture':
+        with gzip.open(filePath, 'rt') as file:
+            fixtureDict = json.load(file)
+        return cls(responses=fixtureDict['responses'], blockNumbers=fixtureDict['blockNumbers'])
+
+    @classmethod
+    def load_or_create(cls, filePath: str) -> 'EthClientFixture':
+        if not os.path.exists(filePath):
+            return cls()
+        return cls.load(filePath=filePath)
+
+    def save(self, filePath: str) -> None:
+        # NOTE(krishan711): responses are stored raw so replaying them goes through exactly the same formatting as a live node
+        directoryPath = os.path.dirname(filePath)
+        if directoryPath:
+            os.makedirs(directoryPath, exist_ok=True)
+        with gzip.open(filePath, 'wt') as file:
+            json.dump({'blockNumbers': sorted(set(self.blockNumbers)), 'responses': self.responses}, file, sort_keys=True)
+
+
+class RecordingEthClient(RestEthClient):
+
+    def __init__(self, url: str, requester: Requester, fixture: EthClientFixture, isTestnet: bool = False):
+        super().__init__(url=url, requester=requester, isTestnet=isTestnet)
+        self.fixture = fixture
+
+    async def _make_request(self, method: str, params: Optional[List[Any]] = None) -> Any:  # type: ignore[misc]
+        response = await super()._make_request(method=method, params=params)
+        self.fixture.add_response(method=method, params=params, response=response)
+        return response
+
+
+class ReplayEthClient(RestEthClient):
+
+    def __init__(self, fixture: EthClientFixture, isTestnet: bool = False):
+        # NOTE(krishan711): replaying never goes over the network so there is no url or requester
+        super().__init__(url='', requester=typing.cast(Requester, None), isTestnet=isTestnet)
+        self.fixture = fixture
+
+    async def _make_request(self, method: str, params: Optional[List[Any]] = None) -> Any:  # type: ignore[misc]
+        response = self.fixture.get_response(method=method, params=params)
+        # NOTE(krishan711): get_block modifies the response in place for testnets so it gets a copy there
+        if self.isTestnet:
+            return json.loads(json.dumps(response))
+        return response
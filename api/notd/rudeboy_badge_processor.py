@@ -1,9 +1,14 @@
+import asyncio
 import datetime
 from typing import Any
 from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Set
 from typing import Tuple
 
 import sqlalchemy
+from sqlalchemy import ColumnElement
 from sqlalchemy import Select
 from sqlalchemy.sql import functions as sqlalchemyfunc
 
@@ -14,6 +19,8 @@ from notd.store.retriever import Retriever
 from notd.store.saver import Saver
 from notd.store.schema import BlocksTable
 from notd.store.schema import TokenMultiOwnershipsTable
+from notd.store.schema import TokenOwnershipsTable
+from notd.store.schema import TokenStakingsTable
 from notd.store.schema import TokenTransfersTable
 from notd.store.schema import UserRegistryOrderedOwnershipsMaterializedView
 
@@ -27,21 +34,78 @@ class RudeboysBadgeProcessor(CollectionBadgeProcessor):
         self.retriever= retriever
         self.saver= saver
 
-    async def calculate_all_gallery_badge_holders(self) -> List[RetrievedGalleryBadgeHolder]:
-        minterBadgeHolders = await self.calculate_minter_badge_holders()
-        oneOfOneBadgeHolders = await self.calculate_one_of_one_badge_holders()
-        neverSoldBadgeHolders = await self.calculate_never_sold_badge_holders()
-        collectorBadgeHolders = await self.calculate_collector_badge_holders()
-        hodlerBadgeHolders = await self.calculate_hodler_badge_holders()
-        diamondHandsBadgeHolders = await self.calculate_diamond_hands_badge_holders()
-        enthusiastBadgeHolders = await self.calculate_enthusiast_badge_holders()
-        seeingDoubleBadgeHolders = await self.calculate_seeing_double_badge_holders()
-        firstTenBadgeHolders = await self.calculate_first_ten_badge_holders()
-        specialEditionBadgeHolders = await self.calculate_special_edition_badge_holders()
-        allBadges = minterBadgeHolders + oneOfOneBadgeHolders + specialEditionBadgeHolders + neverSoldBadgeHolders + collectorBadgeHolders + hodlerBadgeHolders + diamondHandsBadgeHolders + enthusiastBadgeHolders + seeingDoubleBadgeHolders + firstTenBadgeHolders
+    async def get_changed_owner_addresses(self, sinceDate: datetime.datetime) -> Set[str]:
+        # NOTE(krishan711): every rule only depends on an owner's own transfers and ownerships, except one of one which depends on the token's supply
+        changedTransfersQuery: Select[Any] = (  # type: ignore[misc]
+            sqlalchemy.select(TokenTransfersTable.c.fromAddress, TokenTransfersTable.c.toAddress, TokenTransfersTable.c.tokenId)
+            .join(BlocksTable, TokenTransfersTable.c.blockNumber == BlocksTable.c.blockNumber)
+            .where(TokenTransfersTable.c.registryAddress == COLLECTION_RUDEBOYS_ADDRESS)
+            .where(BlocksTable.c.updatedDate >= sinceDate)
+        )
+        changedMultiOwnershipsQuery: Select[Any] = (  # type: ignore[misc]
+            sqlalchemy.select(TokenMultiOwnershipsTable.c.ownerAddress, TokenMultiOwnershipsTable.c.tokenId)
+            .where(TokenMultiOwnershipsTable.c.registryAddress == COLLECTION_RUDEBOYS_ADDRESS)
+            .where(TokenMultiOwnershipsTable.c.updatedDate >= sinceDate)
+        )
+        changedOwnershipsQuery: Select[Any] = (  # type: ignore[misc]
+            sqlalchemy.select(TokenOwnershipsTable.c.ownerAddress)
+            .where(TokenOwnershipsTable.c.registryAddress == COLLECTION_RUDEBOYS_ADDRESS)
+            .where(TokenOwnershipsTable.c.updatedDate >= sinceDate)
+        )
+        changedStakingsQuery: Select[Any] = (  # type: ignore[misc]
+            sqlalchemy.select(TokenStakingsTable.c.ownerAddress)
+            .where(TokenStakingsTable.c.registryAddress == COLLECTION_RUDEBOYS_ADDRESS)
+            .where(TokenStakingsTable.c.updatedDate >= sinceDate)
+        )
+        changedTransfersResult, changedMultiOwnershipsResult, changedOwnershipsResult, changedStakingsResult = await asyncio.gather(
+            self.retriever.database.execute(query=changedTransfersQuery),
+            self.retriever.database.execute(query=changedMultiOwnershipsQuery),
+            self.retriever.database.execute(query=changedOwnershipsQuery),
+            self.retriever.database.execute(query=changedStakingsQuery),
+        )
+        ownerAddresses: Set[str] = set()
+        changedTokenIds: Set[str] = set()
+        for fromAddress, toAddress, tokenId in changedTransfersResult:
+            ownerAddresses.update([fromAddress, toAddress])
+            changedTokenIds.add(tokenId)
+        for ownerAddress, tokenId in changedMultiOwnershipsResult:
+            ownerAddresses.add(ownerAddress)
+            changedTokenIds.add(tokenId)
+        ownerAddresses.update(ownerAddress for (ownerAddress, ) in changedOwnershipsResult)
+        ownerAddresses.update(ownerAddress for (ownerAddress, ) in changedStakingsResult)
+        if len(changedTokenIds) > 0:
+            tokenRecipientsQuery: Select[Any] = (  # type: ignore[misc]
+                sqlalchemy.select(TokenTransfersTable.c.toAddress.distinct())
+                .where(TokenTransfersTable.c.registryAddress == COLLECTION_RUDEBOYS_ADDRESS)
+                .where(TokenTransfersTable.c.tokenId.in_(changedTokenIds))
+            )
+            tokenRecipientsResult = await self.retriever.database.execute(query=tokenRecipientsQuery)
+            ownerAddresses.update(ownerAddress for (ownerAddress, ) in tokenRecipientsResult)
+        return ownerAddresses
+
+    async def calculate_all_gallery_badge_holders(self, ownerAddresses: Optional[Sequence[str]] = None) -> List[RetrievedGalleryBadgeHolder]:
+        badgeHolderLists = await asyncio.gather(
+            self.calculate_minter_badge_holders(ownerAddresses=ownerAddresses),
+            self.calculate_one_of_one_badge_holders(ownerAddresses=ownerAddresses),
+            self.calculate_special_edition_badge_holders(ownerAddresses=ownerAddresses),
+            self.calculate_never_sold_badge_holders(ownerAddresses=ownerAddresses),
+            self.calculate_collector_badge_holders(ownerAddresses=ownerAddresses),
+            self.calculate_hodler_badge_holders(ownerAddresses=ownerAddresses),
+            self.calculate_diamond_hands_badge_holders(ownerAddresses=ownerAddresses),
+            self.calculate_enthusiast_badge_holders(ownerAddresses=ownerAddresses),
+            self.calculate_seeing_double_badge_holders(ownerAddresses=ownerAddresses),
+            self.calculate_first_ten_badge_holders(ownerAddresses=ownerAddresses),
+        )
+        allBadges = [badgeHolder for badgeHolders in badgeHolderLists for badgeHolder in badgeHolders]
         return allBadges
 
-    async def calculate_minter_badge_holders(self) -> List[RetrievedGalleryBadgeHolder]:
+    @staticmethod
+    def _filter_owners(query: Select[Any], ownerColumn: ColumnElement[Any], ownerAddresses: Optional[Sequence[str]]) -> Select[Any]:  # type: ignore[misc]
+        if ownerAddresses is None:
+            return query
+        return query.where(ownerColumn.in_(ownerAddresses))
+
+    async def calculate_minter_badge_holders(self, ownerAddresses: Optional[Sequence[str]] = None) -> List[RetrievedGalleryBadgeHolder]:
         query: Select[Any] = (  # type: ignore[misc]
             sqlalchemy.select(TokenTransfersTable.c.registryAddress.label('registryAddress'), TokenTransfersTable.c.toAddress.label('ownerAddress'), sqlalchemyfunc.min(BlocksTable.c.blockDate).label('achievedDate'))
             .join(BlocksTable, TokenTransfersTable.c.blockNumber == BlocksTable.c.blockNumber, isouter=True)
@@ -49,11 +113,12 @@ class RudeboysBadgeProcessor(CollectionBadgeProcessor):
             .where(TokenTransfersTable.c.fromAddress == RUDEBOYS_OWNER_ADDRESS)
             .group_by(TokenTransfersTable.c.registryAddress, TokenTransfersTable.c.toAddress)
         )
+        query = self._filter_owners(query=query, ownerColumn=TokenTransfersTable.c.toAddress, ownerAddresses=ownerAddresses)
         result = await self.retriever.database.execute(query=query)
         minterBadgeHolders = [RetrievedGalleryBadgeHolder(registryAddress=row.registryAddress, ownerAddress=row.ownerAddress, badgeKey="MINTER", achievedDate=row.achievedDate) for row in result.mappings()]
         return minterBadgeHolders
 
-    async def calculate_one_of_one_badge_holders(self) -> List[RetrievedGalleryBadgeHolder]:
+    async def calculate_one_of_one_badge_holders(self, ownerAddresses: Optional[Sequence[str]] = None) -> List[RetrievedGalleryBadgeHolder]:
         oneOfOneQuery: Select[Any] = (  # type: ignore[misc]
             sqlalchemy.select(TokenMultiOwnershipsTable.c.tokenId)
             .where(TokenMultiOwnershipsTable.c.registryAddress == COLLECTION_RUDEBOYS_ADDRESS)
@@ -67,11 +132,12 @@ class RudeboysBadgeProcessor(CollectionBadgeProcessor):
             .where(TokenTransfersTable.c.tokenId.in_(oneOfOneQuery))
             .group_by(TokenTransfersTable.c.registryAddress, TokenTransfersTable.c.toAddress)
         )
+        query = self._filter_owners(query=query, ownerColumn=TokenTransfersTable.c.toAddress, ownerAddresses=ownerAddresses)
         result = await self.retriever.database.execute(query=query)
         oneOfOneBadgeHolders = [RetrievedGalleryBadgeHolder(registryAddress=row.registryAddress, ownerAddress=row.ownerAddress, badgeKey="ONE_OF_ONE", achievedDate=row.achievedDate) for row in result.mappings()]
         return oneOfOneBadgeHolders
 
-    async def calculate_never_sold_badge_holders(self) -> List[RetrievedGalleryBadgeHolder]:
+    async def calculate_never_sold_badge_holders(self, ownerAddresses: Optional[Sequence[str]] = None) -> List[RetrievedGalleryBadgeHolder]:
         soldTokenQuery: Select[Any] = (  # type: ignore[misc]
                 sqlalchemy.select(TokenTransfersTable.c.fromAddress)
                 .where(TokenTransfersTable.c.registryAddress == COLLECTION_RUDEBOYS_ADDRESS)
@@ -84,11 +150,12 @@ class RudeboysBadgeProcessor(CollectionBadgeProcessor):
                 .where(TokenTransfersTable.c.toAddress.not_in(soldTokenQuery))
                 .group_by(TokenTransfersTable.c.registryAddress, TokenTransfersTable.c.toAddress)
             )
+        query = self._filter_owners(query=query, ownerColumn=TokenTransfersTable.c.toAddress, ownerAddresses=ownerAddresses)
         result = await self.retriever.database.execute(query=query)
         neverSoldBadgeHolders = [RetrievedGalleryBadgeHolder(registryAddress=row.registryAddress, ownerAddress=row.ownerAddress, badgeKey="NEVER_SOLD", achievedDate=row.achievedDate) for row in result.mappings()]
         return neverSoldBadgeHolders
 
-    async def _get_holders_per_limit(self, rewardTokenIndex: int) -> List[Tuple[str, str, datetime.datetime]]:
+    async def _get_holders_per_limit(self, rewardTokenIndex: int, ownerAddresses: Optional[Sequence[str]] = None) -> List[Tuple[str, str, datetime.datetime]]:
         query: Select[Any] = (  # type: ignore[misc]
             sqlalchemy.select(UserRegistryOrderedOwnershipsMaterializedView.c.registryAddress, UserRegistryOrderedOwnershipsMaterializedView.c.ownerAddress, TokenMultiOwnershipsTable.c.latestTransferDate.label('achievedDate'))
             .join(TokenMultiOwnershipsTable, sqlalchemy.and_(TokenMultiOwnershipsTable.c.registryAddress == UserRegistryOrderedOwnershipsMaterializedView.c.registryAddress, TokenMultiOwnershipsTable.c.ownerAddress == UserRegistryOrderedOwnershipsMaterializedView.c.ownerAddress, TokenMultiOwnershipsTable.c.tokenId == UserRegistryOrderedOwnershipsMaterializedView.c.tokenId))
@@ -96,31 +163,32 @@ class RudeboysBadgeProcessor(CollectionBadgeProcessor):
             .where(UserRegistryOrderedOwnershipsMaterializedView.c.quantity > 0)
             .where(UserRegistryOrderedOwnershipsMaterializedView.c.ownerTokenIndex == rewardTokenIndex)
         )
+        query = self._filter_owners(query=query, ownerColumn=UserRegistryOrderedOwnershipsMaterializedView.c.ownerAddress, ownerAddresses=ownerAddresses)
         result = await self.retriever.database.execute(query=query)
         holders = [(registryAddress, ownerAddress, achievedDate) for registryAddress, ownerAddress, achievedDate in result] #pylint: disable=unnecessary-comprehension
         return holders
 
-    async def calculate_collector_badge_holders(self) -> List[RetrievedGalleryBadgeHolder]:
-        holders = await self._get_holders_per_limit(rewardTokenIndex=1)
+    async def calculate_collector_badge_holders(self, ownerAddresses: Optional[Sequence[str]] = None) -> List[RetrievedGalleryBadgeHolder]:
+        holders = await self._get_holders_per_limit(rewardTokenIndex=1, ownerAddresses=ownerAddresses)
         collectorBadgeHolders = [RetrievedGalleryBadgeHolder(registryAddress=registryAddress, ownerAddress=ownerAddress, badgeKey="COLLECTOR", achievedDate=achievedDate) for (registryAddress, ownerAddress, achievedDate) in holders]
         return collectorBadgeHolders
 
-    async def calculate_hodler_badge_holders(self) -> List[RetrievedGalleryBadgeHolder]:
-        holders = await self._get_holders_per_limit(rewardTokenIndex=11)
+    async def calculate_hodler_badge_holders(self, ownerAddresses: Optional[Sequence[str]] = None) -> List[RetrievedGalleryBadgeHolder]:
+        holders = await self._get_holders_per_limit(rewardTokenIndex=11, ownerAddresses=ownerAddresses)
         hodlerBadgeHolders = [RetrievedGalleryBadgeHolder(registryAddress=registryAddress, ownerAddress=ownerAddress, badgeKey="HODLER", achievedDate=achievedDate) for (registryAddress, ownerAddress, achievedDate) in holders]
         return hodlerBadgeHolders
 
-    async def calculate_diamond_hands_badge_holders(self) -> List[RetrievedGalleryBadgeHolder]:
-        holders = await self._get_holders_per_limit(rewardTokenIndex=21)
+    async def calculate_diamond_hands_badge_holders(self, ownerAddresses: Optional[Sequence[str]] = None) -> List[RetrievedGalleryBadgeHolder]:
+        holders = await self._get_holders_per_limit(rewardTokenIndex=21, ownerAddresses=ownerAddresses)
         diamondHandsBadgeHolders = [RetrievedGalleryBadgeHolder(registryAddress=registryAddress, ownerAddress=ownerAddress, badgeKey="DIAMOND_HANDS", achievedDate=achievedDate) for (registryAddress, ownerAddress, achievedDate) in holders]
         return diamondHandsBadgeHolders
 
-    async def calculate_enthusiast_badge_holders(self) -> List[RetrievedGalleryBadgeHolder]:
-        holders = await self._get_holders_per_limit(rewardTokenIndex=51)
+    async def calculate_enthusiast_badge_holders(self, ownerAddresses: Optional[Sequence[str]] = None) -> List[RetrievedGalleryBadgeHolder]:
+        holders = await self._get_holders_per_limit(rewardTokenIndex=51, ownerAddresses=ownerAddresses)
         enthusiastBadgeHolders = [RetrievedGalleryBadgeHolder(registryAddress=registryAddress, ownerAddress=ownerAddress, badgeKey="ENTHUSIAST", achievedDate=achievedDate) for (registryAddress, ownerAddress, achievedDate) in holders]
         return enthusiastBadgeHolders
 
-    async def calculate_seeing_double_badge_holders(self) -> List[RetrievedGalleryBadgeHolder]:
+    async def calculate_seeing_double_badge_holders(self, ownerAddresses: Optional[Sequence[str]] = None) -> List[RetrievedGalleryBadgeHolder]:
         query: Select[Any] = (  # type: ignore[misc]
             sqlalchemy.select(UserRegistryOrderedOwnershipsMaterializedView.c.registryAddress, UserRegistryOrderedOwnershipsMaterializedView.c.ownerAddress, sqlalchemyfunc.min(TokenMultiOwnershipsTable.c.latestTransferDate).label('achievedDate'))
             .join(TokenMultiOwnershipsTable, sqlalchemy.and_(TokenMultiOwnershipsTable.c.registryAddress == UserRegistryOrderedOwnershipsMaterializedView.c.registryAddress, TokenMultiOwnershipsTable.c.ownerAddress == UserRegistryOrderedOwnershipsMaterializedView.c.ownerAddress, TokenMultiOwnershipsTable.c.tokenId == UserRegistryOrderedOwnershipsMaterializedView.c.tokenId))
@@ -128,15 +196,16 @@ class RudeboysBadgeProcessor(CollectionBadgeProcessor):
             .where(UserRegistryOrderedOwnershipsMaterializedView.c.quantity >= 2)
             .group_by(UserRegistryOrderedOwnershipsMaterializedView.c.registryAddress, UserRegistryOrderedOwnershipsMaterializedView.c.ownerAddress)
         )
+        query = self._filter_owners(query=query, ownerColumn=UserRegistryOrderedOwnershipsMaterializedView.c.ownerAddress, ownerAddresses=ownerAddresses)
         result = await self.retriever.database.execute(query=query)
         seeingDoubleBadgeHolders = [RetrievedGalleryBadgeHolder(registryAddress=row.registryAddress, ownerAddress=row.ownerAddress, badgeKey="SEEING_DOUBLE", achievedDate=row.achievedDate) for row in result.mappings()]
         return seeingDoubleBadgeHolders
 
-    async def calculate_first_ten_badge_holders(self) -> List[RetrievedGalleryBadgeHolder]:
+    async def calculate_first_ten_badge_holders(self, ownerAddresses: Optional[Sequence[str]] = None) -> List[RetrievedGalleryBadgeHolder]:  # pylint: disable=unused-argument
         firstTenBadgeHolders: List[RetrievedGalleryBadgeHolder] = []
         return firstTenBadgeHolders
 
-    async def calculate_special_edition_badge_holders(self) -> List[RetrievedGalleryBadgeHolder]:
+    async def calculate_special_edition_badge_holders(self, ownerAddresses: Optional[Sequence[str]] = None) -> List[RetrievedGalleryBadgeHolder]:
         specialEditionBadgeHolders: List[RetrievedGalleryBadgeHolder] = []
         query: Select[Any] = (  # type: ignore[misc]
             sqlalchemy.select(UserRegistryOrderedOwnershipsMaterializedView.c.registryAddress, UserRegistryOrderedOwnershipsMaterializedView.c.ownerAddress, sqlalchemyfunc.min(TokenMultiOwnershipsTable.c.latestTransferDate).label('achievedDate'))
@@ -146,6 +215,7 @@ class RudeboysBadgeProcessor(CollectionBadgeProcessor):
             .where(UserRegistryOrderedOwnershipsMaterializedView.c.quantity > 0)
             .group_by(UserRegistryOrderedOwnershipsMaterializedView.c.registryAddress, UserRegistryOrderedOwnershipsMaterializedView.c.ownerAddress)
         )
+        query = self._filter_owners(query=query, ownerColumn=UserRegistryOrderedOwnershipsMaterializedView.c.ownerAddress, ownerAddresses=ownerAddresses)
         result = await self.retriever.database.execute(query=query)
         specialEditionBadgeHolders = [RetrievedGalleryBadgeHolder(registryAddress=row.registryAddress, ownerAddress=row.ownerAddress, badgeKey="SPECIAL_EDITION", achievedDate=row.achievedDate) for row in result.mappings()]
         return specialEditionBadgeHolders
@@ -0,0 +1,130 @@
+import contextlib
+import dataclasses
+import time
+import typing
+from typing import AsyncIterator
+from typing import Optional
+
+import sqlalchemy
+from core import logging
+from core.exceptions import InternalServerErrorException
+from core.store.database import DatabaseConnection
+from core.store.database import ResultType
+from sqlalchemy.engine import Result
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.sql.selectable import TypedReturnsRows
+
+from notd.store.query_counting_database import QueryCountingDatabase
+
+
+@dataclasses.dataclass
+class PoolStatus:
+    poolSize: int
+    maxOverflow: int
+    checkedOutCount: int
+    waitingCount: int
+    checkoutCount: int
+    timeoutCount: int
+    averageWaitSeconds: float
+    maxWaitSeconds: float
+
+
+class PooledDatabase(QueryCountingDatabase):
+
+    def __init__(self, connectionString: str, poolSize: int = 5, maxOverflow: int = 10, poolTimeoutSeconds: float = 30, reportIntervalSeconds: float = 60) -> None:
+        super().__init__(connectionString=connectionString)
+        self.poolSize = poolSize
+        self.maxOverflow = maxOverflow
+        self.poolTimeoutSeconds = poolTimeoutSeconds
+        self.reportIntervalSeconds = reportIntervalSeconds
+        self.waitingCount = 0
+        self.checkoutCount = 0
+        self.timeoutCount = 0
+        self.totalWaitSeconds = 0.0
+        self.maxWaitSeconds = 0.0
+        self.lastReportTime = time.monotonic()
+
+    async def connect(self) -> None:
+        if not self._engine:
+            self._engine = create_async_engine(self.connectionString, future=True, pool_size=self.poolSize, max_overflow=self.maxOverflow, pool_timeout=self.poolTimeoutSeconds)
+
+    def get_pool_status(self) -> PoolStatus:
+        checkedOutCount = typing.cast(sqlalchemy.QueuePool, self._engine.pool).checkedout() if self._engine else 0
+        return PoolStatus(
+            poolSize=self.poolSize,
+            maxOverflow=self.maxOverflow,
+            checkedOutCount=checkedOutCount,
+            waitingCount=self.waitingCount,
+            checkoutCount=self.checkoutCount,
+            timeoutCount=self.timeoutCount,
+            averageWaitSeconds=(self.totalWaitSeconds / self.checkoutCount) if self.checkoutCount > 0 else 0,
+            maxWaitSeconds=self.maxWaitSeconds,
+        )
+
+    def reset_pool_metrics(self) -> None:
+        self.checkoutCount = 0
+        self.timeoutCount = 0
+        self.totalWaitSeconds = 0.0
+        self.maxWaitSeconds = 0.0
+
+    def _report_pool_status(self) -> None:
+        if time.monotonic() - self.lastReportTime < self.reportIntervalSeconds:
+            return
+        self.lastReportTime = time.monotonic()
+        poolStatus = self.get_pool_status()
+        logging.stat('DATABASE_POOL_CHECKED_OUT', 'pool', poolStatus.checkedOutCount)
+        logging.stat('DATABASE_POOL_SATURATION', 'pool', poolStatus.checkedOutCount / (poolStatus.poolSize + poolStatus.maxOverflow))
+        logging.stat('DATABASE_POOL_WAITING', 'pool', poolStatus.waitingCount)
+        logging.stat('DATABASE_POOL_CHECKOUTS', 'pool', poolStatus.checkoutCount)
+        logging.stat('DATABASE_POOL_TIMEOUTS', 'pool', poolStatus.timeoutCount)
+        logging.stat('DATABASE_POOL_AVERAGE_WAIT_MS', 'pool', poolStatus.averageWaitSeconds * 1000)
+        logging.stat('DATABASE_POOL_MAX_WAIT_MS', 'pool', poolStatus.maxWaitSeconds * 1000)
+        self.reset_pool_metrics()
+
+    @contextlib.asynccontextmanager
+    async def _checkout_connection(self, shouldBegin: bool) -> AsyncIterator[DatabaseConnection]:
+        # NOTE(krishan711): all connections go through here so the time spent waiting on a saturated pool can be measured
+        if not self._engine:
+            raise InternalServerErrorException(message='Engine has not been established. Please called collect() first.')
+        connection = self._engine.connect()
+        self.waitingCount += 1
+        startTime = time.perf_counter()
+        try:
+            await connection.start()
+        except sqlalchemy.exc.TimeoutError:
+            self.timeoutCount += 1
+            raise
+        finally:
+            self.waitingCount -= 1
+        waitSeconds = time.perf_counter() - startTime
+        self.checkoutCount += 1
+        self.totalWaitSeconds += waitSeconds
+        self.maxWaitSeconds = max(self.maxWaitSeconds, waitSeconds)
+        self._report_pool_status()
+        try:
+            if shouldBegin:
+                async with connection.begin():
+                    yield connection
+            else:
+                yield connection
+        finally:
+            await connection.close()
+
+    @contextlib.asynccontextmanager
+    async def create_transaction(self) -> AsyncIterator[DatabaseConnection]:
+        async with self._checkout_connection(shouldBegin=True) as connection:
+            yield connection
+
+    @contextlib.asynccontextmanager
+    async def create_context_connection(self) -> AsyncIterator[DatabaseConnection]:
+        if self._get_connection() is not None:
+            raise InternalServerErrorException(message='Connection has already been established in this context.')
+        async with self._checkout_connection(shouldBegin=True) as connection:
+            self._connectionContext.set(connection)
+            yield connection
+
+    async def execute(self, query: TypedReturnsRows[ResultType], connection: Optional[DatabaseConnection] = None) -> Result[ResultType]:
+        if connection or self._get_connection():
+            return await super().execute(query=query, connection=connection)
+        async with self._checkout_connection(shouldBegin=False) as temporaryConnection:
+            return await super().execute(query=query, connection=temporaryConnection)
@@ -0,0 +1,39 @@
+import contextlib
+import contextvars
+from typing import Iterator
+from typing import Optional
+
+from core.store.database import Database
+from core.store.database import DatabaseConnection
+from core.store.database import ResultType
+from sqlalchemy.engine import Result
+from sqlalchemy.sql.selectable import TypedReturnsRows
+
+
+class QueryCounter:
+
+    def __init__(self) -> None:
+        self.queryCount = 0
+
+
+_queryCounterContext = contextvars.ContextVar[Optional[QueryCounter]]('_queryCounterContext', default=None)
+
+
+@contextlib.contextmanager
+def count_queries() -> Iterator[QueryCounter]:
+    # NOTE(krishan711): tasks started inside the block copy the context so their queries are counted too
+    queryCounter = QueryCounter()
+    token = _queryCounterContext.set(queryCounter)
+    try:
+        yield queryCounter
+    finally:
+        _queryCounterContext.reset(token)
+
+
+class QueryCountingDatabase(Database):
+
+    async def execute(self, query: TypedReturnsRows[ResultType], connection: Optional[DatabaseConnection] = None) -> Result[ResultType]:
+        queryCounter = _queryCounterContext.get()
+        if queryCounter is not None:
+            queryCounter.queryCount += 1
+        return await super().execute(query=query, connection=connection)
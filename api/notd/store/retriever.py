@@ -1,4 +1,6 @@
 import typing
+from typing import Any
+from typing import AsyncIterator
 from typing import List
 from typing import Optional
 from typing import Sequence
@@ -11,6 +13,7 @@ from core.store.retriever import DateFieldFilter
 from core.store.retriever import FieldFilter
 from core.store.retriever import Order
 from core.store.retriever import Retriever as CoreRetriever
+from sqlalchemy.engine import RowMapping
 from sqlalchemy.sql import Select
 
 from notd.model import AccountCollectionGm
@@ -27,6 +30,7 @@ from notd.model import Lock
 from notd.model import SubCollection
 from notd.model import SubCollectionToken
 from notd.model import TokenAttribute
+from notd.model import TokenAttributeBitmap
 from notd.model import TokenCustomization
 from notd.model import TokenListing
 from notd.model import TokenMetadata
@@ -50,6 +54,7 @@ from notd.store.schema import LatestUpdatesTable
 from notd.store.schema import LocksTable
 from notd.store.schema import SubCollectionsTable
 from notd.store.schema import SubCollectionTokensTable
+from notd.store.schema import TokenAttributeBitmapsTable
 from notd.store.schema import TokenAttributesTable
 from notd.store.schema import TokenCollectionOverlapsTable
 from notd.store.schema import TokenCollectionsTable
@@ -76,6 +81,7 @@ from notd.store.schema_conversions import latest_update_from_row
 from notd.store.schema_conversions import lock_from_row
 from notd.store.schema_conversions import sub_collection_from_row
 from notd.store.schema_conversions import sub_collection_token_from_row
+from notd.store.schema_conversions import token_attribute_bitmap_from_row
 from notd.store.schema_conversions import token_attribute_from_row
 from notd.store.schema_conversions import token_customization_from_row
 from notd.store.schema_conversions import token_listing_from_row
@@ -92,6 +98,20 @@ from notd.store.schema_conversions import user_profile_from_row
 
 class Retriever(CoreRetriever):
 
+    async def _stream_rows(self, query: Select[ResultType], batchSize: int, connection: Optional[DatabaseConnection] = None) -> AsyncIterator[Sequence[RowMapping]]:
+        # NOTE(krishan711): uses a server-side cursor so only batchSize rows are held in memory at once.
+        # The cursor needs a transaction so without a connection one is held open until the caller has finished iterating.
+        query = query.execution_options(yield_per=batchSize)
+        if connection:
+            result = await connection.stream(statement=query)
+            async for rows in result.mappings().partitions(batchSize):
+                yield rows
+            return
+        async with self.database.create_transaction() as transactionConnection:
+            result = await transactionConnection.stream(statement=query)
+            async for rows in result.mappings().partitions(batchSize):
+                yield rows
+
     async def list_blocks(self, fieldFilters: Optional[Sequence[FieldFilter]] = None, orders: Optional[Sequence[Order]] = None, limit: Optional[int] = None, offset: Optional[int] = None, connection: Optional[DatabaseConnection] = None) -> List[Block]:
         query = BlocksTable.select()
         if fieldFilters:
@@ -117,7 +137,12 @@ class Retriever(CoreRetriever):
         block = block_from_row(row)
         return block
 
-    async def list_token_transfers(self, fieldFilters: Optional[Sequence[FieldFilter]] = None, orders: Optional[Sequence[Order]] = None, limit: Optional[int] = None, offset: Optional[int] = None, connection: Optional[DatabaseConnection] = None) -> List[TokenTransfer]:
+    async def query_token_transfers(self, query: Select[ResultType], connection: Optional[DatabaseConnection] = None) -> List[TokenTransfer]:
+        result = await self.database.execute(query=query, connection=connection)
+        tokenTransfers = [token_transfer_from_row(row) for row in result.mappings()]
+        return tokenTransfers
+
+    def _get_token_transfers_query(self, fieldFilters: Optional[Sequence[FieldFilter]] = None, orders: Optional[Sequence[Order]] = None) -> Select[Any]:  # type: ignore[misc]
         query = (
             sqlalchemy.select(TokenTransfersTable, BlocksTable)
             .join(BlocksTable, BlocksTable.c.blockNumber == TokenTransfersTable.c.blockNumber)
@@ -134,6 +159,10 @@ class Retriever(CoreRetriever):
                     query = self._apply_order(query=query, table=BlocksTable, order=order)
                 else:
                     query = self._apply_order(query=query, table=TokenTransfersTable, order=order)
+        return query
+
+    async def list_token_transfers(self, fieldFilters: Optional[Sequence[FieldFilter]] = None, orders: Optional[Sequence[Order]] = None, limit: Optional[int] = None, offset: Optional[int] = None, connection: Optional[DatabaseConnection] = None) -> List[TokenTransfer]:
+        query = self._get_token_transfers_query(fieldFilters=fieldFilters, orders=orders)
         if limit:
             query = query.limit(limit)
         if offset:
@@ -142,6 +171,11 @@ class Retriever(CoreRetriever):
         tokenTransfers = [token_transfer_from_row(row) for row in result.mappings()]
         return tokenTransfers
 
+    async def stream_token_transfers(self, fieldFilters: Optional[Sequence[FieldFilter]] = None, orders: Optional[Sequence[Order]] = None, batchSize: int = 1000, connection: Optional[DatabaseConnection] = None) -> AsyncIterator[List[TokenTransfer]]:
+        query = self._get_token_transfers_query(fieldFilters=fieldFilters, orders=orders)
+        async for rows in self._stream_rows(query=query, batchSize=batchSize, connection=connection):
+            yield [token_transfer_from_row(row) for row in rows]
+
     async def query_token_metadatas(self, query: Select[ResultType], connection: Optional[DatabaseConnection] = None) -> List[TokenMetadata]:
         result = await self.database.execute(query=query, connection=connection)
         tokenMetadatas = [token_metadata_from_row(row) for row in result.mappings()]
@@ -190,6 +224,11 @@ class Retriever(CoreRetriever):
         collection = collection_from_row(row)
         return collection
 
+    async def query_token_ownerships(self, query: Select[ResultType], connection: Optional[DatabaseConnection] = None) -> List[TokenOwnership]:
+        result = await self.database.execute(query=query, connection=connection)
+        tokenOwnerships = [token_ownership_from_row(row) for row in result.mappings()]
+        return tokenOwnerships
+
     async def list_token_ownerships(self, fieldFilters: Optional[Sequence[FieldFilter]] = None, orders: Optional[Sequence[Order]] = None, limit: Optional[int] = None, connection: Optional[DatabaseConnection] = None) -> List[TokenOwnership]:
         query = TokenOwnershipsTable.select()
         if fieldFilters:
@@ -249,6 +288,15 @@ class Retriever(CoreRetriever):
         collectionActivities = [collection_activity_from_row(row) for row in result.mappings()]
         return collectionActivities
 
+    async def stream_collection_activities(self, fieldFilters: Optional[Sequence[FieldFilter]] = None, orders: Optional[Sequence[Order]] = None, batchSize: int = 1000, connection: Optional[DatabaseConnection] = None) -> AsyncIterator[List[CollectionHourlyActivity]]:
+        query = CollectionHourlyActivitiesTable.select()
+        if fieldFilters:
+            query = self._apply_field_filters(query=query, table=CollectionHourlyActivitiesTable, fieldFilters=fieldFilters)
+        if orders:
+            query = self._apply_orders(query=query, table=CollectionHourlyActivitiesTable, orders=orders)
+        async for rows in self._stream_rows(query=query, batchSize=batchSize, connection=connection):
+            yield [collection_activity_from_row(row) for row in rows]
+
     async def list_collection_total_activities(self, fieldFilters: Optional[Sequence[FieldFilter]] = None, orders: Optional[Sequence[Order]] = None, limit: Optional[int] = None, connection: Optional[DatabaseConnection] = None) -> List[CollectionTotalActivity]:
         query = CollectionTotalActivitiesTable.select()
         if fieldFilters:
@@ -322,6 +370,18 @@ class Retriever(CoreRetriever):
         tokenAttributes = [token_attribute_from_row(row) for row in result.mappings()]
         return tokenAttributes
 
+    async def list_token_attribute_bitmaps(self, fieldFilters: Optional[Sequence[FieldFilter]] = None, orders: Optional[Sequence[Order]] = None, limit: Optional[int] = None, connection: Optional[DatabaseConnection] = None) -> List[TokenAttributeBitmap]:
+        query = TokenAttributeBitmapsTable.select()
+        if fieldFilters:
+            query = self._apply_field_filters(query=query, table=TokenAttributeBitmapsTable, fieldFilters=fieldFilters)
+        if orders:
+            query = self._apply_orders(query=query, table=TokenAttributeBitmapsTable, orders=orders)
+        if limit:
+            query = query.limit(limit)
+        result = await self.database.execute(query=query, connection=connection)
+        tokenAttributeBitmaps = [token_attribute_bitmap_from_row(row) for row in result.mappings()]
+        return tokenAttributeBitmaps
+
     async def list_latest_token_listings(self, fieldFilters: Optional[Sequence[FieldFilter]] = None, orders: Optional[Sequence[Order]] = None, limit: Optional[int] = None, connection: Optional[DatabaseConnection] = None) -> List[TokenListing]:
         query = LatestTokenListingsTable.select()
         if fieldFilters:
@@ -1,17 +1,25 @@
 # pylint: disable=too-many-lines
 import datetime
+import decimal
 from typing import TYPE_CHECKING
 from typing import Any
 from typing import Dict
 from typing import List
 from typing import Optional
 from typing import Sequence
+from typing import Tuple
 
+import asyncpg  # type: ignore[import]
+import sqlalchemy
 from core.store.database import DatabaseConnection
 from core.store.saver import Saver as CoreSaver
+from core.store.saver import SavingException
 from core.util import date_util
 from core.util import list_util
 from core.util.typing_util import JSON
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.sql import Executable
+from sqlalchemy.sql import functions as sqlalchemyfunc
 
 from notd.model import AccountCollectionGm
 from notd.model import AccountGm
@@ -24,15 +32,20 @@ from notd.model import LatestUpdate
 from notd.model import Lock
 from notd.model import RetrievedCollectionOverlap
 from notd.model import RetrievedGalleryBadgeHolder
+from notd.model import RetrievedSubCollectionToken
 from notd.model import RetrievedTokenAttribute
+from notd.model import RetrievedTokenAttributeBitmap
 from notd.model import RetrievedTokenListing
 from notd.model import RetrievedTokenMultiOwnership
+from notd.model import RetrievedTokenOwnership
 from notd.model import RetrievedTokenStaking
 from notd.model import RetrievedTokenTransfer
+from notd.model import RetrievedTwitterProfile
 from notd.model import Signature
 from notd.model import SubCollection
 from notd.model import SubCollectionToken
 from notd.model import TokenCustomization
+from notd.model import TokenListingsSyncResult
 from notd.model import TokenMetadata
 from notd.model import TokenOwnership
 from notd.model import TwitterCredential
@@ -41,16 +54,22 @@ from notd.model import UserInteraction
 from notd.model import UserProfile
 from notd.store.schema import AccountCollectionGmsTable
 from notd.store.schema import AccountGmsTable
+from notd.store.schema import BestTokenListingsTable
 from notd.store.schema import BlocksTable
 from notd.store.schema import CollectionHourlyActivitiesTable
 from notd.store.schema import CollectionTotalActivitiesTable
 from notd.store.schema import GalleryBadgeAssignmentsTable
 from notd.store.schema import GalleryBadgeHoldersTable
+from notd.store.schema import GmAccountCollectionCountsTable
+from notd.store.schema import GmAccountCountsTable
+from notd.store.schema import GmCollectionCountsTable
+from notd.store.schema import LatestTokenListingsStagingTable
 from notd.store.schema import LatestTokenListingsTable
 from notd.store.schema import LatestUpdatesTable
 from notd.store.schema import LocksTable
 from notd.store.schema import SubCollectionsTable
 from notd.store.schema import SubCollectionTokensTable
+from notd.store.schema import TokenAttributeBitmapsTable
 from notd.store.schema import TokenAttributesTable
 from notd.store.schema import TokenCollectionOverlapsTable
 from notd.store.schema import TokenCollectionsTable
@@ -58,6 +77,7 @@ from notd.store.schema import TokenCustomizationsTable
 from notd.store.schema import TokenMetadatasTable
 from notd.store.schema import TokenMultiOwnershipsTable
 from notd.store.schema import TokenOwnershipsTable
+from notd.store.schema import TokenOwnershipsView
 from notd.store.schema import TokenStakingsTable
 from notd.store.schema import TokenTransfersTable
 from notd.store.schema import TwitterCredentialsTable
@@ -76,8 +96,89 @@ _EMPTY_OBJECT = '_EMPTY_OBJECT'
 CreateRecordDict = Dict[_DMLColumnArgument, Any]  # type: ignore[misc]
 UpdateRecordDict = Dict[_DMLColumnArgument, Any]  # type: ignore[misc]
 
+# NOTE(krishan711): a uint256 has at most 78 digits which is what the NUMERIC(78) sort key columns hold
+_MAX_TOKEN_ID_SORT_KEY_LENGTH = 78
+
+
+# NOTE(krishan711): below this many rows the chunked multi-row inserts are as fast as copying
+_COPY_INSERT_MIN_ROW_COUNT = 1000
+
+_COPY_STAGING_TABLES: Dict[str, sqlalchemy.Table] = {}
+
+
+def get_token_id_sort_key(tokenId: str) -> Optional[int]:
+    if not tokenId.isascii() or not tokenId.isdecimal() or len(tokenId) > _MAX_TOKEN_ID_SORT_KEY_LENGTH:
+        return None
+    return int(tokenId)
+
+
+def _get_copy_staging_table(table: sqlalchemy.Table) -> sqlalchemy.Table:
+    stagingTable = _COPY_STAGING_TABLES.get(table.name)
+    if stagingTable is None:
+        # NOTE(krishan711): the primary key draws from the real table's sequence as rows are copied so each staged row knows its final id
+        idColumn = list(table.primary_key.columns)[0]
+        columns = [sqlalchemy.Column(key=idColumn.key, name=idColumn.name, type_=idColumn.type, nullable=False, server_default=sqlalchemy.text(f"nextval(pg_get_serial_sequence('{table.name}', '{idColumn.name}'))"))]
+        columns += [sqlalchemy.Column(key=column.key, name=column.name, type_=column.type, nullable=True) for column in table.columns if not column.primary_key]
+        columns.append(sqlalchemy.Column(key='copyIndex', name='copy_index', type_=sqlalchemy.Integer, nullable=False))
+        stagingTable = sqlalchemy.Table(f'tmp_copy_{table.name}', sqlalchemy.MetaData(), *columns, prefixes=['TEMPORARY'], postgresql_on_commit='DROP')
+        _COPY_STAGING_TABLES[table.name] = stagingTable
+    return stagingTable
+
+
+def _get_copy_record_value(column: sqlalchemy.Column, value: object) -> object:  # type: ignore[type-arg]
+    # NOTE(krishan711): asyncpg's binary copy format needs Decimals for numeric columns
+    if isinstance(column.type, sqlalchemy.Numeric) and isinstance(value, (int, float, str)):
+        return decimal.Decimal(value)
+    return value
+
 class Saver(CoreSaver):
 
+    async def _execute_without_rows(self, query: Executable, connection: DatabaseConnection) -> None:
+        # NOTE(krishan711): for bulk writes where returning the affected rows would only send every row back unused
+        try:
+            await connection.execute(statement=query)
+        except Exception as exception:
+            raise SavingException(message=f'Error running save operation: {str(exception)}') from exception
+
+    async def _copy_insert(self, table: sqlalchemy.Table, valuesList: Sequence[CreateRecordDict], connection: Optional[DatabaseConnection] = None) -> List[int]:
+        # NOTE(krishan711): rows are copied into a temp table and then moved over with one INSERT ... SELECT so the table's constraints are checked as usual.
+        # Every column is listed in that insert so the table's column defaults never apply and valuesList must give every value itself.
+        if len(valuesList) == 0:
+            return []
+        if not connection:
+            async with self.create_transaction() as transactionConnection:
+                return await self._copy_insert(table=table, valuesList=valuesList, connection=transactionConnection)
+        stagingTable = _get_copy_staging_table(table=table)
+        idColumn = list(table.primary_key.columns)[0]
+        stagingIdColumn = stagingTable.c[idColumn.key]
+        copyColumns = [column for column in stagingTable.columns if column.key not in {stagingIdColumn.key, stagingTable.c.copyIndex.key}]
+        records = [tuple(_get_copy_record_value(column=column, value=values.get(column.key)) for column in copyColumns) + (copyIndex, ) for copyIndex, values in enumerate(valuesList)]
+        rawConnection = await connection.get_raw_connection()
+        driverConnection = rawConnection.driver_connection
+        if not isinstance(driverConnection, asyncpg.Connection):
+            raise SavingException(message=f'Copy operations need an asyncpg connection, got {type(driverConnection).__name__}')
+        try:
+            await connection.run_sync(stagingTable.create)
+            await driverConnection.copy_records_to_table(stagingTable.name, records=records, columns=[column.name for column in copyColumns] + [stagingTable.c.copyIndex.name])
+        except Exception as exception:
+            raise SavingException(message=f'Error running copy operation: {str(exception)}') from exception
+        insertedIdsCte = (
+            table.insert()
+            .from_select([table.c[column.key] for column in [stagingIdColumn, *copyColumns]], sqlalchemy.select(stagingIdColumn, *copyColumns))
+            .returning(idColumn)
+            .cte(name='inserted_ids')
+        )
+        # NOTE(krishan711): returning only sees the inserted table so the ids are joined back to their copy index to line them up with valuesList
+        query = (
+            sqlalchemy.select(insertedIdsCte.c[idColumn.key])
+            .join(stagingTable, stagingIdColumn == insertedIdsCte.c[idColumn.key])
+            .order_by(stagingTable.c.copyIndex)
+        )
+        result = await self._execute(query=query, connection=connection)
+        rowIds = [int(rowId) for rowId in result.scalars()]
+        await connection.run_sync(stagingTable.drop)
+        return rowIds
+
     @staticmethod
     def _get_create_token_transfer_values(retrievedTokenTransfer: RetrievedTokenTransfer) -> CreateRecordDict:
         return {
@@ -99,6 +200,7 @@ class Saver(CoreSaver):
             TokenTransfersTable.c.isSwap.key: retrievedTokenTransfer.isSwap,
             TokenTransfersTable.c.isBatch.key: retrievedTokenTransfer.isBatch,
             TokenTransfersTable.c.isOutbound.key: retrievedTokenTransfer.isOutbound,
+            TokenTransfersTable.c.tokenIdSortKey.key: get_token_id_sort_key(tokenId=retrievedTokenTransfer.tokenId),
         }
 
     async def create_token_transfer(self, retrievedTokenTransfer: RetrievedTokenTransfer, connection: Optional[DatabaseConnection] = None) -> int:
@@ -111,6 +213,8 @@ class Saver(CoreSaver):
     async def create_token_transfers(self, retrievedTokenTransfers: Sequence[RetrievedTokenTransfer], connection: Optional[DatabaseConnection] = None) -> List[int]:
         if len(retrievedTokenTransfers) == 0:
             return []
+        if len(retrievedTokenTransfers) >= _COPY_INSERT_MIN_ROW_COUNT:
+            return await self.copy_token_transfers(retrievedTokenTransfers=retrievedTokenTransfers, connection=connection)
         tokenTransferIds = []
         for chunk in list_util.generate_chunks(lst=retrievedTokenTransfers, chunkSize=100):
             values = [self._get_create_token_transfer_values(retrievedTokenTransfer=retrievedTokenTransfer) for retrievedTokenTransfer in chunk]
@@ -119,6 +223,10 @@ class Saver(CoreSaver):
             tokenTransferIds += [row[0] for row in rows]
         return tokenTransferIds
 
+    async def copy_token_transfers(self, retrievedTokenTransfers: Sequence[RetrievedTokenTransfer], connection: Optional[DatabaseConnection] = None) -> List[int]:
+        valuesList = [self._get_create_token_transfer_values(retrievedTokenTransfer=retrievedTokenTransfer) for retrievedTokenTransfer in retrievedTokenTransfers]
+        return await self._copy_insert(table=TokenTransfersTable, valuesList=valuesList, connection=connection)
+
     async def delete_token_transfer(self, tokenTransferId: int, connection: Optional[DatabaseConnection] = None) -> None:
         query = TokenTransfersTable.delete().where(TokenTransfersTable.c.tokenTransferId == tokenTransferId).returning(TokenTransfersTable.c.tokenTransferId)
         await self._execute(query=query, connection=connection)
@@ -180,6 +288,7 @@ class Saver(CoreSaver):
             TokenMetadatasTable.c.backgroundColor.key: backgroundColor,
             TokenMetadatasTable.c.frameImageUrl.key: frameImageUrl,
             TokenMetadatasTable.c.attributes.key: attributes,
+            TokenMetadatasTable.c.tokenIdSortKey.key: get_token_id_sort_key(tokenId=tokenId),
         }
         query = TokenMetadatasTable.insert().values(values).returning(TokenMetadatasTable.c.tokenMetadataId)
         result = await self._execute(query=query, connection=connection)
@@ -318,6 +427,7 @@ class Saver(CoreSaver):
             TokenOwnershipsTable.c.transferValue.key: transferValue,
             TokenOwnershipsTable.c.transferDate.key: transferDate,
             TokenOwnershipsTable.c.transferTransactionHash.key: transferTransactionHash,
+            TokenOwnershipsTable.c.tokenIdSortKey.key: get_token_id_sort_key(tokenId=tokenId),
         }
         query = TokenOwnershipsTable.insert().values(values).returning(TokenOwnershipsTable.c.tokenOwnershipId)
         result = await self._execute(query=query, connection=connection)
@@ -349,6 +459,35 @@ class Saver(CoreSaver):
         query = TokenOwnershipsTable.update().where(TokenOwnershipsTable.c.tokenOwnershipId == tokenOwnershipId).values(values).returning(TokenOwnershipsTable.c.tokenOwnershipId)
         await self._execute(query=query, connection=connection)
 
+    async def upsert_token_ownerships(self, retrievedTokenOwnerships: Sequence[RetrievedTokenOwnership], connection: Optional[DatabaseConnection] = None) -> None:
+        if len(retrievedTokenOwnerships) == 0:
+            return
+        creationDate = date_util.datetime_from_now()
+        for chunk in list_util.generate_chunks(lst=retrievedTokenOwnerships, chunkSize=100):
+            values = [{
+                TokenOwnershipsTable.c.createdDate.key: creationDate,
+                TokenOwnershipsTable.c.updatedDate.key: creationDate,
+                TokenOwnershipsTable.c.registryAddress.key: retrievedTokenOwnership.registryAddress,
+                TokenOwnershipsTable.c.tokenId.key: retrievedTokenOwnership.tokenId,
+                TokenOwnershipsTable.c.ownerAddress.key: retrievedTokenOwnership.ownerAddress,
+                TokenOwnershipsTable.c.transferValue.key: retrievedTokenOwnership.transferValue,
+                TokenOwnershipsTable.c.transferDate.key: retrievedTokenOwnership.transferDate,
+                TokenOwnershipsTable.c.transferTransactionHash.key: retrievedTokenOwnership.transferTransactionHash,
+                TokenOwnershipsTable.c.tokenIdSortKey.key: get_token_id_sort_key(tokenId=retrievedTokenOwnership.tokenId),
+            } for retrievedTokenOwnership in chunk]
+            insertQuery = postgresql.insert(TokenOwnershipsTable).values(values)
+            query = insertQuery.on_conflict_do_update(
+                index_elements=[TokenOwnershipsTable.c.registryAddress, TokenOwnershipsTable.c.tokenId],
+                set_={
+                    TokenOwnershipsTable.c.updatedDate: insertQuery.excluded.updatedDate,
+                    TokenOwnershipsTable.c.ownerAddress: insertQuery.excluded.ownerAddress,
+                    TokenOwnershipsTable.c.transferValue: insertQuery.excluded.transferValue,
+                    TokenOwnershipsTable.c.transferDate: insertQuery.excluded.transferDate,
+                    TokenOwnershipsTable.c.transferTransactionHash: insertQuery.excluded.transferTransactionHash,
+                },
+            ).returning(TokenOwnershipsTable.c.tokenOwnershipId)
+            await self._execute(query=query, connection=connection)
+
     @staticmethod
     def _get_create_token_multi_ownership(creationDate: datetime.datetime, retrievedTokenMultiOwnership: RetrievedTokenMultiOwnership) -> CreateRecordDict:
         return {
@@ -361,6 +500,7 @@ class Saver(CoreSaver):
             TokenMultiOwnershipsTable.c.averageTransferValue.key: retrievedTokenMultiOwnership.averageTransferValue,
             TokenMultiOwnershipsTable.c.latestTransferDate.key: retrievedTokenMultiOwnership.latestTransferDate,
             TokenMultiOwnershipsTable.c.latestTransferTransactionHash.key: retrievedTokenMultiOwnership.latestTransferTransactionHash,
+            TokenMultiOwnershipsTable.c.tokenIdSortKey.key: get_token_id_sort_key(tokenId=retrievedTokenMultiOwnership.tokenId),
         }
 
     async def create_token_multi_ownership(self, retrievedTokenMultiOwnership: RetrievedTokenMultiOwnership, connection: Optional[DatabaseConnection] = None) -> int:
@@ -546,7 +686,7 @@ class Saver(CoreSaver):
             message=message,
         )
 
-    async def create_latest_update(self, date: datetime.datetime, key: str, name: Optional[str], connection: Optional[DatabaseConnection] = None) -> LatestUpdate:
+    async def create_latest_update(self, date: datetime.datetime, key: str, name: Optional[str], cursor: Optional[str] = None, connection: Optional[DatabaseConnection] = None) -> LatestUpdate:
         createdDate = date_util.datetime_from_now()
         updatedDate = createdDate
         values: CreateRecordDict = {
@@ -555,6 +695,7 @@ class Saver(CoreSaver):
             LatestUpdatesTable.c.date.key: date,
             LatestUpdatesTable.c.key.key: key,
             LatestUpdatesTable.c.name.key: name,
+            LatestUpdatesTable.c.cursor.key: cursor,
         }
         query = LatestUpdatesTable.insert().values(values).returning(LatestUpdatesTable.c.latestUpdateId)
         result = await self._execute(query=query, connection=connection)
@@ -566,9 +707,10 @@ class Saver(CoreSaver):
             key=key,
             name=name,
             date=date,
+            cursor=cursor,
         )
 
-    async def update_latest_update(self, latestUpdateId: int, key: Optional[str] = None, name: Optional[str] = _EMPTY_STRING, date: Optional[datetime.datetime] = None, connection: Optional[DatabaseConnection] = None) -> None:
+    async def update_latest_update(self, latestUpdateId: int, key: Optional[str] = None, name: Optional[str] = _EMPTY_STRING, date: Optional[datetime.datetime] = None, cursor: Optional[str] = _EMPTY_STRING, connection: Optional[DatabaseConnection] = None) -> None:
         values: UpdateRecordDict = {}
         if key is not None:
             values[LatestUpdatesTable.c.key.key] = key
@@ -576,6 +718,8 @@ class Saver(CoreSaver):
             values[LatestUpdatesTable.c.name.key] = name
         if date is not None:
             values[LatestUpdatesTable.c.date.key] = date
+        if cursor != _EMPTY_STRING:
+            values[LatestUpdatesTable.c.cursor.key] = cursor
         if len(values) > 0:
             values[LatestUpdatesTable.c.updatedDate.key] = date_util.datetime_from_now()
         query = LatestUpdatesTable.update().where(LatestUpdatesTable.c.latestUpdateId == latestUpdateId).values(values).returning(LatestUpdatesTable.c.latestUpdateId)
@@ -604,6 +748,8 @@ class Saver(CoreSaver):
     async def create_token_attributes(self, retrievedTokenAttributes: Sequence[RetrievedTokenAttribute], connection: Optional[DatabaseConnection] = None) -> List[int]:
         if len(retrievedTokenAttributes) == 0:
             return []
+        if len(retrievedTokenAttributes) >= _COPY_INSERT_MIN_ROW_COUNT:
+            return await self.copy_token_attributes(retrievedTokenAttributes=retrievedTokenAttributes, connection=connection)
         createdDate = date_util.datetime_from_now()
         updatedDate = createdDate
         tokenAttributeIds = []
@@ -614,6 +760,12 @@ class Saver(CoreSaver):
             tokenAttributeIds += [row[0] for row in rows]
         return tokenAttributeIds
 
+    async def copy_token_attributes(self, retrievedTokenAttributes: Sequence[RetrievedTokenAttribute], connection: Optional[DatabaseConnection] = None) -> List[int]:
+        createdDate = date_util.datetime_from_now()
+        updatedDate = createdDate
+        valuesList = [self._get_create_token_attributes_values(retrievedTokenAttribute=retrievedTokenAttribute, createdDate=createdDate, updatedDate=updatedDate) for retrievedTokenAttribute in retrievedTokenAttributes]
+        return await self._copy_insert(table=TokenAttributesTable, valuesList=valuesList, connection=connection)
+
     async def delete_token_attribute(self, tokenAttributeId: int, connection: Optional[DatabaseConnection] = None) -> None:
         query = TokenAttributesTable.delete().where(TokenAttributesTable.c.tokenAttributeId == tokenAttributeId).returning(TokenAttributesTable.c.tokenAttributeId)
         await self._execute(query=query, connection=connection)
@@ -624,6 +776,28 @@ class Saver(CoreSaver):
         query = TokenAttributesTable.delete().where(TokenAttributesTable.c.tokenAttributeId.in_(tokenAttributeIds)).returning(TokenAttributesTable.c.tokenAttributeId)
         await self._execute(query=query, connection=connection)
 
+    async def create_token_attribute_bitmaps(self, retrievedTokenAttributeBitmaps: Sequence[RetrievedTokenAttributeBitmap], connection: Optional[DatabaseConnection] = None) -> None:
+        if len(retrievedTokenAttributeBitmaps) == 0:
+            return
+        createdDate = date_util.datetime_from_now()
+        updatedDate = createdDate
+        for chunk in list_util.generate_chunks(lst=retrievedTokenAttributeBitmaps, chunkSize=100):
+            values = [{
+                TokenAttributeBitmapsTable.c.createdDate.key: createdDate,
+                TokenAttributeBitmapsTable.c.updatedDate.key: updatedDate,
+                TokenAttributeBitmapsTable.c.registryAddress.key: retrievedTokenAttributeBitmap.registryAddress,
+                TokenAttributeBitmapsTable.c.name.key: retrievedTokenAttributeBitmap.name,
+                TokenAttributeBitmapsTable.c.value.key: retrievedTokenAttributeBitmap.value,
+                TokenAttributeBitmapsTable.c.tokenCount.key: retrievedTokenAttributeBitmap.tokenCount,
+                TokenAttributeBitmapsTable.c.bitmap.key: retrievedTokenAttributeBitmap.bitmap,
+            } for retrievedTokenAttributeBitmap in chunk]
+            query = TokenAttributeBitmapsTable.insert().values(values).returning(TokenAttributeBitmapsTable.c.tokenAttributeBitmapId)
+            await self._execute(query=query, connection=connection)
+
+    async def delete_token_attribute_bitmaps_for_collection(self, registryAddress: str, connection: Optional[DatabaseConnection] = None) -> None:
+        query = TokenAttributeBitmapsTable.delete().where(TokenAttributeBitmapsTable.c.registryAddress == registryAddress).returning(TokenAttributeBitmapsTable.c.tokenAttributeBitmapId)
+        await self._execute(query=query, connection=connection)
+
     @staticmethod
     def _get_create_latest_token_listing_values(retrievedTokenListing: RetrievedTokenListing, createdDate: datetime.datetime, updatedDate: datetime.datetime) -> CreateRecordDict:
         return {
@@ -672,6 +846,190 @@ class Saver(CoreSaver):
         query = LatestTokenListingsTable.delete().where(LatestTokenListingsTable.c.latestTokenListingId.in_(latestTokenListingIds)).returning(LatestTokenListingsTable.c.latestTokenListingId)
         await self._execute(query=query, connection=connection)
 
+    @staticmethod
+    def _get_create_latest_token_listing_staging_values(retrievedTokenListing: RetrievedTokenListing) -> CreateRecordDict:
+        return {
+            LatestTokenListingsStagingTable.c.registryAddress.key: retrievedTokenListing.registryAddress,
+            LatestTokenListingsStagingTable.c.tokenId.key: retrievedTokenListing.tokenId,
+            LatestTokenListingsStagingTable.c.offererAddress.key: retrievedTokenListing.offererAddress,
+            LatestTokenListingsStagingTable.c.startDate.key: retrievedTokenListing.startDate,
+            LatestTokenListingsStagingTable.c.endDate.key: retrievedTokenListing.endDate,
+            LatestTokenListingsStagingTable.c.isValueNative.key: retrievedTokenListing.isValueNative,
+            LatestTokenListingsStagingTable.c.value.key: retrievedTokenListing.value,
+            LatestTokenListingsStagingTable.c.source.key: retrievedTokenListing.source,
+            LatestTokenListingsStagingTable.c.sourceId.key: retrievedTokenListing.sourceId,
+        }
+
+    async def merge_latest_token_listings(self, registryAddress: str, retrievedTokenListings: Sequence[RetrievedTokenListing], syncDate: datetime.datetime, connection: Optional[DatabaseConnection] = None) -> TokenListingsSyncResult:
+        # NOTE(krishan711): every listing seen is marked with syncDate so that delete_stale_latest_token_listings can remove the rest
+        if not connection:
+            async with self.create_transaction() as transactionConnection:
+                return await self.merge_latest_token_listings(registryAddress=registryAddress, retrievedTokenListings=retrievedTokenListings, syncDate=syncDate, connection=transactionConnection)
+        # NOTE(krishan711): the UPDATE ... FROM below needs at most one staged row per listing so later duplicates replace earlier ones
+        sourceIdListingMap = {(retrievedTokenListing.source, retrievedTokenListing.sourceId): retrievedTokenListing for retrievedTokenListing in retrievedTokenListings}
+        await connection.run_sync(LatestTokenListingsStagingTable.create)
+        for chunk in list_util.generate_chunks(lst=list(sourceIdListingMap.values()), chunkSize=1000):
+            values = [self._get_create_latest_token_listing_staging_values(retrievedTokenListing=retrievedTokenListing) for retrievedTokenListing in chunk]
+            stagingQuery = LatestTokenListingsStagingTable.insert().values(values).returning(LatestTokenListingsStagingTable.c.sourceId)
+            await self._execute(query=stagingQuery, connection=connection)
+        updateQuery = (
+            LatestTokenListingsTable.update()
+            .where(LatestTokenListingsTable.c.registryAddress == registryAddress)
+            .where(LatestTokenListingsTable.c.source == LatestTokenListingsStagingTable.c.source)
+            .where(LatestTokenListingsTable.c.sourceId == LatestTokenListingsStagingTable.c.sourceId)
+            .where(sqlalchemy.or_(
+                LatestTokenListingsTable.c.tokenId != LatestTokenListingsStagingTable.c.tokenId,
+                LatestTokenListingsTable.c.offererAddress != LatestTokenListingsStagingTable.c.offererAddress,
+                LatestTokenListingsTable.c.startDate != LatestTokenListingsStagingTable.c.startDate,
+                LatestTokenListingsTable.c.endDate != LatestTokenListingsStagingTable.c.endDate,
+                LatestTokenListingsTable.c.isValueNative != LatestTokenListingsStagingTable.c.isValueNative,
+                LatestTokenListingsTable.c.value != LatestTokenListingsStagingTable.c.value,
+            ))
+            .values({
+                LatestTokenListingsTable.c.updatedDate.key: syncDate,
+                LatestTokenListingsTable.c.tokenId.key: LatestTokenListingsStagingTable.c.tokenId,
+                LatestTokenListingsTable.c.offererAddress.key: LatestTokenListingsStagingTable.c.offererAddress,
+                LatestTokenListingsTable.c.startDate.key: LatestTokenListingsStagingTable.c.startDate,
+                LatestTokenListingsTable.c.endDate.key: LatestTokenListingsStagingTable.c.endDate,
+                LatestTokenListingsTable.c.isValueNative.key: LatestTokenListingsStagingTable.c.isValueNative,
+                LatestTokenListingsTable.c.value.key: LatestTokenListingsStagingTable.c.value,
+            })
+            .returning(LatestTokenListingsTable.c.latestTokenListingId)
+        )
+        updateResult = await self._execute(query=updateQuery, connection=connection)
+        updatedCount = len(updateResult.all())
+        keepQuery = (
+            LatestTokenListingsTable.update()
+            .where(LatestTokenListingsTable.c.registryAddress == registryAddress)
+            .where(LatestTokenListingsTable.c.source == LatestTokenListingsStagingTable.c.source)
+            .where(LatestTokenListingsTable.c.sourceId == LatestTokenListingsStagingTable.c.sourceId)
+            .where(LatestTokenListingsTable.c.updatedDate < syncDate)
+            .values({LatestTokenListingsTable.c.updatedDate.key: syncDate})
+            .returning(LatestTokenListingsTable.c.latestTokenListingId)
+        )
+        keepResult = await self._execute(query=keepQuery, connection=connection)
+        keptCount = len(keepResult.all())
+        existingListingExistsQuery = (
+            sqlalchemy.select(sqlalchemy.literal(1))
+            .where(LatestTokenListingsTable.c.registryAddress == registryAddress)
+            .where(LatestTokenListingsTable.c.source == LatestTokenListingsStagingTable.c.source)
+            .where(LatestTokenListingsTable.c.sourceId == LatestTokenListingsStagingTable.c.sourceId)
+            .exists()
+        )
+        newListingsQuery = (
+            sqlalchemy.select(
+                # NOTE(krishan711): new listings are created at syncDate too so that updatedDate is never before createdDate
+                sqlalchemy.literal(syncDate, type_=sqlalchemy.DateTime),
+                sqlalchemy.literal(syncDate, type_=sqlalchemy.DateTime),
+                LatestTokenListingsStagingTable.c.registryAddress,
+                LatestTokenListingsStagingTable.c.tokenId,
+                LatestTokenListingsStagingTable.c.offererAddress,
+                LatestTokenListingsStagingTable.c.startDate,
+                LatestTokenListingsStagingTable.c.endDate,
+                LatestTokenListingsStagingTable.c.isValueNative,
+                LatestTokenListingsStagingTable.c.value,
+                LatestTokenListingsStagingTable.c.source,
+                LatestTokenListingsStagingTable.c.sourceId,
+            )
+            .where(sqlalchemy.not_(existingListingExistsQuery))
+        )
+        insertQuery = (
+            LatestTokenListingsTable.insert()
+            .from_select([
+                LatestTokenListingsTable.c.createdDate,
+                LatestTokenListingsTable.c.updatedDate,
+                LatestTokenListingsTable.c.registryAddress,
+                LatestTokenListingsTable.c.tokenId,
+                LatestTokenListingsTable.c.offererAddress,
+                LatestTokenListingsTable.c.startDate,
+                LatestTokenListingsTable.c.endDate,
+                LatestTokenListingsTable.c.isValueNative,
+                LatestTokenListingsTable.c.value,
+                LatestTokenListingsTable.c.source,
+                LatestTokenListingsTable.c.sourceId,
+            ], newListingsQuery)
+            .returning(LatestTokenListingsTable.c.latestTokenListingId)
+        )
+        insertResult = await self._execute(query=insertQuery, connection=connection)
+        addedCount = len(insertResult.all())
+        # NOTE(krishan711): drop explicitly so the staging table can be used again within the same transaction
+        await connection.run_sync(LatestTokenListingsStagingTable.drop)
+        return TokenListingsSyncResult(
+            addedCount=addedCount,
+            updatedCount=updatedCount,
+            keptCount=keptCount,
+        )
+
+    async def delete_stale_latest_token_listings(self, registryAddress: str, syncDate: datetime.datetime, connection: Optional[DatabaseConnection] = None) -> int:
+        query = (
+            LatestTokenListingsTable.delete()
+            .where(LatestTokenListingsTable.c.registryAddress == registryAddress)
+            .where(LatestTokenListingsTable.c.updatedDate < syncDate)
+            .returning(LatestTokenListingsTable.c.latestTokenListingId)
+        )
+        result = await self._execute(query=query, connection=connection)
+        return len(result.all())
+
+    async def update_best_token_listings(self, registryAddress: str, tokenIds: Optional[Sequence[str]] = None, connection: Optional[DatabaseConnection] = None) -> None:
+        # NOTE(krishan711): if tokenIds is None every token in the collection is recalculated
+        if tokenIds is not None and len(tokenIds) == 0:
+            return
+        if not connection:
+            async with self.create_transaction() as transactionConnection:
+                await self.update_best_token_listings(registryAddress=registryAddress, tokenIds=tokenIds, connection=transactionConnection)
+            return
+        deleteQuery = BestTokenListingsTable.delete().where(BestTokenListingsTable.c.registryAddress == registryAddress)
+        bestListingsQuery = (
+            sqlalchemy.select(
+                LatestTokenListingsTable.c.latestTokenListingId,
+                LatestTokenListingsTable.c.createdDate,
+                LatestTokenListingsTable.c.updatedDate,
+                LatestTokenListingsTable.c.registryAddress,
+                LatestTokenListingsTable.c.tokenId,
+                LatestTokenListingsTable.c.offererAddress,
+                LatestTokenListingsTable.c.startDate,
+                LatestTokenListingsTable.c.endDate,
+                LatestTokenListingsTable.c.isValueNative,
+                LatestTokenListingsTable.c.value,
+                LatestTokenListingsTable.c.source,
+                LatestTokenListingsTable.c.sourceId,
+            )
+            .distinct(LatestTokenListingsTable.c.registryAddress, LatestTokenListingsTable.c.tokenId)
+            .join(TokenOwnershipsView, sqlalchemy.and_(
+                TokenOwnershipsView.c.registryAddress == LatestTokenListingsTable.c.registryAddress,
+                TokenOwnershipsView.c.tokenId == LatestTokenListingsTable.c.tokenId,
+                TokenOwnershipsView.c.ownerAddress == LatestTokenListingsTable.c.offererAddress,
+                TokenOwnershipsView.c.quantity > 0,
+            ))
+            .where(LatestTokenListingsTable.c.registryAddress == registryAddress)
+            .where(LatestTokenListingsTable.c.endDate > date_util.datetime_from_now())
+            .order_by(LatestTokenListingsTable.c.registryAddress, LatestTokenListingsTable.c.tokenId, LatestTokenListingsTable.c.value.asc(), LatestTokenListingsTable.c.latestTokenListingId.asc())
+        )
+        if tokenIds is not None:
+            deleteQuery = deleteQuery.where(BestTokenListingsTable.c.tokenId.in_(tokenIds))
+            bestListingsQuery = bestListingsQuery.where(LatestTokenListingsTable.c.tokenId.in_(tokenIds))
+        insertQuery = postgresql.insert(BestTokenListingsTable).from_select([
+            BestTokenListingsTable.c.latestTokenListingId,
+            BestTokenListingsTable.c.createdDate,
+            BestTokenListingsTable.c.updatedDate,
+            BestTokenListingsTable.c.registryAddress,
+            BestTokenListingsTable.c.tokenId,
+            BestTokenListingsTable.c.offererAddress,
+            BestTokenListingsTable.c.startDate,
+            BestTokenListingsTable.c.endDate,
+            BestTokenListingsTable.c.isValueNative,
+            BestTokenListingsTable.c.value,
+            BestTokenListingsTable.c.source,
+            BestTokenListingsTable.c.sourceId,
+        ], bestListingsQuery)
+        # NOTE(krishan711): the listing refresh and ownership transfers can update the same tokens at once so the insert upserts rather than relying on the delete
+        upsertQuery = insertQuery.on_conflict_do_update(
+            index_elements=[BestTokenListingsTable.c.registryAddress, BestTokenListingsTable.c.tokenId],
+            set_={column: insertQuery.excluded[column.key] for column in BestTokenListingsTable.columns if not column.primary_key},
+        )
+        await self._execute_without_rows(query=deleteQuery, connection=connection)
+        await self._execute_without_rows(query=upsertQuery, connection=connection)
+
     async def create_token_customization(self, registryAddress: str, tokenId: str, creatorAddress: str, signature: str, blockNumber: int, name: Optional[str], description: Optional[str], connection: Optional[DatabaseConnection] = None) -> TokenCustomization:
         createdDate = date_util.datetime_from_now()
         updatedDate = createdDate
@@ -861,6 +1219,40 @@ class Saver(CoreSaver):
         query = TwitterProfilesTable.update().where(TwitterProfilesTable.c.twitterProfileId == twitterProfileId).values(values).returning(TwitterProfilesTable.c.twitterProfileId)
         await self._execute(query=query, connection=connection)
 
+    async def upsert_twitter_profiles(self, retrievedTwitterProfiles: Sequence[RetrievedTwitterProfile], connection: Optional[DatabaseConnection] = None) -> int:
+        # NOTE(krishan711): rows where nothing changed are left alone so a full refresh only writes (and bumps updatedDate on) profiles that actually moved
+        if len(retrievedTwitterProfiles) == 0:
+            return 0
+        creationDate = date_util.datetime_from_now()
+        changedCount = 0
+        for chunk in list_util.generate_chunks(lst=retrievedTwitterProfiles, chunkSize=500):
+            values = [{
+                TwitterProfilesTable.c.createdDate.key: creationDate,
+                TwitterProfilesTable.c.updatedDate.key: creationDate,
+                TwitterProfilesTable.c.twitterId.key: retrievedTwitterProfile.twitterId,
+                TwitterProfilesTable.c.username.key: retrievedTwitterProfile.username,
+                TwitterProfilesTable.c.name.key: retrievedTwitterProfile.name,
+                TwitterProfilesTable.c.description.key: retrievedTwitterProfile.description,
+                TwitterProfilesTable.c.isVerified.key: retrievedTwitterProfile.isVerified,
+                TwitterProfilesTable.c.pinnedTweetId.key: retrievedTwitterProfile.pinnedTweetId,
+                TwitterProfilesTable.c.followerCount.key: retrievedTwitterProfile.followerCount,
+                TwitterProfilesTable.c.followingCount.key: retrievedTwitterProfile.followingCount,
+                TwitterProfilesTable.c.tweetCount.key: retrievedTwitterProfile.tweetCount,
+            } for retrievedTwitterProfile in chunk]
+            insertQuery = postgresql.insert(TwitterProfilesTable).values(values)
+            updatedColumns = [TwitterProfilesTable.c.followerCount, TwitterProfilesTable.c.followingCount, TwitterProfilesTable.c.tweetCount, TwitterProfilesTable.c.username, TwitterProfilesTable.c.name, TwitterProfilesTable.c.description, TwitterProfilesTable.c.isVerified, TwitterProfilesTable.c.pinnedTweetId]
+            query = insertQuery.on_conflict_do_update(
+                index_elements=[TwitterProfilesTable.c.twitterId],
+                set_={
+                    TwitterProfilesTable.c.updatedDate: insertQuery.excluded.updatedDate,
+                    **{column: insertQuery.excluded[column.key] for column in updatedColumns},
+                },
+                where=sqlalchemy.tuple_(*updatedColumns).is_distinct_from(sqlalchemy.tuple_(*[insertQuery.excluded[column.key] for column in updatedColumns])),
+            ).returning(TwitterProfilesTable.c.twitterProfileId)
+            result = await self._execute(query=query, connection=connection)
+            changedCount += len(result.all())
+        return changedCount
+
     async def create_account_gm(self, address: str, delegateAddress: Optional[str], date: datetime.datetime, streakLength: int, collectionCount: int, signatureMessage: str, signature: str, connection: Optional[DatabaseConnection] = None) -> AccountGm:
         createdDate = date_util.datetime_from_now()
         updatedDate = createdDate
@@ -919,6 +1311,224 @@ class Saver(CoreSaver):
             signature=signature,
         )
 
+    async def create_account_collection_gms_for_owned_collections(self, accountAddress: str, accountDelegateAddress: Optional[str], date: datetime.datetime, signatureMessage: str, signature: str, connection: Optional[DatabaseConnection] = None) -> List[str]:
+        # NOTE(krishan711): reads the ownership tables directly (rather than vw_token_ownerships) so each side uses its owner index
+        createdDate = date_util.datetime_from_now()
+        updatedDate = createdDate
+        ownedCollectionsQuery = sqlalchemy.union(
+            sqlalchemy.select(TokenOwnershipsTable.c.registryAddress)
+            .where(TokenOwnershipsTable.c.ownerAddress == accountAddress),
+            sqlalchemy.select(TokenMultiOwnershipsTable.c.registryAddress)
+            .where(TokenMultiOwnershipsTable.c.ownerAddress == accountAddress)
+            .where(TokenMultiOwnershipsTable.c.quantity > 0),
+        ).subquery()
+        query = AccountCollectionGmsTable.insert().from_select(
+            [AccountCollectionGmsTable.c.createdDate, AccountCollectionGmsTable.c.updatedDate, AccountCollectionGmsTable.c.registryAddress, AccountCollectionGmsTable.c.accountAddress, AccountCollectionGmsTable.c.accountDelegateAddress, AccountCollectionGmsTable.c.date, AccountCollectionGmsTable.c.signatureMessage, AccountCollectionGmsTable.c.signature],
+            sqlalchemy.select(
+                sqlalchemy.literal(createdDate, type_=sqlalchemy.DateTime),
+                sqlalchemy.literal(updatedDate, type_=sqlalchemy.DateTime),
+                ownedCollectionsQuery.c.registryAddress,
+                sqlalchemy.literal(accountAddress, type_=sqlalchemy.Text),
+                sqlalchemy.literal(accountDelegateAddress, type_=sqlalchemy.Text),
+                sqlalchemy.literal(date, type_=sqlalchemy.DateTime),
+                sqlalchemy.literal(signatureMessage, type_=sqlalchemy.Text),
+                sqlalchemy.literal(signature, type_=AccountCollectionGmsTable.c.signature.type),
+            ),
+        ).returning(AccountCollectionGmsTable.c.registryAddress)
+        result = await self._execute(query=query, connection=connection)
+        return [registryAddress for (registryAddress, ) in result]
+
+    async def increment_gm_counts(self, address: str, registryAddresses: Sequence[str], date: datetime.datetime, streakLength: int, connection: Optional[DatabaseConnection] = None) -> None:
+        # NOTE(krishan711): the counts only grow here, recalculate_gm_counts moves the windows forward on the first leaderboard load each day
+        createdDate = date_util.datetime_from_now()
+        updatedDate = createdDate
+        accountCountsInsertQuery = postgresql.insert(GmAccountCountsTable).values({
+            GmAccountCountsTable.c.createdDate.key: createdDate,
+            GmAccountCountsTable.c.updatedDate.key: updatedDate,
+            GmAccountCountsTable.c.address.key: address,
+            GmAccountCountsTable.c.latestDate.key: date,
+            GmAccountCountsTable.c.streakLength.key: streakLength,
+            GmAccountCountsTable.c.weekCount.key: 1,
+            GmAccountCountsTable.c.monthCount.key: 1,
+        })
+        accountCountsQuery = accountCountsInsertQuery.on_conflict_do_update(
+            index_elements=[GmAccountCountsTable.c.address],
+            set_={
+                GmAccountCountsTable.c.updatedDate: accountCountsInsertQuery.excluded.updatedDate,
+                GmAccountCountsTable.c.latestDate: accountCountsInsertQuery.excluded.latestDate,
+                GmAccountCountsTable.c.streakLength: accountCountsInsertQuery.excluded.streakLength,
+                GmAccountCountsTable.c.weekCount: GmAccountCountsTable.c.weekCount + 1,
+                GmAccountCountsTable.c.monthCount: GmAccountCountsTable.c.monthCount + 1,
+            },
+        ).returning(GmAccountCountsTable.c.address)
+        await self._execute(query=accountCountsQuery, connection=connection)
+        for chunk in list_util.generate_chunks(lst=list(registryAddresses), chunkSize=100):
+            accountCollectionCountsInsertQuery = postgresql.insert(GmAccountCollectionCountsTable).values([{
+                GmAccountCollectionCountsTable.c.createdDate.key: createdDate,
+                GmAccountCollectionCountsTable.c.updatedDate.key: updatedDate,
+                GmAccountCollectionCountsTable.c.registryAddress.key: registryAddress,
+                GmAccountCollectionCountsTable.c.accountAddress.key: address,
+                GmAccountCollectionCountsTable.c.latestDate.key: date,
+                GmAccountCollectionCountsTable.c.weekCount.key: 1,
+                GmAccountCollectionCountsTable.c.monthCount.key: 1,
+            } for registryAddress in chunk])
+            accountCollectionCountsQuery = accountCollectionCountsInsertQuery.on_conflict_do_update(
+                index_elements=[GmAccountCollectionCountsTable.c.registryAddress, GmAccountCollectionCountsTable.c.accountAddress],
+                set_={
+                    GmAccountCollectionCountsTable.c.updatedDate: accountCollectionCountsInsertQuery.excluded.updatedDate,
+                    GmAccountCollectionCountsTable.c.latestDate: accountCollectionCountsInsertQuery.excluded.latestDate,
+                    GmAccountCollectionCountsTable.c.weekCount: GmAccountCollectionCountsTable.c.weekCount + 1,
+                    GmAccountCollectionCountsTable.c.monthCount: GmAccountCollectionCountsTable.c.monthCount + 1,
+                },
+            ).returning(GmAccountCollectionCountsTable.c.registryAddress)
+            await self._execute(query=accountCollectionCountsQuery, connection=connection)
+            collectionCountsInsertQuery = postgresql.insert(GmCollectionCountsTable).values([{
+                GmCollectionCountsTable.c.createdDate.key: createdDate,
+                GmCollectionCountsTable.c.updatedDate.key: updatedDate,
+                GmCollectionCountsTable.c.registryAddress.key: registryAddress,
+                GmCollectionCountsTable.c.todayDate.key: date,
+                GmCollectionCountsTable.c.todayCount.key: 1,
+                GmCollectionCountsTable.c.weekCount.key: 1,
+                GmCollectionCountsTable.c.monthCount.key: 1,
+            } for registryAddress in chunk])
+            collectionCountsQuery = collectionCountsInsertQuery.on_conflict_do_update(
+                index_elements=[GmCollectionCountsTable.c.registryAddress],
+                set_={
+                    GmCollectionCountsTable.c.updatedDate: collectionCountsInsertQuery.excluded.updatedDate,
+                    GmCollectionCountsTable.c.todayDate: collectionCountsInsertQuery.excluded.todayDate,
+                    GmCollectionCountsTable.c.todayCount: sqlalchemy.case((GmCollectionCountsTable.c.todayDate == collectionCountsInsertQuery.excluded.todayDate, GmCollectionCountsTable.c.todayCount + 1), else_=1),
+                    GmCollectionCountsTable.c.weekCount: GmCollectionCountsTable.c.weekCount + 1,
+                    GmCollectionCountsTable.c.monthCount: GmCollectionCountsTable.c.monthCount + 1,
+                },
+            ).returning(GmCollectionCountsTable.c.registryAddress)
+            await self._execute(query=collectionCountsQuery, connection=connection)
+
+    async def recalculate_gm_counts(self, connection: Optional[DatabaseConnection] = None) -> None:
+        # NOTE(krishan711): gm dates are the start of a day so the windows are the last 7 and 30 days including today
+        if not connection:
+            async with self.create_transaction() as transactionConnection:
+                await self.recalculate_gm_counts(connection=transactionConnection)
+            return
+        updatedDate = date_util.datetime_from_now()
+        todayDate = date_util.start_of_day(dt=updatedDate)
+        weekStartDate = date_util.datetime_from_datetime(dt=todayDate, days=-6)
+        monthStartDate = date_util.datetime_from_datetime(dt=todayDate, days=-29)
+        latestAccountGmsQuery = (
+            sqlalchemy.select(AccountGmsTable.c.address, AccountGmsTable.c.date, AccountGmsTable.c.streakLength)
+            .distinct(AccountGmsTable.c.address)
+            .where(AccountGmsTable.c.date >= monthStartDate)
+            .order_by(AccountGmsTable.c.address, AccountGmsTable.c.date.desc())
+        ).subquery()
+        accountGmCountsQuery = (
+            sqlalchemy.select(
+                AccountGmsTable.c.address,
+                sqlalchemyfunc.count().filter(AccountGmsTable.c.date >= weekStartDate).label('weekCount'),
+                sqlalchemyfunc.count().label('monthCount'),
+            )
+            .where(AccountGmsTable.c.date >= monthStartDate)
+            .group_by(AccountGmsTable.c.address)
+        ).subquery()
+        accountCountsInsertQuery = postgresql.insert(GmAccountCountsTable).from_select(
+            [GmAccountCountsTable.c.createdDate, GmAccountCountsTable.c.updatedDate, GmAccountCountsTable.c.address, GmAccountCountsTable.c.latestDate, GmAccountCountsTable.c.streakLength, GmAccountCountsTable.c.weekCount, GmAccountCountsTable.c.monthCount],
+            sqlalchemy.select(
+                sqlalchemy.literal(updatedDate, type_=sqlalchemy.DateTime),
+                sqlalchemy.literal(updatedDate, type_=sqlalchemy.DateTime),
+                latestAccountGmsQuery.c.address,
+                latestAccountGmsQuery.c.date,
+                latestAccountGmsQuery.c.streakLength,
+                accountGmCountsQuery.c.weekCount,
+                accountGmCountsQuery.c.monthCount,
+            ).join(accountGmCountsQuery, accountGmCountsQuery.c.address == latestAccountGmsQuery.c.address),
+        )
+        accountCountsQuery = accountCountsInsertQuery.on_conflict_do_update(
+            index_elements=[GmAccountCountsTable.c.address],
+            set_={
+                GmAccountCountsTable.c.updatedDate: accountCountsInsertQuery.excluded.updatedDate,
+                GmAccountCountsTable.c.latestDate: accountCountsInsertQuery.excluded.latestDate,
+                GmAccountCountsTable.c.streakLength: accountCountsInsertQuery.excluded.streakLength,
+                GmAccountCountsTable.c.weekCount: accountCountsInsertQuery.excluded.weekCount,
+                GmAccountCountsTable.c.monthCount: accountCountsInsertQuery.excluded.monthCount,
+            },
+        ).returning(GmAccountCountsTable.c.address)
+        await self._execute(query=accountCountsQuery, connection=connection)
+        expiredAccountCountsQuery = (
+            GmAccountCountsTable.update()
+            .where(GmAccountCountsTable.c.latestDate < monthStartDate)
+            .where(GmAccountCountsTable.c.monthCount > 0)
+            .values({GmAccountCountsTable.c.updatedDate.key: updatedDate, GmAccountCountsTable.c.weekCount.key: 0, GmAccountCountsTable.c.monthCount.key: 0})
+            .returning(GmAccountCountsTable.c.address)
+        )
+        await self._execute(query=expiredAccountCountsQuery, connection=connection)
+        accountCollectionCountsInsertQuery = postgresql.insert(GmAccountCollectionCountsTable).from_select(
+            [GmAccountCollectionCountsTable.c.createdDate, GmAccountCollectionCountsTable.c.updatedDate, GmAccountCollectionCountsTable.c.registryAddress, GmAccountCollectionCountsTable.c.accountAddress, GmAccountCollectionCountsTable.c.latestDate, GmAccountCollectionCountsTable.c.weekCount, GmAccountCollectionCountsTable.c.monthCount],
+            sqlalchemy.select(
+                sqlalchemy.literal(updatedDate, type_=sqlalchemy.DateTime),
+                sqlalchemy.literal(updatedDate, type_=sqlalchemy.DateTime),
+                AccountCollectionGmsTable.c.registryAddress,
+                AccountCollectionGmsTable.c.accountAddress,
+                sqlalchemyfunc.max(AccountCollectionGmsTable.c.date),
+                sqlalchemyfunc.count().filter(AccountCollectionGmsTable.c.date >= weekStartDate),
+                sqlalchemyfunc.count(),
+            )
+            .where(AccountCollectionGmsTable.c.date >= monthStartDate)
+            .group_by(AccountCollectionGmsTable.c.registryAddress, AccountCollectionGmsTable.c.accountAddress),
+        )
+        accountCollectionCountsQuery = accountCollectionCountsInsertQuery.on_conflict_do_update(
+            index_elements=[GmAccountCollectionCountsTable.c.registryAddress, GmAccountCollectionCountsTable.c.accountAddress],
+            set_={
+                GmAccountCollectionCountsTable.c.updatedDate: accountCollectionCountsInsertQuery.excluded.updatedDate,
+                GmAccountCollectionCountsTable.c.latestDate: accountCollectionCountsInsertQuery.excluded.latestDate,
+                GmAccountCollectionCountsTable.c.weekCount: accountCollectionCountsInsertQuery.excluded.weekCount,
+                GmAccountCollectionCountsTable.c.monthCount: accountCollectionCountsInsertQuery.excluded.monthCount,
+            },
+        ).returning(GmAccountCollectionCountsTable.c.registryAddress)
+        await self._execute(query=accountCollectionCountsQuery, connection=connection)
+        expiredAccountCollectionCountsQuery = (
+            GmAccountCollectionCountsTable.update()
+            .where(GmAccountCollectionCountsTable.c.latestDate < monthStartDate)
+            .where(GmAccountCollectionCountsTable.c.monthCount > 0)
+            .values({GmAccountCollectionCountsTable.c.updatedDate.key: updatedDate, GmAccountCollectionCountsTable.c.weekCount.key: 0, GmAccountCollectionCountsTable.c.monthCount.key: 0})
+            .returning(GmAccountCollectionCountsTable.c.registryAddress)
+        )
+        await self._execute(query=expiredAccountCollectionCountsQuery, connection=connection)
+        collectionCountsInsertQuery = postgresql.insert(GmCollectionCountsTable).from_select(
+            [GmCollectionCountsTable.c.createdDate, GmCollectionCountsTable.c.updatedDate, GmCollectionCountsTable.c.registryAddress, GmCollectionCountsTable.c.todayDate, GmCollectionCountsTable.c.todayCount, GmCollectionCountsTable.c.weekCount, GmCollectionCountsTable.c.monthCount],
+            sqlalchemy.select(
+                sqlalchemy.literal(updatedDate, type_=sqlalchemy.DateTime),
+                sqlalchemy.literal(updatedDate, type_=sqlalchemy.DateTime),
+                AccountCollectionGmsTable.c.registryAddress,
+                sqlalchemy.literal(todayDate, type_=sqlalchemy.DateTime),
+                sqlalchemyfunc.count().filter(AccountCollectionGmsTable.c.date >= todayDate),
+                sqlalchemyfunc.count().filter(AccountCollectionGmsTable.c.date >= weekStartDate),
+                sqlalchemyfunc.count(),
+            )
+            .where(AccountCollectionGmsTable.c.date >= monthStartDate)
+            .group_by(AccountCollectionGmsTable.c.registryAddress),
+        )
+        collectionCountsQuery = collectionCountsInsertQuery.on_conflict_do_update(
+            index_elements=[GmCollectionCountsTable.c.registryAddress],
+            set_={
+                GmCollectionCountsTable.c.updatedDate: collectionCountsInsertQuery.excluded.updatedDate,
+                GmCollectionCountsTable.c.todayDate: collectionCountsInsertQuery.excluded.todayDate,
+                GmCollectionCountsTable.c.todayCount: collectionCountsInsertQuery.excluded.todayCount,
+                GmCollectionCountsTable.c.weekCount: collectionCountsInsertQuery.excluded.weekCount,
+                GmCollectionCountsTable.c.monthCount: collectionCountsInsertQuery.excluded.monthCount,
+            },
+        ).returning(GmCollectionCountsTable.c.registryAddress)
+        await self._execute(query=collectionCountsQuery, connection=connection)
+        activeCollectionsQuery = (
+            sqlalchemy.select(AccountCollectionGmsTable.c.registryAddress)
+            .where(AccountCollectionGmsTable.c.date >= monthStartDate)
+        )
+        expiredCollectionCountsQuery = (
+            GmCollectionCountsTable.update()
+            .where(GmCollectionCountsTable.c.registryAddress.not_in(activeCollectionsQuery))
+            .where(GmCollectionCountsTable.c.monthCount > 0)
+            .values({GmCollectionCountsTable.c.updatedDate.key: updatedDate, GmCollectionCountsTable.c.todayDate.key: todayDate, GmCollectionCountsTable.c.todayCount.key: 0, GmCollectionCountsTable.c.weekCount.key: 0, GmCollectionCountsTable.c.monthCount.key: 0})
+            .returning(GmCollectionCountsTable.c.registryAddress)
+        )
+        await self._execute(query=expiredCollectionCountsQuery, connection=connection)
+
     @staticmethod
     def _get_create_collection_overlaps_values(retrievedCollectionOverlap: RetrievedCollectionOverlap, createdDate: datetime.datetime, updatedDate: datetime.datetime) -> CreateRecordDict:
         return {
@@ -943,6 +1553,8 @@ class Saver(CoreSaver):
     async def create_collection_overlaps(self, retrievedCollectionOverlaps: Sequence[RetrievedCollectionOverlap], connection: Optional[DatabaseConnection] = None) -> List[int]:
         if len(retrievedCollectionOverlaps) == 0:
             return []
+        if len(retrievedCollectionOverlaps) >= _COPY_INSERT_MIN_ROW_COUNT:
+            return await self.copy_collection_overlaps(retrievedCollectionOverlaps=retrievedCollectionOverlaps, connection=connection)
         createdDate = date_util.datetime_from_now()
         updatedDate = createdDate
         latestCollectionOverlapsIds = []
@@ -953,6 +1565,12 @@ class Saver(CoreSaver):
             latestCollectionOverlapsIds += [row[0] for row in rows]
         return latestCollectionOverlapsIds
 
+    async def copy_collection_overlaps(self, retrievedCollectionOverlaps: Sequence[RetrievedCollectionOverlap], connection: Optional[DatabaseConnection] = None) -> List[int]:
+        createdDate = date_util.datetime_from_now()
+        updatedDate = createdDate
+        valuesList = [self._get_create_collection_overlaps_values(retrievedCollectionOverlap=retrievedCollectionOverlap, createdDate=createdDate, updatedDate=updatedDate) for retrievedCollectionOverlap in retrievedCollectionOverlaps]
+        return await self._copy_insert(table=TokenCollectionOverlapsTable, valuesList=valuesList, connection=connection)
+
     async def delete_collection_overlap(self, collectionOverlapId: int, connection: Optional[DatabaseConnection] = None) -> None:
         query = TokenCollectionOverlapsTable.delete().where(TokenCollectionOverlapsTable.c.collectionOverlapId == collectionOverlapId).returning(TokenCollectionOverlapsTable.c.collectionOverlapId)
         await self._execute(query=query, connection=connection)
@@ -1081,6 +1699,62 @@ class Saver(CoreSaver):
         query = TokenStakingsTable.delete().where(TokenStakingsTable.c.tokenStakingId.in_(tokenStakingIds)).returning(TokenStakingsTable.c.tokenStakingId)
         await self._execute(query=query, connection=connection)
 
+    async def upsert_token_stakings(self, retrievedTokenStakings: Sequence[RetrievedTokenStaking], connection: Optional[DatabaseConnection] = None) -> None:
+        # NOTE(krishan711): an existing staking is only replaced by one staked at the same time or later so reprocessing old blocks can't overwrite newer stakings
+        if len(retrievedTokenStakings) == 0:
+            return
+        createdDate = date_util.datetime_from_now()
+        updatedDate = createdDate
+        for chunk in list_util.generate_chunks(lst=retrievedTokenStakings, chunkSize=100):
+            values = [self._get_create_token_staking_values(retrievedTokenStaking=retrievedTokenStaking, createdDate=createdDate, updatedDate=updatedDate) for retrievedTokenStaking in chunk]
+            insertQuery = postgresql.insert(TokenStakingsTable).values(values)
+            query = insertQuery.on_conflict_do_update(
+                index_elements=[TokenStakingsTable.c.registryAddress, TokenStakingsTable.c.tokenId],
+                set_={
+                    TokenStakingsTable.c.updatedDate: insertQuery.excluded.updatedDate,
+                    TokenStakingsTable.c.stakingAddress: insertQuery.excluded.stakingAddress,
+                    TokenStakingsTable.c.ownerAddress: insertQuery.excluded.ownerAddress,
+                    TokenStakingsTable.c.stakedDate: insertQuery.excluded.stakedDate,
+                    TokenStakingsTable.c.transactionHash: insertQuery.excluded.transactionHash,
+                },
+                where=TokenStakingsTable.c.stakedDate <= insertQuery.excluded.stakedDate,
+            ).returning(TokenStakingsTable.c.tokenStakingId)
+            await self._execute(query=query, connection=connection)
+
+    async def delete_token_stakings_for_tokens(self, collectionTokenIds: Sequence[Tuple[str, str]], unstakedDate: datetime.datetime, connection: Optional[DatabaseConnection] = None) -> None:
+        if len(collectionTokenIds) == 0:
+            return
+        query = (
+            TokenStakingsTable.delete()
+            .where(sqlalchemy.tuple_(TokenStakingsTable.c.registryAddress, TokenStakingsTable.c.tokenId).in_(collectionTokenIds))
+            .where(TokenStakingsTable.c.stakedDate <= unstakedDate)
+            .returning(TokenStakingsTable.c.tokenStakingId)
+        )
+        await self._execute(query=query, connection=connection)
+
+    async def upsert_sub_collection_tokens(self, retrievedSubCollectionTokens: Sequence[RetrievedSubCollectionToken], connection: Optional[DatabaseConnection] = None) -> None:
+        if len(retrievedSubCollectionTokens) == 0:
+            return
+        creationDate = date_util.datetime_from_now()
+        for chunk in list_util.generate_chunks(lst=retrievedSubCollectionTokens, chunkSize=1000):
+            values = [{
+                SubCollectionTokensTable.c.createdDate.key: creationDate,
+                SubCollectionTokensTable.c.updatedDate.key: creationDate,
+                SubCollectionTokensTable.c.registryAddress.key: retrievedSubCollectionToken.registryAddress,
+                SubCollectionTokensTable.c.tokenId.key: retrievedSubCollectionToken.tokenId,
+                SubCollectionTokensTable.c.subCollectionId.key: retrievedSubCollectionToken.subCollectionId,
+            } for retrievedSubCollectionToken in chunk]
+            insertQuery = postgresql.insert(SubCollectionTokensTable).values(values)
+            query = insertQuery.on_conflict_do_update(
+                index_elements=[SubCollectionTokensTable.c.registryAddress, SubCollectionTokensTable.c.tokenId],
+                set_={
+                    SubCollectionTokensTable.c.updatedDate: insertQuery.excluded.updatedDate,
+                    SubCollectionTokensTable.c.subCollectionId: insertQuery.excluded.subCollectionId,
+                },
+                where=SubCollectionTokensTable.c.subCollectionId.is_distinct_from(insertQuery.excluded.subCollectionId),
+            ).returning(SubCollectionTokensTable.c.subCollectionTokenId)
+            await self._execute(query=query, connection=connection)
+
     async def update_sub_collection_token(self, subCollectionTokenId: int, subCollectionId: Optional[int] = None, connection: Optional[DatabaseConnection] = None) -> None:
         values: UpdateRecordDict = {}
         if subCollectionId is not None:
@@ -25,6 +25,7 @@ TokenTransfersTable = sqlalchemy.Table(
     sqlalchemy.Column(key='isSwap', name='is_swap', type_=sqlalchemy.Boolean, nullable=False),
     sqlalchemy.Column(key='isBatch', name='is_batch', type_=sqlalchemy.Boolean, nullable=False),
     sqlalchemy.Column(key='isOutbound', name='is_outbound', type_=sqlalchemy.Boolean, nullable=False),
+    sqlalchemy.Column(key='tokenIdSortKey', name='token_id_sort_key', type_=sqlalchemy.Numeric(precision=78, scale=0), nullable=True),
 )
 
 
@@ -58,6 +59,7 @@ TokenMetadatasTable = sqlalchemy.Table(
     sqlalchemy.Column(key='name', name='name', type_=sqlalchemy.Text, nullable=True),
     sqlalchemy.Column(key='description', name='description', type_=sqlalchemy.Text, nullable=True),
     sqlalchemy.Column(key='attributes', name='attributes', type_=sqlalchemy.JSON, nullable=True),
+    sqlalchemy.Column(key='tokenIdSortKey', name='token_id_sort_key', type_=sqlalchemy.Numeric(precision=78, scale=0), nullable=True),
 )
 
 
@@ -96,6 +98,7 @@ TokenOwnershipsTable = sqlalchemy.Table(
     sqlalchemy.Column(key='transferValue', name='transfer_value', type_=sqlalchemy.Numeric(precision=256, scale=0), nullable=False),
     sqlalchemy.Column(key='transferDate', name='transfer_date', type_=sqlalchemy.DateTime, nullable=False),
     sqlalchemy.Column(key='transferTransactionHash', name='transfer_transaction_hash', type_=sqlalchemy.Text, nullable=False),
+    sqlalchemy.Column(key='tokenIdSortKey', name='token_id_sort_key', type_=sqlalchemy.Numeric(precision=78, scale=0), nullable=True),
 )
 
 
@@ -112,6 +115,7 @@ TokenMultiOwnershipsTable = sqlalchemy.Table(
     sqlalchemy.Column(key='averageTransferValue', name='average_transfer_value', type_=sqlalchemy.Numeric(precision=256, scale=0), nullable=False),
     sqlalchemy.Column(key='latestTransferDate', name='latest_transfer_date', type_=sqlalchemy.DateTime, nullable=False),
     sqlalchemy.Column(key='latestTransferTransactionHash', name='latest_transfer_transaction_hash', type_=sqlalchemy.Text, nullable=False),
+    sqlalchemy.Column(key='tokenIdSortKey', name='token_id_sort_key', type_=sqlalchemy.Numeric(precision=78, scale=0), nullable=True),
 )
 
 
@@ -127,6 +131,7 @@ TokenOwnershipsView = sqlalchemy.Table(
     sqlalchemy.Column(key='averageTransferValue', name='average_transfer_value', type_=sqlalchemy.Numeric(precision=256, scale=0), nullable=False),
     sqlalchemy.Column(key='latestTransferDate', name='latest_transfer_date', type_=sqlalchemy.DateTime, nullable=False),
     sqlalchemy.Column(key='latestTransferTransactionHash', name='latest_transfer_transaction_hash', type_=sqlalchemy.Text, nullable=False),
+    sqlalchemy.Column(key='tokenIdSortKey', name='token_id_sort_key', type_=sqlalchemy.Numeric(precision=78, scale=0), nullable=True),
 )
 
 
@@ -188,6 +193,7 @@ LatestUpdatesTable = sqlalchemy.Table(
     sqlalchemy.Column(key='key', name='key', type_=sqlalchemy.Text, nullable=False),
     sqlalchemy.Column(key='name', name='name', type_=sqlalchemy.Text, nullable=True),
     sqlalchemy.Column(key='date', name='date', type_=sqlalchemy.DateTime, nullable=False),
+    sqlalchemy.Column(key='cursor', name='cursor', type_=sqlalchemy.Text, nullable=True),
 )
 
 
@@ -209,6 +215,24 @@ LatestTokenListingsTable = sqlalchemy.Table(
 )
 
 
+# NOTE(krishan711): this only lives for the length of the transaction that creates it
+LatestTokenListingsStagingTable = sqlalchemy.Table(
+    'tmp_latest_token_listings',
+    metadata,
+    sqlalchemy.Column(key='registryAddress', name='registry_address', type_=sqlalchemy.Text, nullable=False),
+    sqlalchemy.Column(key='tokenId', name='token_id', type_=sqlalchemy.Text, nullable=False),
+    sqlalchemy.Column(key='offererAddress', name='offerer_address', type_=sqlalchemy.Text, nullable=False),
+    sqlalchemy.Column(key='startDate', name='start_date', type_=sqlalchemy.DateTime, nullable=False),
+    sqlalchemy.Column(key='endDate', name='end_date', type_=sqlalchemy.DateTime, nullable=False),
+    sqlalchemy.Column(key='isValueNative', name='is_value_native', type_=sqlalchemy.Boolean, nullable=False),
+    sqlalchemy.Column(key='value', name='value', type_=sqlalchemy.Numeric(precision=256, scale=0), nullable=False),
+    sqlalchemy.Column(key='source', name='source', type_=sqlalchemy.Text, nullable=False),
+    sqlalchemy.Column(key='sourceId', name='source_id', type_=sqlalchemy.Text, nullable=False),
+    prefixes=['TEMPORARY'],
+    postgresql_on_commit='DROP',
+)
+
+
 OrderedTokenListingsView = sqlalchemy.Table(
     'vw_ordered_token_listings',
     metadata,
@@ -228,6 +252,25 @@ OrderedTokenListingsView = sqlalchemy.Table(
 )
 
 
+# NOTE(krishan711): one row per token holding its cheapest valid listing (maintained by Saver.update_best_token_listings)
+BestTokenListingsTable = sqlalchemy.Table(
+    'tbl_best_token_listings',
+    metadata,
+    sqlalchemy.Column(key='latestTokenListingId', name='id', type_=sqlalchemy.Integer, nullable=False),
+    sqlalchemy.Column(key='createdDate', name='created_date', type_=sqlalchemy.DateTime, nullable=False),
+    sqlalchemy.Column(key='updatedDate', name='updated_date', type_=sqlalchemy.DateTime, nullable=False),
+    sqlalchemy.Column(key='registryAddress', name='registry_address', type_=sqlalchemy.Text, primary_key=True, nullable=False),
+    sqlalchemy.Column(key='tokenId', name='token_id', type_=sqlalchemy.Text, primary_key=True, nullable=False),
+    sqlalchemy.Column(key='offererAddress', name='offerer_address', type_=sqlalchemy.Text, nullable=False),
+    sqlalchemy.Column(key='startDate', name='start_date', type_=sqlalchemy.DateTime, nullable=False),
+    sqlalchemy.Column(key='endDate', name='end_date', type_=sqlalchemy.DateTime, nullable=False),
+    sqlalchemy.Column(key='isValueNative', name='is_value_native', type_=sqlalchemy.Boolean, nullable=False),
+    sqlalchemy.Column(key='value', name='value', type_=sqlalchemy.Numeric(precision=256, scale=0), nullable=False),
+    sqlalchemy.Column(key='source', name='source', type_=sqlalchemy.Text, nullable=False),
+    sqlalchemy.Column(key='sourceId', name='source_id', type_=sqlalchemy.Text, nullable=False),
+)
+
+
 TokenAttributesTable = sqlalchemy.Table(
     'tbl_token_attributes',
     metadata,
@@ -241,6 +284,20 @@ TokenAttributesTable = sqlalchemy.Table(
 )
 
 
+TokenAttributeBitmapsTable = sqlalchemy.Table(
+    'tbl_token_attribute_bitmaps',
+    metadata,
+    sqlalchemy.Column(key='tokenAttributeBitmapId', name='id', type_=sqlalchemy.Integer, autoincrement=True, primary_key=True, nullable=False),
+    sqlalchemy.Column(key='createdDate', name='created_date', type_=sqlalchemy.DateTime, nullable=False),
+    sqlalchemy.Column(key='updatedDate', name='updated_date', type_=sqlalchemy.DateTime, nullable=False),
+    sqlalchemy.Column(key='registryAddress', name='registry_address', type_=sqlalchemy.Text, nullable=False),
+    sqlalchemy.Column(key='name', name='name', type_=sqlalchemy.Text, nullable=False),
+    sqlalchemy.Column(key='value', name='value', type_=sqlalchemy.Text, nullable=False),
+    sqlalchemy.Column(key='tokenCount', name='token_count', type_=sqlalchemy.Integer, nullable=False),
+    sqlalchemy.Column(key='bitmap', name='bitmap', type_=sqlalchemy.LargeBinary, nullable=False),
+)
+
+
 TokenCustomizationsTable = sqlalchemy.Table(
     'tbl_token_customizations',
     metadata,
@@ -364,6 +421,45 @@ AccountCollectionGmsTable = sqlalchemy.Table(
 )
 
 
+GmAccountCountsTable = sqlalchemy.Table(
+    'tbl_gm_account_counts',
+    metadata,
+    sqlalchemy.Column(key='createdDate', name='created_date', type_=sqlalchemy.DateTime, nullable=False),
+    sqlalchemy.Column(key='updatedDate', name='updated_date', type_=sqlalchemy.DateTime, nullable=False),
+    sqlalchemy.Column(key='address', name='address', type_=sqlalchemy.Text, primary_key=True, nullable=False),
+    sqlalchemy.Column(key='latestDate', name='latest_date', type_=sqlalchemy.DateTime, nullable=False),
+    sqlalchemy.Column(key='streakLength', name='streak_length', type_=sqlalchemy.Integer, nullable=False),
+    sqlalchemy.Column(key='weekCount', name='week_count', type_=sqlalchemy.Integer, nullable=False),
+    sqlalchemy.Column(key='monthCount', name='month_count', type_=sqlalchemy.Integer, nullable=False),
+)
+
+
+GmAccountCollectionCountsTable = sqlalchemy.Table(
+    'tbl_gm_account_collection_counts',
+    metadata,
+    sqlalchemy.Column(key='createdDate', name='created_date', type_=sqlalchemy.DateTime, nullable=False),
+    sqlalchemy.Column(key='updatedDate', name='updated_date', type_=sqlalchemy.DateTime, nullable=False),
+    sqlalchemy.Column(key='registryAddress', name='registry_address', type_=sqlalchemy.Text, primary_key=True, nullable=False),
+    sqlalchemy.Column(key='accountAddress', name='account_address', type_=sqlalchemy.Text, primary_key=True, nullable=False),
+    sqlalchemy.Column(key='latestDate', name='latest_date', type_=sqlalchemy.DateTime, nullable=False),
+    sqlalchemy.Column(key='weekCount', name='week_count', type_=sqlalchemy.Integer, nullable=False),
+    sqlalchemy.Column(key='monthCount', name='month_count', type_=sqlalchemy.Integer, nullable=False),
+)
+
+
+GmCollectionCountsTable = sqlalchemy.Table(
+    'tbl_gm_collection_counts',
+    metadata,
+    sqlalchemy.Column(key='createdDate', name='created_date', type_=sqlalchemy.DateTime, nullable=False),
+    sqlalchemy.Column(key='updatedDate', name='updated_date', type_=sqlalchemy.DateTime, nullable=False),
+    sqlalchemy.Column(key='registryAddress', name='registry_address', type_=sqlalchemy.Text, primary_key=True, nullable=False),
+    sqlalchemy.Column(key='todayDate', name='today_date', type_=sqlalchemy.DateTime, nullable=False),
+    sqlalchemy.Column(key='todayCount', name='today_count', type_=sqlalchemy.Integer, nullable=False),
+    sqlalchemy.Column(key='weekCount', name='week_count', type_=sqlalchemy.Integer, nullable=False),
+    sqlalchemy.Column(key='monthCount', name='month_count', type_=sqlalchemy.Integer, nullable=False),
+)
+
+
 TokenCollectionOverlapsTable = sqlalchemy.Table(
     'tbl_collection_overlaps',
     metadata,
@@ -469,3 +565,37 @@ SubCollectionTokensTable = sqlalchemy.Table(
     sqlalchemy.Column(key='subCollectionId', name='sub_collection_id', type_=sqlalchemy.BIGINT, nullable=False),
     sqlalchemy.Column(key='tokenId', name='token_id', type_=sqlalchemy.Text, nullable=False),
 )
+
+
+# NOTE(krishan711): shared by every broadcast channel so event ids are ordered across all the api processes
+BroadcastEventIdsSequence = sqlalchemy.Sequence(name='seq_broadcast_event_ids', metadata=metadata)
+
+
+QueueMessagesTable = sqlalchemy.Table(
+    'tbl_queue_messages',
+    metadata,
+    sqlalchemy.Column(key='queueMessageId', name='id', type_=sqlalchemy.BIGINT, autoincrement=True, primary_key=True, nullable=False),
+    sqlalchemy.Column(key='createdDate', name='created_date', type_=sqlalchemy.DateTime, nullable=False),
+    sqlalchemy.Column(key='updatedDate', name='updated_date', type_=sqlalchemy.DateTime, nullable=False),
+    sqlalchemy.Column(key='queueName', name='queue_name', type_=sqlalchemy.Text, nullable=False),
+    sqlalchemy.Column(key='visibleDate', name='visible_date', type_=sqlalchemy.DateTime, nullable=False),
+    sqlalchemy.Column(key='receiveCount', name='receive_count', type_=sqlalchemy.Integer, nullable=False),
+    sqlalchemy.Column(key='receiptHandle', name='receipt_handle', type_=sqlalchemy.Text, nullable=True),
+    sqlalchemy.Column(key='body', name='body', type_=sqlalchemy.Text, nullable=False),
+)
+
+
+BackfillCheckpointsTable = sqlalchemy.Table(
+    'tbl_backfill_checkpoints',
+    metadata,
+    sqlalchemy.Column(key='backfillCheckpointId', name='id', type_=sqlalchemy.Integer, autoincrement=True, primary_key=True, nullable=False),
+    sqlalchemy.Column(key='createdDate', name='created_date', type_=sqlalchemy.DateTime, nullable=False),
+    sqlalchemy.Column(key='updatedDate', name='updated_date', type_=sqlalchemy.DateTime, nullable=False),
+    sqlalchemy.Column(key='jobName', name='job_name', type_=sqlalchemy.Text, nullable=False),
+    sqlalchemy.Column(key='startIndex', name='start_index', type_=sqlalchemy.BIGINT, nullable=False),
+    sqlalchemy.Column(key='endIndex', name='end_index', type_=sqlalchemy.BIGINT, nullable=False),
+    sqlalchemy.Column(key='completedIndex', name='completed_index', type_=sqlalchemy.BIGINT, nullable=False),
+    sqlalchemy.Column(key='leaseOwner', name='lease_owner', type_=sqlalchemy.Text, nullable=True),
+    sqlalchemy.Column(key='leaseDate', name='lease_date', type_=sqlalchemy.DateTime, nullable=True),
+    sqlalchemy.Column(key='completedDate', name='completed_date', type_=sqlalchemy.DateTime, nullable=True),
+)
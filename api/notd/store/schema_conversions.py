@@ -18,6 +18,7 @@ from notd.model import Signature
 from notd.model import SubCollection
 from notd.model import SubCollectionToken
 from notd.model import TokenAttribute
+from notd.model import TokenAttributeBitmap
 from notd.model import TokenCustomization
 from notd.model import TokenListing
 from notd.model import TokenMetadata
@@ -40,6 +41,7 @@ from notd.store.schema import LatestUpdatesTable
 from notd.store.schema import LocksTable
 from notd.store.schema import SubCollectionsTable
 from notd.store.schema import SubCollectionTokensTable
+from notd.store.schema import TokenAttributeBitmapsTable
 from notd.store.schema import TokenAttributesTable
 from notd.store.schema import TokenCollectionOverlapsTable
 from notd.store.schema import TokenCollectionsTable
@@ -217,6 +219,7 @@ def latest_update_from_row(rowMapping: RowMapping) -> LatestUpdate:
         key=rowMapping[LatestUpdatesTable.c.key],
         name=rowMapping[LatestUpdatesTable.c.name],
         date=rowMapping[LatestUpdatesTable.c.date],
+        cursor=rowMapping[LatestUpdatesTable.c.cursor],
     )
 
 
@@ -250,6 +253,19 @@ def token_attribute_from_row(rowMapping: RowMapping) -> TokenAttribute:
     )
 
 
+def token_attribute_bitmap_from_row(rowMapping: RowMapping) -> TokenAttributeBitmap:
+    return TokenAttributeBitmap(
+        tokenAttributeBitmapId=rowMapping[TokenAttributeBitmapsTable.c.tokenAttributeBitmapId],
+        createdDate=rowMapping[TokenAttributeBitmapsTable.c.createdDate],
+        updatedDate=rowMapping[TokenAttributeBitmapsTable.c.updatedDate],
+        registryAddress=rowMapping[TokenAttributeBitmapsTable.c.registryAddress],
+        name=rowMapping[TokenAttributeBitmapsTable.c.name],
+        value=rowMapping[TokenAttributeBitmapsTable.c.value],
+        tokenCount=rowMapping[TokenAttributeBitmapsTable.c.tokenCount],
+        bitmap=bytes(rowMapping[TokenAttributeBitmapsTable.c.bitmap]),
+    )
+
+
 def token_customization_from_row(rowMapping: RowMapping) -> TokenCustomization:
     return TokenCustomization(
         tokenCustomizationId=rowMapping[TokenCustomizationsTable.c.tokenCustomizationId],
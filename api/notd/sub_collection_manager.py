@@ -1,5 +1,6 @@
 import logging
 from typing import Optional
+from typing import Sequence
 
 from core.exceptions import NotFoundException
 from core.queues.message_queue import MessageQueue
@@ -65,3 +66,17 @@ class SubCollectionManager:
                 await self.saver.update_sub_collection(connection=connection, subCollectionId=subCollection.subCollectionId, name=retrievedSubCollection.name, symbol=retrievedSubCollection.symbol, description=retrievedSubCollection.description, imageUrl=retrievedSubCollection.imageUrl, twitterUsername=retrievedSubCollection.twitterUsername, instagramUsername=retrievedSubCollection.instagramUsername, wikiUrl=retrievedSubCollection.wikiUrl, openseaSlug=retrievedSubCollection.openseaSlug, url=retrievedSubCollection.url, discordUrl=retrievedSubCollection.discordUrl, bannerImageUrl=retrievedSubCollection.bannerImageUrl, doesSupportErc721=retrievedSubCollection.doesSupportErc721, doesSupportErc1155=retrievedSubCollection.doesSupportErc1155)
             else:
                 await self.saver.create_sub_collection(connection=connection, registryAddress=registryAddress, externalId=externalId, name=retrievedSubCollection.name, symbol=retrievedSubCollection.symbol, description=retrievedSubCollection.description, imageUrl=retrievedSubCollection.imageUrl, twitterUsername=retrievedSubCollection.twitterUsername, instagramUsername=retrievedSubCollection.instagramUsername, wikiUrl=retrievedSubCollection.wikiUrl, openseaSlug=retrievedSubCollection.openseaSlug, url=retrievedSubCollection.url, discordUrl=retrievedSubCollection.discordUrl, bannerImageUrl=retrievedSubCollection.bannerImageUrl, doesSupportErc721=retrievedSubCollection.doesSupportErc721, doesSupportErc1155=retrievedSubCollection.doesSupportErc1155)
+
+    async def update_sub_collections(self, registryAddress: str, externalIds: Sequence[str], shouldForce: Optional[bool] = False) -> None:
+        externalIdsToUpdate = set(externalIds)
+        if not shouldForce and len(externalIdsToUpdate) > 0:
+            recentlyUpdatedSubCollections = await self.retriever.list_sub_collections(
+                fieldFilters=[
+                    StringFieldFilter(fieldName=SubCollectionsTable.c.registryAddress.key, eq=registryAddress),
+                    StringFieldFilter(fieldName=SubCollectionsTable.c.externalId.key, containedIn=list(externalIdsToUpdate)),
+                    DateFieldFilter(fieldName=SubCollectionsTable.c.updatedDate.key, gt=date_util.datetime_from_now(days=-_SUB_COLLECTION_UPDATE_MIN_DAYS))
+                ],
+            )
+            externalIdsToUpdate -= {subCollection.externalId for subCollection in recentlyUpdatedSubCollections}
+        for externalId in sorted(externalIdsToUpdate):
+            await self.update_sub_collection(registryAddress=registryAddress, externalId=externalId, shouldForce=True)
@@ -1,9 +1,13 @@
-from core.exceptions import NotFoundException
+from typing import Sequence
+
+from core.store.retriever import StringFieldFilter
 from core.util import chain_util
 
 from notd.model import SUB_COLLECTION_PARENT_ADDRESSES
+from notd.model import RetrievedSubCollectionToken
 from notd.store.retriever import Retriever
 from notd.store.saver import Saver
+from notd.store.schema import SubCollectionsTable
 from notd.sub_collection_manager import SubCollectionManager
 from notd.sub_collection_token_processor import SubCollectionTokenProcessor
 
@@ -20,21 +24,27 @@ class SubCollectionTokenManager:
         return registryAddress in SUB_COLLECTION_PARENT_ADDRESSES
 
     async def update_sub_collection_token(self, registryAddress: str, tokenId: str) -> None:
+        await self.update_sub_collection_tokens(registryAddress=registryAddress, tokenIds=[tokenId])
+
+    async def update_sub_collection_tokens(self, registryAddress: str, tokenIds: Sequence[str]) -> None:
         registryAddress = chain_util.normalize_address(value=registryAddress)
         hasSubCollections = await self.has_sub_collections(registryAddress=registryAddress)
-        if not hasSubCollections:
+        if not hasSubCollections or len(tokenIds) == 0:
             return
-        subCollectionKey = await self.subCollectionTokenProcessor.retrieve_sub_collection_name(registryAddress=registryAddress, tokenId=tokenId)
-        if not subCollectionKey:
+        tokenIdSubCollectionKeyMap = await self.subCollectionTokenProcessor.retrieve_sub_collection_keys(registryAddress=registryAddress, tokenIds=sorted(set(tokenIds)))
+        tokenIdExternalIdMap = {tokenId: subCollectionKey.externalId for tokenId, subCollectionKey in tokenIdSubCollectionKeyMap.items() if subCollectionKey.externalId}
+        if len(tokenIdExternalIdMap) == 0:
             return
-        await self.subCollectionManager.update_sub_collection(registryAddress=subCollectionKey.registryAddress, externalId=subCollectionKey.externalId)
-        subCollection = await self.retriever.get_sub_collection_by_registry_address_external_id(registryAddress=registryAddress, externalId=subCollectionKey.externalId)
-        if subCollectionKey.externalId:
-            try:
-                subCollectionToken = await self.retriever.get_sub_collection_token_by_registry_address_token_id(registryAddress=registryAddress, tokenId=tokenId)
-            except NotFoundException:
-                subCollectionToken = None
-            if subCollectionToken:
-                await self.saver.update_sub_collection_token(subCollectionTokenId=subCollectionToken.subCollectionTokenId, subCollectionId=subCollectionToken.subCollectionId)
-            else:
-                await self.saver.create_sub_collection_token(registryAddress=registryAddress, tokenId=tokenId, subCollectionId=subCollection.subCollectionId)
+        # NOTE(krishan711): many tokens share a sub-collection so each one is only refreshed once per batch
+        externalIds = sorted(set(tokenIdExternalIdMap.values()))
+        await self.subCollectionManager.update_sub_collections(registryAddress=registryAddress, externalIds=externalIds)
+        subCollections = await self.retriever.list_sub_collections(fieldFilters=[
+            StringFieldFilter(fieldName=SubCollectionsTable.c.registryAddress.key, eq=registryAddress),
+            StringFieldFilter(fieldName=SubCollectionsTable.c.externalId.key, containedIn=externalIds),
+        ])
+        externalIdSubCollectionIdMap = {subCollection.externalId: subCollection.subCollectionId for subCollection in subCollections}
+        retrievedSubCollectionTokens = [
+            RetrievedSubCollectionToken(registryAddress=registryAddress, tokenId=tokenId, subCollectionId=externalIdSubCollectionIdMap[externalId])
+            for tokenId, externalId in tokenIdExternalIdMap.items() if externalId in externalIdSubCollectionIdMap
+        ]
+        await self.saver.upsert_sub_collection_tokens(retrievedSubCollectionTokens=retrievedSubCollectionTokens)
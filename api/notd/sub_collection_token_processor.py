@@ -1,12 +1,20 @@
+import asyncio
+from typing import Dict
 from typing import Optional
+from typing import Sequence
 
 from core import logging
 from core.exceptions import KibaException
 from core.requester import Requester
+from core.util import list_util
+from core.util.typing_util import JSON1
 
 from notd.model import OPENSEA_SHARED_STOREFRONT_ADDRESS
 from notd.model import SubCollectionKey
 
+# NOTE(krishan711): opensea allows at most 30 token_ids per assets request
+_OPENSEA_API_ASSETS_CHUNK_SIZE = 30
+_OPENSEA_API_ASSETS_PAGE_SIZE = 50
 
 class SubCollectionTokenProcessor:
 
@@ -26,3 +34,33 @@ class SubCollectionTokenProcessor:
             collectionName = tokenAssetDict.get('collection', {}).get('slug', None)
             return SubCollectionKey(registryAddress=registryAddress, externalId=collectionName)
         raise KibaException(message=f'Unhandled registryAddress: {registryAddress}')
+
+    async def retrieve_sub_collection_keys(self, registryAddress: str, tokenIds: Sequence[str]) -> Dict[str, SubCollectionKey]:
+        if registryAddress != OPENSEA_SHARED_STOREFRONT_ADDRESS:
+            raise KibaException(message=f'Unhandled registryAddress: {registryAddress}')
+        tokenIdSubCollectionKeyMap: Dict[str, SubCollectionKey] = {}
+        for index, chunkedTokenIds in enumerate(list_util.generate_chunks(lst=list(tokenIds), chunkSize=_OPENSEA_API_ASSETS_CHUNK_SIZE)):
+            queryData: Dict[str, JSON1] = {
+                'asset_contract_address': registryAddress,
+                'token_ids': chunkedTokenIds,  # type: ignore[dict-item]
+                'limit': _OPENSEA_API_ASSETS_PAGE_SIZE,
+            }
+            pageCount = 0
+            while True:
+                logging.stat('RETRIEVE_SUB_COLLECTIONS_OPENSEA', registryAddress, float(f'{index}.{pageCount}'))
+                try:
+                    response = await self.openseaRequester.get(url='https://api.opensea.io/api/v1/assets', dataDict=queryData, timeout=30)
+                except Exception as exception:  # pylint: disable=broad-except
+                    logging.info(f'Failed find sub-collections for {len(chunkedTokenIds)} tokens in {registryAddress}: {str(exception)}')
+                    break
+                responseJson = response.json()
+                for assetDict in (responseJson.get('assets') or []):
+                    collectionName = (assetDict.get('collection') or {}).get('slug', None)
+                    tokenIdSubCollectionKeyMap[str(assetDict['token_id'])] = SubCollectionKey(registryAddress=registryAddress, externalId=collectionName)
+                if not responseJson.get('next'):
+                    break
+                queryData['cursor'] = responseJson['next']
+                pageCount += 1
+                # NOTE(krishan711): sleep to avoid opensea limits
+                await asyncio.sleep(0.2)
+        return tokenIdSubCollectionKeyMap
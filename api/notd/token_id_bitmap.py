@@ -0,0 +1,38 @@
+import zlib
+from typing import Collection
+from typing import List
+from typing import Optional
+
+# NOTE(krishan711): one bit per token id so anything above this would make the bitmaps too big to be worth it
+MAX_BITMAP_TOKEN_ID = 1_000_000
+
+
+def get_bitmap_token_id(tokenId: str) -> Optional[int]:
+    # NOTE(krishan711): only plain decimal ids can round-trip through a bitmap position back to the stored token id
+    if not (tokenId.isascii() and tokenId.isdecimal()) or (len(tokenId) > 1 and tokenId.startswith('0')):
+        return None
+    tokenIdValue = int(tokenId)
+    if tokenIdValue > MAX_BITMAP_TOKEN_ID:
+        return None
+    return tokenIdValue
+
+
+def create_bitmap(tokenIdValues: Collection[int]) -> bytearray:
+    # NOTE(krishan711): setting bits in a preallocated buffer is linear, or-ing into an int copies the whole int for every token
+    bitmap = bytearray(((max(tokenIdValues) >> 3) + 1) if len(tokenIdValues) > 0 else 0)
+    for tokenIdValue in tokenIdValues:
+        bitmap[tokenIdValue >> 3] |= 1 << (tokenIdValue & 7)
+    return bitmap
+
+
+def serialize_bitmap(bitmap: bytearray) -> bytes:
+    return zlib.compress(bitmap)
+
+
+def deserialize_bitmap(value: bytes) -> int:
+    return int.from_bytes(zlib.decompress(value), byteorder='little')
+
+
+def get_bitmap_token_ids(bitmap: int) -> List[str]:
+    reversedBits = bin(bitmap)[:1:-1]
+    return [str(index) for index, bit in enumerate(reversedBits) if bit == '1']
@@ -1,9 +1,11 @@
 import asyncio
 import datetime
+from typing import AsyncGenerator
 from typing import Dict
 from typing import List
 from typing import Optional
 from typing import Sequence
+from typing import Tuple
 
 from core import logging
 from core.requester import Requester
@@ -43,12 +45,12 @@ class TokenListingProcessor:
         self.lockManager = lockManager
         self.collectionManger = collectionManger
 
-    async def get_opensea_listings_for_collection(self, registryAddress: str) -> List[RetrievedTokenListing]:
-        listings = []
-        async with self.lockManager.with_lock(name='opensea-requester', timeoutSeconds=100, expirySeconds=240):
+    async def generate_opensea_listing_pages_for_collection(self, registryAddress: str, startCursor: Optional[str] = None) -> AsyncGenerator[Tuple[List[RetrievedTokenListing], Optional[str]], None]:
+        # NOTE(krishan711): yields (listings, nextCursor) per page. the lock is held for the whole refresh so two refreshes can never interleave their pages
+        async with self.lockManager.with_lock(name='opensea-requester', timeoutSeconds=100, expirySeconds=60 * 15):
             collection = await self.collectionManger.get_collection_by_address(address=registryAddress)
             collectionOpenseaSlug = collection.openseaSlug
-            nextPageId: Optional[str] = None
+            nextPageId = startCursor
             pageCount = 0
             while True:
                 logging.stat('RETRIEVE_LISTINGS_OPENSEA', registryAddress, float(f'{pageCount}'))
@@ -59,7 +61,10 @@ class TokenListingProcessor:
                 if nextPageId:
                     queryData['next'] = nextPageId
                 response = await self.openseaRequester.get(url=f'https://api.opensea.io/v2/listings/collection/{collectionOpenseaSlug}/all', dataDict=queryData, timeout=30)
+                # NOTE(krishan711): sleep to avoid opensea limits
+                await asyncio.sleep(0.2)
                 responseJson = response.json()
+                listings = []
                 for openseaListing in (responseJson.get('listings') or []):
                     startDate = _timestamp_to_datetime(timestamp=int(openseaListing['protocol_data']["parameters"]["startTime"]))
                     endDate = _timestamp_to_datetime(timestamp=int(openseaListing['protocol_data']["parameters"]["endTime"]))
@@ -81,14 +86,11 @@ class TokenListingProcessor:
                         sourceId=sourceId,
                     )
                     listings.append(listing)
-                # NOTE(krishan711): sleep to avoid opensea limits
-                await asyncio.sleep(0.2)
-                if responseJson.get('next'):
-                    nextPageId = responseJson.get('next')
-                    pageCount += 1
-                else:
+                nextPageId = responseJson.get('next') or None
+                yield listings, nextPageId
+                if not nextPageId:
                     break
-            return listings
+                pageCount += 1
 
     async def get_opensea_listings_for_tokens(self, registryAddress: str, tokenIds: Sequence[str]) -> List[RetrievedTokenListing]:
         listings = []
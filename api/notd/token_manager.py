@@ -2,6 +2,7 @@ import asyncio
 from typing import List
 from typing import Optional
 from typing import Sequence
+from typing import Set
 from typing import Tuple
 
 import sqlalchemy
@@ -18,6 +19,8 @@ from core.util import list_util
 from notd.collection_manager import CollectionManager
 from notd.messages import UpdateCollectionTokensMessageContent
 from notd.messages import UpdateTokenMetadataMessageContent
+from notd.model import Collection
+from notd.model import RetrievedTokenMetadata
 from notd.model import TokenMetadata
 from notd.ownership_manager import OwnershipManager
 from notd.store.retriever import Retriever
@@ -56,23 +59,41 @@ class TokenManager:
             tokenMetadata = await self.retriever.get_token_metadata_by_registry_address_token_id(registryAddress=registryAddress, tokenId=tokenId)
         return tokenMetadata
 
+    async def _get_recently_updated_collection_token_ids(self, collectionTokenIds: Sequence[Tuple[str, str]]) -> Set[Tuple[str, str]]:
+        recentlyUpdatedCollectionTokenIds: Set[Tuple[str, str]] = set()
+        for chunkedCollectionTokenIds in list_util.generate_chunks(lst=list(collectionTokenIds), chunkSize=1000):
+            query = (
+                TokenMetadatasTable.select()
+                    .where(TokenMetadatasTable.c.updatedDate > date_util.datetime_from_now(days=-_TOKEN_UPDATE_MIN_DAYS))
+                    .where(sqlalchemy.tuple_(TokenMetadatasTable.c.registryAddress, TokenMetadatasTable.c.tokenId).in_(chunkedCollectionTokenIds))
+            )
+            recentlyUpdatedTokenMetadatas = await self.retriever.query_token_metadatas(query=query)
+            recentlyUpdatedTokenIds = {(tokenMetadata.registryAddress, tokenMetadata.tokenId) for tokenMetadata in recentlyUpdatedTokenMetadatas}
+            logging.info(f'Skipping {len(recentlyUpdatedTokenIds)} collectionTokenIds because they have been updated recently.')
+            recentlyUpdatedCollectionTokenIds.update(recentlyUpdatedTokenIds)
+        return recentlyUpdatedCollectionTokenIds
+
+    @staticmethod
+    def _has_token_metadata_changed(tokenMetadata: TokenMetadata, retrievedTokenMetadata: RetrievedTokenMetadata) -> bool:
+        return (
+            tokenMetadata.metadataUrl != retrievedTokenMetadata.metadataUrl or \
+            tokenMetadata.name != retrievedTokenMetadata.name  or \
+            tokenMetadata.description != retrievedTokenMetadata.description or \
+            tokenMetadata.imageUrl != retrievedTokenMetadata.imageUrl or \
+            tokenMetadata.resizableImageUrl != retrievedTokenMetadata.resizableImageUrl or \
+            tokenMetadata.animationUrl != retrievedTokenMetadata.animationUrl or \
+            tokenMetadata.youtubeUrl != retrievedTokenMetadata.youtubeUrl or \
+            tokenMetadata.backgroundColor != retrievedTokenMetadata.backgroundColor or \
+            tokenMetadata.frameImageUrl != retrievedTokenMetadata.frameImageUrl or \
+            tokenMetadata.attributes != retrievedTokenMetadata.attributes
+        )
+
     async def update_token_metadatas_deferred(self, collectionTokenIds: Sequence[Tuple[str, str]], shouldForce: Optional[bool] = False) -> None:
         if len(collectionTokenIds) == 0:
             return
-        collectionTokenIdsToProcess = set()
-        if shouldForce:
-            collectionTokenIdsToProcess = set(collectionTokenIds)
-        else:
-            for chunkedCollectionTokenIds in list_util.generate_chunks(lst=list(collectionTokenIds), chunkSize=1000):
-                query = (
-                    TokenMetadatasTable.select()
-                        .where(TokenMetadatasTable.c.updatedDate > date_util.datetime_from_now(days=-_TOKEN_UPDATE_MIN_DAYS))
-                        .where(sqlalchemy.tuple_(TokenMetadatasTable.c.registryAddress, TokenMetadatasTable.c.tokenId).in_(chunkedCollectionTokenIds))
-                )
-                recentlyUpdatedTokenMetadatas = await self.retriever.query_token_metadatas(query=query)
-                recentlyUpdatedTokenIds = {(tokenMetadata.registryAddress, tokenMetadata.tokenId) for tokenMetadata in recentlyUpdatedTokenMetadatas}
-                logging.info(f'Skipping {len(recentlyUpdatedTokenIds)} collectionTokenIds because they have been updated recently.')
-                collectionTokenIdsToProcess.update(set(chunkedCollectionTokenIds) - recentlyUpdatedTokenIds)
+        collectionTokenIdsToProcess = set(collectionTokenIds)
+        if not shouldForce:
+            collectionTokenIdsToProcess -= await self._get_recently_updated_collection_token_ids(collectionTokenIds=collectionTokenIds)
         messages = [UpdateTokenMetadataMessageContent(registryAddress=registryAddress, tokenId=tokenId, shouldForce=shouldForce).to_message() for (registryAddress, tokenId) in collectionTokenIdsToProcess]
         await self.tokenQueue.send_messages(messages=messages)
 
@@ -105,13 +126,8 @@ class TokenManager:
                 logging.info('Skipping token because it has been updated recently.')
                 return
         collection = await self.collectionManager.get_collection_by_address(address=registryAddress)
-        try:
-            retrievedTokenMetadata = await self.tokenMetadataProcessor.retrieve_token_metadata(registryAddress=registryAddress, tokenId=tokenId, collection=collection)
-        except TokenMetadataUnprocessableException as exception:
-            logging.info(f'Failed to retrieve metadata for token: {registryAddress}/{tokenId}: {exception}')
-            retrievedTokenMetadata = None
-        except TokenDoesNotExistException as exception:
-            logging.info(f'Failed to retrieve metadata for token: {registryAddress}/{tokenId}: {exception}')
+        doesTokenExist, retrievedTokenMetadata = await self._retrieve_token_metadata(registryAddress=registryAddress, tokenId=tokenId, collection=collection)
+        if not doesTokenExist:
             return
         async with self.saver.create_transaction() as connection:
             try:
@@ -122,19 +138,7 @@ class TokenManager:
                 if not retrievedTokenMetadata:
                     logging.info(f'Skipped updating token metadata because it failed to retrieve.')
                     return
-                hasTokenChanged = (
-                    tokenMetadata.metadataUrl != retrievedTokenMetadata.metadataUrl or \
-                    tokenMetadata.name != retrievedTokenMetadata.name  or \
-                    tokenMetadata.description != retrievedTokenMetadata.description or \
-                    tokenMetadata.imageUrl != retrievedTokenMetadata.imageUrl or \
-                    tokenMetadata.resizableImageUrl != retrievedTokenMetadata.resizableImageUrl or \
-                    tokenMetadata.animationUrl != retrievedTokenMetadata.animationUrl or \
-                    tokenMetadata.youtubeUrl != retrievedTokenMetadata.youtubeUrl or \
-                    tokenMetadata.backgroundColor != retrievedTokenMetadata.backgroundColor or \
-                    tokenMetadata.frameImageUrl != retrievedTokenMetadata.frameImageUrl or \
-                    tokenMetadata.attributes != retrievedTokenMetadata.attributes
-                )
-                if not hasTokenChanged:
+                if not self._has_token_metadata_changed(tokenMetadata=tokenMetadata, retrievedTokenMetadata=retrievedTokenMetadata):
                     logging.info(f'Skipped updating token metadata because it has not changed.')
                     return
                 await self.saver.update_token_metadata(connection=connection, tokenMetadataId=tokenMetadata.tokenMetadataId, metadataUrl=retrievedTokenMetadata.metadataUrl, name=retrievedTokenMetadata.name, description=retrievedTokenMetadata.description, imageUrl=retrievedTokenMetadata.imageUrl, resizableImageUrl=retrievedTokenMetadata.resizableImageUrl, animationUrl=retrievedTokenMetadata.animationUrl, youtubeUrl=retrievedTokenMetadata.youtubeUrl, backgroundColor=retrievedTokenMetadata.backgroundColor, frameImageUrl=retrievedTokenMetadata.frameImageUrl, attributes=retrievedTokenMetadata.attributes)
@@ -143,6 +147,50 @@ class TokenManager:
                     retrievedTokenMetadata = TokenMetadataProcessor.get_default_token_metadata(registryAddress=registryAddress, tokenId=tokenId)
                 await self.saver.create_token_metadata(connection=connection, registryAddress=retrievedTokenMetadata.registryAddress, tokenId=retrievedTokenMetadata.tokenId, metadataUrl=retrievedTokenMetadata.metadataUrl, name=retrievedTokenMetadata.name, description=retrievedTokenMetadata.description, imageUrl=retrievedTokenMetadata.imageUrl, resizableImageUrl=retrievedTokenMetadata.resizableImageUrl, animationUrl=retrievedTokenMetadata.animationUrl, youtubeUrl=retrievedTokenMetadata.youtubeUrl, backgroundColor=retrievedTokenMetadata.backgroundColor, frameImageUrl=retrievedTokenMetadata.frameImageUrl, attributes=retrievedTokenMetadata.attributes)
 
+    async def update_token_metadatas(self, collectionTokenIds: Sequence[Tuple[str, str]], shouldForce: Optional[bool] = False) -> None:
+        collectionTokenIdsToProcess = {(chain_util.normalize_address(value=registryAddress), tokenId) for (registryAddress, tokenId) in collectionTokenIds}
+        if not shouldForce:
+            collectionTokenIdsToProcess -= await self._get_recently_updated_collection_token_ids(collectionTokenIds=list(collectionTokenIdsToProcess))
+        if len(collectionTokenIdsToProcess) == 0:
+            return
+        sortedCollectionTokenIds = sorted(collectionTokenIdsToProcess)
+        registryAddresses = list({registryAddress for (registryAddress, _) in sortedCollectionTokenIds})
+        collections = await asyncio.gather(*[self.collectionManager.get_collection_by_address(address=registryAddress) for registryAddress in registryAddresses])
+        collectionMap = dict(zip(registryAddresses, collections))
+        retrievedTokenMetadatas: List[Tuple[bool, Optional[RetrievedTokenMetadata]]] = []
+        for collectionTokenIdChunk in list_util.generate_chunks(lst=sortedCollectionTokenIds, chunkSize=10):
+            retrievedTokenMetadatas += await asyncio.gather(*[self._retrieve_token_metadata(registryAddress=registryAddress, tokenId=tokenId, collection=collectionMap[registryAddress]) for (registryAddress, tokenId) in collectionTokenIdChunk])
+        async with self.saver.create_transaction() as connection:
+            query = (
+                TokenMetadatasTable.select()
+                    .where(sqlalchemy.tuple_(TokenMetadatasTable.c.registryAddress, TokenMetadatasTable.c.tokenId).in_(sortedCollectionTokenIds))
+            )
+            tokenMetadatas = await self.retriever.query_token_metadatas(query=query, connection=connection)
+            tokenMetadataMap = {(tokenMetadata.registryAddress, tokenMetadata.tokenId): tokenMetadata for tokenMetadata in tokenMetadatas}
+            for (registryAddress, tokenId), (doesTokenExist, retrievedTokenMetadata) in zip(sortedCollectionTokenIds, retrievedTokenMetadatas):
+                if not doesTokenExist:
+                    continue
+                tokenMetadata = tokenMetadataMap.get((registryAddress, tokenId))
+                if tokenMetadata:
+                    if not retrievedTokenMetadata or not self._has_token_metadata_changed(tokenMetadata=tokenMetadata, retrievedTokenMetadata=retrievedTokenMetadata):
+                        continue
+                    await self.saver.update_token_metadata(connection=connection, tokenMetadataId=tokenMetadata.tokenMetadataId, metadataUrl=retrievedTokenMetadata.metadataUrl, name=retrievedTokenMetadata.name, description=retrievedTokenMetadata.description, imageUrl=retrievedTokenMetadata.imageUrl, resizableImageUrl=retrievedTokenMetadata.resizableImageUrl, animationUrl=retrievedTokenMetadata.animationUrl, youtubeUrl=retrievedTokenMetadata.youtubeUrl, backgroundColor=retrievedTokenMetadata.backgroundColor, frameImageUrl=retrievedTokenMetadata.frameImageUrl, attributes=retrievedTokenMetadata.attributes)
+                else:
+                    if retrievedTokenMetadata is None:
+                        retrievedTokenMetadata = TokenMetadataProcessor.get_default_token_metadata(registryAddress=registryAddress, tokenId=tokenId)
+                    await self.saver.create_token_metadata(connection=connection, registryAddress=retrievedTokenMetadata.registryAddress, tokenId=retrievedTokenMetadata.tokenId, metadataUrl=retrievedTokenMetadata.metadataUrl, name=retrievedTokenMetadata.name, description=retrievedTokenMetadata.description, imageUrl=retrievedTokenMetadata.imageUrl, resizableImageUrl=retrievedTokenMetadata.resizableImageUrl, animationUrl=retrievedTokenMetadata.animationUrl, youtubeUrl=retrievedTokenMetadata.youtubeUrl, backgroundColor=retrievedTokenMetadata.backgroundColor, frameImageUrl=retrievedTokenMetadata.frameImageUrl, attributes=retrievedTokenMetadata.attributes)
+
+    async def _retrieve_token_metadata(self, registryAddress: str, tokenId: str, collection: Collection) -> Tuple[bool, Optional[RetrievedTokenMetadata]]:
+        try:
+            retrievedTokenMetadata = await self.tokenMetadataProcessor.retrieve_token_metadata(registryAddress=registryAddress, tokenId=tokenId, collection=collection)
+        except TokenMetadataUnprocessableException as exception:
+            logging.info(f'Failed to retrieve metadata for token: {registryAddress}/{tokenId}: {exception}')
+            return (True, None)
+        except TokenDoesNotExistException as exception:
+            logging.info(f'Failed to retrieve metadata for token: {registryAddress}/{tokenId}: {exception}')
+            return (False, None)
+        return (True, retrievedTokenMetadata)
+
     async def update_collection_tokens(self, address: str, shouldForce: Optional[bool] = False) -> None:
         address = chain_util.normalize_address(value=address)
         tokenMetadatas = await self.retriever.list_token_metadatas(fieldFilters=[
@@ -1,4 +1,5 @@
 import base64
+import functools
 import json
 import math
 import typing
@@ -19,8 +20,11 @@ from core.util.typing_util import JSON
 from core.util.typing_util import JSON1
 from core.web3.eth_client import EthClientInterface
 from pablo import PabloClient
-from web3.main import Web3
+from web3.contract import Contract
 
+from notd.contract_store import get_contract
+from notd.contract_store import get_contract_abi
+from notd.contract_store import get_function_abi
 from notd.model import GALLERY_COLLECTIONS
 from notd.model import Collection
 from notd.model import RetrievedTokenMetadata
@@ -53,29 +57,14 @@ class TokenMetadataProcessor:
         self.ethClient = ethClient
         self.pabloClient = pabloClient
         self.openseaRequester = openseaRequester
-        self.w3 = Web3()
-        with open('./contracts/IERC721Metadata.json') as contractJsonFile:
-            erc721MetadataContractJson = json.load(contractJsonFile)
-        self.erc721MetadataContractAbi = erc721MetadataContractJson['abi']
-        self.erc721MetadataUriFunctionAbi = [internalAbi for internalAbi in self.erc721MetadataContractAbi if internalAbi.get('name') == 'tokenURI'][0]
-        self.erc721MetadataNameFunctionAbi = [internalAbi for internalAbi in self.erc721MetadataContractAbi if internalAbi.get('name') == 'name'][0]
-        with open('./contracts/CryptoPunksMetadata.json') as contractJsonFile:
-            contractJson = json.load(contractJsonFile)
-        self.cryptoPunksContract = self.w3.eth.contract(address='0x16F5A35647D6F03D5D3da7b35409D65ba03aF3B2', abi=contractJson['abi'])  # type: ignore[call-overload]
-        self.cryptoPunksAttributesFunctionAbi = [internalAbi for internalAbi in self.cryptoPunksContract.abi if internalAbi.get('name') == 'punkAttributes'][0]
-        self.cryptoPunksImageSvgFunctionAbi = [internalAbi for internalAbi in self.cryptoPunksContract.abi if internalAbi.get('name') == 'punkImageSvg'][0]
-        with open('./contracts/Autoglyphs.json') as contractJsonFile:
-            contractJson = json.load(contractJsonFile)
-        self.autoglyphsContract = self.w3.eth.contract(address='0xd4e4078ca3495DE5B1d4dB434BEbc5a986197782', abi=contractJson['abi'])  # type: ignore[call-overload]
-        with open('./contracts/IERC1155MetadataURI.json') as contractJsonFile:
-            erc1155MetadataContractJson = json.load(contractJsonFile)
-        self.erc1155MetadataContractAbi = erc1155MetadataContractJson['abi']
-        self.erc1155MetadataUriFunctionAbi = [internalAbi for internalAbi in self.erc1155MetadataContractAbi if internalAbi.get('name') == 'uri'][0]
-        #self.erc1155MetadataNameFunctionAbi = [internalAbi for internalAbi in self.erc1155MetadataContractAbi if internalAbi.get('name') == 'name'][0]
-        with open('./contracts/IERC165.json') as contractJsonFile:
-            erc165MetadataContractJson = json.load(contractJsonFile)
-        self.erc165MetadataContractAbi = erc165MetadataContractJson['abi']
-        self.erc165SupportInterfaceUriFunctionAbi = [internalAbi for internalAbi in self.erc165MetadataContractAbi if internalAbi.get('name') == 'supportsInterface'][0]
+
+    @functools.cached_property
+    def cryptoPunksContract(self) -> Contract:  # pylint: disable=invalid-name
+        return get_contract(name='CryptoPunksMetadata', address='0x16F5A35647D6F03D5D3da7b35409D65ba03aF3B2')
+
+    @functools.cached_property
+    def autoglyphsContract(self) -> Contract:  # pylint: disable=invalid-name
+        return get_contract(name='Autoglyphs', address='0xd4e4078ca3495DE5B1d4dB434BEbc5a986197782')
 
     @staticmethod
     def get_default_token_metadata(registryAddress: str, tokenId: str) -> RetrievedTokenMetadata:
@@ -209,9 +198,9 @@ class TokenMetadataProcessor:
     async def retrieve_token_metadata(self, registryAddress: str, tokenId: str, collection: Collection) -> RetrievedTokenMetadata:  # pylint: disable=too-many-statements
         if registryAddress == '0xb47e3cd837dDF8e4c57F05d70Ab865de6e193BBB':
             # NOTE(krishan711): special case for CryptoPunks
-            attributesResponse = await self.ethClient.call_function(toAddress=self.cryptoPunksContract.address, contractAbi=self.cryptoPunksContract.abi, functionAbi=self.cryptoPunksAttributesFunctionAbi, arguments={'index': int(tokenId)})
+            attributesResponse = await self.ethClient.call_function(toAddress=self.cryptoPunksContract.address, contractAbi=self.cryptoPunksContract.abi, functionAbi=get_function_abi(contractName='CryptoPunksMetadata', functionName='punkAttributes'), arguments={'index': int(tokenId)})
             attributes: JSON = [{'trait_type': 'Accessory', 'value': attribute.strip()} for attribute in attributesResponse[0].split(',')]
-            imageSvgResponse = await self.ethClient.call_function(toAddress=self.cryptoPunksContract.address, contractAbi=self.cryptoPunksContract.abi, functionAbi=self.cryptoPunksImageSvgFunctionAbi, arguments={'index': int(tokenId)})
+            imageSvgResponse = await self.ethClient.call_function(toAddress=self.cryptoPunksContract.address, contractAbi=self.cryptoPunksContract.abi, functionAbi=get_function_abi(contractName='CryptoPunksMetadata', functionName='punkImageSvg'), arguments={'index': int(tokenId)})
             return RetrievedTokenMetadata(
                 registryAddress=registryAddress,
                 tokenId=tokenId,
@@ -269,14 +258,14 @@ class TokenMetadataProcessor:
         badRequestException = None
         if collection.doesSupportErc721:
             try:
-                tokenMetadataUriResponse = (await self.ethClient.call_function(toAddress=registryAddress, contractAbi=self.erc721MetadataContractAbi, functionAbi=self.erc721MetadataUriFunctionAbi, arguments={'tokenId': int(tokenId)}))[0]
+                tokenMetadataUriResponse = (await self.ethClient.call_function(toAddress=registryAddress, contractAbi=get_contract_abi(name='IERC721Metadata'), functionAbi=get_function_abi(contractName='IERC721Metadata', functionName='tokenURI'), arguments={'tokenId': int(tokenId)}))[0]
             except BadRequestException as exception:
                 badRequestException = exception
             except UnicodeDecodeError as exception:
                 badRequestException = BadRequestException(message=str(exception))
         if collection.doesSupportErc1155:
             try:
-                tokenMetadataUriResponse = (await self.ethClient.call_function(toAddress=registryAddress, contractAbi=self.erc1155MetadataContractAbi, functionAbi=self.erc1155MetadataUriFunctionAbi, arguments={'id': int(tokenId)}))[0]
+                tokenMetadataUriResponse = (await self.ethClient.call_function(toAddress=registryAddress, contractAbi=get_contract_abi(name='IERC1155MetadataURI'), functionAbi=get_function_abi(contractName='IERC1155MetadataURI', functionName='uri'), arguments={'id': int(tokenId)}))[0]
             except BadRequestException as exception:
                 badRequestException = exception
             except UnicodeDecodeError as exception:
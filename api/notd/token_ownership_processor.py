@@ -2,7 +2,10 @@ import datetime
 from typing import Dict
 from typing import List
 from typing import Optional
+from typing import Sequence
+from typing import Tuple
 
+import sqlalchemy
 from core.exceptions import KibaException
 from core.store.retriever import DateFieldFilter
 from core.store.retriever import Direction
@@ -10,6 +13,7 @@ from core.store.retriever import FieldFilter
 from core.store.retriever import Order
 from core.store.retriever import StringFieldFilter
 from core.util import chain_util
+from core.util import list_util
 
 from notd.model import RetrievedTokenMultiOwnership
 from notd.model import RetrievedTokenOwnership
@@ -51,23 +55,42 @@ class TokenOwnershipProcessor:
             transferTransactionHash=latestTokenTransfer.transactionHash,
         )
 
+    async def calculate_token_single_ownerships(self, collectionTokenIds: Sequence[Tuple[str, str]]) -> Dict[Tuple[str, str], RetrievedTokenOwnership]:
+        # NOTE(krishan711): tokens without any transfers are left out of the result rather than raising NoOwnershipException
+        retrievedTokenOwnerships: Dict[Tuple[str, str], RetrievedTokenOwnership] = {}
+        for chunkedCollectionTokenIds in list_util.generate_chunks(lst=list(collectionTokenIds), chunkSize=1000):
+            query = (
+                sqlalchemy.select(TokenTransfersTable, BlocksTable)
+                    .join(BlocksTable, BlocksTable.c.blockNumber == TokenTransfersTable.c.blockNumber)
+                    .where(sqlalchemy.tuple_(TokenTransfersTable.c.registryAddress, TokenTransfersTable.c.tokenId).in_(chunkedCollectionTokenIds))
+                    .distinct(TokenTransfersTable.c.registryAddress, TokenTransfersTable.c.tokenId)
+                    .order_by(TokenTransfersTable.c.registryAddress, TokenTransfersTable.c.tokenId, TokenTransfersTable.c.blockNumber.desc())
+            )
+            latestTokenTransfers = await self.retriever.query_token_transfers(query=query)
+            for latestTokenTransfer in latestTokenTransfers:
+                retrievedTokenOwnerships[(latestTokenTransfer.registryAddress, latestTokenTransfer.tokenId)] = RetrievedTokenOwnership(
+                    registryAddress=latestTokenTransfer.registryAddress,
+                    tokenId=latestTokenTransfer.tokenId,
+                    ownerAddress=latestTokenTransfer.toAddress,
+                    transferDate=latestTokenTransfer.blockDate,
+                    transferValue=latestTokenTransfer.value,
+                    transferTransactionHash=latestTokenTransfer.transactionHash,
+                )
+        return retrievedTokenOwnerships
+
     async def calculate_token_multi_ownership(self, registryAddress: str, tokenId: str, date: Optional[datetime.datetime] = None) -> List[RetrievedTokenMultiOwnership]:
         ownerships: Dict[str, RetrievedTokenMultiOwnership] = {}
-        offset = 0
-        limit = 500
         filters: List[FieldFilter] = [
             StringFieldFilter(fieldName=TokenTransfersTable.c.registryAddress.key, eq=registryAddress),
             StringFieldFilter(fieldName=TokenTransfersTable.c.tokenId.key, eq=tokenId),
         ]
         if date:
             filters.append(DateFieldFilter(fieldName=BlocksTable.c.blockDate.key, lte=date))
-        while True:
-            tokenTransfers = await self.retriever.list_token_transfers(
-                fieldFilters=filters,
-                orders=[Order(fieldName=TokenTransfersTable.c.blockNumber.key, direction=Direction.ASCENDING)],
-                limit=limit,
-                offset=offset,
-            )
+        tokenTransfersIterator = self.retriever.stream_token_transfers(
+            fieldFilters=filters,
+            orders=[Order(fieldName=TokenTransfersTable.c.blockNumber.key, direction=Direction.ASCENDING)],
+        )
+        async for tokenTransfers in tokenTransfersIterator:
             for tokenTransfer in tokenTransfers:
                 if tokenTransfer.toAddress != chain_util.BURN_ADDRESS:
                     receiverOwnership = ownerships.get(tokenTransfer.toAddress)
@@ -105,7 +128,4 @@ class TokenOwnershipProcessor:
                     senderOwnership.averageTransferValue = int(currentTotalValue / senderOwnership.quantity) if senderOwnership.quantity > 0 else 0
                     senderOwnership.latestTransferDate = tokenTransfer.blockDate
                     senderOwnership.latestTransferTransactionHash = tokenTransfer.transactionHash
-            if len(tokenTransfers) < limit:
-                break
-            offset += limit
         return list(ownerships.values())
@@ -1,14 +1,10 @@
-from typing import Set
-from typing import Tuple
-
 from core import logging
 from core.queues.message_queue import MessageQueue
 from core.queues.model import Message
 from core.store.retriever import StringFieldFilter
 
 from notd.messages import UpdateTokenStakingMessageContent
-from notd.messages import UpdateTokenStakingsForCollectionMessageContent
-from notd.model import GALLERY_COLLECTIONS
+from notd.model import ProcessedBlock
 from notd.store.retriever import Retriever
 from notd.store.saver import Saver
 from notd.store.schema import TokenStakingsTable
@@ -24,10 +20,14 @@ class TokenStakingManager:
         self.tokenQueue = tokenQueue
         self.tokenStakingProcessor = tokenStakingProcessor
 
-    async def update_token_stakings_deferred(self, collectionTokenIds: Set[Tuple[str, str]]) -> None:
-        uniqueCollectionTokenIds = set(collectionTokenIds)
-        messages = [UpdateTokenStakingMessageContent(registryAddress=registryAddress, tokenId=tokenId).to_message() for (registryAddress, tokenId) in uniqueCollectionTokenIds]
-        await self.tokenQueue.send_messages(messages=messages)
+    async def update_token_stakings_for_block(self, processedBlock: ProcessedBlock) -> None:
+        retrievedTokenStakings, unstakedCollectionTokenIds = await self.tokenStakingProcessor.calculate_token_stakings_from_transfers(retrievedTokenTransfers=processedBlock.retrievedTokenTransfers, blockDate=processedBlock.blockDate)
+        if len(retrievedTokenStakings) == 0 and len(unstakedCollectionTokenIds) == 0:
+            return
+        async with self.saver.create_transaction() as connection:
+            await self.saver.upsert_token_stakings(retrievedTokenStakings=retrievedTokenStakings, connection=connection)
+            await self.saver.delete_token_stakings_for_tokens(collectionTokenIds=unstakedCollectionTokenIds, unstakedDate=processedBlock.blockDate, connection=connection)
+        logging.info(f'Saving stakings for block {processedBlock.blockNumber}: staked {len(retrievedTokenStakings)}, unstaked {len(unstakedCollectionTokenIds)}')
 
     async def update_token_staking_deferred(self, registryAddress: str, tokenId: str) -> None:
         await self.tokenQueue.send_message(message=UpdateTokenStakingMessageContent(registryAddress=registryAddress, tokenId=tokenId).to_message())
@@ -47,14 +47,3 @@ class TokenStakingManager:
             if retrievedTokenStaking:
                 logging.info(f'Saving staking for registryAddress: {registryAddress}, tokenId: {tokenId}')
                 await self.saver.create_token_staking(retrievedTokenStaking=retrievedTokenStaking, connection=connection)
-
-    async def update_token_stakings_for_all_collections_deferred(self) -> None:
-        for index, registryAddress in enumerate(GALLERY_COLLECTIONS):
-            await self.workQueue.send_message(message=UpdateTokenStakingsForCollectionMessageContent(address=registryAddress).to_message(), delaySeconds=index*20)
-
-    async def update_token_stakings_for_collection_deferred(self, address: str) -> None:
-        await self.workQueue.send_message(message=UpdateTokenStakingsForCollectionMessageContent(address=address).to_message())
-
-    async def update_token_stakings_for_collection(self, address: str) -> None:
-        collectionTokenIds = await self.tokenStakingProcessor.retrieve_collection_token_staking_ids(registryAddress=address)
-        await self.update_token_stakings_deferred(collectionTokenIds=collectionTokenIds)
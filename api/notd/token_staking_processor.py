@@ -1,21 +1,31 @@
 import datetime
-import json
+import functools
+from collections import defaultdict
 from typing import Dict
+from typing import List
 from typing import Optional
-from typing import Set
+from typing import Sequence
 from typing import Tuple
 
-import sqlalchemy
+from core import logging
 from core.exceptions import BadRequestException
 from core.store.retriever import Direction
 from core.store.retriever import Order
 from core.store.retriever import StringFieldFilter
 from core.util.chain_util import normalize_address
 from core.web3.eth_client import EthClientInterface
+from web3._utils.abi import get_abi_output_types
+from web3.auto import w3
+from web3.contract import Contract
 
+from notd.contract_store import get_contract
+from notd.contract_store import get_contract_abi
+from notd.contract_store import get_function_abi
 from notd.model import CREEPZ_STAKING_ADDRESS
+from notd.model import MULTICALL3_ADDRESS
 from notd.model import STAKING_ADDRESSES
 from notd.model import RetrievedTokenStaking
+from notd.model import RetrievedTokenTransfer
 from notd.store.retriever import Retriever
 from notd.store.schema import BlocksTable
 from notd.store.schema import TokenTransfersTable
@@ -29,16 +39,24 @@ class TokenStakingProcessor:
     def __init__(self, ethClient: EthClientInterface, retriever: Retriever) -> None:
         self.retriever = retriever
         self.ethClient = ethClient
-        with open('./contracts/CreepzStaking.json') as contractJsonFile:
-            contractJson = json.load(contractJsonFile)
-        self.creepzStakingContractAbi = contractJson['abi']
-        self.creepzStakingOwnerOfFunctionAbi = [internalAbi for internalAbi in self.creepzStakingContractAbi if internalAbi.get('name') == 'ownerOf'][0]
+
+    @functools.cached_property
+    def creepzStakingOwnerOfOutputTypes(self) -> List[str]:  # pylint: disable=invalid-name
+        return get_abi_output_types(abi=get_function_abi(contractName='CreepzStaking', functionName='ownerOf'))
+
+    @functools.cached_property
+    def creepzStakingContract(self) -> Contract:  # pylint: disable=invalid-name
+        return get_contract(name='CreepzStaking', address=CREEPZ_STAKING_ADDRESS)
+
+    @functools.cached_property
+    def multicallContract(self) -> Contract:  # pylint: disable=invalid-name
+        return get_contract(name='Multicall3', address=MULTICALL3_ADDRESS)
 
     async def retrieve_token_staking(self, registryAddress: str, tokenId: str) -> Optional[RetrievedTokenStaking]:
         tokenOwnership = await self.retriever.get_token_ownership_by_registry_address_token_id(registryAddress=registryAddress, tokenId=tokenId)
         if tokenOwnership.ownerAddress == CREEPZ_STAKING_ADDRESS:
             stakingAddress = CREEPZ_STAKING_ADDRESS
-            ownerAddress = (await self.ethClient.call_function(toAddress=CREEPZ_STAKING_ADDRESS, contractAbi=self.creepzStakingContractAbi, functionAbi=self.creepzStakingOwnerOfFunctionAbi, arguments={'tokenId': int(tokenId), 'contractAddress': registryAddress}))[0]
+            ownerAddress = (await self.ethClient.call_function(toAddress=CREEPZ_STAKING_ADDRESS, contractAbi=get_contract_abi(name='CreepzStaking'), functionAbi=get_function_abi(contractName='CreepzStaking', functionName='ownerOf'), arguments={'tokenId': int(tokenId), 'contractAddress': registryAddress}))[0]
         else:
             return None
         ownerAddress = normalize_address(ownerAddress)
@@ -62,32 +80,46 @@ class TokenStakingProcessor:
         )
         return retrievedTokenStaking
 
-    async def retrieve_collection_token_staking_ids(self, registryAddress: str) -> Set[Tuple[str, str]]:
-        stakedCollectionTokenIds: Set[Tuple[str, str]] = set()
-        for stakingAddress in STAKING_ADDRESSES:
-            stakedQuery = (
-                sqlalchemy.select(TokenTransfersTable.c.tokenId, BlocksTable.c.blockDate)
-                .join(BlocksTable, BlocksTable.c.blockNumber == TokenTransfersTable.c.blockNumber)
-                .where(TokenTransfersTable.c.registryAddress == registryAddress)
-                .where(TokenTransfersTable.c.toAddress == stakingAddress)
-                .order_by(TokenTransfersTable.c.blockNumber.asc())
-            )
-            stakedTokensResult = await self.retriever.database.execute(query=stakedQuery)
-            stakedTokens = list(stakedTokensResult)
-            unStakedQuery = (
-                sqlalchemy.select(TokenTransfersTable.c.tokenId, BlocksTable.c.blockDate)
-                .join(BlocksTable, BlocksTable.c.blockNumber == TokenTransfersTable.c.blockNumber)
-                .where(TokenTransfersTable.c.registryAddress == registryAddress)
-                .where(TokenTransfersTable.c.fromAddress == stakingAddress)
-                .order_by(TokenTransfersTable.c.blockNumber.asc())
-            )
-            unStakedTokensResult = await self.retriever.database.execute(query=unStakedQuery)
-            unStakedTokens = list(unStakedTokensResult)
-            currentlyStakedTokens: Dict[str, Tuple[str, datetime.datetime]] = {}
-            for tokenId, blockDate in stakedTokens:
-                currentlyStakedTokens[tokenId] = blockDate
-            for tokenId, blockDate in unStakedTokens:
-                if currentlyStakedTokens[tokenId] < blockDate:
-                    del currentlyStakedTokens[tokenId]
-            stakedCollectionTokenIds.update({(registryAddress, tokenId) for tokenId in currentlyStakedTokens.keys()})
-        return stakedCollectionTokenIds
+    async def _get_staked_token_owners(self, stakedTokenTransfers: Sequence[RetrievedTokenTransfer]) -> List[str]:
+        # NOTE(krishan711): only creepz can look up the staked owner, everything else (and any failed lookup) uses the staker
+        ownerAddresses = [tokenTransfer.fromAddress for tokenTransfer in stakedTokenTransfers]
+        blockNumberIndicesMap: Dict[int, List[int]] = defaultdict(list)
+        for index, tokenTransfer in enumerate(stakedTokenTransfers):
+            if tokenTransfer.toAddress == CREEPZ_STAKING_ADDRESS:
+                blockNumberIndicesMap[tokenTransfer.blockNumber].append(index)
+        for blockNumber, indices in blockNumberIndicesMap.items():
+            calls = [(CREEPZ_STAKING_ADDRESS, True, bytes.fromhex(self.creepzStakingContract.encodeABI(fn_name='ownerOf', args=[stakedTokenTransfers[index].registryAddress, int(stakedTokenTransfers[index].tokenId)])[2:])) for index in indices]
+            try:
+                response = await self.ethClient.call_contract_function(contract=self.multicallContract, functionName='aggregate3', arguments={'calls': calls}, blockNumber=blockNumber)
+            except BadRequestException as exception:
+                logging.info(f'Failed to get staked owners in block {blockNumber}, using stakers instead: {str(exception)}')
+                continue
+            for index, (isSuccess, returnData) in zip(indices, response[0]):
+                tokenTransfer = stakedTokenTransfers[index]
+                if not isSuccess:
+                    logging.info(f'Failed to get staked owner for {tokenTransfer.registryAddress}:{tokenTransfer.tokenId}, using staker instead')
+                    continue
+                (ownerAddress, ) = w3.codec.decode(types=self.creepzStakingOwnerOfOutputTypes, data=returnData)
+                ownerAddresses[index] = normalize_address(ownerAddress)
+        return ownerAddresses
+
+    async def calculate_token_stakings_from_transfers(self, retrievedTokenTransfers: Sequence[RetrievedTokenTransfer], blockDate: datetime.datetime) -> Tuple[List[RetrievedTokenStaking], List[Tuple[str, str]]]:
+        # NOTE(krishan711): transfers are in log order so the last one for each token decides whether it is staked at the end of the block
+        latestStakingTransfers: Dict[Tuple[str, str], RetrievedTokenTransfer] = {}
+        for tokenTransfer in retrievedTokenTransfers:
+            if tokenTransfer.toAddress in STAKING_ADDRESSES or tokenTransfer.fromAddress in STAKING_ADDRESSES:
+                latestStakingTransfers[(tokenTransfer.registryAddress, tokenTransfer.tokenId)] = tokenTransfer
+        stakedTokenTransfers = [tokenTransfer for tokenTransfer in latestStakingTransfers.values() if tokenTransfer.toAddress in STAKING_ADDRESSES]
+        unstakedCollectionTokenIds = [collectionTokenId for collectionTokenId, tokenTransfer in latestStakingTransfers.items() if tokenTransfer.toAddress not in STAKING_ADDRESSES]
+        ownerAddresses = await self._get_staked_token_owners(stakedTokenTransfers=stakedTokenTransfers)
+        retrievedTokenStakings = [
+            RetrievedTokenStaking(
+                registryAddress=tokenTransfer.registryAddress,
+                tokenId=tokenTransfer.tokenId,
+                stakingAddress=tokenTransfer.toAddress,
+                ownerAddress=ownerAddress,
+                stakedDate=blockDate,
+                transactionHash=tokenTransfer.transactionHash,
+            ) for tokenTransfer, ownerAddress in zip(stakedTokenTransfers, ownerAddresses)
+        ]
+        return retrievedTokenStakings, unstakedCollectionTokenIds
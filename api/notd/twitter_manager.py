@@ -8,6 +8,7 @@ from typing import Dict
 from typing import List
 from typing import Optional
 
+from core import logging
 from core.exceptions import FoundRedirectException
 from core.exceptions import NotFoundException
 from core.http.basic_authentication import BasicAuthentication
@@ -131,8 +132,8 @@ class TwitterManager:
 
     async def update_all_twitter_users(self) -> None:
         allTwitterProfiles = await self.retriever.list_twitter_profiles()
-        twitterIdProfileMap = {twitterProfile.twitterId: twitterProfile for twitterProfile in allTwitterProfiles}
-        twitterIds = list(twitterIdProfileMap.keys())
+        twitterIds = [twitterProfile.twitterId for twitterProfile in allTwitterProfiles]
+        changedProfileCount = 0
         chunkedIds = list_util.generate_chunks(twitterIds, 100)
         for chunk in chunkedIds:
             ids = ','.join(chunk)
@@ -158,9 +159,8 @@ class TwitterManager:
                         twitterId=userData['id'],
                     )
                 ]
-            for retrievedTwitterProfile in retrievedTwitterProfiles:
-                twitterProfile = twitterIdProfileMap[retrievedTwitterProfile.twitterId]
-                await self.saver.update_twitter_profile(twitterProfileId=twitterProfile.twitterProfileId, username=retrievedTwitterProfile.username, name=retrievedTwitterProfile.name, description=retrievedTwitterProfile.description, isVerified=retrievedTwitterProfile.isVerified, pinnedTweetId=retrievedTwitterProfile.pinnedTweetId, followerCount=retrievedTwitterProfile.followerCount, followingCount=retrievedTwitterProfile.followingCount, tweetCount=retrievedTwitterProfile.tweetCount)
+            changedProfileCount += await self.saver.upsert_twitter_profiles(retrievedTwitterProfiles=retrievedTwitterProfiles)
+        logging.info(f'Updated {changedProfileCount} of {len(twitterIds)} twitter profiles')
 
     async def update_twitter_profile(self, twitterId: str) -> None:
         twitterCredential = await self.retriever.get_twitter_credential_by_twitter_id(twitterId=twitterId)
@@ -0,0 +1,38 @@
+import asyncio
+import os
+import sys
+
+import asyncclick as click
+import sqlalchemy
+import tqdm
+from core import logging
+from core.store.database import Database
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from notd.store.retriever import Retriever
+from notd.store.saver import Saver
+from notd.store.schema import LatestTokenListingsTable
+
+
+@click.command()
+async def backfill_best_token_listings():
+    databaseConnectionString = Database.create_psql_connection_string(username=os.environ["DB_USERNAME"], password=os.environ["DB_PASSWORD"], host=os.environ["DB_HOST"], port=os.environ["DB_PORT"], name=os.environ["DB_NAME"])
+    database = Database(connectionString=databaseConnectionString)
+    saver = Saver(database=database)
+    retriever = Retriever(database=database)
+
+    await database.connect()
+    registryAddressesQuery = (
+        sqlalchemy.select(LatestTokenListingsTable.c.registryAddress).distinct()
+    )
+    registryAddressesResult = await retriever.database.execute(query=registryAddressesQuery)
+    registryAddresses = sorted({registryAddress for (registryAddress, ) in registryAddressesResult})
+    print(f'Got {len(registryAddresses)} registryAddresses')
+    for registryAddress in tqdm.tqdm(registryAddresses):
+        await saver.update_best_token_listings(registryAddress=registryAddress)
+    await database.disconnect()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(backfill_best_token_listings())
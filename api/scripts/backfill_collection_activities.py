@@ -5,7 +5,6 @@ import os
 import sys
 
 import asyncclick as click
-from core.queues.sqs import SqsMessageQueue
 from core.store.database import Database
 from core.store.retriever import DateFieldFilter
 from core.store.retriever import Direction
@@ -16,6 +15,7 @@ from core.util import list_util
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 from notd.collection_activity_processor import CollectionActivityProcessor
+from notd.message_queues import create_message_queue
 from notd.store.retriever import Retriever
 from notd.store.saver import Saver
 from notd.store.schema import BlocksTable
@@ -32,7 +32,7 @@ async def backfill_collection_activities(startBlock: int, endBlock: int, batchSi
     database = Database(connectionString=databaseConnectionString)
     retriever = Retriever(database=database)
     saver = Saver(database=database)
-    tokenQueue = SqsMessageQueue(region='eu-west-1', accessKeyId=os.environ['AWS_KEY'], accessKeySecret=os.environ['AWS_SECRET'], queueUrl='https://sqs.eu-west-1.amazonaws.com/097520841056/notd-token-queue')
+    tokenQueue = create_message_queue(queueBackend=os.environ.get('QUEUE_BACKEND', 'sqs'), queueName='notd-token-queue', database=database, accessKeyId=os.environ['AWS_KEY'], accessKeySecret=os.environ['AWS_SECRET'])
     collectionActivityProcessor = CollectionActivityProcessor(retriever=retriever)
     tokenManager = TokenManager(saver=saver, retriever=retriever, tokenQueue=tokenQueue, collectionProcessor=None, tokenMetadataProcessor=None, tokenOwnershipProcessor=None, collectionActivityProcessor=collectionActivityProcessor)
 
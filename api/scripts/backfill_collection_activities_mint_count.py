@@ -6,7 +6,6 @@ import sys
 import asyncclick as click
 import sqlalchemy
 from core import logging
-from core.queues.sqs import SqsMessageQueue
 from core.store.database import Database
 from core.store.retriever import DateFieldFilter
 from core.store.retriever import Direction
@@ -20,6 +19,7 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 from notd.activity_manager import ActivityManager
 from notd.collection_activity_processor import CollectionActivityProcessor
+from notd.message_queues import create_message_queue
 from notd.messages import UpdateActivityForCollectionMessageContent
 from notd.store.retriever import Retriever
 from notd.store.saver import Saver
@@ -41,7 +41,7 @@ async def backfill_collection_activities_mint_count(startBlock: int, endBlock: i
     saver = Saver(database=database)
     retriever = Retriever(database=database)
     collectionActivityProcessor = CollectionActivityProcessor(retriever=retriever)
-    tokenQueue = SqsMessageQueue(region='eu-west-1', accessKeyId=accessKeyId, accessKeySecret=accessKeySecret, queueUrl='https://sqs.eu-west-1.amazonaws.com/097520841056/notd-token-queue')
+    tokenQueue = create_message_queue(queueBackend=os.environ.get('QUEUE_BACKEND', 'sqs'), queueName='notd-token-queue', database=database, accessKeyId=accessKeyId, accessKeySecret=accessKeySecret)
     activityManager = ActivityManager(saver=saver, retriever=retriever, workQueue=None, tokenQueue=tokenQueue, collectionActivityProcessor=collectionActivityProcessor)
 
     await database.connect()
@@ -0,0 +1,131 @@
+import contextlib
+import dataclasses
+import os
+import sys
+from typing import AsyncIterator
+
+from core.http.basic_authentication import BasicAuthentication
+from core.requester import Requester
+from core.slack_client import SlackClient
+from core.store.database import Database
+from core.web3.eth_client import RestEthClient
+from pablo import PabloClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+from notd.activity_manager import ActivityManager
+from notd.attribute_manager import AttributeManager
+from notd.badge_manager import BadgeManager
+from notd.badge_processor import BadgeProcessor
+from notd.block_manager import BlockManager
+from notd.block_processor import BlockProcessor
+from notd.broadcast_hub import BroadcastHub
+from notd.broadcast_hub import PostgresBroadcastBackend
+from notd.collection_activity_processor import CollectionActivityProcessor
+from notd.collection_manager import CollectionManager
+from notd.collection_overlap_manager import CollectionOverlapManager
+from notd.collection_overlap_processor import CollectionOverlapProcessor
+from notd.collection_processor import CollectionProcessor
+from notd.delegation_manager import DelegationManager
+from notd.listing_manager import ListingManager
+from notd.lock_manager import LockManager
+from notd.manager import NotdManager
+from notd.message_queues import create_message_queue
+from notd.ownership_manager import OwnershipManager
+from notd.store.query_counting_database import QueryCountingDatabase
+from notd.store.retriever import Retriever
+from notd.store.saver import Saver
+from notd.sub_collection_manager import SubCollectionManager
+from notd.sub_collection_processor import SubCollectionProcessor
+from notd.sub_collection_token_manager import SubCollectionTokenManager
+from notd.sub_collection_token_processor import SubCollectionTokenProcessor
+from notd.token_attributes_processor import TokenAttributeProcessor
+from notd.token_listing_processor import TokenListingProcessor
+from notd.token_manager import TokenManager
+from notd.token_metadata_processor import TokenMetadataProcessor
+from notd.token_ownership_processor import TokenOwnershipProcessor
+from notd.token_staking_manager import TokenStakingManager
+from notd.token_staking_processor import TokenStakingProcessor
+from notd.twitter_manager import TwitterManager
+
+
+@dataclasses.dataclass
+class BackfillContext:
+    database: Database
+    retriever: Retriever
+    saver: Saver
+    notdManager: NotdManager
+    ownershipManager: OwnershipManager
+    slackClient: SlackClient
+
+
+@contextlib.asynccontextmanager
+async def create_backfill_context() -> AsyncIterator[BackfillContext]:
+    # NOTE(krishan711): this is the same graph the worker builds so backfill jobs behave exactly like the queued work they replay
+    openseaApiKey = os.environ['OPENSEA_API_KEY']
+    raribleApiKey = os.environ['RARIBLE_API_KEY']
+    revueApiKey = os.environ['REVUE_API_KEY']
+    accessKeyId = os.environ['AWS_KEY']
+    accessKeySecret = os.environ['AWS_SECRET']
+    twitterBearerToken = os.environ["TWITTER_BEARER_TOKEN"]
+    ethNodeUsername = os.environ["ETH_NODE_USERNAME"]
+    ethNodePassword = os.environ["ETH_NODE_PASSWORD"]
+    ethNodeUrl = os.environ["ETH_NODE_URL"]
+    queueBackend = os.environ.get('QUEUE_BACKEND', 'sqs')
+
+    databaseConnectionString = Database.create_psql_connection_string(username=os.environ["DB_USERNAME"], password=os.environ["DB_PASSWORD"], host=os.environ["DB_HOST"], port=os.environ["DB_PORT"], name=os.environ["DB_NAME"])
+    database = QueryCountingDatabase(connectionString=databaseConnectionString)
+    saver = Saver(database=database)
+    retriever = Retriever(database=database)
+    workQueue = create_message_queue(queueBackend=queueBackend, queueName='notd-work-queue', database=database, accessKeyId=accessKeyId, accessKeySecret=accessKeySecret)
+    tokenQueue = create_message_queue(queueBackend=queueBackend, queueName='notd-token-queue', database=database, accessKeyId=accessKeyId, accessKeySecret=accessKeySecret)
+    ethNodeAuth = BasicAuthentication(username=ethNodeUsername, password=ethNodePassword)
+    ethNodeRequester = Requester(headers={'Authorization': f'Basic {ethNodeAuth.to_string()}'})
+    ethClient = RestEthClient(url=ethNodeUrl, requester=ethNodeRequester)
+    blockProcessor = BlockProcessor(ethClient=ethClient)
+    requester = Requester()
+    pabloClient = PabloClient(requester=requester)
+    openseaRequester = Requester(headers={"Accept": "application/json", "X-API-KEY": openseaApiKey})
+    raribleRequester = Requester(headers={"Accept": "application/json", "X-API-KEY": raribleApiKey})
+    tokenMetadataProcessor = TokenMetadataProcessor(requester=requester, ethClient=ethClient, pabloClient=pabloClient, openseaRequester=openseaRequester)
+    collectionProcessor = CollectionProcessor(requester=requester, ethClient=ethClient, openseaApiKey=openseaApiKey)
+    tokenOwnershipProcessor = TokenOwnershipProcessor(retriever=retriever)
+    collectionActivityProcessor = CollectionActivityProcessor(retriever=retriever)
+    lockManager = LockManager(retriever=retriever, saver=saver)
+    tokenAttributeProcessor = TokenAttributeProcessor(retriever=retriever)
+    collectionOverlapProcessor = CollectionOverlapProcessor(retriever=retriever)
+    activityManager = ActivityManager(saver=saver, retriever=retriever, workQueue=workQueue, tokenQueue=tokenQueue, collectionActivityProcessor=collectionActivityProcessor)
+    attributeManager = AttributeManager(saver=saver, retriever=retriever, workQueue=workQueue, tokenQueue=tokenQueue, tokenAttributeProcessor=tokenAttributeProcessor)
+    collectionManager = CollectionManager(saver=saver, retriever=retriever, tokenQueue=tokenQueue, collectionProcessor=collectionProcessor)
+    subCollectionProcessor = SubCollectionProcessor(openseaRequester=openseaRequester, collectionManager=collectionManager)
+    subCollectionManager = SubCollectionManager(retriever=retriever, saver=saver, workQueue=workQueue, subCollectionProcessor=subCollectionProcessor)
+    subCollectionTokenProcessor = SubCollectionTokenProcessor(openseaRequester=openseaRequester)
+    subCollectionTokenManager = SubCollectionTokenManager(retriever=retriever, saver=saver, subCollectionTokenProcessor=subCollectionTokenProcessor, subCollectionManager=subCollectionManager)
+    tokenListingProcessor = TokenListingProcessor(requester=requester, openseaRequester=openseaRequester, raribleRequester=raribleRequester, lockManager=lockManager, collectionManger=collectionManager)
+    collectionOverlapManager = CollectionOverlapManager(saver=saver, retriever=retriever, workQueue=workQueue, collectionOverlapProcessor=collectionOverlapProcessor)
+    ownershipManager = OwnershipManager(saver=saver, retriever=retriever, tokenQueue=tokenQueue, tokenOwnershipProcessor=tokenOwnershipProcessor, lockManager=lockManager, collectionManager=collectionManager)
+    listingManager = ListingManager(saver=saver, retriever=retriever, workQueue=workQueue, tokenListingProcessor=tokenListingProcessor)
+    tokenManager = TokenManager(saver=saver, retriever=retriever, tokenQueue=tokenQueue, tokenMetadataProcessor=tokenMetadataProcessor, collectionManager=collectionManager, ownershipManager=ownershipManager)
+    twitterManager = TwitterManager(saver=saver, retriever=retriever, requester=requester, workQueue=workQueue, twitterBearerToken=twitterBearerToken)
+    badgeProcessor = BadgeProcessor(retriever=retriever, saver=saver)
+    badgeManager = BadgeManager(retriever=retriever, saver=saver, workQueue=workQueue, badgeProcessor=badgeProcessor)
+    delegationBroadcastHub = BroadcastHub(backend=PostgresBroadcastBackend(database=database, channel='notd_delegations'))
+    delegationManager = DelegationManager(ethClient=ethClient, delegationBroadcastHub=delegationBroadcastHub)
+    tokenStakingProcessor = TokenStakingProcessor(ethClient=ethClient, retriever=retriever)
+    tokenStakingManager = TokenStakingManager(retriever=retriever, saver=saver, tokenQueue=tokenQueue, workQueue=workQueue, tokenStakingProcessor=tokenStakingProcessor)
+    blockManager = BlockManager(saver=saver, retriever=retriever, workQueue=workQueue, blockProcessor=blockProcessor, tokenManager=tokenManager, collectionManager=collectionManager, ownershipManager=ownershipManager, tokenStakingManager=tokenStakingManager, delegationManager=delegationManager)
+    notdManager = NotdManager(saver=saver, retriever=retriever, workQueue=workQueue, blockManager=blockManager, tokenManager=tokenManager, activityManager=activityManager, attributeManager=attributeManager, collectionManager=collectionManager, ownershipManager=ownershipManager, listingManager=listingManager, twitterManager=twitterManager, collectionOverlapManager=collectionOverlapManager, badgeManager=badgeManager, delegationManager=delegationManager, tokenStakingManager=tokenStakingManager, subCollectionTokenManager=subCollectionTokenManager, subCollectionManager=subCollectionManager, requester=requester, revueApiKey=revueApiKey)
+    slackClient = SlackClient(webhookUrl=os.environ['SLACK_WEBHOOK_URL'], requester=requester, defaultSender='worker', defaultChannel='notd-notifications')
+
+    await database.connect()
+    await workQueue.connect()
+    await tokenQueue.connect()
+    try:
+        yield BackfillContext(database=database, retriever=retriever, saver=saver, notdManager=notdManager, ownershipManager=ownershipManager, slackClient=slackClient)
+    finally:
+        await database.disconnect()
+        await workQueue.disconnect()
+        await tokenQueue.disconnect()
+        await requester.close_connections()
+        await ethNodeRequester.close_connections()
+        await openseaRequester.close_connections()
+        await raribleRequester.close_connections()
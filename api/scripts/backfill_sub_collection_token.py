@@ -9,6 +9,7 @@ import sqlalchemy
 import tqdm
 from core.requester import Requester
 from core.store.database import Database
+from core.util import list_util
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
@@ -47,9 +48,9 @@ async def backfill_sub_collection_tokens():
     tokenKeyResult = await retriever.database.execute(query=query)
     tokenKeyRows = list(tokenKeyResult.mappings())
 
-    for row in tqdm.tqdm(tokenKeyRows):
+    for chunk in tqdm.tqdm(list(list_util.generate_chunks(lst=tokenKeyRows, chunkSize=300))):
         try:
-            await subCollectionTokenManager.update_sub_collection_token(registryAddress=row['registryAddress'], tokenId=row['tokenId'])
+            await subCollectionTokenManager.update_sub_collection_tokens(registryAddress=OPENSEA_SHARED_STOREFRONT_ADDRESS, tokenIds=[row['tokenId'] for row in chunk])
         except Exception:
             await asyncio.sleep(1)
     await database.disconnect()
@@ -0,0 +1,76 @@
+import asyncio
+import os
+import sys
+from typing import Sequence
+from typing import Tuple
+
+import asyncclick as click
+import sqlalchemy
+from core import logging
+from core.store.database import Database
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+from notd.backfill_engine import BackfillEngine
+from notd.backfill_engine import BackfillJob
+from notd.backfill_engine import spawn_backfill_processes
+from notd.store.schema import TokenMetadatasTable
+from notd.store.schema import TokenMultiOwnershipsTable
+from notd.store.schema import TokenOwnershipsTable
+from notd.store.schema import TokenTransfersTable
+
+SORT_KEY_TABLES = {table.name: table for table in [TokenTransfersTable, TokenMetadatasTable, TokenOwnershipsTable, TokenMultiOwnershipsTable]}
+
+
+class BackfillTokenIdSortKeysJob(BackfillJob[Tuple[int, int]]):
+
+    def __init__(self, database: Database, table: sqlalchemy.Table, startId: int, endId: int, chunkSize: int) -> None:
+        super().__init__(name=f'backfill_token_id_sort_keys_{table.name}', startIndex=startId, endIndex=endId)
+        self.database = database
+        self.table = table
+        self.idColumn = list(table.primary_key.columns)[0]
+        self.chunkSize = chunkSize
+
+    async def list_items(self, startIndex: int, endIndex: int) -> Sequence[Tuple[int, int]]:
+        # NOTE(krishan711): each item is an id range so a whole chunk is updated in one statement
+        return [(chunkStartId, min(chunkStartId + self.chunkSize, endIndex)) for chunkStartId in range(startIndex, endIndex, self.chunkSize)]
+
+    async def process_item(self, item: Tuple[int, int]) -> None:
+        startId, endId = item
+        # NOTE(krishan711): same rule as get_token_id_sort_key in the saver, anything that isn't a plain uint256 stays null
+        query = (
+            self.table.update()
+                .where(self.idColumn >= startId)
+                .where(self.idColumn < endId)
+                .where(self.table.c.tokenIdSortKey.is_(None))
+                .where(self.table.c.tokenId.regexp_match('^[0-9]{1,78}$'))
+                .values({self.table.c.tokenIdSortKey: sqlalchemy.cast(self.table.c.tokenId, sqlalchemy.Numeric(precision=78, scale=0))})
+        )
+        async with self.database.create_transaction() as connection:
+            await self.database.execute(query=query, connection=connection)
+
+
+@click.command()
+@click.option('-t', '--table', 'tableName', required=True, type=click.Choice(list(SORT_KEY_TABLES.keys())))
+@click.option('-s', '--start-id', 'startId', required=False, type=int, default=0)
+@click.option('-e', '--end-id', 'endId', required=True, type=int)
+@click.option('-b', '--batch-size', 'batchSize', required=False, type=int, default=100000)
+@click.option('-c', '--chunk-size', 'chunkSize', required=False, type=int, default=5000)
+@click.option('-p', '--process-count', 'processCount', required=False, type=int, default=1)
+@click.option('--partition-size', 'partitionSize', required=False, type=int, default=1000000)
+async def backfill_token_id_sort_keys(tableName: str, startId: int, endId: int, batchSize: int, chunkSize: int, processCount: int, partitionSize: int):
+    # NOTE(krishan711): rows saved since the sort key columns were added already have them so end-id only needs to cover the ids from before then
+    if await spawn_backfill_processes(processCount=processCount):
+        return
+    databaseConnectionString = Database.create_psql_connection_string(username=os.environ["DB_USERNAME"], password=os.environ["DB_PASSWORD"], host=os.environ["DB_HOST"], port=os.environ["DB_PORT"], name=os.environ["DB_NAME"])
+    database = Database(connectionString=databaseConnectionString)
+    job = BackfillTokenIdSortKeysJob(database=database, table=SORT_KEY_TABLES[tableName], startId=startId, endId=endId, chunkSize=chunkSize)
+    backfillEngine = BackfillEngine(database=database, job=job, partitionSize=partitionSize, stepSize=batchSize, initialConcurrency=4, maxConcurrency=10)
+    await database.connect()
+    try:
+        await backfillEngine.run()
+    finally:
+        await database.disconnect()
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(backfill_token_id_sort_keys())
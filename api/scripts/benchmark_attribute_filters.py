@@ -0,0 +1,147 @@
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+import typing
+from typing import Dict
+from typing import List
+from typing import Tuple
+
+import asyncclick as click
+from core import logging
+from core.store.database import Database
+from core.util import chain_util
+from core.util import date_util
+from core.util import list_util
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+from notd.api.endpoints_v1 import InQueryParam
+from notd.attribute_manager import AttributeManager
+from notd.badge_manager import BadgeManager
+from notd.collection_manager import CollectionManager
+from notd.gallery_manager import GalleryManager
+from notd.store.retriever import Retriever
+from notd.store.saver import Saver
+from notd.store.schema import TokenAttributeBitmapsTable
+from notd.store.schema import TokenAttributesTable
+from notd.store.schema import TokenMetadatasTable
+from notd.store.schema import TokenOwnershipsTable
+from notd.twitter_manager import TwitterManager
+
+BENCHMARK_REGISTRY_ADDRESS = chain_util.normalize_address(value='0x00000000000000000000000000000000000b1e55')
+BENCHMARK_OWNER_ADDRESS = chain_util.normalize_address(value='0x00000000000000000000000000000000000b0b00')
+
+
+class _StubCollectionManager:
+
+    async def get_collection_by_address(self, address: str) -> None:  # pylint: disable=unused-argument
+        return None
+
+
+def _create_trait_values(traitCount: int) -> Dict[str, List[str]]:
+    # NOTE(krishan711): a mix of small and large value sets like a typical pfp collection
+    return {f'trait-{traitIndex}': [f'value-{traitIndex}-{valueIndex}' for valueIndex in range(3 + traitIndex * 4)] for traitIndex in range(traitCount)}
+
+
+def _create_attribute_filters(traitValues: Dict[str, List[str]], randomGenerator: random.Random) -> List[List[InQueryParam]]:
+    traitNames = list(traitValues.keys())
+    attributeFiltersList: List[List[InQueryParam]] = []
+    for filterCount in [1, 2, 3, 4]:
+        for _ in range(5):
+            attributeFilters = []
+            for traitName in randomGenerator.sample(traitNames, k=filterCount):
+                attributeFilters.append(InQueryParam(fieldName=traitName, values=randomGenerator.sample(traitValues[traitName], k=randomGenerator.randint(1, 3))))
+            attributeFiltersList.append(attributeFilters)
+    return attributeFiltersList
+
+
+async def _create_benchmark_rows(database: Database, tokenCount: int, traitValues: Dict[str, List[str]], randomGenerator: random.Random) -> None:
+    currentDate = date_util.datetime_from_now()
+    tokenIds = [str(tokenIndex) for tokenIndex in range(tokenCount)]
+    async with database.create_transaction() as connection:
+        for chunk in list_util.generate_chunks(lst=tokenIds, chunkSize=1000):
+            await database.execute(connection=connection, query=TokenMetadatasTable.insert().values([{
+                TokenMetadatasTable.c.createdDate.key: currentDate,
+                TokenMetadatasTable.c.updatedDate.key: currentDate,
+                TokenMetadatasTable.c.registryAddress.key: BENCHMARK_REGISTRY_ADDRESS,
+                TokenMetadatasTable.c.tokenId.key: tokenId,
+                TokenMetadatasTable.c.tokenIdSortKey.key: int(tokenId),
+            } for tokenId in chunk]))
+            await database.execute(connection=connection, query=TokenOwnershipsTable.insert().values([{
+                TokenOwnershipsTable.c.createdDate.key: currentDate,
+                TokenOwnershipsTable.c.updatedDate.key: currentDate,
+                TokenOwnershipsTable.c.registryAddress.key: BENCHMARK_REGISTRY_ADDRESS,
+                TokenOwnershipsTable.c.tokenId.key: tokenId,
+                TokenOwnershipsTable.c.tokenIdSortKey.key: int(tokenId),
+                TokenOwnershipsTable.c.ownerAddress.key: BENCHMARK_OWNER_ADDRESS,
+                TokenOwnershipsTable.c.transferValue.key: 0,
+                TokenOwnershipsTable.c.transferDate.key: currentDate,
+                TokenOwnershipsTable.c.transferTransactionHash.key: f'benchmark-{tokenId}',
+            } for tokenId in chunk]))
+            await database.execute(connection=connection, query=TokenAttributesTable.insert().values([{
+                TokenAttributesTable.c.createdDate.key: currentDate,
+                TokenAttributesTable.c.updatedDate.key: currentDate,
+                TokenAttributesTable.c.registryAddress.key: BENCHMARK_REGISTRY_ADDRESS,
+                TokenAttributesTable.c.tokenId.key: tokenId,
+                TokenAttributesTable.c.name.key: traitName,
+                TokenAttributesTable.c.value.key: randomGenerator.choice(values),
+            } for tokenId in chunk for traitName, values in traitValues.items()]))
+
+
+async def _delete_benchmark_rows(database: Database) -> None:
+    async with database.create_transaction() as connection:
+        for table in [TokenAttributeBitmapsTable, TokenAttributesTable, TokenOwnershipsTable, TokenMetadatasTable]:
+            await database.execute(connection=connection, query=table.delete().where(table.c.registryAddress == BENCHMARK_REGISTRY_ADDRESS))
+
+
+async def _time_queries(galleryManager: GalleryManager, attributeFiltersList: List[List[InQueryParam]], repeatCount: int) -> Tuple[List[float], List[List[str]]]:
+    durations = []
+    tokenIdsList = []
+    for attributeFilters in attributeFiltersList:
+        for _ in range(repeatCount):
+            startTime = time.perf_counter()
+            galleryTokens = await galleryManager.query_collection_tokens(registryAddress=BENCHMARK_REGISTRY_ADDRESS, limit=50, offset=0, attributeFilters=attributeFilters)
+            durations.append(time.perf_counter() - startTime)
+        tokenIdsList.append([galleryToken.tokenMetadata.tokenId for galleryToken in galleryTokens])
+    return durations, tokenIdsList
+
+
+@click.command()
+@click.option('-t', '--token-count', 'tokenCount', required=False, type=int, default=10000)
+@click.option('-a', '--trait-count', 'traitCount', required=False, type=int, default=8)
+@click.option('-r', '--repeat-count', 'repeatCount', required=False, type=int, default=5)
+async def benchmark_attribute_filters(tokenCount: int, traitCount: int, repeatCount: int):
+    # NOTE(krishan711): run this against a local database only, it creates and deletes its own collection tokens
+    databaseConnectionString = Database.create_psql_connection_string(username=os.environ["DB_USERNAME"], password=os.environ["DB_PASSWORD"], host=os.environ["DB_HOST"], port=os.environ["DB_PORT"], name=os.environ["DB_NAME"])
+    database = Database(connectionString=databaseConnectionString)
+    saver = Saver(database=database)
+    retriever = Retriever(database=database)
+    collectionManager = typing.cast(CollectionManager, _StubCollectionManager())
+    galleryManager = GalleryManager(ethClient=None, retriever=retriever, saver=saver, twitterManager=typing.cast(TwitterManager, None), collectionManager=collectionManager, badgeManager=typing.cast(BadgeManager, None))  # type: ignore[arg-type]
+    attributeManager = AttributeManager(saver=saver, retriever=retriever, workQueue=None, tokenQueue=None, tokenAttributeProcessor=None)  # type: ignore[arg-type]
+    randomGenerator = random.Random(0)
+    traitValues = _create_trait_values(traitCount=traitCount)
+    attributeFiltersList = _create_attribute_filters(traitValues=traitValues, randomGenerator=randomGenerator)
+
+    await database.connect()
+    try:
+        await _delete_benchmark_rows(database=database)
+        await _create_benchmark_rows(database=database, tokenCount=tokenCount, traitValues=traitValues, randomGenerator=randomGenerator)
+        joinDurations, joinTokenIdsList = await _time_queries(galleryManager=galleryManager, attributeFiltersList=attributeFiltersList, repeatCount=repeatCount)
+        print(f'attribute joins: median {statistics.median(joinDurations) * 1000:.1f}ms, max {max(joinDurations) * 1000:.1f}ms over {len(joinDurations)} queries')
+        startTime = time.perf_counter()
+        await attributeManager.update_collection_attribute_bitmaps(registryAddress=BENCHMARK_REGISTRY_ADDRESS)
+        print(f'built attribute bitmaps for {tokenCount} tokens in {time.perf_counter() - startTime:.3f}s')
+        bitmapDurations, bitmapTokenIdsList = await _time_queries(galleryManager=galleryManager, attributeFiltersList=attributeFiltersList, repeatCount=repeatCount)
+        print(f'attribute bitmaps: median {statistics.median(bitmapDurations) * 1000:.1f}ms, max {max(bitmapDurations) * 1000:.1f}ms over {len(bitmapDurations)} queries')
+        mismatchCount = len([1 for joinTokenIds, bitmapTokenIds in zip(joinTokenIdsList, bitmapTokenIdsList) if joinTokenIds != bitmapTokenIds])
+        print(f'{mismatchCount} of {len(attributeFiltersList)} filter sets returned different tokens')
+    finally:
+        await _delete_benchmark_rows(database=database)
+        await database.disconnect()
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(benchmark_attribute_filters())
@@ -0,0 +1,135 @@
+import asyncio
+import logging
+import os
+import sys
+import time
+import tracemalloc
+import typing
+from typing import Dict
+from typing import List
+from typing import Optional
+
+import asyncclick as click
+from core import logging
+from core.web3.eth_client import EthClientInterface
+from web3 import Web3
+from web3._utils.method_formatters import PYTHONIC_RESULT_FORMATTERS
+from web3._utils.rpc_abi import RPC
+from web3.types import BlockData
+from web3.types import LogReceipt
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from notd.block_processor import BlockProcessor
+from notd.recorded_eth_client import EthClientFixture
+from notd.recorded_eth_client import ReplayEthClient
+
+ERC721_TRANSFER_TOPIC = Web3.keccak(text='Transfer(address,address,uint256)').hex()
+ERC1155_TRANSFER_SINGLE_TOPIC = Web3.keccak(text='TransferSingle(address,address,address,uint256,uint256)').hex()
+ERC1155_TRANSFER_BATCH_TOPIC = Web3.keccak(text='TransferBatch(address,address,address,uint256[],uint256[])').hex()
+WRAPPED_ETHER_ADDRESS = '0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2'
+
+
+def _address(index: int) -> str:
+    return '0x' + f'{index:040x}'
+
+def _topic_address(index: int) -> str:
+    return '0x' + f'{index:064x}'
+
+def _word(value: int) -> str:
+    return f'{value:064x}'
+
+def _hash(index: int) -> str:
+    return '0x' + f'{index:064x}'
+
+
+class InMemoryEthClient(EthClientInterface):
+
+    def __init__(self, rawBlocks: Dict[int, Dict], rawLogs: Dict[int, List[Dict]]) -> None:
+        self.rawBlocks = rawBlocks
+        self.rawLogs = rawLogs
+
+    async def get_latest_block_number(self) -> int:
+        return max(self.rawBlocks.keys())
+
+    async def get_block(self, blockNumber: int, shouldHydrateTransactions: bool = False) -> BlockData:
+        return typing.cast(BlockData, PYTHONIC_RESULT_FORMATTERS[RPC.eth_getBlockByNumber](self.rawBlocks[blockNumber]))
+
+    async def get_log_entries(self, topics: Optional[List[str]] = None, startBlockNumber: Optional[int] = None, endBlockNumber: Optional[int] = None, address: Optional[str] = None) -> List[LogReceipt]:
+        rawLogs = [rawLog for blockNumber, blockLogs in self.rawLogs.items() if (startBlockNumber is None or blockNumber >= startBlockNumber) and (endBlockNumber is None or blockNumber <= endBlockNumber) for rawLog in blockLogs]
+        if topics:
+            rawLogs = [rawLog for rawLog in rawLogs if rawLog['topics'][0] == topics[0]]
+        return typing.cast(List[LogReceipt], PYTHONIC_RESULT_FORMATTERS[RPC.eth_getLogs](rawLogs))
+
+
+def build_block(blockNumber: int, batchTokenCount: int, erc721TransactionCount: int) -> typing.Tuple[Dict, List[Dict]]:
+    # NOTE(krishan711): one large erc1155 batch mint plus a number of single erc721 sales paid in weth
+    transactions = []
+    logs = []
+    batchTransactionHash = _hash(blockNumber * 1000000)
+    transactions.append({'hash': batchTransactionHash, 'from': _address(1), 'to': _address(2), 'gas': hex(10000000), 'gasPrice': hex(1), 'value': hex(0), 'blockNumber': hex(blockNumber), 'input': '0x', 'nonce': hex(0), 'transactionIndex': hex(0)})
+    batchData = '0x' + _word(64) + _word(64 + 32 * (batchTokenCount + 1)) + _word(batchTokenCount) + ''.join(_word(tokenId) for tokenId in range(batchTokenCount)) + _word(batchTokenCount) + ''.join(_word(1) for _ in range(batchTokenCount))
+    logs.append({'address': _address(3), 'topics': [ERC1155_TRANSFER_BATCH_TOPIC, _topic_address(1), _topic_address(0), _topic_address(1)], 'data': batchData, 'transactionHash': batchTransactionHash, 'blockNumber': hex(blockNumber), 'logIndex': hex(0), 'transactionIndex': hex(0), 'blockHash': _hash(blockNumber), 'removed': False})
+    for index in range(erc721TransactionCount):
+        transactionHash = _hash(blockNumber * 1000000 + index + 1)
+        buyerIndex = 1000 + index
+        transactions.append({'hash': transactionHash, 'from': _address(buyerIndex), 'to': _address(4), 'gas': hex(200000), 'gasPrice': hex(1), 'value': hex(0), 'blockNumber': hex(blockNumber), 'input': '0x', 'nonce': hex(index), 'transactionIndex': hex(index + 1)})
+        logs.append({'address': _address(5 + (index % 10)), 'topics': [ERC721_TRANSFER_TOPIC, _topic_address(2000 + index), _topic_address(buyerIndex), _topic_address(index)], 'data': '0x', 'transactionHash': transactionHash, 'blockNumber': hex(blockNumber), 'logIndex': hex(index * 2 + 1), 'transactionIndex': hex(index + 1), 'blockHash': _hash(blockNumber), 'removed': False})
+        logs.append({'address': WRAPPED_ETHER_ADDRESS, 'topics': [ERC721_TRANSFER_TOPIC, _topic_address(buyerIndex), _topic_address(2000 + index)], 'data': '0x' + _word(10 ** 17), 'transactionHash': transactionHash, 'blockNumber': hex(blockNumber), 'logIndex': hex(index * 2 + 2), 'transactionIndex': hex(index + 1), 'blockHash': _hash(blockNumber), 'removed': False})
+    rawBlock = {'number': hex(blockNumber), 'hash': _hash(blockNumber), 'timestamp': hex(1660000000 + blockNumber), 'transactions': transactions}
+    return rawBlock, logs
+
+
+async def _benchmark_blocks(name: str, blockProcessor: BlockProcessor, blockNumbers: List[int], repeatCount: int) -> None:
+    # NOTE(krishan711): allocations are measured in a separate pass because tracing them slows everything down
+    transferCount = 0
+    durations = []
+    for _ in range(repeatCount):
+        transferCount = 0
+        startTime = time.perf_counter()
+        for blockNumber in blockNumbers:
+            processedBlock = await blockProcessor.process_block(blockNumber=blockNumber)
+            transferCount += len(processedBlock.retrievedTokenTransfers)
+        durations.append(time.perf_counter() - startTime)
+    duration = min(durations)
+    tracemalloc.start()
+    startSnapshot = tracemalloc.take_snapshot()
+    allocationCount = 0
+    for blockNumber in blockNumbers:
+        processedBlock = await blockProcessor.process_block(blockNumber=blockNumber)
+        blockSnapshot = tracemalloc.take_snapshot()
+        allocationCount += sum(max(statistic.count_diff, 0) for statistic in blockSnapshot.compare_to(startSnapshot, 'lineno'))
+        del processedBlock
+    _, peakSize = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    blockCount = len(blockNumbers)
+    print(f'{name}: {blockCount} blocks ({transferCount} transfers) in {duration:.3f}s -> {blockCount / duration:.2f} blocks/s, {duration / blockCount:.3f}s per block, peak {peakSize / 1024 / 1024:.1f}MB, {allocationCount / blockCount:.0f} live allocations per block')
+
+
+@click.command()
+@click.option('-f', '--fixtures-directory', 'fixturesDirectory', required=False, type=str)
+@click.option('-b', '--block-count', 'blockCount', required=False, type=int, default=5)
+@click.option('-t', '--batch-token-count', 'batchTokenCount', required=False, type=int, default=10000)
+@click.option('-e', '--erc721-transaction-count', 'erc721TransactionCount', required=False, type=int, default=200)
+@click.option('-r', '--repeat-count', 'repeatCount', required=False, type=int, default=3)
+async def benchmark_block_processor(fixturesDirectory: Optional[str], blockCount: int, batchTokenCount: int, erc721TransactionCount: int, repeatCount: int):
+    if fixturesDirectory:
+        # NOTE(krishan711): each fixture file is one corpus of recorded blocks, e.g. batch mints or floor sweeps (see record_block_fixtures.py)
+        for fileName in sorted(os.listdir(fixturesDirectory)):
+            if not fileName.endswith('.json.gz'):
+                continue
+            fixture = EthClientFixture.load(filePath=os.path.join(fixturesDirectory, fileName))
+            blockProcessor = BlockProcessor(ethClient=ReplayEthClient(fixture=fixture))
+            await _benchmark_blocks(name=fileName[:-len('.json.gz')], blockProcessor=blockProcessor, blockNumbers=fixture.blockNumbers, repeatCount=repeatCount)
+        return
+    rawBlocks = {}
+    rawLogs = {}
+    for blockNumber in range(1, blockCount + 1):
+        rawBlocks[blockNumber], rawLogs[blockNumber] = build_block(blockNumber=blockNumber, batchTokenCount=batchTokenCount, erc721TransactionCount=erc721TransactionCount)
+    ethClient = InMemoryEthClient(rawBlocks=rawBlocks, rawLogs=rawLogs)
+    blockProcessor = BlockProcessor(ethClient=ethClient)
+    await _benchmark_blocks(name='synthetic', blockProcessor=blockProcessor, blockNumbers=list(rawBlocks.keys()), repeatCount=repeatCount)
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(benchmark_block_processor())
@@ -0,0 +1,128 @@
+import asyncio
+import os
+import sys
+import time
+import tracemalloc
+from typing import Awaitable
+from typing import Callable
+from typing import List
+from typing import Tuple
+
+import asyncclick as click
+from core import logging
+from core.store.database import Database
+from core.store.retriever import Direction
+from core.store.retriever import FieldFilter
+from core.store.retriever import Order
+from core.store.retriever import StringFieldFilter
+from core.util import chain_util
+from core.util import date_util
+from core.util import list_util
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+from notd.store.retriever import Retriever
+from notd.store.schema import BlocksTable
+from notd.store.schema import TokenTransfersTable
+from notd.token_ownership_processor import TokenOwnershipProcessor
+
+BENCHMARK_REGISTRY_ADDRESS = chain_util.normalize_address(value='0x00000000000000000000000000000000005e1f00')
+BENCHMARK_TOKEN_ID = '1'
+# NOTE(krishan711): far above any real block so the seeded blocks never collide with indexed ones
+BENCHMARK_START_BLOCK_NUMBER = 2_000_000_000
+
+
+async def _create_benchmark_rows(database: Database, transferCount: int, ownerCount: int) -> None:
+    blockDate = date_util.datetime_from_now()
+    ownerAddresses = [chain_util.normalize_address(value=f'0x{ownerIndex + 1:040x}') for ownerIndex in range(ownerCount)]
+    async with database.create_transaction() as connection:
+        for chunk in list_util.generate_chunks(lst=list(range(transferCount)), chunkSize=1000):
+            await database.execute(connection=connection, query=BlocksTable.insert().values([{
+                BlocksTable.c.createdDate.key: blockDate,
+                BlocksTable.c.updatedDate.key: blockDate,
+                BlocksTable.c.blockNumber.key: BENCHMARK_START_BLOCK_NUMBER + transferIndex,
+                BlocksTable.c.blockHash.key: f'benchmark-{transferIndex}',
+                BlocksTable.c.blockDate.key: blockDate,
+            } for transferIndex in chunk]))
+            await database.execute(connection=connection, query=TokenTransfersTable.insert().values([{
+                TokenTransfersTable.c.transactionHash.key: f'benchmark-{transferIndex}',
+                TokenTransfersTable.c.registryAddress.key: BENCHMARK_REGISTRY_ADDRESS,
+                TokenTransfersTable.c.fromAddress.key: chain_util.BURN_ADDRESS if transferIndex < ownerCount else ownerAddresses[transferIndex % ownerCount],
+                TokenTransfersTable.c.toAddress.key: ownerAddresses[(transferIndex + 1) % ownerCount],
+                TokenTransfersTable.c.operatorAddress.key: ownerAddresses[transferIndex % ownerCount],
+                TokenTransfersTable.c.contractAddress.key: BENCHMARK_REGISTRY_ADDRESS,
+                TokenTransfersTable.c.tokenId.key: BENCHMARK_TOKEN_ID,
+                TokenTransfersTable.c.value.key: transferIndex * 1000,
+                TokenTransfersTable.c.amount.key: 1,
+                TokenTransfersTable.c.gasLimit.key: 21000,
+                TokenTransfersTable.c.gasPrice.key: 1,
+                TokenTransfersTable.c.blockNumber.key: BENCHMARK_START_BLOCK_NUMBER + transferIndex,
+                TokenTransfersTable.c.tokenType.key: 'erc1155single',
+                TokenTransfersTable.c.isMultiAddress.key: False,
+                TokenTransfersTable.c.isInterstitial.key: False,
+                TokenTransfersTable.c.isSwap.key: False,
+                TokenTransfersTable.c.isBatch.key: False,
+                TokenTransfersTable.c.isOutbound.key: False,
+                TokenTransfersTable.c.tokenIdSortKey.key: int(BENCHMARK_TOKEN_ID),
+            } for transferIndex in chunk]))
+
+
+async def _delete_benchmark_rows(database: Database) -> None:
+    async with database.create_transaction() as connection:
+        await database.execute(connection=connection, query=TokenTransfersTable.delete().where(TokenTransfersTable.c.registryAddress == BENCHMARK_REGISTRY_ADDRESS))
+        await database.execute(connection=connection, query=BlocksTable.delete().where(BlocksTable.c.blockNumber >= BENCHMARK_START_BLOCK_NUMBER))
+
+
+async def _measure(name: str, function: Callable[[], Awaitable[int]]) -> Tuple[float, float]:
+    tracemalloc.start()
+    startTime = time.perf_counter()
+    resultCount = await function()
+    duration = time.perf_counter() - startTime
+    _, peakBytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f'{name}: {resultCount} results in {duration:.3f}s with peak memory {peakBytes / (1024 * 1024):.1f}MiB')
+    return duration, peakBytes
+
+
+@click.command()
+@click.option('-t', '--transfer-count', 'transferCount', required=False, type=int, default=200000)
+@click.option('-o', '--owner-count', 'ownerCount', required=False, type=int, default=500)
+async def benchmark_retriever_streaming(transferCount: int, ownerCount: int):
+    # NOTE(krishan711): run this against a local database only, it creates and deletes its own blocks and transfers
+    databaseConnectionString = Database.create_psql_connection_string(username=os.environ["DB_USERNAME"], password=os.environ["DB_PASSWORD"], host=os.environ["DB_HOST"], port=os.environ["DB_PORT"], name=os.environ["DB_NAME"])
+    database = Database(connectionString=databaseConnectionString)
+    retriever = Retriever(database=database)
+    tokenOwnershipProcessor = TokenOwnershipProcessor(retriever=retriever)
+    fieldFilters: List[FieldFilter] = [
+        StringFieldFilter(fieldName=TokenTransfersTable.c.registryAddress.key, eq=BENCHMARK_REGISTRY_ADDRESS),
+        StringFieldFilter(fieldName=TokenTransfersTable.c.tokenId.key, eq=BENCHMARK_TOKEN_ID),
+    ]
+    orders = [Order(fieldName=TokenTransfersTable.c.blockNumber.key, direction=Direction.ASCENDING)]
+
+    async def _list_all() -> int:
+        tokenTransfers = await retriever.list_token_transfers(fieldFilters=fieldFilters, orders=orders)
+        return len(tokenTransfers)
+
+    async def _stream_all() -> int:
+        resultCount = 0
+        async for tokenTransfers in retriever.stream_token_transfers(fieldFilters=fieldFilters, orders=orders):
+            resultCount += len(tokenTransfers)
+        return resultCount
+
+    async def _calculate_multi_ownership() -> int:
+        retrievedTokenMultiOwnerships = await tokenOwnershipProcessor.calculate_token_multi_ownership(registryAddress=BENCHMARK_REGISTRY_ADDRESS, tokenId=BENCHMARK_TOKEN_ID)
+        return len(retrievedTokenMultiOwnerships)
+
+    await database.connect()
+    try:
+        await _delete_benchmark_rows(database=database)
+        await _create_benchmark_rows(database=database, transferCount=transferCount, ownerCount=ownerCount)
+        await _measure(name='list_token_transfers', function=_list_all)
+        await _measure(name='stream_token_transfers', function=_stream_all)
+        await _measure(name='calculate_token_multi_ownership (streamed)', function=_calculate_multi_ownership)
+    finally:
+        await _delete_benchmark_rows(database=database)
+        await database.disconnect()
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(benchmark_retriever_streaming())
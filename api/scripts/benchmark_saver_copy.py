@@ -0,0 +1,103 @@
+import asyncio
+import os
+import sys
+import time
+from typing import List
+
+import asyncclick as click
+from core import logging
+from core.store.database import Database
+from core.util import chain_util
+from core.util import list_util
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+from notd.model import RetrievedTokenTransfer
+from notd.store.saver import Saver
+from notd.store.schema import TokenTransfersTable
+
+BENCHMARK_REGISTRY_ADDRESS = chain_util.normalize_address(value='0x00000000000000000000000000000000000c0b1e')
+# NOTE(krishan711): far above any real block so the seeded transfers never mix with indexed ones
+BENCHMARK_START_BLOCK_NUMBER = 2_000_000_000
+
+
+def _create_retrieved_token_transfers(transferCount: int) -> List[RetrievedTokenTransfer]:
+    ownerAddresses = [chain_util.normalize_address(value=f'0x{ownerIndex + 1:040x}') for ownerIndex in range(1000)]
+    return [RetrievedTokenTransfer(
+        transactionHash=f'0x{transferIndex:064x}',
+        registryAddress=BENCHMARK_REGISTRY_ADDRESS,
+        tokenId=str(transferIndex % 10000),
+        fromAddress=ownerAddresses[transferIndex % len(ownerAddresses)],
+        toAddress=ownerAddresses[(transferIndex + 1) % len(ownerAddresses)],
+        operatorAddress=ownerAddresses[transferIndex % len(ownerAddresses)],
+        contractAddress=BENCHMARK_REGISTRY_ADDRESS,
+        amount=1,
+        value=transferIndex * 10 ** 15,
+        gasLimit=21000,
+        gasPrice=30 * 10 ** 9,
+        blockNumber=BENCHMARK_START_BLOCK_NUMBER + (transferIndex // 100),
+        tokenType='erc721',
+        isMultiAddress=False,
+        isInterstitial=False,
+        isSwap=False,
+        isBatch=False,
+        isOutbound=False,
+    ) for transferIndex in range(transferCount)]
+
+
+async def _delete_benchmark_rows(database: Database) -> None:
+    async with database.create_transaction() as connection:
+        await database.execute(connection=connection, query=TokenTransfersTable.delete().where(TokenTransfersTable.c.registryAddress == BENCHMARK_REGISTRY_ADDRESS))
+
+
+async def _insert_with_values(saver: Saver, retrievedTokenTransfers: List[RetrievedTokenTransfer]) -> List[int]:
+    tokenTransferIds = []
+    async with saver.create_transaction() as connection:
+        # NOTE(krishan711): chunks of 100 keep create_token_transfers on its multi-row VALUES path
+        for chunk in list_util.generate_chunks(lst=retrievedTokenTransfers, chunkSize=100):
+            tokenTransferIds += await saver.create_token_transfers(retrievedTokenTransfers=chunk, connection=connection)
+    return tokenTransferIds
+
+
+async def _insert_with_copy(saver: Saver, retrievedTokenTransfers: List[RetrievedTokenTransfer]) -> List[int]:
+    async with saver.create_transaction() as connection:
+        return await saver.copy_token_transfers(retrievedTokenTransfers=retrievedTokenTransfers, connection=connection)
+
+
+@click.command()
+@click.option('-t', '--transfer-count', 'transferCount', required=False, type=int, default=1000000)
+@click.option('-v', '--values-transfer-count', 'valuesTransferCount', required=False, type=int, default=100000)
+async def benchmark_saver_copy(transferCount: int, valuesTransferCount: int):
+    # NOTE(krishan711): run this against a local database only, it creates and deletes its own transfers
+    databaseConnectionString = Database.create_psql_connection_string(username=os.environ["DB_USERNAME"], password=os.environ["DB_PASSWORD"], host=os.environ["DB_HOST"], port=os.environ["DB_PORT"], name=os.environ["DB_NAME"])
+    database = Database(connectionString=databaseConnectionString)
+    saver = Saver(database=database)
+    retrievedTokenTransfers = _create_retrieved_token_transfers(transferCount=transferCount)
+    await database.connect()
+    try:
+        await _delete_benchmark_rows(database=database)
+        valuesTokenTransfers = retrievedTokenTransfers[:valuesTransferCount]
+        startTime = time.perf_counter()
+        await _insert_with_values(saver=saver, retrievedTokenTransfers=valuesTokenTransfers)
+        duration = time.perf_counter() - startTime
+        print(f'multi-row values: {len(valuesTokenTransfers)} transfers in {duration:.2f}s ({len(valuesTokenTransfers) / duration:.0f} rows/s)')
+        await _delete_benchmark_rows(database=database)
+        startTime = time.perf_counter()
+        tokenTransferIds = await _insert_with_copy(saver=saver, retrievedTokenTransfers=retrievedTokenTransfers)
+        duration = time.perf_counter() - startTime
+        print(f'copy: {len(retrievedTokenTransfers)} transfers in {duration:.2f}s ({len(retrievedTokenTransfers) / duration:.0f} rows/s)')
+        tokenTransfersQuery = (
+            TokenTransfersTable.select()
+                .with_only_columns(TokenTransfersTable.c.tokenTransferId, TokenTransfersTable.c.transactionHash)
+                .where(TokenTransfersTable.c.tokenTransferId.in_(tokenTransferIds[:1000]))
+        )
+        tokenTransfersResult = await database.execute(query=tokenTransfersQuery)
+        transactionHashIdMap = {transactionHash: tokenTransferId for tokenTransferId, transactionHash in tokenTransfersResult}
+        mismatchCount = len([1 for tokenTransferId, retrievedTokenTransfer in zip(tokenTransferIds[:1000], retrievedTokenTransfers) if transactionHashIdMap.get(retrievedTokenTransfer.transactionHash) != tokenTransferId])
+        print(f'{mismatchCount} of the first {min(1000, len(tokenTransferIds))} returned ids did not match their input transfer')
+    finally:
+        await _delete_benchmark_rows(database=database)
+        await database.disconnect()
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(benchmark_saver_copy())
@@ -0,0 +1,97 @@
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict
+from typing import List
+
+import asyncclick as click
+from core import logging
+
+API_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# NOTE(krishan711): nothing connects at import time so placeholders are enough to build the object graph offline
+DUMMY_ENVIRONMENT = {
+    'ENV': 'dev',
+    'OPENSEA_API_KEY': 'benchmark',
+    'RARIBLE_API_KEY': 'benchmark',
+    'REVUE_API_KEY': 'benchmark',
+    'AWS_KEY': 'benchmark',
+    'AWS_SECRET': 'benchmark',
+    'TWITTER_BEARER_TOKEN': 'benchmark',
+    'TWITTER_OAUTH_CLIENT_ID': 'benchmark',
+    'TWITTER_OAUTH_CLIENT_SECRET': 'benchmark',
+    'TWITTER_OAUTH_REDIRECT_URI': 'http://localhost/benchmark',
+    'ETH_NODE_USERNAME': 'benchmark',
+    'ETH_NODE_PASSWORD': 'benchmark',
+    'ETH_NODE_URL': 'http://localhost:8545',
+    'DB_USERNAME': 'benchmark',
+    'DB_PASSWORD': 'benchmark',
+    'DB_HOST': 'localhost',
+    'DB_PORT': '5432',
+    'DB_NAME': 'benchmark',
+}
+
+IMPORT_APPLICATION_CODE = '''
+import time
+startTime = time.perf_counter()
+import application
+print(time.perf_counter() - startTime)
+'''
+
+IMPORT_WORKER_CODE = '''
+import time
+startTime = time.perf_counter()
+import worker
+print(time.perf_counter() - startTime)
+'''
+
+CONTRACT_PROCESSORS_CODE = '''
+import time
+from notd.block_processor import BlockProcessor
+from notd.collection_processor import CollectionProcessor
+from notd.contract_store import get_function_abi
+from notd.delegation_manager import DelegationManager
+from notd.token_metadata_processor import TokenMetadataProcessor
+from notd.token_staking_processor import TokenStakingProcessor
+startTime = time.perf_counter()
+blockProcessor = BlockProcessor(ethClient=None)
+tokenMetadataProcessor = TokenMetadataProcessor(requester=None, ethClient=None, pabloClient=None, openseaRequester=None)
+collectionProcessor = CollectionProcessor(requester=None, ethClient=None, openseaApiKey='benchmark')
+delegationManager = DelegationManager(ethClient=None, delegationBroadcastHub=None)
+tokenStakingProcessor = TokenStakingProcessor(ethClient=None, retriever=None)
+print(time.perf_counter() - startTime)
+startTime = time.perf_counter()
+blockProcessor.cryptoKittiesTransferEvent, blockProcessor.cryptoPunksTransferEvent, blockProcessor.cryptoPunksBoughtEvent
+tokenMetadataProcessor.cryptoPunksContract, tokenMetadataProcessor.autoglyphsContract
+get_function_abi(contractName='IERC721Metadata', functionName='tokenURI'), get_function_abi(contractName='IERC1155MetadataURI', functionName='uri'), get_function_abi(contractName='IERC165', functionName='supportsInterface'), get_function_abi(contractName='ContractMetadata', functionName='contractURI')
+delegationManager.delegationRegistryContract, delegationManager.getDelegationsByDelegateOutputTypes, delegationManager.multicallContract
+tokenStakingProcessor.creepzStakingContract, tokenStakingProcessor.creepzStakingOwnerOfOutputTypes
+print(time.perf_counter() - startTime)
+'''
+
+
+def _run_timed_code(code: str, environment: Dict[str, str]) -> List[float]:
+    # NOTE(krishan711): each run is a fresh interpreter so nothing is already imported or cached
+    output = subprocess.run([sys.executable, '-c', code], cwd=API_DIRECTORY, env=environment, check=True, capture_output=True, text=True).stdout
+    return [float(line) for line in output.strip().splitlines()[-2:] if line]
+
+
+def _print_durations(name: str, durations: List[float]) -> None:
+    print(f'{name}: median {statistics.median(durations) * 1000:.1f}ms, min {min(durations) * 1000:.1f}ms, max {max(durations) * 1000:.1f}ms over {len(durations)} runs')
+
+
+@click.command()
+@click.option('-r', '--repeat-count', 'repeatCount', required=False, type=int, default=5)
+async def benchmark_startup(repeatCount: int):
+    environment = {**DUMMY_ENVIRONMENT, **os.environ}
+    _print_durations(name='import application (imports and object graph)', durations=[_run_timed_code(code=IMPORT_APPLICATION_CODE, environment=environment)[-1] for _ in range(repeatCount)])
+    _print_durations(name='import worker (imports only, the graph is built in main)', durations=[_run_timed_code(code=IMPORT_WORKER_CODE, environment=environment)[-1] for _ in range(repeatCount)])
+    processorDurations = [_run_timed_code(code=CONTRACT_PROCESSORS_CODE, environment=environment) for _ in range(repeatCount)]
+    _print_durations(name='construct contract processors', durations=[constructDuration for constructDuration, _ in processorDurations])
+    _print_durations(name='first use of all processor contracts', durations=[firstUseDuration for _, firstUseDuration in processorDurations])
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(benchmark_startup())
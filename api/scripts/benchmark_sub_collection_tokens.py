@@ -0,0 +1,137 @@
+import asyncio
+import os
+import sys
+import time
+import typing
+from typing import Dict
+from typing import List
+from typing import Optional
+from urllib import parse as urlparse
+
+import asyncclick as click
+from core import logging
+from core.exceptions import NotFoundException
+from core.requester import Requester
+from core.store.database import Database
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+from notd.collection_manager import CollectionManager
+from notd.model import OPENSEA_SHARED_STOREFRONT_ADDRESS
+from notd.store.retriever import Retriever
+from notd.store.saver import Saver
+from notd.store.schema import SubCollectionsTable
+from notd.store.schema import SubCollectionTokensTable
+from notd.sub_collection_manager import SubCollectionManager
+from notd.sub_collection_processor import SubCollectionProcessor
+from notd.sub_collection_token_manager import SubCollectionTokenManager
+from notd.sub_collection_token_processor import SubCollectionTokenProcessor
+
+BENCHMARK_ID_PREFIX = 'benchmark-'
+
+
+class _StubResponse:
+
+    def __init__(self, data: Dict) -> None:
+        self.data = data
+
+    def json(self) -> Dict:
+        return self.data
+
+
+class StubOpenseaRequester(Requester):
+
+    def __init__(self, subCollectionCount: int, latencySeconds: float) -> None:
+        super().__init__()
+        self.subCollectionCount = subCollectionCount
+        self.latencySeconds = latencySeconds
+        self.requestCount = 0
+
+    def _get_slug(self, tokenId: str) -> str:
+        return f'{BENCHMARK_ID_PREFIX}collection-{int(tokenId[len(BENCHMARK_ID_PREFIX):]) % self.subCollectionCount}'
+
+    async def get(self, url: str, dataDict: Optional[Dict] = None, data: Optional[bytes] = None, timeout: Optional[int] = 10, headers: Optional[Dict] = None, outputFilePath: Optional[str] = None) -> _StubResponse:  # type: ignore[override]
+        self.requestCount += 1
+        await asyncio.sleep(self.latencySeconds)
+        path = urlparse.urlparse(url).path.rstrip('/')
+        if path.startswith('/api/v1/collection/'):
+            slug = path.split('/')[-1]
+            return _StubResponse(data={'collection': {'slug': slug, 'name': slug}})
+        if path.startswith('/api/v1/asset/'):
+            tokenId = path.split('/')[-1]
+            return _StubResponse(data={'token_id': tokenId, 'collection': {'slug': self._get_slug(tokenId=tokenId)}})
+        if path == '/api/v1/assets':
+            tokenIds = (dataDict or {}).get('token_ids') or []
+            return _StubResponse(data={'assets': [{'token_id': tokenId, 'collection': {'slug': self._get_slug(tokenId=tokenId)}} for tokenId in tokenIds], 'next': None})
+        raise NotFoundException(message=f'Unhandled url {url}')
+
+
+class _StubCollection:
+    doesSupportErc721 = False
+    doesSupportErc1155 = True
+
+
+class _StubCollectionManager:
+
+    async def get_collection_by_address(self, address: str) -> _StubCollection:  # pylint: disable=unused-argument
+        return _StubCollection()
+
+
+async def _update_one_by_one(subCollectionTokenProcessor: SubCollectionTokenProcessor, subCollectionManager: SubCollectionManager, saver: Saver, retriever: Retriever, tokenIds: List[str]) -> None:
+    # NOTE(krishan711): this is the previous implementation, one asset request and one sub-collection refresh per token
+    for tokenId in tokenIds:
+        subCollectionKey = await subCollectionTokenProcessor.retrieve_sub_collection_name(registryAddress=OPENSEA_SHARED_STOREFRONT_ADDRESS, tokenId=tokenId)
+        if not subCollectionKey or not subCollectionKey.externalId:
+            continue
+        await subCollectionManager.update_sub_collection(registryAddress=subCollectionKey.registryAddress, externalId=subCollectionKey.externalId)
+        subCollection = await retriever.get_sub_collection_by_registry_address_external_id(registryAddress=OPENSEA_SHARED_STOREFRONT_ADDRESS, externalId=subCollectionKey.externalId)
+        try:
+            subCollectionToken = await retriever.get_sub_collection_token_by_registry_address_token_id(registryAddress=OPENSEA_SHARED_STOREFRONT_ADDRESS, tokenId=tokenId)
+        except NotFoundException:
+            subCollectionToken = None
+        if subCollectionToken:
+            await saver.update_sub_collection_token(subCollectionTokenId=subCollectionToken.subCollectionTokenId, subCollectionId=subCollection.subCollectionId)
+        else:
+            await saver.create_sub_collection_token(registryAddress=OPENSEA_SHARED_STOREFRONT_ADDRESS, tokenId=tokenId, subCollectionId=subCollection.subCollectionId)
+
+
+async def _delete_benchmark_rows(database: Database) -> None:
+    await database.execute(query=SubCollectionTokensTable.delete().where(SubCollectionTokensTable.c.tokenId.startswith(BENCHMARK_ID_PREFIX)))
+    await database.execute(query=SubCollectionsTable.delete().where(SubCollectionsTable.c.externalId.startswith(BENCHMARK_ID_PREFIX)))
+
+
+@click.command()
+@click.option('-t', '--token-count', 'tokenCount', required=False, type=int, default=1000)
+@click.option('-s', '--sub-collection-count', 'subCollectionCount', required=False, type=int, default=20)
+@click.option('-l', '--latency', 'latencySeconds', required=False, type=float, default=0.05)
+async def benchmark_sub_collection_tokens(tokenCount: int, subCollectionCount: int, latencySeconds: float):
+    # NOTE(krishan711): run this against a local database only, it creates and deletes its own sub-collections
+    databaseConnectionString = Database.create_psql_connection_string(username=os.environ["DB_USERNAME"], password=os.environ["DB_PASSWORD"], host=os.environ["DB_HOST"], port=os.environ["DB_PORT"], name=os.environ["DB_NAME"])
+    database = Database(connectionString=databaseConnectionString)
+    saver = Saver(database=database)
+    retriever = Retriever(database=database)
+    openseaRequester = StubOpenseaRequester(subCollectionCount=subCollectionCount, latencySeconds=latencySeconds)
+    subCollectionProcessor = SubCollectionProcessor(openseaRequester=openseaRequester, collectionManager=typing.cast(CollectionManager, _StubCollectionManager()))
+    subCollectionManager = SubCollectionManager(retriever=retriever, saver=saver, workQueue=None, subCollectionProcessor=subCollectionProcessor)  # type: ignore[arg-type]
+    subCollectionTokenProcessor = SubCollectionTokenProcessor(openseaRequester=openseaRequester)
+    subCollectionTokenManager = SubCollectionTokenManager(retriever=retriever, saver=saver, subCollectionTokenProcessor=subCollectionTokenProcessor, subCollectionManager=subCollectionManager)
+    tokenIds = [f'{BENCHMARK_ID_PREFIX}{index}' for index in range(tokenCount)]
+
+    await database.connect()
+    try:
+        await _delete_benchmark_rows(database=database)
+        startTime = time.perf_counter()
+        await _update_one_by_one(subCollectionTokenProcessor=subCollectionTokenProcessor, subCollectionManager=subCollectionManager, saver=saver, retriever=retriever, tokenIds=tokenIds)
+        print(f'one token at a time: {tokenCount} tokens with {openseaRequester.requestCount} requests in {time.perf_counter() - startTime:.3f}s')
+        await _delete_benchmark_rows(database=database)
+        openseaRequester.requestCount = 0
+        startTime = time.perf_counter()
+        await subCollectionTokenManager.update_sub_collection_tokens(registryAddress=OPENSEA_SHARED_STOREFRONT_ADDRESS, tokenIds=tokenIds)
+        print(f'batched: {tokenCount} tokens with {openseaRequester.requestCount} requests in {time.perf_counter() - startTime:.3f}s')
+    finally:
+        await _delete_benchmark_rows(database=database)
+        await database.disconnect()
+        await openseaRequester.close_connections()
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(benchmark_sub_collection_tokens())
@@ -0,0 +1,105 @@
+import asyncio
+import os
+import sys
+import time
+from typing import Dict
+from typing import List
+from typing import Optional
+
+import asyncclick as click
+from core import logging
+from core.requester import Requester
+from core.store.database import Database
+from core.util import list_util
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+from notd.model import RetrievedTwitterProfile
+from notd.store.retriever import Retriever
+from notd.store.saver import Saver
+from notd.store.schema import TwitterProfilesTable
+from notd.twitter_manager import TwitterManager
+
+BENCHMARK_TWITTER_ID_PREFIX = 'benchmark-'
+
+
+class _StubResponse:
+
+    def __init__(self, data: Dict) -> None:
+        self.data = data
+
+    def json(self) -> Dict:
+        return self.data
+
+
+class StubTwitterRequester(Requester):
+
+    def __init__(self, changedFraction: float) -> None:
+        super().__init__()
+        self.changedFraction = changedFraction
+        self.version = 0
+
+    async def get(self, url: str, dataDict: Optional[Dict] = None, data: Optional[bytes] = None, timeout: Optional[int] = 10, headers: Optional[Dict] = None, outputFilePath: Optional[str] = None) -> _StubResponse:  # type: ignore[override]
+        twitterIds = dataDict['ids'].split(',') if dataDict else []
+        changedCount = int(len(twitterIds) * self.changedFraction)
+        return _StubResponse(data={'data': [{
+            'id': twitterId,
+            'username': f'user_{twitterId}',
+            'name': f'User {twitterId}',
+            'description': 'benchmark user',
+            'verified': False,
+            'public_metrics': {
+                'followers_count': 100 + self.version if index < changedCount else 100,
+                'following_count': 10,
+                'tweet_count': 1000,
+            },
+        } for index, twitterId in enumerate(twitterIds)]})
+
+
+async def _refresh_one_by_one(twitterManager: TwitterManager, saver: Saver, retriever: Retriever) -> None:
+    # NOTE(krishan711): this is the previous implementation, one update statement per profile
+    allTwitterProfiles = await retriever.list_twitter_profiles()
+    twitterIdProfileMap = {twitterProfile.twitterId: twitterProfile for twitterProfile in allTwitterProfiles}
+    for chunk in list_util.generate_chunks(lst=list(twitterIdProfileMap.keys()), chunkSize=100):
+        userResponse = await twitterManager.requester.get(url='https://api.twitter.com/2/users', dataDict={'ids': ','.join(chunk)})
+        for userData in userResponse.json()['data']:
+            twitterProfile = twitterIdProfileMap[userData['id']]
+            await saver.update_twitter_profile(twitterProfileId=twitterProfile.twitterProfileId, username=userData['username'], name=userData['name'], description=userData['description'], isVerified=userData['verified'], pinnedTweetId=userData.get('pinned_tweet_id'), followerCount=userData['public_metrics']['followers_count'], followingCount=userData['public_metrics']['following_count'], tweetCount=userData['public_metrics']['tweet_count'])
+
+
+@click.command()
+@click.option('-u', '--user-count', 'userCount', required=False, type=int, default=10000)
+@click.option('-c', '--changed-fraction', 'changedFraction', required=False, type=float, default=0.1)
+async def benchmark_twitter_profiles(userCount: int, changedFraction: float):
+    # NOTE(krishan711): run this against a local database only, it creates and deletes its own profiles
+    databaseConnectionString = Database.create_psql_connection_string(username=os.environ["DB_USERNAME"], password=os.environ["DB_PASSWORD"], host=os.environ["DB_HOST"], port=os.environ["DB_PORT"], name=os.environ["DB_NAME"])
+    database = Database(connectionString=databaseConnectionString)
+    saver = Saver(database=database)
+    retriever = Retriever(database=database)
+    for environmentKey in ['TWITTER_OAUTH_CLIENT_ID', 'TWITTER_OAUTH_CLIENT_SECRET', 'TWITTER_OAUTH_REDIRECT_URI']:
+        os.environ.setdefault(environmentKey, 'benchmark')
+    requester = StubTwitterRequester(changedFraction=changedFraction)
+    twitterManager = TwitterManager(saver=saver, retriever=retriever, requester=requester, workQueue=None, twitterBearerToken='benchmark')  # type: ignore[arg-type]
+
+    await database.connect()
+    try:
+        retrievedTwitterProfiles: List[RetrievedTwitterProfile] = [RetrievedTwitterProfile(twitterId=f'{BENCHMARK_TWITTER_ID_PREFIX}{index}', username=f'user_{BENCHMARK_TWITTER_ID_PREFIX}{index}', name='', description='', isVerified=False, pinnedTweetId=None, followerCount=0, followingCount=0, tweetCount=0) for index in range(userCount)]
+        await saver.upsert_twitter_profiles(retrievedTwitterProfiles=retrievedTwitterProfiles)
+        startTime = time.perf_counter()
+        await _refresh_one_by_one(twitterManager=twitterManager, saver=saver, retriever=retriever)
+        print(f'one update per profile: {userCount} profiles in {time.perf_counter() - startTime:.3f}s')
+        requester.version += 1
+        startTime = time.perf_counter()
+        await twitterManager.update_all_twitter_users()
+        print(f'upsert ({changedFraction:.0%} changed): {userCount} profiles in {time.perf_counter() - startTime:.3f}s')
+        startTime = time.perf_counter()
+        await twitterManager.update_all_twitter_users()
+        print(f'upsert (none changed): {userCount} profiles in {time.perf_counter() - startTime:.3f}s')
+    finally:
+        async with database.create_transaction() as connection:
+            await database.execute(connection=connection, query=TwitterProfilesTable.delete().where(TwitterProfilesTable.c.twitterId.startswith(BENCHMARK_TWITTER_ID_PREFIX)))
+        await database.disconnect()
+        await requester.close_connections()
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(benchmark_twitter_profiles())
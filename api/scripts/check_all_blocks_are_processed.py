@@ -4,10 +4,10 @@ import sys
 
 import asyncclick as click
 from core import logging
-from core.queues.sqs import SqsMessageQueue
 from core.store.database import Database
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+from notd.message_queues import create_message_queue
 from notd.messages import ProcessBlocksMessageContent
 from notd.store.schema import TokenTransfersTable
 
@@ -19,7 +19,7 @@ from notd.store.schema import TokenTransfersTable
 async def check_all_processed(startBlockNumber: int, endBlockNumber: int, batchSize: int):
     databaseConnectionString = Database.create_psql_connection_string(username=os.environ["DB_USERNAME"], password=os.environ["DB_PASSWORD"], host=os.environ["DB_HOST"], port=os.environ["DB_PORT"], name=os.environ["DB_NAME"])
     database = Database(connectionString=databaseConnectionString)
-    workQueue = SqsMessageQueue(region='eu-west-1', accessKeyId=os.environ['AWS_KEY'], accessKeySecret=os.environ['AWS_SECRET'], queueUrl='https://sqs.eu-west-1.amazonaws.com/097520841056/notd-work-queue')
+    workQueue = create_message_queue(queueBackend=os.environ.get('QUEUE_BACKEND', 'sqs'), queueName='notd-work-queue', database=database, accessKeyId=os.environ['AWS_KEY'], accessKeySecret=os.environ['AWS_SECRET'])
     await database.connect()
     await workQueue.connect()
 
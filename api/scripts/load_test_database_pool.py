@@ -0,0 +1,82 @@
+import asyncio
+import os
+import statistics
+import sys
+import time
+from typing import List
+from typing import Tuple
+
+import asyncclick as click
+import httpx
+import sqlalchemy
+from core import logging
+from core.store.database import Database
+from fastapi import FastAPI
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+from notd.api.database_connection_middleware import DatabaseConnectionMiddleware
+from notd.store.pooled_database import PooledDatabase
+
+
+def _create_app(database: PooledDatabase, outboundSeconds: float, isLazy: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.post('/outbound')
+    async def outbound() -> None:
+        # NOTE(krishan711): this looks like create_gm, a lookup then a slow eth call then a write
+        await database.execute(query=sqlalchemy.select(sqlalchemy.literal(1)))
+        await asyncio.sleep(outboundSeconds)
+        await database.execute(query=sqlalchemy.select(sqlalchemy.literal(1)))
+
+    app.add_middleware(DatabaseConnectionMiddleware, database=database, lazyPathPatterns=['/outbound'] if isLazy else [])
+    return app
+
+
+async def _run_requests(app: FastAPI, concurrency: int) -> Tuple[int, List[float]]:
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)  # type: ignore[arg-type]
+    async with httpx.AsyncClient(transport=transport, base_url='http://load-test') as client:
+        async def _run_request() -> Tuple[bool, float]:
+            startTime = time.perf_counter()
+            try:
+                response = await client.post('/outbound')
+                isSuccess = response.status_code == 200
+            except Exception:  # pylint: disable=broad-except
+                isSuccess = False
+            return isSuccess, time.perf_counter() - startTime
+        results = await asyncio.gather(*[_run_request() for _ in range(concurrency)])
+    failureCount = len([isSuccess for isSuccess, _ in results if not isSuccess])
+    return failureCount, [duration for isSuccess, duration in results if isSuccess]
+
+
+@click.command()
+@click.option('-p', '--pool-size', 'poolSize', required=False, type=int, default=5)
+@click.option('-o', '--outbound-seconds', 'outboundSeconds', required=False, type=float, default=0.5)
+@click.option('-t', '--pool-timeout', 'poolTimeoutSeconds', required=False, type=float, default=2)
+@click.option('-c', '--concurrency', 'concurrencies', required=False, type=int, multiple=True, default=[5, 10, 20, 50, 100, 200])
+async def load_test_database_pool(poolSize: int, outboundSeconds: float, poolTimeoutSeconds: float, concurrencies: Tuple[int, ...]):
+    # NOTE(krishan711): run this against a local database only
+    databaseConnectionString = Database.create_psql_connection_string(username=os.environ["DB_USERNAME"], password=os.environ["DB_PASSWORD"], host=os.environ["DB_HOST"], port=os.environ["DB_PORT"], name=os.environ["DB_NAME"])
+    for isLazy in [False, True]:
+        modeName = 'lazy checkout' if isLazy else 'connection per request'
+        database = PooledDatabase(connectionString=databaseConnectionString, poolSize=poolSize, maxOverflow=0, poolTimeoutSeconds=poolTimeoutSeconds)
+        await database.connect()
+        app = _create_app(database=database, outboundSeconds=outboundSeconds, isLazy=isLazy)
+        maxServedConcurrency = 0
+        try:
+            for concurrency in concurrencies:
+                database.reset_pool_metrics()
+                startTime = time.perf_counter()
+                failureCount, durations = await _run_requests(app=app, concurrency=concurrency)
+                duration = time.perf_counter() - startTime
+                poolStatus = database.get_pool_status()
+                if failureCount == 0:
+                    maxServedConcurrency = concurrency
+                medianDuration = statistics.median(durations) if durations else 0
+                print(f'{modeName}: concurrency {concurrency}: {concurrency - failureCount} ok, {failureCount} failed ({poolStatus.timeoutCount} pool timeouts) in {duration:.2f}s, median {medianDuration:.3f}s, max pool wait {poolStatus.maxWaitSeconds:.3f}s')
+        finally:
+            await database.disconnect()
+        print(f'{modeName}: served up to {maxServedConcurrency} concurrent requests with a pool of {poolSize}')
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(load_test_database_pool())
@@ -7,7 +7,6 @@ import asyncclick as click
 import sqlalchemy
 from core import logging
 from core.aws_requester import AwsRequester
-from core.queues.sqs import SqsMessageQueue
 from core.requester import Requester
 from core.s3_manager import S3Manager
 from core.slack_client import SlackClient
@@ -18,6 +17,7 @@ from core.web3.eth_client import RestEthClient
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 from notd.collection_processor import CollectionProcessor
+from notd.message_queues import create_message_queue
 from notd.store.retriever import Retriever
 from notd.store.saver import Saver
 from notd.store.schema import TokenMetadatasTable
@@ -41,8 +41,8 @@ async def process_collection_token_ownerships(collectionAddress: str):
     saver = Saver(database=database)
     retriever = Retriever(database=database)
     s3Manager = S3Manager(region='eu-west-1', accessKeyId=os.environ['AWS_KEY'], accessKeySecret=os.environ['AWS_SECRET'])
-    workQueue = SqsMessageQueue(region='eu-west-1', accessKeyId=os.environ['AWS_KEY'], accessKeySecret=os.environ['AWS_SECRET'], queueUrl='https://sqs.eu-west-1.amazonaws.com/097520841056/notd-work-queue')
-    tokenQueue = SqsMessageQueue(region='eu-west-1', accessKeyId=os.environ['AWS_KEY'], accessKeySecret=os.environ['AWS_SECRET'], queueUrl='https://sqs.eu-west-1.amazonaws.com/097520841056/notd-token-queue')
+    workQueue = create_message_queue(queueBackend=os.environ.get('QUEUE_BACKEND', 'sqs'), queueName='notd-work-queue', database=database, accessKeyId=os.environ['AWS_KEY'], accessKeySecret=os.environ['AWS_SECRET'])
+    tokenQueue = create_message_queue(queueBackend=os.environ.get('QUEUE_BACKEND', 'sqs'), queueName='notd-token-queue', database=database, accessKeyId=os.environ['AWS_KEY'], accessKeySecret=os.environ['AWS_SECRET'])
     requester = Requester()
     tokenOwnershipProcessor = TokenOwnershipProcessor(retriever=retriever)
     tokenManager = TokenManager(saver=saver, retriever=retriever, workQueue=workQueue, tokenQueue=tokenQueue, collectionProcessor=None, tokenMetadataProcessor=None, tokenOwnershipProcessor=tokenOwnershipProcessor, collectionActivityProcessor=None, tokenListingProcessor=None, tokenAttributeProcessor=None)
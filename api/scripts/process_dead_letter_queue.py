@@ -19,6 +19,8 @@ from notd.badge_manager import BadgeManager
 from notd.badge_processor import BadgeProcessor
 from notd.block_manager import BlockManager
 from notd.block_processor import BlockProcessor
+from notd.broadcast_hub import BroadcastHub
+from notd.broadcast_hub import PostgresBroadcastBackend
 from notd.collection_activity_processor import CollectionActivityProcessor
 from notd.collection_manager import CollectionManager
 from notd.collection_overlap_manager import CollectionOverlapManager
@@ -28,6 +30,7 @@ from notd.delegation_manager import DelegationManager
 from notd.listing_manager import ListingManager
 from notd.lock_manager import LockManager
 from notd.manager import NotdManager
+from notd.message_queues import create_message_queue
 from notd.notd_message_processor import NotdMessageProcessor
 from notd.ownership_manager import OwnershipManager
 from notd.store.retriever import Retriever
@@ -72,8 +75,8 @@ async def main():
     database = Database(connectionString=databaseConnectionString)
     saver = Saver(database=database)
     retriever = Retriever(database=database)
-    workQueue = SqsMessageQueue(region='eu-west-1', accessKeyId=accessKeyId, accessKeySecret=accessKeySecret, queueUrl='https://sqs.eu-west-1.amazonaws.com/097520841056/notd-work-queue')
-    tokenQueue = SqsMessageQueue(region='eu-west-1', accessKeyId=accessKeyId, accessKeySecret=accessKeySecret, queueUrl='https://sqs.eu-west-1.amazonaws.com/097520841056/notd-token-queue')
+    workQueue = create_message_queue(queueBackend=os.environ.get('QUEUE_BACKEND', 'sqs'), queueName='notd-work-queue', database=database, accessKeyId=accessKeyId, accessKeySecret=accessKeySecret)
+    tokenQueue = create_message_queue(queueBackend=os.environ.get('QUEUE_BACKEND', 'sqs'), queueName='notd-token-queue', database=database, accessKeyId=accessKeyId, accessKeySecret=accessKeySecret)
     ethNodeAuth = BasicAuthentication(username=ethNodeUsername, password=ethNodePassword)
     ethNodeRequester = Requester(headers={'Authorization': f'Basic {ethNodeAuth.to_string()}'})
     ethClient = RestEthClient(url=ethNodeUrl, requester=ethNodeRequester)
@@ -104,10 +107,11 @@ async def main():
     twitterManager = TwitterManager(saver=saver, retriever=retriever, requester=requester, workQueue=workQueue, twitterBearerToken=twitterBearerToken)
     badgeProcessor = BadgeProcessor(retriever=retriever, saver=saver)
     badgeManager = BadgeManager(retriever=retriever, saver=saver, workQueue=workQueue, badgeProcessor=badgeProcessor)
-    delegationManager = DelegationManager(ethClient=ethClient)
+    delegationBroadcastHub = BroadcastHub(backend=PostgresBroadcastBackend(database=database, channel='notd_delegations'))
+    delegationManager = DelegationManager(ethClient=ethClient, delegationBroadcastHub=delegationBroadcastHub)
     tokenStakingProcessor = TokenStakingProcessor(ethClient=ethClient, retriever=retriever)
     tokenStakingManager = TokenStakingManager(retriever=retriever, saver=saver, tokenQueue=tokenQueue, workQueue=workQueue, tokenStakingProcessor=tokenStakingProcessor)
-    blockManager = BlockManager(saver=saver, retriever=retriever, workQueue=workQueue, blockProcessor=blockProcessor, tokenManager=tokenManager, collectionManager=collectionManager, ownershipManager=ownershipManager, tokenStakingManager=tokenStakingManager)
+    blockManager = BlockManager(saver=saver, retriever=retriever, workQueue=workQueue, blockProcessor=blockProcessor, tokenManager=tokenManager, collectionManager=collectionManager, ownershipManager=ownershipManager, tokenStakingManager=tokenStakingManager, delegationManager=delegationManager)
     notdManager = NotdManager(saver=saver, retriever=retriever, workQueue=workQueue, blockManager=blockManager, tokenManager=tokenManager, activityManager=activityManager, attributeManager=attributeManager, collectionManager=collectionManager, ownershipManager=ownershipManager, listingManager=listingManager, twitterManager=twitterManager, collectionOverlapManager=collectionOverlapManager, badgeManager=badgeManager, delegationManager=delegationManager, tokenStakingManager=tokenStakingManager, subCollectionTokenManager=subCollectionTokenManager, subCollectionManager=subCollectionManager, requester=requester, revueApiKey=revueApiKey)
     processor = NotdMessageProcessor(notdManager=notdManager)
 
@@ -2,132 +2,71 @@ import asyncio
 import os
 import sys
 from typing import Sequence
+from typing import Set
+from typing import Tuple
 
 import asyncclick as click
 import sqlalchemy
 from core import logging
-from core.aws_requester import AwsRequester
-from core.queues.sqs import SqsMessageQueue
-from core.requester import Requester
-from core.s3_manager import S3Manager
 from core.store.database import Database
-from core.store.retriever import StringFieldFilter
 from core.util import list_util
-from core.web3.eth_client import RestEthClient
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
-from notd.collection_processor import CollectionProcessor
-from notd.store.retriever import Retriever
-from notd.store.saver import Saver
-from notd.store.schema import TokenCollectionsTable
+from notd.backfill_engine import BackfillEngine
+from notd.backfill_engine import BackfillJob
+from notd.backfill_engine import spawn_backfill_processes
+from notd.manager import NotdManager
 from notd.store.schema import TokenMetadatasTable
 from notd.store.schema import TokenTransfersTable
-from notd.token_manager import TokenManager
-from notd.token_metadata_processor import TokenMetadataProcessor
-from notd.token_ownership_processor import TokenOwnershipProcessor
+from scripts.backfill_context import create_backfill_context
 
 
-async def _update_token_metadatas(tokensToProcess: Sequence[tuple], tokenManager: TokenManager, retriever: Retriever):
-    query = (
-        TokenMetadatasTable.select()
-            .where(sqlalchemy.tuple_(TokenMetadatasTable.c.registryAddress, TokenMetadatasTable.c.tokenId).in_(tokensToProcess))
-    )
-    recentlyUpdatedTokenMetadatas = await retriever.query_token_metadatas(query=query)
-    recentlyUpdatedTokenIds = set((tokenMetadata.registryAddress, tokenMetadata.tokenId) for tokenMetadata in recentlyUpdatedTokenMetadatas)
-    tokensToUpdate = set(tokensToProcess) - recentlyUpdatedTokenIds
-    print('len(tokensToUpdate)', len(tokensToUpdate))
-    for tokensToUpdateChunk in list_util.generate_chunks(lst=list(tokensToUpdate), chunkSize=10):
-        tokenProcessResults = await asyncio.gather(*[tokenManager.update_token_metadata(registryAddress=registryAddress, tokenId=tokenId) for (registryAddress, tokenId) in tokensToUpdateChunk], return_exceptions=True)
-        tokenProcessSuccessCount = tokenProcessResults.count(None)
-        if tokenProcessSuccessCount:
-            print(f'{tokenProcessSuccessCount} / {len(tokenProcessResults)} token updates succeeded')
-        # NOTE(krishan711): if less than 90% of things succeed, bail out
-        if len(tokenProcessResults) >= 100 and tokenProcessSuccessCount / len(tokenProcessResults) < 0.9:
-            raise Exception('Less than 90% of token updates failed!')
+class ProcessTokensFromOldTransfersJob(BackfillJob[Tuple[str, str]]):
 
+    def __init__(self, database: Database, notdManager: NotdManager, startBlockNumber: int, endBlockNumber: int) -> None:
+        super().__init__(name='process_tokens_from_old_transfers', startIndex=startBlockNumber, endIndex=endBlockNumber)
+        self.database = database
+        self.notdManager = notdManager
+        self.seenTokenIds: Set[Tuple[str, str]] = set()
 
-async def _update_collections(collectionsToProcess: Sequence[str], tokenManager: TokenManager, retriever: Retriever):
-    recentlyUpdatedCollections = await retriever.list_collections(
-        fieldFilters=[
-            StringFieldFilter(fieldName=TokenCollectionsTable.c.address.key, containedIn=collectionsToProcess),
-        ],
-    )
-    recentlyUpdatedAddresses = set(collection.address for collection in recentlyUpdatedCollections)
-    collectionsToUpdate = set(collectionsToProcess) - recentlyUpdatedAddresses
-    print('len(collectionsToUpdate)', len(collectionsToUpdate))
-    for collectionsToUpdateChunk in list_util.generate_chunks(lst=list(collectionsToUpdate), chunkSize=50):
-        collectionProcessResults = await asyncio.gather(*[tokenManager.update_collection(address=address) for address in collectionsToUpdateChunk], return_exceptions=True)
-        collectionProcessSuccessCount = collectionProcessResults.count(None)
-        if collectionProcessSuccessCount:
-            print(f'{collectionProcessSuccessCount} / {len(collectionProcessResults)} collection updates succeeded')
-        # NOTE(krishan711): if less than 90% of things succeed, bail out
-        if len(collectionProcessResults) >= 100 and collectionProcessSuccessCount / len(collectionProcessResults) < 0.9:
-            raise Exception('Less than 90% of collection updates failed!')
+    async def list_items(self, startIndex: int, endIndex: int) -> Sequence[Tuple[str, str]]:
+        query = (
+            sqlalchemy.select(TokenTransfersTable.c.registryAddress, TokenTransfersTable.c.tokenId)
+            .where(TokenTransfersTable.c.blockNumber >= startIndex)
+            .where(TokenTransfersTable.c.blockNumber < endIndex)
+        )
+        result = await self.database.execute(query=query)
+        tokensToProcess = {(registryAddress, tokenId) for (registryAddress, tokenId) in result} - self.seenTokenIds
+        self.seenTokenIds.update(tokensToProcess)
+        existingTokenIds: Set[Tuple[str, str]] = set()
+        for tokensChunk in list_util.generate_chunks(lst=list(tokensToProcess), chunkSize=1000):
+            query = (
+                sqlalchemy.select(TokenMetadatasTable.c.registryAddress, TokenMetadatasTable.c.tokenId)
+                .where(sqlalchemy.tuple_(TokenMetadatasTable.c.registryAddress, TokenMetadatasTable.c.tokenId).in_(tokensChunk))
+            )
+            result = await self.database.execute(query=query)
+            existingTokenIds.update((registryAddress, tokenId) for (registryAddress, tokenId) in result)
+        return sorted(tokensToProcess - existingTokenIds)
+
+    async def process_item(self, item: Tuple[str, str]) -> None:
+        # NOTE(krishan711): updating the metadata also creates the collection if it hasn't been seen before
+        registryAddress, tokenId = item
+        await self.notdManager.update_token_metadata(registryAddress=registryAddress, tokenId=tokenId)
 
 
 @click.command()
 @click.option('-s', '--start-block-number', 'startBlockNumber', required=True, type=int)
 @click.option('-e', '--end-block-number', 'endBlockNumber', required=True, type=int)
 @click.option('-b', '--batch-size', 'batchSize', required=False, type=int, default=100)
-async def process_tokens_from_old_transfers(startBlockNumber: int, endBlockNumber: int, batchSize: int):
-    databaseConnectionString = Database.create_psql_connection_string(username=os.environ["DB_USERNAME"], password=os.environ["DB_PASSWORD"], host=os.environ["DB_HOST"], port=os.environ["DB_PORT"], name=os.environ["DB_NAME"])
-    database = Database(connectionString=databaseConnectionString)
-    saver = Saver(database=database)
-    retriever = Retriever(database=database)
-    s3Manager = S3Manager(region='eu-west-1', accessKeyId=os.environ['AWS_KEY'], accessKeySecret=os.environ['AWS_SECRET'])
-    workQueue = SqsMessageQueue(region='eu-west-1', accessKeyId=os.environ['AWS_KEY'], accessKeySecret=os.environ['AWS_SECRET'], queueUrl='https://sqs.eu-west-1.amazonaws.com/097520841056/notd-work-queue')
-    tokenQueue = SqsMessageQueue(region='eu-west-1', accessKeyId=os.environ['AWS_KEY'], accessKeySecret=os.environ['AWS_SECRET'], queueUrl='https://sqs.eu-west-1.amazonaws.com/097520841056/notd-token-queue')
-    awsRequester = AwsRequester(accessKeyId=os.environ['AWS_KEY'], accessKeySecret=os.environ['AWS_SECRET'])
-    ethClient = RestEthClient(url='https://nd-foldvvlb25awde7kbqfvpgvrrm.ethereum.managedblockchain.eu-west-1.amazonaws.com', requester=awsRequester)
-    requester = Requester()
-    tokenMetadataProcessor = TokenMetadataProcessor(requester=requester, ethClient=ethClient, s3Manager=s3Manager, bucketName=os.environ['S3_BUCKET'])
-    openseaApiKey = os.environ['OPENSEA_API_KEY']
-    tokenOwnershipProcessor = TokenOwnershipProcessor(retriever=retriever)
-    collectionProcessor = CollectionProcessor(requester=requester, ethClient=ethClient, openseaApiKey=openseaApiKey, s3Manager=s3Manager, bucketName=os.environ['S3_BUCKET'])
-    tokenManager = TokenManager(saver=saver, retriever=retriever, tokenQueue=tokenQueue, collectionProcessor=collectionProcessor, tokenMetadataProcessor=tokenMetadataProcessor, tokenOwnershipProcessor=tokenOwnershipProcessor)
-    revueApiKey = os.environ['REVUE_API_KEY']
-
-    await database.connect()
-    await workQueue.connect()
-    await s3Manager.connect()
-    await tokenQueue.connect()
-    cache = set()
-    registryCache = set()
-    currentBlockNumber = startBlockNumber
-    while currentBlockNumber < endBlockNumber:
-        start = currentBlockNumber
-        end = min(currentBlockNumber + batchSize, endBlockNumber)
-        currentBlockNumber = end
-        logging.info(f'Working on {start}-{end}...')
-        query = (
-             sqlalchemy.select(TokenTransfersTable.c.registryAddress, TokenTransfersTable.c.tokenId)
-             .where(TokenTransfersTable.c.blockNumber >= start)
-             .where(TokenTransfersTable.c.blockNumber < end)
-         )
-        result = await database.execute(query=query)
-        tokensToProcess = set()
-        collectionsToProcess = set()
-        for (registryAddress, tokenId) in result:
-            if (registryAddress, tokenId) in cache:
-                continue
-            cache.add((registryAddress, tokenId))
-            tokensToProcess.add((registryAddress, tokenId))
-            if registryAddress in registryCache:
-                continue
-            registryCache.add(registryAddress)
-            collectionsToProcess.add(registryAddress)
-        print('len(tokensToProcess)', len(tokensToProcess))
-        print('len(collectionsToProcess)', len(collectionsToProcess))
-        try:
-            await _update_token_metadatas(tokensToProcess=tokensToProcess, tokenManager=tokenManager, retriever=retriever)
-            await _update_collections(collectionsToProcess=collectionsToProcess, tokenManager=tokenManager, retriever=retriever)
-        except:
-            logging.error(f'Failed during: {start}-{end}')
-            raise
-    await database.disconnect()
-    await workQueue.disconnect()
-    await tokenQueue.disconnect()
-    await s3Manager.disconnect()
+@click.option('-p', '--process-count', 'processCount', required=False, type=int, default=1)
+@click.option('--partition-size', 'partitionSize', required=False, type=int, default=100000)
+async def process_tokens_from_old_transfers(startBlockNumber: int, endBlockNumber: int, batchSize: int, processCount: int, partitionSize: int):
+    if await spawn_backfill_processes(processCount=processCount):
+        return
+    async with create_backfill_context() as context:
+        job = ProcessTokensFromOldTransfersJob(database=context.database, notdManager=context.notdManager, startBlockNumber=startBlockNumber, endBlockNumber=endBlockNumber)
+        backfillEngine = BackfillEngine(database=context.database, job=job, partitionSize=partitionSize, stepSize=batchSize, slackClient=context.slackClient)
+        await backfillEngine.run()
 
 if __name__ == '__main__':
     logging.basicConfig(level=logging.INFO)
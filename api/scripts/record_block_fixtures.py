@@ -0,0 +1,43 @@
+import asyncio
+import os
+import sys
+from typing import Tuple
+
+import asyncclick as click
+from core import logging
+from core.http.basic_authentication import BasicAuthentication
+from core.requester import Requester
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+from notd.block_processor import BlockProcessor
+from notd.recorded_eth_client import EthClientFixture
+from notd.recorded_eth_client import RecordingEthClient
+
+
+@click.command()
+@click.option('-n', '--name', 'name', required=True, type=str)
+@click.option('-b', '--block-number', 'blockNumbers', required=True, type=int, multiple=True)
+@click.option('-o', '--output-directory', 'outputDirectory', required=False, type=str, default='./fixtures/blocks')
+async def record_block_fixtures(name: str, blockNumbers: Tuple[int, ...], outputDirectory: str):
+    ethNodeUsername = os.environ["ETH_NODE_USERNAME"]
+    ethNodePassword = os.environ["ETH_NODE_PASSWORD"]
+    ethNodeUrl = os.environ["ETH_NODE_URL"]
+    ethNodeAuth = BasicAuthentication(username=ethNodeUsername, password=ethNodePassword)
+    ethNodeRequester = Requester(headers={'Authorization': f'Basic {ethNodeAuth.to_string()}'})
+    filePath = os.path.join(outputDirectory, f'{name}.json.gz')
+    fixture = EthClientFixture.load_or_create(filePath=filePath)
+    ethClient = RecordingEthClient(url=ethNodeUrl, requester=ethNodeRequester, fixture=fixture)
+    blockProcessor = BlockProcessor(ethClient=ethClient)
+    try:
+        for blockNumber in blockNumbers:
+            processedBlock = await blockProcessor.process_block(blockNumber=blockNumber)
+            fixture.blockNumbers.append(blockNumber)
+            logging.info(f'Recorded block {blockNumber} with {len(processedBlock.retrievedTokenTransfers)} transfers')
+    finally:
+        fixture.save(filePath=filePath)
+        await ethNodeRequester.close_connections()
+    logging.info(f'Saved {len(fixture.responses)} responses to {filePath}')
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(record_block_fixtures())
@@ -3,65 +3,49 @@ import datetime
 import os
 import sys
 from typing import Optional
+from typing import Sequence
 
 import asyncclick as click
 import sqlalchemy
 from core import logging
-from core.aws_requester import AwsRequester
-from core.queues.sqs import SqsMessageQueue
-from core.requester import Requester
-from core.slack_client import SlackClient
 from core.store.database import Database
 from core.util import list_util
-from core.web3.eth_client import RestEthClient
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
-from notd.block_processor import BlockProcessor
+from notd.backfill_engine import BackfillEngine
+from notd.backfill_engine import BackfillJob
+from notd.backfill_engine import spawn_backfill_processes
 from notd.manager import NotdManager
-from notd.store.retriever import Retriever
-from notd.store.saver import Saver
+from notd.ownership_manager import OwnershipManager
 from notd.store.schema import BlocksTable
 from notd.store.schema import TokenCollectionsTable
 from notd.store.schema import TokenMetadatasTable
 from notd.store.schema import TokenTransfersTable
-from notd.token_manager import TokenManager
+from scripts.backfill_context import create_backfill_context
 
 
-@click.command()
-@click.option('-r', '--registry-addess', 'registryAddress', required=False, type=str)
-async def run(registryAddress: Optional[str]):
-    databaseConnectionString = Database.create_psql_connection_string(username=os.environ["DB_USERNAME"], password=os.environ["DB_PASSWORD"], host=os.environ["DB_HOST"], port=os.environ["DB_PORT"], name=os.environ["DB_NAME"])
-    database = Database(connectionString=databaseConnectionString)
-    saver = Saver(database=database)
-    retriever = Retriever(database=database)
-    workQueue = SqsMessageQueue(region='eu-west-1', accessKeyId=os.environ['AWS_KEY'], accessKeySecret=os.environ['AWS_SECRET'], queueUrl='https://sqs.eu-west-1.amazonaws.com/097520841056/notd-work-queue')
-    tokenQueue = SqsMessageQueue(region='eu-west-1', accessKeyId=os.environ['AWS_KEY'], accessKeySecret=os.environ['AWS_SECRET'], queueUrl='https://sqs.eu-west-1.amazonaws.com/097520841056/notd-token-queue')
-    requester = Requester()
-    awsRequester = AwsRequester(accessKeyId=os.environ['AWS_KEY'], accessKeySecret=os.environ['AWS_SECRET'])
-    ethClient = RestEthClient(url='https://nd-foldvvlb25awde7kbqfvpgvrrm.ethereum.managedblockchain.eu-west-1.amazonaws.com', requester=awsRequester)
-    blockProcessor = BlockProcessor(ethClient=ethClient)
-    tokenManager = TokenManager(saver=saver, retriever=retriever, tokenQueue=tokenQueue, collectionProcessor=None, tokenMetadataProcessor=None, tokenOwnershipProcessor=None)
-    # NOTE(krishan711): use tokenqueue so its lower prioritized work
-    notdManager = NotdManager(blockProcessor=blockProcessor, saver=saver, retriever=retriever, workQueue=tokenQueue, tokenManager=tokenManager, requester=requester, revueApiKey=None)
+class ReprocessCollectionBlocksJob(BackfillJob[str]):
 
-    await database.connect()
-    await workQueue.connect()
-    await tokenQueue.connect()
+    def __init__(self, database: Database, notdManager: NotdManager, ownershipManager: OwnershipManager, startCollectionId: int, endCollectionId: int) -> None:
+        # NOTE(krishan711): collections are partitioned by id rather than position so collections added during a run don't shift the checkpoints
+        super().__init__(name='reprocess_collection_blocks', startIndex=startCollectionId, endIndex=endCollectionId)
+        self.database = database
+        self.notdManager = notdManager
+        self.ownershipManager = ownershipManager
 
-    if registryAddress:
-        registryAddresses = [registryAddress]
-    else:
+    async def list_items(self, startIndex: int, endIndex: int) -> Sequence[str]:
         query = (
             sqlalchemy.select(TokenCollectionsTable.c.address)
             .filter(TokenCollectionsTable.c.doesSupportErc1155 == True)
-            .order_by(TokenCollectionsTable.c.collectionId.desc())
+            .filter(TokenCollectionsTable.c.collectionId >= startIndex)
+            .filter(TokenCollectionsTable.c.collectionId < endIndex)
+            .order_by(TokenCollectionsTable.c.collectionId.asc())
         )
-        results = await database.execute(query=query)
-        registryAddresses = [registryAddress for (registryAddress, ) in results]
-    print(f'Starting to reprocess blocks for {len(registryAddresses)} collections')
+        results = await self.database.execute(query=query)
+        return [registryAddress for (registryAddress, ) in results]
 
-    for index, registryAddress in enumerate(registryAddresses):
-        print(f'Reprocessing blocks for collection: {registryAddress} (index: {index})')
+    async def process_item(self, item: str) -> None:
+        registryAddress = item
         minDate = datetime.datetime(2022, 4, 8, 9, 0)
         query = (
             sqlalchemy.select(sqlalchemy.distinct(BlocksTable.c.blockNumber)) \
@@ -69,26 +53,45 @@ async def run(registryAddress: Optional[str]):
             .filter(TokenTransfersTable.c.registryAddress == registryAddress)
             .filter(BlocksTable.c.updatedDate < minDate)
         )
-        results = await database.execute(query=query)
-        blockNumbers = set(blockNumber for (blockNumber, ) in results)
-        print(f'Processing {len(blockNumbers)} blocks')
+        results = await self.database.execute(query=query)
+        blockNumbers = sorted(blockNumber for (blockNumber, ) in results)
+        logging.info(f'Reprocessing {len(blockNumbers)} blocks for collection: {registryAddress}')
         if len(blockNumbers) == 0:
-            continue
-        # await notdManager.process_blocks_deferred(blockNumbers=blockNumbers)
-        for blockNumberChunk in list_util.generate_chunks(lst=list(blockNumbers), chunkSize=5):
-            await asyncio.gather(*[notdManager.process_block(blockNumber=blockNumber) for blockNumber in blockNumberChunk])
+            return
+        for blockNumberChunk in list_util.generate_chunks(lst=blockNumbers, chunkSize=5):
+            await asyncio.gather(*[self.notdManager.process_block(blockNumber=blockNumber) for blockNumber in blockNumberChunk])
         query = (
             sqlalchemy.select(TokenMetadatasTable.c.tokenId) \
             .filter(TokenMetadatasTable.c.registryAddress == registryAddress)
         )
-        results = await database.execute(query=query)
+        results = await self.database.execute(query=query)
         collectionTokenIds = [(registryAddress, tokenId) for (tokenId, ) in results]
-        await tokenManager.update_token_ownerships_deferred(collectionTokenIds=collectionTokenIds)
-    await database.disconnect()
-    await workQueue.disconnect()
-    await tokenQueue.disconnect()
-    await requester.close_connections()
-    await awsRequester.close_connections()
+        await self.ownershipManager.update_token_ownerships_deferred(collectionTokenIds=collectionTokenIds)
+
+
+@click.command()
+@click.option('-r', '--registry-addess', 'registryAddress', required=False, type=str)
+@click.option('-b', '--batch-size', 'batchSize', required=False, type=int, default=10)
+@click.option('-p', '--process-count', 'processCount', required=False, type=int, default=1)
+@click.option('--partition-size', 'partitionSize', required=False, type=int, default=1000)
+async def run(registryAddress: Optional[str], batchSize: int, processCount: int, partitionSize: int):
+    if await spawn_backfill_processes(processCount=processCount):
+        return
+    async with create_backfill_context() as context:
+        if registryAddress:
+            collection = await context.retriever.get_collection_by_address(address=registryAddress)
+            startCollectionId = collection.collectionId
+            endCollectionId = collection.collectionId + 1
+        else:
+            query = sqlalchemy.select(sqlalchemy.func.min(TokenCollectionsTable.c.collectionId), sqlalchemy.func.max(TokenCollectionsTable.c.collectionId))
+            result = await context.database.execute(query=query)
+            minCollectionId, maxCollectionId = result.first()
+            startCollectionId = minCollectionId or 0
+            endCollectionId = (maxCollectionId or 0) + 1
+        job = ReprocessCollectionBlocksJob(database=context.database, notdManager=context.notdManager, ownershipManager=context.ownershipManager, startCollectionId=startCollectionId, endCollectionId=endCollectionId)
+        # NOTE(krishan711): each collection already processes its blocks in parallel so only a few run at once
+        backfillEngine = BackfillEngine(database=context.database, job=job, partitionSize=partitionSize, stepSize=batchSize, initialConcurrency=1, maxConcurrency=4, slackClient=context.slackClient)
+        await backfillEngine.run()
 
 if __name__ == '__main__':
     logging.basicConfig(level=logging.INFO)
@@ -3,15 +3,15 @@ import sys
 
 import asyncclick as click
 from core import logging
-from core.queues.sqs import SqsMessageQueue
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+from notd.message_queues import create_message_queue
 from notd.messages import ReceiveNewBlocksMessageContent
 
 
 @click.command()
 async def run():
-    workQueue = SqsMessageQueue(region='eu-west-1', accessKeyId=os.environ['AWS_KEY'], accessKeySecret=os.environ['AWS_SECRET'], queueUrl='https://sqs.eu-west-1.amazonaws.com/097520841056/notd-work-queue')
+    workQueue = create_message_queue(queueBackend=os.environ.get('QUEUE_BACKEND', 'sqs'), queueName='notd-work-queue', accessKeyId=os.environ['AWS_KEY'], accessKeySecret=os.environ['AWS_SECRET'])
     await workQueue.connect()
     await workQueue.send_message(message=ReceiveNewBlocksMessageContent().to_message())
     await workQueue.disconnect()
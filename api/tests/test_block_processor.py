@@ -3,6 +3,7 @@ import os
 import sys
 import unittest
 from typing import List
+from typing import Optional
 from unittest import IsolatedAsyncioTestCase
 
 from core.http.basic_authentication import BasicAuthentication
@@ -15,6 +16,9 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 from notd.block_processor import BlockProcessor
 from notd.model import ProcessedBlock
 from notd.model import RetrievedTokenTransfer
+from notd.recorded_eth_client import EthClientFixture
+from notd.recorded_eth_client import RecordingEthClient
+from notd.recorded_eth_client import ReplayEthClient
 
 
 async def _get_transaction(ethClient: EthClientInterface, blockNumber: int, transactionHash: str) -> TxData:
@@ -42,16 +46,32 @@ class BlockProcessorTestCase(KibaAsyncTestCase):
 
     async def asyncSetUp(self) -> None:
         await super().asyncSetUp()
-        ethNodeUsername = os.environ["ETH_NODE_USERNAME"]
-        ethNodePassword = os.environ["ETH_NODE_PASSWORD"]
-        ethNodeUrl = os.environ["ETH_NODE_URL"]
-        ethNodeAuth = BasicAuthentication(username=ethNodeUsername, password=ethNodePassword)
-        self.ethNodeRequester = Requester(headers={'Authorization': f'Basic {ethNodeAuth.to_string()}'})
-        self.ethClient = RestEthClient(url=ethNodeUrl, requester=self.ethNodeRequester)
+        # NOTE(krishan711): set ETH_CLIENT_FIXTURE_MODE to record to save the node responses to ETH_CLIENT_FIXTURE_PATH and to replay to run offline from them
+        self.fixtureMode = os.environ.get('ETH_CLIENT_FIXTURE_MODE')
+        self.fixturePath = os.environ.get('ETH_CLIENT_FIXTURE_PATH', os.path.join(os.path.dirname(__file__), 'fixtures', 'block_processor.json.gz'))
+        self.ethNodeRequester: Optional[Requester] = None
+        self.fixture: Optional[EthClientFixture] = None
+        if self.fixtureMode == 'replay':
+            self.fixture = EthClientFixture.load(filePath=self.fixturePath)
+            self.ethClient: EthClientInterface = ReplayEthClient(fixture=self.fixture)
+        else:
+            ethNodeUsername = os.environ["ETH_NODE_USERNAME"]
+            ethNodePassword = os.environ["ETH_NODE_PASSWORD"]
+            ethNodeUrl = os.environ["ETH_NODE_URL"]
+            ethNodeAuth = BasicAuthentication(username=ethNodeUsername, password=ethNodePassword)
+            self.ethNodeRequester = Requester(headers={'Authorization': f'Basic {ethNodeAuth.to_string()}'})
+            if self.fixtureMode == 'record':
+                self.fixture = EthClientFixture.load_or_create(filePath=self.fixturePath)
+                self.ethClient = RecordingEthClient(url=ethNodeUrl, requester=self.ethNodeRequester, fixture=self.fixture)
+            else:
+                self.ethClient = RestEthClient(url=ethNodeUrl, requester=self.ethNodeRequester)
         self.blockProcessor = BlockProcessor(ethClient=self.ethClient)
 
     async def asyncTearDown(self) -> None:
-        await self.ethNodeRequester.close_connections()
+        if self.fixtureMode == 'record' and self.fixture:
+            self.fixture.save(filePath=self.fixturePath)
+        if self.ethNodeRequester:
+            await self.ethNodeRequester.close_connections()
         await super().asyncTearDown()
 
 
@@ -0,0 +1,151 @@
+import asyncio
+import os
+import sys
+import unittest
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+from unittest import IsolatedAsyncioTestCase
+
+from core.web3.eth_client import EthClientInterface
+from web3._utils.contracts import encode_transaction_data
+from web3.auto import w3
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+from notd.broadcast_hub import BroadcastHub
+from notd.broadcast_hub import LocalBroadcastBackend
+from notd.delegation_manager import DelegationManager
+from notd.delegation_manager import DelegationType
+from notd.model import RetrievedDelegationEvent
+
+VAULT_ADDRESS = '0x18090cDA49B21dEAffC21b4F886aed3eB787d032'
+OTHER_VAULT_ADDRESS = '0x3C0B37D9E4Aa8BB2A6b8Bb8D8B9f04a0A6B1C1E0'
+DELEGATE_ADDRESSES = [
+    '0x0000000000000000000000000000000000000001',
+    '0x0000000000000000000000000000000000000002',
+    '0x0000000000000000000000000000000000000003',
+]
+CONTRACT_ADDRESS = '0x0000000000000000000000000000000000000004'
+EMPTY_ADDRESS = '0x0000000000000000000000000000000000000000'
+
+
+class CountingEthClient(EthClientInterface):
+
+    def __init__(self, delegateDelegationsMap: Dict[str, List[Tuple[int, str, str, str, int]]]) -> None:
+        self.delegateDelegationsMap = delegateDelegationsMap
+        self.functionCallCounts: Dict[str, int] = {}
+        self.delegationManager: Optional[DelegationManager] = None
+        self.releaseEvent: Optional[asyncio.Event] = None
+
+    @property
+    def callCount(self) -> int:
+        return sum(self.functionCallCounts.values())
+
+    async def call_function(self, toAddress, contractAbi, functionAbi, fromAddress=None, arguments=None, blockNumber=None):
+        # NOTE(krishan711): encoding the call checks the arguments are valid for the real abi
+        encode_transaction_data(w3=w3, fn_identifier=functionAbi['name'], contract_abi=contractAbi, fn_abi=functionAbi, kwargs=(arguments or {}))
+        self.functionCallCounts[functionAbi['name']] = self.functionCallCounts.get(functionAbi['name'], 0) + 1
+        await asyncio.sleep(0)
+        if functionAbi['name'] == 'getDelegationsByDelegate':
+            delegationInfos = self.delegateDelegationsMap.get(arguments['delegate'], [])
+            if self.releaseEvent is not None:
+                await self.releaseEvent.wait()
+            return [delegationInfos]
+        if functionAbi['name'] == 'aggregate3':
+            results = []
+            for (_, _, callData) in arguments['calls']:
+                _, callArguments = self.delegationManager.delegationRegistryContract.decode_function_input(callData)
+                delegationInfos = self.delegateDelegationsMap.get(callArguments['delegate'], [])
+                results.append((True, w3.codec.encode(['(uint8,address,address,address,uint256)[]'], [delegationInfos])))
+            return [results]
+        raise NotImplementedError()
+
+
+class KibaAsyncTestCase(IsolatedAsyncioTestCase):
+
+    def __init__(self, methodName: str = 'runTest') -> None:
+        super().__init__(methodName=methodName)
+
+
+class TestDelegationManager(KibaAsyncTestCase):
+
+    def setUp(self) -> None:
+        self.ethClient = CountingEthClient(delegateDelegationsMap={
+            DELEGATE_ADDRESSES[0]: [(1, VAULT_ADDRESS, DELEGATE_ADDRESSES[0], EMPTY_ADDRESS, 0)],
+            DELEGATE_ADDRESSES[1]: [(2, VAULT_ADDRESS, DELEGATE_ADDRESSES[1], CONTRACT_ADDRESS, 0), (3, OTHER_VAULT_ADDRESS, DELEGATE_ADDRESSES[1], CONTRACT_ADDRESS, 12)],
+        })
+        self.delegationBroadcastHub = BroadcastHub(backend=LocalBroadcastBackend())
+        self.delegationManager = DelegationManager(ethClient=self.ethClient, delegationBroadcastHub=self.delegationBroadcastHub)
+        self.ethClient.delegationManager = self.delegationManager
+
+    async def test_concurrent_lookups_are_batched(self):
+        delegationsList = await asyncio.gather(*[self.delegationManager.get_delegations(delegateAddress=delegateAddress) for delegateAddress in DELEGATE_ADDRESSES])
+        self.assertEqual(self.ethClient.functionCallCounts, {'aggregate3': 1})
+        self.assertEqual([len(delegations) for delegations in delegationsList], [1, 2, 0])
+        self.assertEqual(delegationsList[0][0].delegationType, DelegationType.ALL)
+        self.assertIsNone(delegationsList[0][0].contractAddress)
+        self.assertEqual(delegationsList[1][1].vaultAddress, OTHER_VAULT_ADDRESS)
+        self.assertEqual(delegationsList[1][1].tokenId, 12)
+
+    async def test_repeat_lookups_are_cached(self):
+        await self.delegationManager.get_delegations(delegateAddress=DELEGATE_ADDRESSES[0])
+        self.assertEqual(self.ethClient.functionCallCounts, {'getDelegationsByDelegate': 1})
+        delegations = await self.delegationManager.get_delegations(delegateAddress=DELEGATE_ADDRESSES[0].lower())
+        self.assertEqual(self.ethClient.callCount, 1)
+        self.assertEqual(len(delegations), 1)
+
+    async def test_concurrent_lookups_for_same_delegate_are_shared(self):
+        await asyncio.gather(*[self.delegationManager.get_delegations(delegateAddress=DELEGATE_ADDRESSES[1]) for _ in range(5)])
+        self.assertEqual(self.ethClient.functionCallCounts, {'getDelegationsByDelegate': 1})
+
+    async def test_expired_lookups_are_refetched(self):
+        self.delegationManager.cacheSeconds = 0
+        await self.delegationManager.get_delegations(delegateAddress=DELEGATE_ADDRESSES[0])
+        await self.delegationManager.get_delegations(delegateAddress=DELEGATE_ADDRESSES[0])
+        self.assertEqual(self.ethClient.callCount, 2)
+
+    async def test_warm_from_delegation_events(self):
+        await asyncio.gather(*[self.delegationManager.get_delegations(delegateAddress=delegateAddress) for delegateAddress in DELEGATE_ADDRESSES])
+        self.ethClient.delegateDelegationsMap[DELEGATE_ADDRESSES[0]] = []
+        await self.delegationManager.warm_from_delegation_events(delegationEvents=[RetrievedDelegationEvent(blockNumber=1, vaultAddress=OTHER_VAULT_ADDRESS, delegateAddress=None)])
+        self.assertEqual(self.ethClient.functionCallCounts, {'aggregate3': 1, 'getDelegationsByDelegate': 1})
+        await self.delegationManager.warm_from_delegation_events(delegationEvents=[RetrievedDelegationEvent(blockNumber=2, vaultAddress=VAULT_ADDRESS, delegateAddress=DELEGATE_ADDRESSES[0])])
+        self.assertEqual(self.ethClient.functionCallCounts, {'aggregate3': 1, 'getDelegationsByDelegate': 2})
+        delegations = await self.delegationManager.get_delegations(delegateAddress=DELEGATE_ADDRESSES[0])
+        self.assertEqual(delegations, [])
+        self.assertEqual(self.ethClient.callCount, 3)
+
+    async def test_lookups_in_flight_during_warm_are_not_cached(self):
+        self.ethClient.releaseEvent = asyncio.Event()
+        staleLookupTask = asyncio.create_task(self.delegationManager.get_delegations(delegateAddress=DELEGATE_ADDRESSES[0]))
+        await asyncio.sleep(self.delegationManager.batchDelaySeconds * 2)
+        self.ethClient.delegateDelegationsMap[DELEGATE_ADDRESSES[0]] = []
+        warmTask = asyncio.create_task(self.delegationManager.warm_from_delegation_events(delegationEvents=[RetrievedDelegationEvent(blockNumber=1, vaultAddress=VAULT_ADDRESS, delegateAddress=DELEGATE_ADDRESSES[0])]))
+        await asyncio.sleep(self.delegationManager.batchDelaySeconds * 2)
+        self.ethClient.releaseEvent.set()
+        staleDelegations = await staleLookupTask
+        await warmTask
+        self.assertEqual(len(staleDelegations), 1)
+        self.assertEqual(self.ethClient.functionCallCounts, {'getDelegationsByDelegate': 2})
+        delegations = await self.delegationManager.get_delegations(delegateAddress=DELEGATE_ADDRESSES[0])
+        self.assertEqual(delegations, [])
+        self.assertEqual(self.ethClient.callCount, 2)
+
+    async def test_published_delegation_events_warm_the_cache(self):
+        await self.delegationBroadcastHub.connect()
+        self.delegationManager.start_delegation_event_listener()
+        await asyncio.sleep(0)
+        await self.delegationManager.get_delegations(delegateAddress=DELEGATE_ADDRESSES[0])
+        self.ethClient.delegateDelegationsMap[DELEGATE_ADDRESSES[0]] = []
+        await self.delegationManager.publish_delegation_events(delegationEvents=[RetrievedDelegationEvent(blockNumber=1, vaultAddress=VAULT_ADDRESS, delegateAddress=DELEGATE_ADDRESSES[0])])
+        await asyncio.sleep(self.delegationManager.batchDelaySeconds * 2)
+        await self.delegationManager.stop_delegation_event_listener()
+        self.assertEqual(self.ethClient.functionCallCounts, {'getDelegationsByDelegate': 2})
+        delegations = await self.delegationManager.get_delegations(delegateAddress=DELEGATE_ADDRESSES[0])
+        self.assertEqual(delegations, [])
+        self.assertEqual(self.ethClient.callCount, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
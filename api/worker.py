@@ -1,13 +1,10 @@
 import asyncio
 import os
-import time
 
 from core import logging
 from core.discord_client import DiscordClient
 from core.http.basic_authentication import BasicAuthentication
 from core.notification_client import NotificationClient
-from core.queues.message_queue_processor import MessageQueueProcessor
-from core.queues.sqs import SqsMessageQueue
 from core.requester import Requester
 from core.slack_client import SlackClient
 from core.store.database import Database
@@ -21,6 +18,8 @@ from notd.badge_manager import BadgeManager
 from notd.badge_processor import BadgeProcessor
 from notd.block_manager import BlockManager
 from notd.block_processor import BlockProcessor
+from notd.broadcast_hub import BroadcastHub
+from notd.broadcast_hub import PostgresBroadcastBackend
 from notd.collection_activity_processor import CollectionActivityProcessor
 from notd.collection_manager import CollectionManager
 from notd.collection_overlap_manager import CollectionOverlapManager
@@ -30,8 +29,17 @@ from notd.delegation_manager import DelegationManager
 from notd.listing_manager import ListingManager
 from notd.lock_manager import LockManager
 from notd.manager import NotdManager
+from notd.message_coalescing import CoalescingMessageQueue
+from notd.message_coalescing import DeduplicatingMessageProcessor
+from notd.message_queue_consumer import ConsumedQueue
+from notd.message_queue_consumer import MessageQueueConsumer
+from notd.message_queues import create_message_queue
+from notd.messages import UpdateCollectionTokensMessageContent
+from notd.messages import UpdateTokenMetadataMessageContent
+from notd.messages import UpdateTokenOwnershipMessageContent
 from notd.notd_message_processor import NotdMessageProcessor
 from notd.ownership_manager import OwnershipManager
+from notd.store.pooled_database import PooledDatabase
 from notd.store.retriever import Retriever
 from notd.store.saver import Saver
 from notd.sub_collection_manager import SubCollectionManager
@@ -69,13 +77,15 @@ async def main():
     ethNodeUsername = os.environ["ETH_NODE_USERNAME"]
     ethNodePassword = os.environ["ETH_NODE_PASSWORD"]
     ethNodeUrl = os.environ["ETH_NODE_URL"]
+    queueBackend = os.environ.get('QUEUE_BACKEND', 'sqs')
 
     databaseConnectionString = Database.create_psql_connection_string(username=os.environ["DB_USERNAME"], password=os.environ["DB_PASSWORD"], host=os.environ["DB_HOST"], port=os.environ["DB_PORT"], name=os.environ["DB_NAME"])
-    database = Database(connectionString=databaseConnectionString)
+    database = PooledDatabase(connectionString=databaseConnectionString)
     saver = Saver(database=database)
     retriever = Retriever(database=database)
-    workQueue = SqsMessageQueue(region='eu-west-1', accessKeyId=accessKeyId, accessKeySecret=accessKeySecret, queueUrl='https://sqs.eu-west-1.amazonaws.com/097520841056/notd-work-queue')
-    tokenQueue = SqsMessageQueue(region='eu-west-1', accessKeyId=accessKeyId, accessKeySecret=accessKeySecret, queueUrl='https://sqs.eu-west-1.amazonaws.com/097520841056/notd-token-queue')
+    workQueue = create_message_queue(queueBackend=queueBackend, queueName='notd-work-queue', database=database, accessKeyId=accessKeyId, accessKeySecret=accessKeySecret)
+    tokenQueueCoalesceSeconds = int(os.environ.get('TOKEN_QUEUE_COALESCE_SECONDS', 30))
+    tokenQueue = CoalescingMessageQueue(messageQueue=create_message_queue(queueBackend=queueBackend, queueName='notd-token-queue', database=database, accessKeyId=accessKeyId, accessKeySecret=accessKeySecret), windowSeconds=tokenQueueCoalesceSeconds)
     ethNodeAuth = BasicAuthentication(username=ethNodeUsername, password=ethNodePassword)
     ethNodeRequester = Requester(headers={'Authorization': f'Basic {ethNodeAuth.to_string()}'})
     ethClient = RestEthClient(url=ethNodeUrl, requester=ethNodeRequester)
@@ -106,28 +116,37 @@ async def main():
     twitterManager = TwitterManager(saver=saver, retriever=retriever, requester=requester, workQueue=workQueue, twitterBearerToken=twitterBearerToken)
     badgeProcessor = BadgeProcessor(retriever=retriever, saver=saver)
     badgeManager = BadgeManager(retriever=retriever, saver=saver, workQueue=workQueue, badgeProcessor=badgeProcessor)
-    delegationManager = DelegationManager(ethClient=ethClient)
+    delegationBroadcastHub = BroadcastHub(backend=PostgresBroadcastBackend(database=database, channel='notd_delegations'))
+    delegationManager = DelegationManager(ethClient=ethClient, delegationBroadcastHub=delegationBroadcastHub)
     tokenStakingProcessor = TokenStakingProcessor(ethClient=ethClient, retriever=retriever)
     tokenStakingManager = TokenStakingManager(retriever=retriever, saver=saver, tokenQueue=tokenQueue, workQueue=workQueue, tokenStakingProcessor=tokenStakingProcessor)
-    blockManager = BlockManager(saver=saver, retriever=retriever, workQueue=workQueue, blockProcessor=blockProcessor, tokenManager=tokenManager, collectionManager=collectionManager, ownershipManager=ownershipManager, tokenStakingManager=tokenStakingManager)
+    blockManager = BlockManager(saver=saver, retriever=retriever, workQueue=workQueue, blockProcessor=blockProcessor, tokenManager=tokenManager, collectionManager=collectionManager, ownershipManager=ownershipManager, tokenStakingManager=tokenStakingManager, delegationManager=delegationManager)
     notdManager = NotdManager(saver=saver, retriever=retriever, workQueue=workQueue, blockManager=blockManager, tokenManager=tokenManager, activityManager=activityManager, attributeManager=attributeManager, collectionManager=collectionManager, ownershipManager=ownershipManager, listingManager=listingManager, twitterManager=twitterManager, collectionOverlapManager=collectionOverlapManager, badgeManager=badgeManager, delegationManager=delegationManager, tokenStakingManager=tokenStakingManager, subCollectionTokenManager=subCollectionTokenManager, subCollectionManager=subCollectionManager, requester=requester, revueApiKey=revueApiKey)
-    processor = NotdMessageProcessor(notdManager=notdManager)
-    workQueueProcessor = MessageQueueProcessor(queue=workQueue, messageProcessor=processor, notificationClients=[], requestIdHolder=requestIdHolder)
-    tokenQueueProcessor = MessageQueueProcessor(queue=tokenQueue, messageProcessor=processor, notificationClients=[], requestIdHolder=requestIdHolder)
+    processor = DeduplicatingMessageProcessor(messageProcessor=NotdMessageProcessor(notdManager=notdManager), windowSeconds=tokenQueueCoalesceSeconds)
+    # NOTE(krishan711): blocks are prioritised over token updates and ownership / metadata updates are capped so they can't exhaust the database pool
+    # NOTE(krishan711): the limits are only read at start-up, restart the worker with new values to tune them
+    messageQueueConsumer = MessageQueueConsumer(
+        messageProcessor=processor,
+        consumedQueues=[
+            ConsumedQueue(name='work', queue=workQueue, priority=2, pollerCount=2, batchSize=3, maxInFlight=int(os.environ.get('WORK_QUEUE_MAX_IN_FLIGHT', 6))),
+            ConsumedQueue(name='token', queue=tokenQueue, priority=1, pollerCount=2, batchSize=10, maxInFlight=int(os.environ.get('TOKEN_QUEUE_MAX_IN_FLIGHT', 10))),
+        ],
+        maxInFlight=int(os.environ.get('WORKER_MAX_IN_FLIGHT', 12)),
+        commandConcurrencyLimits={
+            UpdateTokenOwnershipMessageContent.get_command(): 4,
+            UpdateTokenMetadataMessageContent.get_command(): 6,
+            UpdateCollectionTokensMessageContent.get_command(): 1,
+        },
+        notificationClients=[],
+        requestIdHolder=requestIdHolder,
+        longPollSeconds=20,
+    )
 
     await database.connect()
     await workQueue.connect()
     await tokenQueue.connect()
     try:
-        while True:
-            hasProcessedWork = await workQueueProcessor.execute_batch(batchSize=3, longPollSeconds=1, shouldProcessInParallel=True)
-            if hasProcessedWork:
-                continue
-            hasProcessedToken = await tokenQueueProcessor.execute_batch(batchSize=10, longPollSeconds=1, shouldProcessInParallel=True)
-            if hasProcessedToken:
-                continue
-            logging.info('No message received.. sleeping')
-            time.sleep(60)
+        await messageQueueConsumer.run()
     finally:
         await database.disconnect()
         await workQueue.disconnect()
@@ -17,7 +17,8 @@ CREATE TABLE tbl_token_transfers (
     is_interstitial BOOLEAN NOT NULL,
     is_swap BOOLEAN NOT NULL,
     is_batch BOOLEAN NOT NULL,
-    is_outbound BOOLEAN NOT NULL
+    is_outbound BOOLEAN NOT NULL,
+    token_id_sort_key NUMERIC(78, 0)
 );
 CREATE UNIQUE INDEX tbl_token_transfers_transaction_hash_registry_address_token_id_from_address_to_address_block_number_amount ON tbl_token_transfers (transaction_hash, registry_address, token_id, from_address, to_address, block_number, amount_2);
 CREATE INDEX tbl_token_transfers_registry_address_token_id ON tbl_token_transfers (registry_address, token_id);
@@ -37,6 +38,7 @@ CREATE INDEX tbl_token_transfers_is_interstitial ON tbl_token_transfers (is_inte
 CREATE INDEX tbl_token_transfers_is_swap ON tbl_token_transfers (is_swap);
 CREATE INDEX tbl_token_transfers_is_batch ON tbl_token_transfers (is_batch);
 CREATE INDEX tbl_token_transfers_is_outbound ON tbl_token_transfers (is_outbound);
+CREATE INDEX tbl_token_transfers_registry_address_token_id_sort_key ON tbl_token_transfers (registry_address, token_id_sort_key);
 -- NOTE(krishan711): this is O(100m) rows and fills O(100k) per day
 ALTER TABLE tbl_token_transfers SET (autovacuum_vacuum_scale_factor = 0.01);
 ALTER TABLE tbl_token_transfers SET (autovacuum_analyze_scale_factor = 0.001);
@@ -56,7 +58,8 @@ CREATE TABLE tbl_token_metadatas (
     frame_image_url TEXT,
     name TEXT,
     description TEXT,
-    attributes JSON
+    attributes JSON,
+    token_id_sort_key NUMERIC(78, 0)
 );
 CREATE UNIQUE INDEX tbl_token_metadatas_registry_address_token_id ON tbl_token_metadatas (registry_address, token_id);
 CREATE INDEX tbl_token_metadatas_registry_address_token_id_updated_date ON tbl_token_metadatas (registry_address, token_id, updated_date);
@@ -64,6 +67,7 @@ CREATE INDEX tbl_token_metadatas_registry_address ON tbl_token_metadatas (regist
 CREATE INDEX tbl_token_metadatas_token_id ON tbl_token_metadatas (token_id);
 CREATE INDEX tbl_token_metadatas_updated_date ON tbl_token_metadatas (updated_date);
 CREATE INDEX tbl_token_metadatas_name ON tbl_token_metadatas (name);
+CREATE INDEX tbl_token_metadatas_registry_address_token_id_sort_key ON tbl_token_metadatas (registry_address, token_id_sort_key);
 -- NOTE(krishan711): this is O(10m) rows and fills O(10k) per day
 ALTER TABLE tbl_token_metadatas SET (autovacuum_vacuum_scale_factor = 0.01);
 ALTER TABLE tbl_token_metadatas SET (autovacuum_analyze_scale_factor = 0.001);
@@ -123,7 +127,8 @@ CREATE TABLE tbl_token_ownerships (
     owner_address TEXT NOT NULL,
     transfer_value NUMERIC(256, 0) NOT NULL,
     transfer_date TIMESTAMP WITHOUT TIME ZONE NOT NULL,
-    transfer_transaction_hash TEXT NOT NULL
+    transfer_transaction_hash TEXT NOT NULL,
+    token_id_sort_key NUMERIC(78, 0)
 );
 CREATE UNIQUE INDEX tbl_token_ownerships_registry_address_token_id ON tbl_token_ownerships (registry_address, token_id);
 CREATE INDEX tbl_token_ownerships_registry_address_token_id_updated_date ON tbl_token_ownerships (registry_address, token_id, updated_date);
@@ -133,9 +138,11 @@ CREATE INDEX tbl_token_ownerships_updated_date ON tbl_token_ownerships (updated_
 CREATE INDEX tbl_token_ownerships_regsitry_address ON tbl_token_ownerships (registry_address);
 CREATE INDEX tbl_token_ownerships_token_id ON tbl_token_ownerships (token_id);
 CREATE INDEX tbl_token_ownerships_owner_address ON tbl_token_ownerships (owner_address);
+CREATE INDEX tbl_token_ownerships_owner_address_registry_address ON tbl_token_ownerships (owner_address, registry_address);
 CREATE INDEX tbl_token_ownerships_transfer_date ON tbl_token_ownerships (transfer_date);
 CREATE INDEX tbl_token_ownerships_transfer_value ON tbl_token_ownerships (transfer_value);
 CREATE INDEX tbl_token_ownerships_transfer_transaction_hash ON tbl_token_ownerships (transfer_transaction_hash);
+CREATE INDEX tbl_token_ownerships_registry_address_token_id_sort_key ON tbl_token_ownerships (registry_address, token_id_sort_key);
 -- NOTE(krishan711): this is O(10m) rows and fills O(10k) per day
 ALTER TABLE tbl_token_ownerships SET (autovacuum_vacuum_scale_factor = 0.01);
 ALTER TABLE tbl_token_ownerships SET (autovacuum_analyze_scale_factor = 0.001);
@@ -151,7 +158,8 @@ CREATE TABLE tbl_token_multi_ownerships (
     quantity NUMERIC(256, 0) NOT NULL,
     average_transfer_value NUMERIC(256, 0) NOT NULL,
     latest_transfer_date TIMESTAMP WITHOUT TIME ZONE NOT NULL,
-    latest_transfer_transaction_hash TEXT NOT NULL
+    latest_transfer_transaction_hash TEXT NOT NULL,
+    token_id_sort_key NUMERIC(78, 0)
 );
 CREATE UNIQUE INDEX tbl_token_multi_ownerships_registry_address_token_id_owner_address ON tbl_token_multi_ownerships (registry_address, token_id, owner_address);
 CREATE INDEX tbl_token_multi_ownerships_registry_address_token_id_updated_date ON tbl_token_multi_ownerships (registry_address, token_id, updated_date);
@@ -163,9 +171,11 @@ CREATE INDEX tbl_token_multi_ownerships_updated_date ON tbl_token_multi_ownershi
 CREATE INDEX tbl_token_multi_ownerships_regsitry_address ON tbl_token_multi_ownerships (registry_address);
 CREATE INDEX tbl_token_multi_ownerships_token_id ON tbl_token_multi_ownerships (token_id);
 CREATE INDEX tbl_token_multi_ownerships_owner_address ON tbl_token_multi_ownerships (owner_address);
+CREATE INDEX tbl_token_multi_ownerships_owner_address_registry_address_quantity ON tbl_token_multi_ownerships (owner_address, registry_address, quantity);
 CREATE INDEX tbl_token_multi_ownerships_latest_transfer_date ON tbl_token_multi_ownerships (latest_transfer_date);
 CREATE INDEX tbl_token_multi_ownerships_latest_transfer_value ON tbl_token_multi_ownerships (latest_transfer_value);
 CREATE INDEX tbl_token_multi_ownerships_latest_transfer_transaction_hash ON tbl_token_multi_ownerships (latest_transfer_transaction_hash);
+CREATE INDEX tbl_token_multi_ownerships_registry_address_token_id_sort_key ON tbl_token_multi_ownerships (registry_address, token_id_sort_key);
 -- NOTE(krishan711): this is O(10m) rows and fills O(10k) per day
 ALTER TABLE tbl_token_multi_ownerships SET (autovacuum_vacuum_scale_factor = 0.01);
 ALTER TABLE tbl_token_multi_ownerships SET (autovacuum_analyze_scale_factor = 0.001);
@@ -227,7 +237,8 @@ CREATE TABLE tbl_latest_updates (
     updated_date TIMESTAMP WITHOUT TIME ZONE NOT NULL,
     key TEXT NOT NULL,
     name TEXT ,
-    date TIMESTAMP WITHOUT TIME ZONE NOT NULL
+    date TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    cursor TEXT
 );
 CREATE UNIQUE INDEX tbl_latest_updates_key_name on tbl_latest_updates (key, name);
 CREATE INDEX tbl_latest_updates_created_date ON tbl_latest_updates (created_date);
@@ -254,10 +265,30 @@ CREATE TABLE tbl_latest_token_listings (
 CREATE INDEX tbl_latest_token_listings_source_registry_address_token_id_offerer_address ON tbl_latest_token_listings (source, registry_address, token_id, offerer_address);
 CREATE INDEX tbl_latest_token_listings_registry_address_token_id_value ON tbl_latest_token_listings (registry_address, token_id, value);
 CREATE INDEX tbl_latest_token_listings_registry_address_token_id_offerer_address ON tbl_latest_token_listings (registry_address, token_id, offerer_address);
+CREATE INDEX tbl_latest_token_listings_registry_address_source_source_id ON tbl_latest_token_listings (registry_address, source, source_id);
 CREATE INDEX tbl_latest_token_listings_created_date ON tbl_latest_token_listings (created_date);
 CREATE INDEX tbl_latest_token_listings_updated_date ON tbl_latest_token_listings (updated_date);
 
 
+CREATE TABLE tbl_best_token_listings (
+    id BIGINT NOT NULL,
+    created_date TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    updated_date TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    offerer_address TEXT NOT NULL,
+    registry_address TEXT NOT NULL,
+    token_id TEXT NOT NULL,
+    start_date TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    end_date TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    is_value_native BOOLEAN NOT NULL,
+    value NUMERIC(256, 0) NOT NULL,
+    source TEXT NOT NULL,
+    source_id TEXT NOT NULL,
+    PRIMARY KEY (registry_address, token_id)
+);
+CREATE INDEX tbl_best_token_listings_registry_address_value_token_id ON tbl_best_token_listings (registry_address, value, token_id);
+CREATE INDEX tbl_best_token_listings_registry_address_end_date ON tbl_best_token_listings (registry_address, end_date);
+
+
 CREATE TABLE tbl_token_attributes (
     id BIGSERIAL PRIMARY KEY,
     created_date TIMESTAMP WITHOUT TIME ZONE NOT NULL,
@@ -276,6 +307,18 @@ CREATE INDEX tbl_token_attributes_registry_address ON tbl_token_attributes (regi
 CREATE INDEX tbl_token_attributes_name ON tbl_token_attributes (name);
 CREATE INDEX tbl_token_attributes_value ON tbl_token_attributes (value);
 
+CREATE TABLE tbl_token_attribute_bitmaps (
+    id BIGSERIAL PRIMARY KEY,
+    created_date TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    updated_date TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    registry_address TEXT NOT NULL,
+    name TEXT NOT NULL,
+    value TEXT NOT NULL,
+    token_count INTEGER NOT NULL,
+    bitmap BYTEA NOT NULL
+);
+CREATE UNIQUE INDEX tbl_token_attribute_bitmaps_registry_address_name_value ON tbl_token_attribute_bitmaps (registry_address, name, value);
+
 
 CREATE TABLE tbl_token_customizations (
     id BIGSERIAL PRIMARY KEY,
@@ -427,6 +470,44 @@ CREATE INDEX tbl_account_collection_gms_account_address ON tbl_account_collectio
 CREATE INDEX tbl_account_collection_gms_registry_address_date ON tbl_account_collection_gms (registry_address, date);
 CREATE INDEX tbl_account_collection_gms_date ON tbl_account_collection_gms (date);
 
+CREATE TABLE tbl_gm_account_counts (
+    created_date TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    updated_date TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    address TEXT NOT NULL,
+    latest_date TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    streak_length INTEGER NOT NULL,
+    week_count INTEGER NOT NULL,
+    month_count INTEGER NOT NULL,
+    PRIMARY KEY (address)
+);
+CREATE INDEX tbl_gm_account_counts_streak_length_latest_date ON tbl_gm_account_counts (streak_length, latest_date);
+CREATE INDEX tbl_gm_account_counts_latest_date ON tbl_gm_account_counts (latest_date);
+
+CREATE TABLE tbl_gm_account_collection_counts (
+    created_date TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    updated_date TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    registry_address TEXT NOT NULL,
+    account_address TEXT NOT NULL,
+    latest_date TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    week_count INTEGER NOT NULL,
+    month_count INTEGER NOT NULL,
+    PRIMARY KEY (registry_address, account_address)
+);
+CREATE INDEX tbl_gm_account_collection_counts_registry_address_latest_date ON tbl_gm_account_collection_counts (registry_address, latest_date);
+CREATE INDEX tbl_gm_account_collection_counts_latest_date ON tbl_gm_account_collection_counts (latest_date);
+
+CREATE TABLE tbl_gm_collection_counts (
+    created_date TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    updated_date TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    registry_address TEXT NOT NULL,
+    today_date TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    today_count INTEGER NOT NULL,
+    week_count INTEGER NOT NULL,
+    month_count INTEGER NOT NULL,
+    PRIMARY KEY (registry_address)
+);
+CREATE INDEX tbl_gm_collection_counts_month_count ON tbl_gm_collection_counts (month_count);
+
 CREATE TABLE tbl_collection_overlaps (
     id BIGSERIAL PRIMARY KEY,
     created_date TIMESTAMP WITHOUT TIME ZONE NOT NULL,
@@ -501,7 +582,7 @@ CREATE TABLE tbl_token_stakings (
 CREATE UNIQUE INDEX tbl_token_stakings_regsitry_address_staking_address_owner_address_token_id ON tbl_token_stakings (registry_address, staking_address, owner_address, token_id);
 CREATE INDEX tbl_token_stakings_created_date ON tbl_token_stakings (created_date);
 CREATE INDEX tbl_token_stakings_updated_date ON tbl_token_stakings (updated_date);
-CREATE INDEX tbl_token_stakings_registry_address_token_id ON tbl_token_stakings (registry_address, token_id);
+CREATE UNIQUE INDEX tbl_token_stakings_registry_address_token_id ON tbl_token_stakings (registry_address, token_id);
 CREATE INDEX tbl_token_stakings_registry_address ON tbl_token_stakings (registry_address);
 CREATE INDEX tbl_token_stakings_staking_address ON tbl_token_stakings (staking_address);
 CREATE INDEX tbl_token_stakings_owner_address ON tbl_token_stakings (owner_address);
@@ -548,3 +629,32 @@ CREATE INDEX tbl_sub_collection_tokens_updated_date ON tbl_sub_collection_tokens
 CREATE INDEX tbl_sub_collection_tokens_sub_collection_id ON tbl_sub_collection_tokens (sub_collection_id);
 CREATE INDEX tbl_sub_collection_tokens_registry_address ON tbl_sub_collection_tokens (registry_address);
 CREATE INDEX tbl_sub_collection_tokens_token_id ON tbl_sub_collection_tokens (token_id);
+
+CREATE SEQUENCE seq_broadcast_event_ids;
+
+CREATE TABLE tbl_queue_messages (
+    id BIGSERIAL PRIMARY KEY,
+    created_date TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    updated_date TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    queue_name TEXT NOT NULL,
+    visible_date TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    receive_count INTEGER NOT NULL,
+    receipt_handle TEXT,
+    body TEXT NOT NULL
+);
+CREATE INDEX tbl_queue_messages_queue_name_visible_date ON tbl_queue_messages (queue_name, visible_date);
+CREATE UNIQUE INDEX tbl_queue_messages_receipt_handle ON tbl_queue_messages (receipt_handle);
+
+CREATE TABLE tbl_backfill_checkpoints (
+    id SERIAL PRIMARY KEY,
+    created_date TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    updated_date TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    job_name TEXT NOT NULL,
+    start_index BIGINT NOT NULL,
+    end_index BIGINT NOT NULL,
+    completed_index BIGINT NOT NULL,
+    lease_owner TEXT,
+    lease_date TIMESTAMP WITHOUT TIME ZONE,
+    completed_date TIMESTAMP WITHOUT TIME ZONE
+);
+CREATE UNIQUE INDEX tbl_backfill_checkpoints_job_name_start_index ON tbl_backfill_checkpoints (job_name, start_index);
@@ -49,12 +49,12 @@ CREATE INDEX mvw_user_registry_ordered_ownerships_registry_address_owner_address
 
 CREATE VIEW vw_token_ownerships AS
 (
-    SELECT id, created_date, updated_date, registry_address, token_id, owner_address, transfer_value AS average_transfer_value, transfer_date AS latest_transfer_date, transfer_transaction_hash AS latest_transfer_transaction_hash, 1 AS quantity
+    SELECT id, created_date, updated_date, registry_address, token_id, owner_address, transfer_value AS average_transfer_value, transfer_date AS latest_transfer_date, transfer_transaction_hash AS latest_transfer_transaction_hash, 1 AS quantity, token_id_sort_key
     FROM tbl_token_ownerships
 )
 UNION
 (
-    SELECT id, created_date, updated_date, registry_address, token_id, owner_address, average_transfer_value, latest_transfer_date, latest_transfer_transaction_hash, quantity
+    SELECT id, created_date, updated_date, registry_address, token_id, owner_address, average_transfer_value, latest_transfer_date, latest_transfer_transaction_hash, quantity, token_id_sort_key
     FROM tbl_token_multi_ownerships
 );
 
@@ -22,8 +22,11 @@ GRANT INSERT, SELECT, UPDATE ON tbl_latest_updates TO notd_api;
 GRANT ALL ON SEQUENCE tbl_latest_updates_id_seq TO notd_api;
 GRANT INSERT, SELECT, UPDATE, DELETE ON tbl_latest_token_listings TO notd_api;
 GRANT ALL ON SEQUENCE tbl_latest_token_listings_id_seq TO notd_api;
+GRANT INSERT, SELECT, UPDATE, DELETE ON tbl_best_token_listings TO notd_api;
 GRANT INSERT, SELECT, UPDATE, DELETE ON tbl_token_attributes TO notd_api;
 GRANT ALL ON SEQUENCE tbl_token_attributes_id_seq TO notd_api;
+GRANT INSERT, SELECT, UPDATE, DELETE ON tbl_token_attribute_bitmaps TO notd_api;
+GRANT ALL ON SEQUENCE tbl_token_attribute_bitmaps_id_seq TO notd_api;
 GRANT INSERT, SELECT, UPDATE, DELETE ON tbl_token_customizations TO notd_api;
 GRANT ALL ON SEQUENCE tbl_token_customizations_id_seq TO notd_api;
 GRANT INSERT, SELECT, UPDATE, DELETE ON tbl_locks TO notd_api;
@@ -40,6 +43,9 @@ GRANT INSERT, SELECT, UPDATE ON tbl_account_gms TO notd_api;
 GRANT ALL ON SEQUENCE tbl_account_gms_id_seq TO notd_api;
 GRANT INSERT, SELECT, UPDATE ON tbl_account_collection_gms TO notd_api;
 GRANT ALL ON SEQUENCE tbl_account_collection_gms_id_seq TO notd_api;
+GRANT INSERT, SELECT, UPDATE ON tbl_gm_account_counts TO notd_api;
+GRANT INSERT, SELECT, UPDATE ON tbl_gm_account_collection_counts TO notd_api;
+GRANT INSERT, SELECT, UPDATE ON tbl_gm_collection_counts TO notd_api;
 GRANT INSERT, SELECT, UPDATE, DELETE ON tbl_collection_overlaps TO notd_api;
 GRANT ALL ON SEQUENCE tbl_collection_overlaps_id_seq TO notd_api;
 GRANT INSERT, SELECT, UPDATE, DELETE ON tbl_gallery_badge_holders TO notd_api;
@@ -52,6 +58,11 @@ GRANT INSERT, SELECT, UPDATE ON tbl_sub_collections TO notd_api;
 GRANT ALL ON SEQUENCE tbl_sub_collections_id_seq TO notd_api;
 GRANT INSERT, SELECT, UPDATE ON tbl_sub_collection_tokens TO notd_api;
 GRANT ALL ON SEQUENCE tbl_sub_collection_tokens_id_seq TO notd_api;
+GRANT ALL ON SEQUENCE seq_broadcast_event_ids TO notd_api;
+GRANT INSERT, SELECT, UPDATE, DELETE ON tbl_queue_messages TO notd_api;
+GRANT ALL ON SEQUENCE tbl_queue_messages_id_seq TO notd_api;
+GRANT INSERT, SELECT, UPDATE, DELETE ON tbl_backfill_checkpoints TO notd_api;
+GRANT ALL ON SEQUENCE tbl_backfill_checkpoints_id_seq TO notd_api;
 GRANT SELECT ON vw_token_ownerships to notd_api;
 GRANT SELECT ON vw_ordered_token_listings to notd_api;
 GRANT SELECT ON vw_gallery_badge_holders to notd_api;
@@ -69,7 +80,9 @@ GRANT SELECT ON tbl_collection_total_activities TO obafemi;
 GRANT SELECT ON tbl_user_interactions TO obafemi;
 GRANT SELECT ON tbl_latest_updates TO obafemi;
 GRANT SELECT ON tbl_latest_token_listings TO obafemi;
+GRANT SELECT ON tbl_best_token_listings TO obafemi;
 GRANT SELECT ON tbl_token_attributes TO obafemi;
+GRANT SELECT ON tbl_token_attribute_bitmaps TO obafemi;
 GRANT SELECT ON tbl_token_customizations TO obafemi;
 GRANT SELECT ON tbl_locks TO obafemi;
 GRANT SELECT ON tbl_twitter_profiles TO obafemi;
@@ -77,12 +90,17 @@ GRANT SELECT ON tbl_user_profiles TO obafemi;
 GRANT SELECT ON tbl_gallery_customers TO obafemi;
 GRANT SELECT ON tbl_account_gms TO obafemi;
 GRANT SELECT ON tbl_account_collection_gms TO obafemi;
+GRANT SELECT ON tbl_gm_account_counts TO obafemi;
+GRANT SELECT ON tbl_gm_account_collection_counts TO obafemi;
+GRANT SELECT ON tbl_gm_collection_counts TO obafemi;
 GRANT SELECT ON tbl_collection_overlaps TO obafemi;
 GRANT SELECT ON tbl_gallery_badge_holders TO obafemi;
 GRANT SELECT ON tbl_gallery_badge_assignments TO obafemi;
 GRANT SELECT ON tbl_token_stakings TO obafemi;
 GRANT SELECT ON tbl_sub_collections TO obafemi;
 GRANT SELECT ON tbl_sub_collection_tokens TO obafemi;
+GRANT SELECT ON tbl_queue_messages TO obafemi;
+GRANT SELECT ON tbl_backfill_checkpoints TO obafemi;
 GRANT SELECT ON vw_token_ownerships to obafemi;
 GRANT SELECT ON vw_ordered_token_listings to obafemi;
 GRANT SELECT ON vw_gallery_badge_holders to obafemi;